@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Replay dead-lettered messages through the per-agent Temporal mailbox.
+
+Pending rows (replayed_at IS NULL) are re-driven oldest-first per agent via
+signal-with-start on AgentMailboxWorkflow, rate limited across all agents.
+Rows are marked replayed once Temporal accepts the signal. Replays keep the
+original event_id and conversation_id (the mailbox dedupes them on a per-replay
+key instead), so if the delivery fails again the dead-letter activity's upsert
+resets the same row to pending.
+
+Requires scripts/migration/003_add_dead_letter_replay_columns.sql.
+
+Usage:
+    python scripts/admin/replay_dead_letters.py [--agent AGENT_ID ...] [--limit N]
+        [--rate MSGS_PER_SEC] [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from temporal_workflows.activities.dead_letters import (
+    ReplayProgress,
+    fetch_pending,
+    replay_dead_letters,
+    replay_dedupe_key,
+)
+from temporal_workflows.activities.deliver import DB_URL
+from temporal_workflows.workflows.agent_mailbox import (
+    AgentMailboxInput,
+    AgentMailboxWorkflow,
+    MailboxMessage,
+    mailbox_workflow_id,
+)
+
+
+def _print_progress(progress: ReplayProgress) -> None:
+    done = progress.replayed + progress.failed
+    print(
+        f"\r  {done}/{progress.total} processed — {progress.replayed} replayed, "
+        f"{progress.failed} failed ({progress.rate:.1f} msg/s)",
+        end="",
+        flush=True,
+    )
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay dead-lettered messages")
+    parser.add_argument("--agent", action="append", dest="agents", help="Only replay this agent (repeatable)")
+    parser.add_argument("--limit", type=int, default=10000, help="Maximum rows to replay")
+    parser.add_argument("--rate", type=float, default=5.0, help="Messages per second across all agents")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be replayed")
+    args = parser.parse_args()
+
+    import asyncpg
+    from temporalio.client import Client
+
+    conn = await asyncpg.connect(DB_URL)
+    try:
+        if args.dry_run:
+            rows = await fetch_pending(conn, args.agents, args.limit)
+            per_agent: dict[str, int] = {}
+            for row in rows:
+                per_agent[row["agent_id"]] = per_agent.get(row["agent_id"], 0) + 1
+            print(f"📋 {len(rows)} pending dead letters across {len(per_agent)} agents")
+            for agent_id, count in sorted(per_agent.items(), key=lambda item: -item[1]):
+                print(f"  {agent_id}: {count}")
+            return 0
+
+        client = await Client.connect(
+            os.getenv("TEMPORAL_HOST", "192.168.50.90:7233"),
+            namespace=os.getenv("TEMPORAL_NAMESPACE", "matrix"),
+        )
+        task_queue = os.getenv("TEMPORAL_TASK_QUEUE", "matrix-file-queue")
+
+        async def _enqueue(row) -> None:
+            await client.start_workflow(
+                AgentMailboxWorkflow.run,
+                AgentMailboxInput(agent_id=row["agent_id"]),
+                id=mailbox_workflow_id(row["agent_id"]),
+                task_queue=task_queue,
+                start_signal="enqueue",
+                start_signal_args=[
+                    MailboxMessage(
+                        room_id=row["room_id"],
+                        message_body=row["message_body"],
+                        sender=row["sender"],
+                        event_id=row["event_id"],
+                        conversation_id=row["conversation_id"] or "",
+                        # The mailbox may still remember the original event_id
+                        dedupe_key=replay_dedupe_key(row),
+                    )
+                ],
+            )
+
+        print(f"🔁 Replaying dead letters at {args.rate} msg/s...")
+        progress = await replay_dead_letters(
+            conn,
+            _enqueue,
+            agent_ids=args.agents,
+            limit=args.limit,
+            rate_per_second=args.rate,
+            on_progress=_print_progress,
+        )
+        print()
+        print(f"✓ Replayed {progress.replayed}/{progress.total} ({progress.failed} left pending)")
+        return 0 if progress.failed == 0 else 1
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
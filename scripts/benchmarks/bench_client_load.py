@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test: how many messages/sec the matrix-client sustains.
+
+Starts FakeHomeserver + FakeGateway (fake_services, child process), seeds a
+throwaway SQLite database with ``--rooms`` agent rooms (one agent and one
+identity each), and runs the real ``src.matrix.client.main`` against them in
+this process. Once the client is syncing, the homeserver injects
+``--messages`` user messages at ``--rate``/s from ``--senders`` users into
+random rooms; each is answered by the full pipeline (sync → message_router →
+task dispatch → gateway stream → Matrix send/edit).
+
+Reports
+  * throughput       — replies/sec from the first injected message until
+                       every message is answered (or --drain-timeout),
+  * e2e latency      — message injected into /sync until its m.text reply
+                       reaches the homeserver (p50/p90/p99/max),
+  * event-loop lag   — overshoot of a 50 ms ticker on the client's loop,
+  * upstream counts  — homeserver requests by kind, gateway sessions,
+                       messages and frames, sync responses and bytes,
+  * sync parse time  — client-side decode time per sync response
+                       (sync_tuning counters).
+
+The gateway's model behaviour is set by ``--first-token-ms`` and
+``--tokens-per-sec``; ``--matrix-latency-ms`` delays every homeserver reply.
+
+Usage:
+    python scripts/benchmarks/bench_client_load.py --rooms 2000 --senders 500 --rate 20 --messages 600
+    python scripts/benchmarks/bench_client_load.py --rooms 200 --rate 50 --tokens-per-sec 80 --live-edit --json load.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from fake_services import serve_in_subprocess, synthetic_turn
+
+SERVER_NAME = "bench.local"
+LAG_INTERVAL = 0.05
+
+
+def _client_env(args, workdir: str, homeserver_url: str, gateway_url: str) -> dict:
+    return {
+        "MATRIX_HOMESERVER_URL": homeserver_url,
+        "MATRIX_USERNAME": f"@letta:{SERVER_NAME}",
+        "MATRIX_PASSWORD": "bench",
+        "MATRIX_ROOM_ID": "",
+        "MATRIX_SESSION_STORE_ENABLED": "false",
+        "MATRIX_DATA_DIR": workdir,
+        "MATRIX_EVENT_DEDUPE_DB": f"{workdir}/matrix_event_dedupe.db",
+        "DOCUMENT_PARSING_CACHE_DB": f"{workdir}/document_parse_cache.db",
+        "MATRIX_AGENT_SYNC_INTERVAL": "86400",
+        "MATRIX_API_URL": homeserver_url,
+        # Startup agent sync finds Letta REST down (503) and leaves the seeded mappings alone
+        "LETTA_API_URL": homeserver_url,
+        "LETTA_STREAMING_ENABLED": "true",
+        "LETTA_STREAMING_LIVE_EDIT": "true" if args.live_edit else "false",
+        "LETTA_GATEWAY_ENABLED": "true",
+        "LETTA_GATEWAY_URL": gateway_url,
+        "LETTA_GATEWAY_MAX_CONNECTIONS": str(args.gateway_connections),
+        "LETTA_CODE_ENABLED": "false",
+        "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+        "HAYHOOKS_EMBEDDER_WARMUP_ENABLED": "false",
+        "LOG_LEVEL": args.log_level,
+    }
+
+
+def _seed_database(rooms: int) -> list:
+    """One agent mapping + letta identity per room; returns the room IDs."""
+    from src.models.agent_mapping import AgentMapping, Base, get_engine, get_session_maker
+    from src.models.identity import Identity
+
+    Base.metadata.create_all(get_engine())
+    room_ids = [f"!load{n}:{SERVER_NAME}" for n in range(rooms)]
+    session = get_session_maker()()
+    try:
+        for n, room_id in enumerate(room_ids):
+            agent_id = f"agent-{n:05d}"
+            mxid = f"@agent_{n:05d}:{SERVER_NAME}"
+            session.add(AgentMapping(
+                agent_id=agent_id, agent_name=f"Load Agent {n}", matrix_user_id=mxid,
+                matrix_password="bench", room_id=room_id, room_created=True,
+            ))
+            session.add(Identity(
+                id=f"letta_{agent_id}", identity_type="letta", mxid=mxid, display_name=f"Load Agent {n}",
+                access_token=f"tok-agent_{n:05d}", password_hash="bench",
+            ))
+        session.commit()
+    finally:
+        session.close()
+    return room_ids
+
+
+async def _monitor_loop_lag(samples: list) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(time.perf_counter() - start - LAG_INTERVAL)
+
+
+async def _stats(session: aiohttp.ClientSession, homeserver_url: str) -> dict:
+    async with session.get(f"{homeserver_url}/_bench/stats") as response:
+        return await response.json()
+
+
+async def _wait_for(session, homeserver_url, predicate, timeout: float, client_task) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        stats = await _stats(session, homeserver_url)
+        if predicate(stats) or time.monotonic() > deadline:
+            return stats
+        if client_task.done():
+            client_task.result()  # surface the crash
+            raise RuntimeError("matrix-client main() exited early")
+        await asyncio.sleep(0.2)
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(pct):
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] * 1000
+
+    return {"p50": pick(50), "p90": pick(90), "p99": pick(99), "max": ordered[-1] * 1000}
+
+
+async def _run(args, room_ids: list, homeserver_url: str) -> dict:
+    from src.matrix import client as matrix_client
+    from src.matrix import sync_tuning
+
+    lag_samples: list = []
+    lag_task = asyncio.create_task(_monitor_loop_lag(lag_samples))
+    client_task = asyncio.create_task(matrix_client.main())
+    async with aiohttp.ClientSession() as session:
+        # Initial sync plus one long-poll means the sync_forever loop is up
+        await _wait_for(
+            session, homeserver_url, lambda s: s["sync"]["responses"] >= 2, args.startup_timeout, client_task
+        )
+        startup_lag = len(lag_samples)
+        before = await _stats(session, homeserver_url)
+        client_sync_before = sync_tuning.snapshot()
+
+        load_started = time.monotonic()
+        spec = {"rooms": room_ids, "senders": args.senders, "rate": args.rate, "messages": args.messages}
+        async with session.post(f"{homeserver_url}/_bench/load", json=spec) as response:
+            response.raise_for_status()
+        load_window = args.messages / args.rate
+        stats = await _wait_for(
+            session, homeserver_url,
+            lambda s: s["load"]["injected"] >= args.messages and s["load"]["unanswered"] == 0,
+            load_window + args.drain_timeout, client_task,
+        )
+        elapsed = time.monotonic() - load_started
+
+    client_sync = sync_tuning.snapshot()
+    client_task.cancel()
+    lag_task.cancel()
+    await asyncio.gather(client_task, lag_task, return_exceptions=True)
+
+    requests = {
+        kind: count - before["homeserver"].get(kind, 0)
+        for kind, count in sorted(stats["homeserver"].items())
+        if count - before["homeserver"].get(kind, 0)
+    }
+    gateway = {k: v - before["gateway"].get(k, 0) for k, v in stats["gateway"].items()}
+    load_lag = lag_samples[startup_lag:]
+    replied = stats["load"]["replied"]
+    parsed = client_sync["sync_responses_total"] - client_sync_before["sync_responses_total"]
+    parse_seconds = client_sync["sync_parse_seconds_total"] - client_sync_before["sync_parse_seconds_total"]
+    return {
+        "injected": stats["load"]["injected"],
+        "replied": replied,
+        "unanswered": stats["load"]["unanswered"],
+        "elapsed_s": elapsed,
+        "throughput_per_s": replied / elapsed if elapsed else 0.0,
+        "latency_ms": _percentiles(stats["load"]["latencies"]),
+        "loop_lag_ms": _percentiles(load_lag),
+        "loop_lag_mean_ms": statistics.mean(load_lag) * 1000 if load_lag else None,
+        "homeserver_requests": requests,
+        "homeserver_requests_per_reply": {k: v / replied for k, v in requests.items()} if replied else {},
+        "gateway": gateway,
+        "sync": {
+            "responses": stats["sync"]["responses"] - before["sync"]["responses"],
+            "bytes": stats["sync"]["bytes"] - before["sync"]["bytes"],
+            "parse_ms_mean": parse_seconds / parsed * 1000 if parsed else None,
+            "parse_ms_max": client_sync["sync_parse_seconds_max"] * 1000,
+        },
+    }
+
+
+def _print_report(args, result: dict) -> None:
+    print(
+        f"rooms {args.rooms}, senders {args.senders}, offered {args.rate:g} msg/s x {args.messages}, "
+        f"{'live-edit' if args.live_edit else 'progress'} streaming"
+    )
+    print(
+        f"replied {result['replied']}/{result['injected']} in {result['elapsed_s']:.1f}s "
+        f"({result['throughput_per_s']:.1f} msg/s), unanswered {result['unanswered']}"
+    )
+    for label, key in (("e2e latency", "latency_ms"), ("loop lag", "loop_lag_ms")):
+        p = result[key]
+        if p:
+            print(f"{label:<12} p50 {p['p50']:8.1f} ms  p90 {p['p90']:8.1f} ms  p99 {p['p99']:8.1f} ms  max {p['max']:8.1f} ms")
+    print("homeserver  " + ", ".join(
+        f"{kind}={count} ({result['homeserver_requests_per_reply'].get(kind, 0):.1f}/reply)"
+        for kind, count in result["homeserver_requests"].items()
+    ))
+    print("gateway     " + ", ".join(f"{k}={v}" for k, v in result["gateway"].items()))
+    sync = result["sync"]
+    parse = f" parse mean {sync['parse_ms_mean']:.2f} ms max {sync['parse_ms_max']:.2f} ms" if sync["parse_ms_mean"] else ""
+    print(f"sync        responses={sync['responses']} bytes={sync['bytes']}{parse}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--senders", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20.0, help="offered messages/sec")
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="0 = send frames back-to-back")
+    parser.add_argument("--matrix-latency-ms", type=float, default=0.0)
+    parser.add_argument("--tool-calls", type=int, default=2)
+    parser.add_argument("--live-edit", action="store_true")
+    parser.add_argument("--gateway-connections", type=int, default=20)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--drain-timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--log-level", default="WARNING", help="matrix-client LOG_LEVEL")
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    rng = random.Random(args.seed)
+    turns = [
+        synthetic_turn(rng, tool_calls=args.tool_calls, reasoning_chunks=10, assistant_chunks=20)
+        for _ in range(8)
+    ]
+    with tempfile.TemporaryDirectory() as workdir, serve_in_subprocess(
+        turns,
+        matrix_latency=args.matrix_latency_ms / 1000,
+        first_frame_delay=args.first_token_ms / 1000,
+        tokens_per_sec=args.tokens_per_sec,
+    ) as (homeserver_url, gateway_url):
+        # main() keeps relative state (matrix_store, data files) under the cwd
+        os.chdir(workdir)
+        os.environ.update(_client_env(args, workdir, homeserver_url, gateway_url))
+        room_ids = _seed_database(args.rooms)
+        result = asyncio.run(_run(args, room_ids, homeserver_url))
+
+    logging.shutdown()
+    _print_report(args, result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": result}, f, indent=2)
+        print(f"results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Gateway frame decoding benchmark: legacy per-frame path vs the fast path.
+
+Replays one or more recorded gateway transcripts (``--transcript``, JSONL with
+one raw WebSocket frame per line) or a synthetic tool-heavy turn (reasoning
+chunks, assistant chunks, and tool calls streamed as progressive
+``status='running'`` snapshots) through
+
+  * legacy — json.loads on every frame, full StreamEvent parse, eager
+    truncated-dict TOOL_CALL log argument, running snapshots dropped last,
+  * fast   — filtered reasoning frames are sniffed and skipped undecoded,
+    decode_gateway_frame (orjson when installed, else json), running
+    snapshots dropped before parsing, lazy TOOL_CALL log formatting,
+
+and reports total time and per-frame cost for each.
+
+Usage:
+    python scripts/benchmarks/bench_gateway_frames.py --tool-calls 20 --snapshots 40
+    python scripts/benchmarks/bench_gateway_frames.py --transcript recorded_turn.jsonl --repeat 50
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.letta import gateway_stream_reader as reader
+from src.letta import ws_gateway_client as gateway
+from src.matrix.streaming import StreamEvent, StreamEventType
+
+legacy_logger = logging.getLogger("bench.legacy_gateway_stream_reader")
+
+
+def _legacy_handle(raw_frame: str, include_reasoning: bool):
+    """The pre-fast-path decode + parse, kept verbatim for comparison."""
+    try:
+        raw = json.loads(raw_frame)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if raw.get("type") != "stream":
+        return reader._parse_gateway_event(raw, include_reasoning)
+    mapped_type = reader._EVENT_MAP.get(raw.get("event", ""))
+    if mapped_type is None:
+        return None
+    if mapped_type == StreamEventType.REASONING and not include_reasoning:
+        return None
+    metadata = {}
+    if mapped_type == StreamEventType.TOOL_CALL:
+        metadata["tool_name"] = raw.get("tool_name", "unknown")
+        if raw.get("tool_call_id"):
+            metadata["tool_call_id"] = raw["tool_call_id"]
+        if raw.get("status"):
+            metadata["tool_call_status"] = raw["status"]
+        tool_args = raw.get("tool_input") or raw.get("arguments")
+        if tool_args:
+            metadata["arguments"] = tool_args
+        legacy_logger.info(
+            "[GW-STREAM] TOOL_CALL raw=%s",
+            {k: (v[:200] if isinstance(v, str) and len(v) > 200 else v) for k, v in raw.items()},
+        )
+    event = StreamEvent(type=mapped_type, content=raw.get("content"), metadata=metadata)
+    if event.metadata.get("tool_call_status") == "running":
+        return None
+    return event
+
+
+def _fast_handle(raw_frame: str, skip: frozenset, include_reasoning: bool):
+    if skip and gateway._should_skip(raw_frame, skip):
+        return None
+    try:
+        raw = gateway.decode_gateway_frame(raw_frame)
+    except (ValueError, TypeError):
+        return None
+    if raw.get("status") == "running" and raw.get("event") == "tool_call":
+        return None
+    return reader._parse_gateway_event(raw, include_reasoning)
+
+
+def _synthetic_turn(args) -> list:
+    rng = random.Random(args.seed)
+    frames = [json.dumps({"type": "session_init", "session_id": "s-1", "conversation_id": "c-1"})]
+    words = ["the", "agent", "checks", "files", "and", "reports", "status", "of", "build", "tests"]
+
+    def chunk():
+        return " ".join(rng.choice(words) for _ in range(rng.randint(2, 6))) + " "
+
+    for call in range(args.tool_calls):
+        for _ in range(args.reasoning_chunks):
+            frames.append(json.dumps({"type": "stream", "event": "reasoning", "content": chunk()}))
+        command = "".join(rng.choice("abcdefghij /-_.") for _ in range(args.arg_bytes))
+        tc_id = f"tc-{call}"
+        for step in range(1, args.snapshots + 1):
+            partial = command[: len(command) * step // args.snapshots]
+            frames.append(json.dumps({
+                "type": "stream", "event": "tool_call", "tool_name": "Bash",
+                "tool_call_id": tc_id, "tool_input": {"command": partial}, "status": "running",
+            }))
+        frames.append(json.dumps({
+            "type": "stream", "event": "tool_call", "tool_name": "Bash",
+            "tool_call_id": tc_id, "tool_input": {"command": command}, "status": "completed",
+        }))
+        frames.append(json.dumps({
+            "type": "stream", "event": "tool_result", "tool_name": "Bash",
+            "tool_call_id": tc_id, "content": chunk() * 20, "is_error": False,
+        }))
+        for _ in range(args.assistant_chunks):
+            frames.append(json.dumps({"type": "stream", "event": "assistant", "uuid": "m-1", "content": chunk()}))
+    frames.append(json.dumps({"type": "result", "success": True}))
+    return frames
+
+
+def _load_transcripts(paths) -> list:
+    frames = []
+    for path in paths:
+        with open(Path(path).expanduser()) as f:
+            frames.extend(line.rstrip("\n") for line in f if line.strip())
+    return frames
+
+
+def _run(handler, frames, repeat) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame in frames:
+            handler(frame)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transcript", action="append", help="JSONL of raw gateway frames (repeatable)")
+    parser.add_argument("--tool-calls", type=int, default=20)
+    parser.add_argument("--snapshots", type=int, default=40, help="running snapshots per tool call")
+    parser.add_argument("--arg-bytes", type=int, default=2000, help="final tool_input size per call")
+    parser.add_argument("--reasoning-chunks", type=int, default=30)
+    parser.add_argument("--assistant-chunks", type=int, default=30)
+    parser.add_argument("--include-reasoning", action="store_true")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--log-level", default="INFO", help="level for the TOOL_CALL loggers (production: INFO)")
+    args = parser.parse_args()
+
+    # Records are built and filtered but not written, so only formatting cost shows
+    level = getattr(logging, args.log_level.upper())
+    for log in (legacy_logger, reader.logger):
+        log.setLevel(level)
+        log.addHandler(logging.NullHandler())
+        log.propagate = False
+
+    frames = _load_transcripts(args.transcript) if args.transcript else _synthetic_turn(args)
+    if not frames:
+        sys.exit("No frames found")
+    skip = frozenset() if args.include_reasoning else frozenset({"reasoning"})
+    total_bytes = sum(len(f) for f in frames)
+
+    legacy = _run(lambda f: _legacy_handle(f, args.include_reasoning), frames, args.repeat)
+    fast = _run(lambda f: _fast_handle(f, skip, args.include_reasoning), frames, args.repeat)
+    has_orjson = gateway.HAS_ORJSON
+    gateway.HAS_ORJSON = False
+    try:
+        fast_json = _run(lambda f: _fast_handle(f, skip, args.include_reasoning), frames, args.repeat)
+    finally:
+        gateway.HAS_ORJSON = has_orjson
+
+    print(f"frames: {len(frames)} ({total_bytes / 1024:.0f} KiB) x {args.repeat} runs, "
+          f"orjson {'available' if has_orjson else 'not installed'}")
+    print(f"{'path':<22}{'median ms':>11}{'us/frame':>10}{'speedup':>9}")
+    base = statistics.median(legacy)
+    for name, timings in (("legacy (json)", legacy), ("fast (json)", fast_json), ("fast (orjson/json)", fast)):
+        median = statistics.median(timings)
+        print(f"{name:<22}{median * 1000:>11.2f}{median / len(frames) * 1e6:>10.2f}{base / median:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
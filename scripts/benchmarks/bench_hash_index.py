@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Concurrent download benchmark: legacy flock + .hashes.json vs SQLite hash store.
+
+Each worker process registers ``--per-worker`` new hashes against an index
+pre-seeded with ``--seed`` entries, mimicking the download activity's
+dedupe step (file copy excluded so only the index cost is measured).
+
+Usage:
+    python scripts/benchmarks/bench_hash_index.py --workers 8 --per-worker 200 --seed 5000
+"""
+import argparse
+import fcntl
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from temporal_workflows.activities import hash_store
+
+
+def _legacy_claim(documents_dir: str, file_hash: str, name: str) -> bool:
+    """The pre-SQLite _mutate_hash_index_locked round trip."""
+    idx_path = os.path.join(documents_dir, ".hashes.json")
+    lock_path = os.path.join(documents_dir, ".hashes.lock")
+    with open(lock_path, "a+") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            index = {}
+            if os.path.exists(idx_path):
+                with open(idx_path, "r") as f:
+                    index = json.load(f)
+            if file_hash in index:
+                return False
+            index[file_hash] = {"filename": name, "mxc_url": "", "persistent_path": name, "ts": time.time()}
+            tmp_path = idx_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, idx_path)
+            return True
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _sqlite_claim(documents_dir: str, file_hash: str, name: str) -> bool:
+    return hash_store.claim(documents_dir, file_hash, name, "", name) is None
+
+
+def _worker(args) -> list[float]:
+    backend, documents_dir, worker_id, count = args
+    claim = _legacy_claim if backend == "json" else _sqlite_claim
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        claim(documents_dir, f"w{worker_id}-{i:06d}", f"doc-{worker_id}-{i}.pdf")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _seed(backend: str, documents_dir: str, count: int) -> None:
+    entries = {
+        f"seed-{i:08d}": {"filename": f"seed{i}.pdf", "mxc_url": "", "persistent_path": f"seed{i}.pdf", "ts": 0.0}
+        for i in range(count)
+    }
+    with open(os.path.join(documents_dir, ".hashes.json"), "w") as f:
+        json.dump(entries, f, indent=2)
+    if backend == "sqlite":
+        hash_store.migrate_legacy_index(documents_dir)
+
+
+def run(backend: str, workers: int, per_worker: int, seed: int) -> dict:
+    with tempfile.TemporaryDirectory() as documents_dir:
+        _seed(backend, documents_dir, seed)
+        ctx = multiprocessing.get_context("spawn")
+        start = time.perf_counter()
+        with ctx.Pool(workers) as pool:
+            results = pool.map(_worker, [(backend, documents_dir, w, per_worker) for w in range(workers)])
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for worker in results for latency in worker)
+    total = len(latencies)
+    return {
+        "backend": backend,
+        "ops": total,
+        "elapsed_s": round(elapsed, 3),
+        "ops_per_s": round(total / elapsed, 1),
+        "p50_ms": round(latencies[total // 2] * 1000, 2),
+        "p99_ms": round(latencies[min(total - 1, int(total * 0.99))] * 1000, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-worker", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=5000, help="Entries already in the index")
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers x {args.per_worker} downloads, index pre-seeded with {args.seed} entries")
+    for backend in ("json", "sqlite"):
+        r = run(backend, args.workers, args.per_worker, args.seed)
+        print(
+            f"  {r['backend']:>6}: {r['ops']} ops in {r['elapsed_s']}s "
+            f"({r['ops_per_s']} ops/s), p50={r['p50_ms']}ms p99={r['p99_ms']}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
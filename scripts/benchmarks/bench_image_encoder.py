@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Image upload encoding benchmark: legacy quality ladder vs budget-targeted encoder.
+
+Runs every image in ``--corpus`` (or a generated set of phone-photo-like
+JPEGs and screenshot-like PNGs) through
+
+  * legacy — the old _compress_to_budget: PNG, then JPEG 85/75/65/55 with
+    optimize=True at full size, then a halved fallback,
+  * cold   — encode_image_for_budget with an empty cache,
+  * warm   — encode_image_for_budget again (re-shared / forwarded image),
+
+and reports per-image latency and output size.
+
+Usage:
+    python scripts/benchmarks/bench_image_encoder.py --photos 6 --screenshots 6
+    python scripts/benchmarks/bench_image_encoder.py --corpus ~/Pictures/samples
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.matrix import file_image_handler as encoder
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+
+
+def _legacy_compress(file_path: str):
+    """The pre-prediction _compress_to_budget, kept verbatim for comparison."""
+    with Image.open(file_path) as img:
+        img.load()
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    if max(img.size) > encoder.MAX_DIMENSION:
+        ratio = encoder.MAX_DIMENSION / max(img.size)
+        img = img.resize((int(img.size[0] * ratio), int(img.size[1] * ratio)), Image.Resampling.LANCZOS)
+    if has_alpha:
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", optimize=True)
+        if buf.tell() <= encoder.MAX_RAW_BYTES:
+            return buf.getvalue(), "image/png"
+        bg = Image.new("RGB", img.size, (255, 255, 255))
+        alpha = img.split()[-1] if img.mode == "RGBA" else None
+        bg.paste(img.convert("RGBA"), mask=alpha)
+        img = bg
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    for quality in encoder.JPEG_QUALITIES:
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=quality, optimize=True)
+        if buf.tell() <= encoder.MAX_RAW_BYTES:
+            return buf.getvalue(), "image/jpeg"
+    halved = img.resize((img.size[0] // 2, img.size[1] // 2), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    halved.save(buf, format="JPEG", quality=55, optimize=True)
+    return buf.getvalue(), "image/jpeg"
+
+
+def _make_photo(path: str, rng: random.Random) -> None:
+    """Phone-photo stand-in: 12 MP gradient with sensor-like noise, saved as q92 JPEG."""
+    width, height = 4032, 3024
+    base = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    tint = Image.new("RGB", (width, height), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    noise = Image.effect_noise((width, height), rng.uniform(20, 60)).convert("RGB")
+    img = Image.blend(Image.blend(base, tint, 0.4), noise, rng.uniform(0.25, 0.5))
+    img.save(path, format="JPEG", quality=92)
+
+
+def _make_screenshot(path: str, rng: random.Random) -> None:
+    """Screenshot stand-in: flat UI blocks and text-like strokes, saved as PNG."""
+    width, height = 1170, 2532
+    img = Image.new("RGB", (width, height), (250, 250, 250))
+    draw = ImageDraw.Draw(img)
+    y = 0
+    while y < height:
+        block = rng.randint(60, 240)
+        colour = tuple(rng.randint(180, 255) for _ in range(3))
+        draw.rectangle([0, y, width, y + block], fill=colour)
+        for line in range(y + 12, y + block - 12, 28):
+            x = 24
+            while x < width - 80:
+                word = rng.randint(20, 110)
+                draw.rectangle([x, line, x + word, line + 14], fill=(30, 30, 30))
+                x += word + 14
+        y += block + 8
+    img.save(path, format="PNG")
+
+
+def _corpus(args, workdir: str) -> list:
+    if args.corpus:
+        return sorted(
+            str(p) for p in Path(args.corpus).expanduser().iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+        )
+    rng = random.Random(args.seed)
+    paths = []
+    for i in range(args.photos):
+        path = os.path.join(workdir, f"photo_{i}.jpg")
+        _make_photo(path, rng)
+        paths.append(path)
+    for i in range(args.screenshots):
+        path = os.path.join(workdir, f"screenshot_{i}.png")
+        _make_screenshot(path, rng)
+        paths.append(path)
+    return paths
+
+
+def _time(fn, path):
+    start = time.perf_counter()
+    result = fn(path)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of sample images (default: generate a synthetic corpus)")
+    parser.add_argument("--photos", type=int, default=6)
+    parser.add_argument("--screenshots", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = _corpus(args, workdir)
+        if not paths:
+            sys.exit("No images found")
+
+        encoder.reset()
+        rows = []
+        for path in paths:
+            legacy_ms, (legacy_bytes, _) = _time(_legacy_compress, path)
+            cold_ms, (_, media_type, raw_len) = _time(encoder.encode_image_for_budget, path)
+            warm_ms, _ = _time(encoder.encode_image_for_budget, path)
+            rows.append((Path(path).name, legacy_ms, cold_ms, warm_ms, len(legacy_bytes), raw_len, media_type))
+
+    print(f"{'image':<22}{'legacy ms':>11}{'cold ms':>10}{'warm ms':>10}{'legacy KiB':>12}{'new KiB':>10}  type")
+    for name, legacy_ms, cold_ms, warm_ms, legacy_len, new_len, media_type in rows:
+        print(
+            f"{name:<22}{legacy_ms:>11.1f}{cold_ms:>10.1f}{warm_ms:>10.2f}"
+            f"{legacy_len / 1024:>12.0f}{new_len / 1024:>10.0f}  {media_type}"
+        )
+
+    legacy = [r[1] for r in rows]
+    cold = [r[2] for r in rows]
+    warm = [r[3] for r in rows]
+    print()
+    print(f"median legacy {statistics.median(legacy):.1f} ms | cold {statistics.median(cold):.1f} ms | warm {statistics.median(warm):.2f} ms")
+    print(f"speedup (cold) {sum(legacy) / sum(cold):.2f}x | over budget: {sum(1 for r in rows if r[5] > encoder.MAX_RAW_BYTES)}")
+    print(f"encoder stats: {encoder.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
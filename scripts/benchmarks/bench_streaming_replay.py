@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Streaming pipeline replay benchmark: gateway transcript → Matrix requests.
+
+Replays recorded gateway transcripts (``--transcript``, JSONL of raw WS
+frames or SSE ``data:`` lines, split into turns at each ``result`` frame) or
+synthetic tool-heavy turns through the real pipeline
+
+    GatewayClient → stream_via_gateway → StreamingMessageHandler /
+    LiveEditStreamingHandler → Matrix send/edit/redact over HTTP
+
+against the local FakeGateway and FakeHomeserver from fake_services (run in
+a child process, so nothing leaves the machine). For each handler mode it
+reports
+
+  * frames/sec        — gateway frames consumed per second of turn time,
+  * first event ms    — turn start until the first Matrix event exists
+                        (median and p95),
+  * Matrix requests   — send / edit / redact per turn,
+  * peak memory       — tracemalloc peak of one turn (separate, untimed pass).
+
+``--json`` saves the results with the current commit; ``--compare`` prints
+them next to a saved run, so numbers can be compared across commits.
+
+Usage:
+    python scripts/benchmarks/bench_streaming_replay.py --turns 50
+    python scripts/benchmarks/bench_streaming_replay.py --transcript turns.jsonl --json after.json --compare before.json
+    python scripts/benchmarks/bench_streaming_replay.py --frame-delay-ms 5 --matrix-latency-ms 40 --mode live-edit
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import aiohttp
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from fake_services import load_transcript_turns, serve_in_subprocess, synthetic_turn
+from src.letta.gateway_stream_reader import stream_via_gateway
+from src.letta.ws_gateway_client import GatewayClient
+from src.matrix.agent_message_content import _build_edit_content, _build_message_content
+from src.matrix.streaming import LiveEditStreamingHandler, StreamEventType, StreamingMessageHandler
+
+ROOM_ID = "!bench:matrix.test"
+AGENT_ID = "agent-bench"
+MODES = ("stream", "live-edit")
+
+
+class MatrixRecorder:
+    """The letta_bridge message callbacks, sending raw HTTP to the fake homeserver."""
+
+    def __init__(self, session: aiohttp.ClientSession, homeserver_url: str):
+        self.session = session
+        self.homeserver_url = homeserver_url
+        self.requests: Counter = Counter()
+        self.first_event_at = None
+
+    def reset(self) -> None:
+        self.requests = Counter()
+        self.first_event_at = None
+
+    async def _put(self, kind: str, path: str, body: dict) -> str:
+        async with self.session.put(f"{self.homeserver_url}{path}", json=body) as response:
+            response.raise_for_status()
+            event_id = (await response.json()).get("event_id", "")
+        self.requests[kind] += 1
+        if self.first_event_at is None:
+            self.first_event_at = time.perf_counter()
+        return event_id
+
+    async def send_message(
+        self, rid, content, msgtype="m.text", thread_event_id=None, thread_latest_event_id=None
+    ) -> str:
+        body = _build_message_content(
+            content, msgtype, room_id=rid,
+            thread_event_id=thread_event_id, thread_latest_event_id=thread_latest_event_id,
+        )
+        return await self._put("send", f"/_matrix/client/r0/rooms/{rid}/send/m.room.message/{uuid.uuid4()}", body)
+
+    async def edit_message(self, rid, event_id, new_body, msgtype="m.text") -> None:
+        body = _build_edit_content(event_id, new_body, msgtype)
+        await self._put("edit", f"/_matrix/client/r0/rooms/{rid}/send/m.room.message/{uuid.uuid4()}", body)
+
+    async def delete_message(self, rid, event_id) -> None:
+        body = {"reason": "Progress message replaced"}
+        await self._put("redact", f"/_matrix/client/v3/rooms/{rid}/redact/{event_id}/{uuid.uuid4()}", body)
+
+
+def _make_handler(mode: str, matrix: MatrixRecorder):
+    # Same wiring as letta_bridge.send_to_letta_api_streaming
+    if mode == "live-edit":
+        return LiveEditStreamingHandler(
+            send_message=matrix.send_message,
+            edit_message=matrix.edit_message,
+            room_id=ROOM_ID,
+            delete_message=matrix.delete_message,
+        )
+    return StreamingMessageHandler(
+        send_message=matrix.send_message,
+        delete_message=matrix.delete_message,
+        room_id=ROOM_ID,
+        delete_progress=False,
+    )
+
+
+async def _replay_turn(gateway: GatewayClient, matrix: MatrixRecorder, mode: str, index: int) -> dict:
+    handler = _make_handler(mode, matrix)
+    matrix.reset()
+    start = time.perf_counter()
+    async for event in stream_via_gateway(client=gateway, agent_id=AGENT_ID, message=f"replay:{index}"):
+        if event.type == StreamEventType.REASONING:
+            continue
+        await handler.handle_event(event)
+    await handler.cleanup()
+    elapsed = time.perf_counter() - start
+    first = matrix.first_event_at - start if matrix.first_event_at is not None else None
+    return {"elapsed": elapsed, "first_event": first, "requests": dict(matrix.requests)}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _bench_mode(homeserver_url, gateway_url, turns, mode, args) -> dict:
+    gateway = GatewayClient(gateway_url=gateway_url)
+    async with aiohttp.ClientSession() as session:
+        matrix = MatrixRecorder(session, homeserver_url)
+        try:
+            for index in range(min(args.warmup, len(turns))):
+                await _replay_turn(gateway, matrix, mode, index)
+
+            results = []
+            for n in range(args.turns):
+                results.append(await _replay_turn(gateway, matrix, mode, n % len(turns)))
+
+            tracemalloc.start()
+            peaks = []
+            for index in range(min(args.memory_turns, len(turns))):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                await _replay_turn(gateway, matrix, mode, index)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            tracemalloc.stop()
+        finally:
+            await gateway.close()
+
+    frames = sum(len(turns[n % len(turns)]) for n in range(args.turns))
+    elapsed = sum(r["elapsed"] for r in results)
+    firsts = [r["first_event"] * 1000 for r in results if r["first_event"] is not None]
+    requests = Counter()
+    for r in results:
+        requests.update(r["requests"])
+    return {
+        "turns": args.turns,
+        "frames": frames,
+        "frames_per_sec": frames / elapsed,
+        "turn_ms_median": statistics.median(r["elapsed"] for r in results) * 1000,
+        "first_event_ms_median": statistics.median(firsts) if firsts else None,
+        "first_event_ms_p95": _percentile(firsts, 95) if firsts else None,
+        "requests_per_turn": {k: v / args.turns for k, v in sorted(requests.items())},
+        "peak_kib": max(peaks) / 1024 if peaks else None,
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=project_root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _fmt(value, spec):
+    return format(value, spec) if value is not None else "-".rjust(int(spec.split(".")[0].lstrip(">")))
+
+
+def _print_results(results: dict, baseline: dict) -> None:
+    print(f"{'mode':<11}{'frames/s':>11}{'turn ms':>9}{'1st ms':>8}{'1st p95':>9}{'req/turn':>10}{'peak KiB':>10}  requests")
+    for mode, r in results.items():
+        per_turn = r["requests_per_turn"]
+        detail = " ".join(f"{k}={v:.1f}" for k, v in per_turn.items())
+        print(
+            f"{mode:<11}{r['frames_per_sec']:>11.0f}{r['turn_ms_median']:>9.2f}"
+            f"{_fmt(r['first_event_ms_median'], '>8.2f')}{_fmt(r['first_event_ms_p95'], '>9.2f')}"
+            f"{sum(per_turn.values()):>10.1f}{_fmt(r['peak_kib'], '>10.0f')}  {detail}"
+        )
+        base = baseline.get("results", {}).get(mode)
+        if base:
+            base_req = sum(base["requests_per_turn"].values())
+            print(
+                f"{'  vs ' + baseline.get('commit', '?'):<11}{r['frames_per_sec'] / base['frames_per_sec']:>10.2f}x"
+                f"{base['turn_ms_median'] / r['turn_ms_median']:>8.2f}x"
+                f"{'':>17}{sum(per_turn.values()) - base_req:>+10.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transcript", action="append", help="recorded gateway frames, JSONL or SSE (repeatable)")
+    parser.add_argument("--mode", choices=MODES + ("both",), default="both")
+    parser.add_argument("--turns", type=int, default=50, help="timed turns per mode")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--memory-turns", type=int, default=3, help="untimed turns traced with tracemalloc")
+    parser.add_argument("--frame-delay-ms", type=float, default=0.0, help="gateway pause before each frame")
+    parser.add_argument("--matrix-latency-ms", type=float, default=0.0, help="homeserver response latency")
+    parser.add_argument("--synthetic-turns", type=int, default=8, help="distinct synthetic turns to cycle through")
+    parser.add_argument("--tool-calls", type=int, default=5)
+    parser.add_argument("--reasoning-chunks", type=int, default=30)
+    parser.add_argument("--assistant-chunks", type=int, default=30)
+    parser.add_argument("--snapshots", type=int, default=0, help="running tool_call snapshots per call")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="results file from an earlier run to compare against")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()))
+
+    if args.transcript:
+        turns = load_transcript_turns(args.transcript)
+    else:
+        rng = random.Random(args.seed)
+        turns = [
+            synthetic_turn(
+                rng, tool_calls=args.tool_calls, reasoning_chunks=args.reasoning_chunks,
+                assistant_chunks=args.assistant_chunks, snapshots=args.snapshots,
+            )
+            for _ in range(args.synthetic_turns)
+        ]
+    if not turns:
+        sys.exit("No turns found")
+    modes = MODES if args.mode == "both" else (args.mode,)
+
+    results = {}
+    with serve_in_subprocess(
+        turns, frame_delay=args.frame_delay_ms / 1000, matrix_latency=args.matrix_latency_ms / 1000
+    ) as (homeserver_url, gateway_url):
+        for mode in modes:
+            results[mode] = asyncio.run(_bench_mode(homeserver_url, gateway_url, turns, mode, args))
+
+    report = {
+        "commit": _commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "source": args.transcript or "synthetic",
+        "distinct_turns": len(turns),
+        "frame_delay_ms": args.frame_delay_ms,
+        "matrix_latency_ms": args.matrix_latency_ms,
+        "results": results,
+    }
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print(f"{len(turns)} distinct turns, {args.turns} timed per mode, commit {report['commit']}")
+    _print_results(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
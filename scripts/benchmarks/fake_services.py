@@ -0,0 +1,491 @@
+"""
+Local stand-ins for the Matrix homeserver and the Letta WS gateway, for
+offline benchmarks.
+
+  * FakeHomeserver — aiohttp app answering the client-server endpoints the
+    matrix-client hits (sync, send/edit/redact, typing, receipts, media,
+    ...); every request is counted by kind and answered after an optional
+    fixed latency. inject_message() / ``POST /_bench/load`` feed user
+    traffic into /sync and time each reply.
+  * FakeGateway — websockets server speaking the lettabot gateway protocol
+    (session_start → session_init, message → stream frames → result). A
+    message whose content is ``replay:<n>`` gets turn ``n`` of its
+    transcript replayed frame-for-frame, optionally paced like a model.
+
+``serve_in_subprocess`` runs both in a child process so the benchmark's own
+CPU and memory numbers only cover the pipeline under test; counters are read
+back over ``GET /_bench/stats`` on the homeserver.
+"""
+import asyncio
+import itertools
+import json
+import multiprocessing
+import random
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+# SSE captures of the gateway stream carry the same JSON after a "data:" prefix
+_SSE_IGNORED = ("event:", "id:", "retry:", ":")
+
+
+def load_transcript_turns(paths) -> List[List[str]]:
+    """
+    Read raw gateway frames (JSONL, or SSE ``data:`` lines) and split them
+    into turns at each ``result`` frame. Connection-level session_init frames
+    are dropped; the fake gateway sends its own on connect.
+    """
+    turns: List[List[str]] = []
+    current: List[str] = []
+    for path in paths:
+        with open(Path(path).expanduser()) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith(_SSE_IGNORED):
+                    continue
+                if line.startswith("data:"):
+                    line = line[5:].strip()
+                    if line == "[DONE]":
+                        continue
+                try:
+                    frame_type = json.loads(line).get("type")
+                except (ValueError, AttributeError):
+                    continue
+                if frame_type == "session_init":
+                    continue
+                current.append(line)
+                if frame_type == "result":
+                    turns.append(current)
+                    current = []
+    if current:
+        current.append(json.dumps({"type": "result", "success": True}))
+        turns.append(current)
+    return turns
+
+
+def synthetic_turn(
+    rng: random.Random,
+    tool_calls: int = 5,
+    reasoning_chunks: int = 30,
+    assistant_chunks: int = 30,
+    arg_bytes: int = 200,
+    snapshots: int = 0,
+) -> List[str]:
+    """
+    One tool-heavy agent turn as the modern gateway sends it: reasoning and
+    assistant chunks around completed tool calls and their results, then a
+    result frame. ``snapshots`` > 0 adds progressive status='running'
+    tool_call frames (the ?progressive_tool_calls=1 wire contract).
+    """
+    words = ["the", "agent", "checks", "files", "and", "reports", "status", "of", "build", "tests"]
+
+    def chunk():
+        return " ".join(rng.choice(words) for _ in range(rng.randint(2, 6))) + " "
+
+    frames = []
+    for call in range(tool_calls):
+        for _ in range(reasoning_chunks):
+            frames.append(json.dumps({"type": "stream", "event": "reasoning", "content": chunk()}))
+        command = "".join(rng.choice("abcdefghij /-_.") for _ in range(arg_bytes))
+        tc_id = f"tc-{call}"
+        for step in range(1, snapshots + 1):
+            frames.append(json.dumps({
+                "type": "stream", "event": "tool_call", "tool_name": "Bash", "tool_call_id": tc_id,
+                "tool_input": {"command": command[: len(command) * step // snapshots]}, "status": "running",
+            }))
+        frames.append(json.dumps({
+            "type": "stream", "event": "tool_call", "tool_name": "Bash", "tool_call_id": tc_id,
+            "tool_input": {"command": command}, "status": "completed",
+        }))
+        frames.append(json.dumps({
+            "type": "stream", "event": "tool_result", "tool_name": "Bash", "tool_call_id": tc_id,
+            "content": chunk() * 20, "is_error": False,
+        }))
+    for _ in range(assistant_chunks):
+        frames.append(json.dumps({"type": "stream", "event": "assistant", "uuid": "m-1", "content": chunk()}))
+    frames.append(json.dumps({"type": "result", "success": True}))
+    return frames
+
+
+class FakeHomeserver:
+    """
+    Answers the client-server API the matrix-client uses: login/whoami,
+    joined_rooms/join, long-poll /sync, send/edit/redact, typing, receipts,
+    read markers, presence, profile and media. Letta REST calls (``/v1/``)
+    get 503; other unknown endpoints get ``{}`` and are counted as "other".
+
+    /sync only carries what inject_message() queued (the load generator's
+    user traffic); the client's own sends are not echoed back. An injected
+    message is answered when the next m.text send or edit reaches its room,
+    which closes one end-to-end latency sample.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        stats_sources: Optional[List[Any]] = None,
+        server_name: str = "bench.local",
+    ):
+        self.latency = latency
+        self.server_name = server_name
+        self.requests: Counter = Counter()
+        self.joined_rooms: set = set()
+        self.sync_responses = 0
+        self.sync_bytes = 0
+        self.injected = 0
+        self.replied = 0
+        self.latencies: List[float] = []
+        self._stats_sources = stats_sources or []
+        self._event_ids = itertools.count(1)
+        self._batches = itertools.count(1)
+        self._timelines: Dict[str, List[Dict[str, Any]]] = {}
+        self._timeline_changed = asyncio.Event()
+        self._awaiting_reply: Dict[str, deque] = {}
+        self._load_task: Optional[asyncio.Task] = None
+        self._runner: Optional[web.AppRunner] = None
+        self.url: Optional[str] = None
+
+        client = "/_matrix/client/{version}"
+        media = "/_matrix/media/{version}"
+        room = client + "/rooms/{room_id}"
+        routes = [
+            web.get("/_matrix/client/versions", self._versions),
+            web.post(client + "/login", self._login),
+            web.post(client + "/register", self._login),
+            web.get(client + "/account/whoami", self._whoami),
+            web.get(client + "/joined_rooms", self._joined_rooms),
+            web.post(client + "/join/{room_id}", self._join),
+            web.post(room + "/join", self._join),
+            web.get(client + "/sync", self._sync),
+            web.put(room + "/send/{event_type}/{txn_id}", self._send),
+            web.put(room + "/redact/{event_id}/{txn_id}", self._redact),
+            web.put(room + "/typing/{user_id}", self._counted("typing")),
+            web.post(room + "/receipt/{receipt_type}/{event_id}", self._counted("receipt")),
+            web.post(room + "/read_markers", self._counted("read_markers")),
+            web.put(client + "/presence/{user_id}/status", self._counted("presence")),
+            web.get(client + "/profile/{user_id}", self._profile),
+            web.put(client + "/profile/{user_id}/{field}", self._counted("profile")),
+            web.post(media + "/upload", self._upload),
+            web.get(media + "/config", self._media_config),
+            web.get(media + "/download/{server}/{media_id}", self._download),
+            web.get("/_matrix/client/v1/media/download/{server}/{media_id}", self._download),
+            web.route("*", "/v1/{tail:.*}", self._letta_unavailable),
+            web.post("/_bench/load", self._start_load),
+            web.get("/_bench/stats", self._stats),
+            web.route("*", "/{tail:.*}", self._counted("other")),
+        ]
+        self.app = web.Application(client_max_size=64 * 2**20)
+        self.app.add_routes(routes)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{bound_port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._load_task is not None:
+            self._load_task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def inject_message(self, room_id: str, sender: str, body: str) -> str:
+        """Queue a user m.text message for the next /sync of *room_id*."""
+        event_id = f"$in{next(self._event_ids)}:{self.server_name}"
+        self._timelines.setdefault(room_id, []).append({
+            "type": "m.room.message",
+            "event_id": event_id,
+            "sender": sender,
+            "origin_server_ts": int(time.time() * 1000),
+            "content": {"msgtype": "m.text", "body": body},
+        })
+        self._awaiting_reply.setdefault(room_id, deque()).append(time.monotonic())
+        self.injected += 1
+        self._timeline_changed.set()
+        return event_id
+
+    def stats(self) -> Dict[str, Any]:
+        merged: Dict[str, Any] = {
+            "homeserver": dict(self.requests),
+            "sync": {"responses": self.sync_responses, "bytes": self.sync_bytes},
+            "load": {
+                "injected": self.injected,
+                "replied": self.replied,
+                "unanswered": sum(len(q) for q in self._awaiting_reply.values()),
+                "latencies": self.latencies,
+            },
+        }
+        for source in self._stats_sources:
+            merged.update(source.stats())
+        return merged
+
+    async def _respond(self, kind: str, body: Optional[Dict[str, Any]] = None) -> web.Response:
+        self.requests[kind] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response(body if body is not None else {})
+
+    def _counted(self, kind: str):
+        async def handler(request: web.Request) -> web.Response:
+            return await self._respond(kind)
+        return handler
+
+    def _user_for(self, request: web.Request) -> str:
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        localpart = token.removeprefix("tok-") or "bench"
+        return f"@{localpart}:{self.server_name}"
+
+    async def _versions(self, request: web.Request) -> web.Response:
+        return web.json_response({"versions": ["r0.6.1", "v1.1", "v1.5", "v1.11"]})
+
+    async def _login(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        user = (body.get("identifier") or {}).get("user") or body.get("user") or body.get("username") or "bench"
+        localpart = user.lstrip("@").split(":")[0]
+        return await self._respond("login", {
+            "user_id": f"@{localpart}:{self.server_name}",
+            "access_token": f"tok-{localpart}",
+            "device_id": "BENCHDEVICE",
+        })
+
+    async def _whoami(self, request: web.Request) -> web.Response:
+        return await self._respond("whoami", {"user_id": self._user_for(request)})
+
+    async def _joined_rooms(self, request: web.Request) -> web.Response:
+        return await self._respond("joined_rooms", {"joined_rooms": sorted(self.joined_rooms)})
+
+    async def _join(self, request: web.Request) -> web.Response:
+        room_id = request.match_info["room_id"]
+        self.joined_rooms.add(room_id)
+        return await self._respond("join", {"room_id": room_id})
+
+    async def _sync(self, request: web.Request) -> web.Response:
+        self.requests["sync"] += 1
+        if request.query.get("since") and not self._timelines:
+            timeout = int(request.query.get("timeout", "0")) / 1000
+            self._timeline_changed.clear()
+            try:
+                await asyncio.wait_for(self._timeline_changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        timelines, self._timelines = self._timelines, {}
+        joined = {
+            room_id: {
+                "timeline": {"events": events, "limited": False, "prev_batch": "p0"},
+                "state": {"events": []},
+                "ephemeral": {"events": []},
+                "account_data": {"events": []},
+                "summary": {},
+            }
+            for room_id, events in timelines.items()
+        }
+        payload = json.dumps({
+            "next_batch": f"s{next(self._batches)}",
+            "rooms": {"join": joined, "invite": {}, "leave": {}},
+            "presence": {"events": []},
+            "account_data": {"events": []},
+            "to_device": {"events": []},
+            "device_lists": {"changed": [], "left": []},
+            "device_one_time_keys_count": {},
+        })
+        self.sync_responses += 1
+        self.sync_bytes += len(payload)
+        return web.Response(text=payload, content_type="application/json")
+
+    async def _send(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        relates_to = body.get("m.relates_to") or {}
+        kind = "edit" if relates_to.get("rel_type") == "m.replace" else "send"
+        msgtype = (body.get("m.new_content") or body).get("msgtype")
+        waiting = self._awaiting_reply.get(request.match_info["room_id"])
+        if msgtype == "m.text" and waiting:
+            self.latencies.append(time.monotonic() - waiting.popleft())
+            self.replied += 1
+        return await self._respond(kind, {"event_id": f"$bench{next(self._event_ids)}"})
+
+    async def _redact(self, request: web.Request) -> web.Response:
+        return await self._respond("redact", {"event_id": f"$bench{next(self._event_ids)}"})
+
+    async def _profile(self, request: web.Request) -> web.Response:
+        user_id = request.match_info["user_id"]
+        return await self._respond("profile", {"displayname": user_id.lstrip("@").split(":")[0]})
+
+    async def _upload(self, request: web.Request) -> web.Response:
+        await request.read()
+        return await self._respond("media_upload", {"content_uri": f"mxc://{self.server_name}/m{next(self._event_ids)}"})
+
+    async def _media_config(self, request: web.Request) -> web.Response:
+        return await self._respond("media_config", {"m.upload.size": 50 * 2**20})
+
+    async def _download(self, request: web.Request) -> web.Response:
+        self.requests["media_download"] += 1
+        return web.Response(body=b"\x89PNG\r\n\x1a\n", content_type="image/png")
+
+    async def _letta_unavailable(self, request: web.Request) -> web.Response:
+        # Letta REST is out of scope: startup agent sync sees the API down and
+        # aborts without touching the seeded mappings.
+        self.requests["letta"] += 1
+        return web.json_response({"detail": "unavailable in benchmark"}, status=503)
+
+    async def _start_load(self, request: web.Request) -> web.Response:
+        spec = await request.json()
+        if self._load_task is not None and not self._load_task.done():
+            return web.json_response({"error": "load already running"}, status=409)
+        self._load_task = asyncio.create_task(self._generate_load(**spec))
+        return web.json_response({"started": True})
+
+    async def _generate_load(self, rooms: List[str], senders: int, rate: float, messages: int, seed: int = 7) -> None:
+        """Inject *messages* user messages at *rate*/s across *rooms* from *senders* users."""
+        rng = random.Random(seed)
+        start = time.monotonic()
+        for n in range(messages):
+            delay = start + n / rate - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            sender = f"@user_{rng.randrange(senders)}:{self.server_name}"
+            self.inject_message(rng.choice(rooms), sender, f"load message {n}")
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+
+class FakeGateway:
+    """
+    Replays turns as gateway frames. ``first_frame_delay`` models time to
+    first token; ``tokens_per_sec`` paces content-bearing frames by their
+    word count; ``frame_delay`` is a flat per-frame pause.
+    """
+
+    def __init__(
+        self,
+        turns: List[List[str]],
+        frame_delay: float = 0.0,
+        first_frame_delay: float = 0.0,
+        tokens_per_sec: float = 0.0,
+    ):
+        if not turns:
+            raise ValueError("FakeGateway needs at least one turn to replay")
+        self.turns = turns
+        self.frame_delay = frame_delay
+        self.first_frame_delay = first_frame_delay
+        self.sessions = 0
+        self.messages = 0
+        self.frames_sent = 0
+        self._delays = [[self._pace(frame, tokens_per_sec) for frame in turn] for turn in turns]
+        self._server = None
+        self.url: Optional[str] = None
+
+    def _pace(self, frame: str, tokens_per_sec: float) -> float:
+        delay = self.frame_delay
+        if tokens_per_sec:
+            content = json.loads(frame).get("content")
+            if isinstance(content, str):
+                delay += len(content.split()) / tokens_per_sec
+        return delay
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._server = await serve(self._handle, host, port, max_size=2**22)
+        bound_port = self._server.sockets[0].getsockname()[1]
+        self.url = f"ws://{host}:{bound_port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"gateway": {"sessions": self.sessions, "messages": self.messages, "frames": self.frames_sent}}
+
+    def _turn_index(self, content: Any) -> int:
+        if isinstance(content, str) and content.startswith("replay:"):
+            try:
+                return int(content[7:]) % len(self.turns)
+            except ValueError:
+                pass
+        return self.messages % len(self.turns)
+
+    async def _handle(self, ws) -> None:
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                msg_type = msg.get("type")
+                if msg_type == "session_start":
+                    self.sessions += 1
+                    await ws.send(json.dumps({
+                        "type": "session_init",
+                        "session_id": f"bench-session-{self.sessions}",
+                        "conversation_id": msg.get("conversation_id") or f"bench-conv-{self.sessions}",
+                    }))
+                elif msg_type == "message":
+                    index = self._turn_index(msg.get("content"))
+                    self.messages += 1
+                    if self.first_frame_delay:
+                        await asyncio.sleep(self.first_frame_delay)
+                    for frame, delay in zip(self.turns[index], self._delays[index]):
+                        if delay:
+                            await asyncio.sleep(delay)
+                        await ws.send(frame)
+                    self.frames_sent += len(self.turns[index])
+                elif msg_type == "session_close":
+                    break
+        except ConnectionClosed:
+            pass
+
+
+async def _serve(conn, turns, matrix_latency: float, gateway_options: Dict[str, float]) -> None:
+    gateway = FakeGateway(turns, **gateway_options)
+    homeserver = FakeHomeserver(latency=matrix_latency, stats_sources=[gateway])
+    gateway_url = await gateway.start()
+    homeserver_url = await homeserver.start()
+    conn.send((homeserver_url, gateway_url))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await gateway.stop()
+        await homeserver.stop()
+
+
+def _serve_main(conn, turns, matrix_latency: float, gateway_options: Dict[str, float]) -> None:
+    asyncio.run(_serve(conn, turns, matrix_latency, gateway_options))
+
+
+@contextmanager
+def serve_in_subprocess(
+    turns: List[List[str]],
+    frame_delay: float = 0.0,
+    matrix_latency: float = 0.0,
+    first_frame_delay: float = 0.0,
+    tokens_per_sec: float = 0.0,
+    startup_timeout: float = 30.0,
+) -> Iterator[Tuple[str, str]]:
+    """Run FakeHomeserver + FakeGateway in a child process; yields (homeserver_url, gateway_url)."""
+    gateway_options = {
+        "frame_delay": frame_delay, "first_frame_delay": first_frame_delay, "tokens_per_sec": tokens_per_sec,
+    }
+    ctx = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe()
+    process = ctx.Process(
+        target=_serve_main, args=(child_conn, turns, matrix_latency, gateway_options), daemon=True
+    )
+    process.start()
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while not parent_conn.poll(0.1):
+            if not process.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Fake services failed to start")
+        yield parent_conn.recv()
+    finally:
+        process.terminate()
+        process.join(5)
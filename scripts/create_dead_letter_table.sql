@@ -8,16 +8,22 @@ CREATE TABLE IF NOT EXISTS dead_letter_messages (
     agent_id TEXT NOT NULL,
     message_body TEXT NOT NULL,
     sender TEXT NOT NULL,
+    conversation_id TEXT NOT NULL DEFAULT '',
     error TEXT DEFAULT '',
     attempts INTEGER DEFAULT 0,
     created_at TIMESTAMPTZ DEFAULT NOW(),
-    failed_at TIMESTAMPTZ DEFAULT NOW()
+    failed_at TIMESTAMPTZ DEFAULT NOW(),
+    replayed_at TIMESTAMPTZ,
+    replay_count INTEGER NOT NULL DEFAULT 0
 );
 
 -- Index for querying by room or agent
 CREATE INDEX IF NOT EXISTS idx_dead_letter_room_id ON dead_letter_messages(room_id);
 CREATE INDEX IF NOT EXISTS idx_dead_letter_agent_id ON dead_letter_messages(agent_id);
 CREATE INDEX IF NOT EXISTS idx_dead_letter_created_at ON dead_letter_messages(created_at);
+CREATE INDEX IF NOT EXISTS idx_dead_letter_pending
+    ON dead_letter_messages(agent_id, created_at, id)
+    WHERE replayed_at IS NULL;
 
 -- Comment
 COMMENT ON TABLE dead_letter_messages IS 'Messages that failed delivery to Letta agents after exhausting retries';
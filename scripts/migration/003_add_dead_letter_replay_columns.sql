@@ -0,0 +1,14 @@
+-- Migration: Track dead-letter replays
+-- Date: 2026-10-18
+
+-- replayed_at IS NULL means the row is still pending replay; a new failure for
+-- the same event resets it (see temporal_workflows/activities/dead_letters.py)
+ALTER TABLE dead_letter_messages ADD COLUMN IF NOT EXISTS replayed_at TIMESTAMPTZ;
+ALTER TABLE dead_letter_messages ADD COLUMN IF NOT EXISTS replay_count INTEGER NOT NULL DEFAULT 0;
+-- Replays go back to the conversation the message was originally sent to
+ALTER TABLE dead_letter_messages ADD COLUMN IF NOT EXISTS conversation_id TEXT NOT NULL DEFAULT '';
+
+-- Replay scans pending rows per agent in arrival order
+CREATE INDEX IF NOT EXISTS idx_dead_letter_pending
+    ON dead_letter_messages(agent_id, created_at, id)
+    WHERE replayed_at IS NULL;
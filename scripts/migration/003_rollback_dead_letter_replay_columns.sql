@@ -0,0 +1,6 @@
+-- Rollback: Remove dead-letter replay tracking
+
+DROP INDEX IF EXISTS idx_dead_letter_pending;
+ALTER TABLE dead_letter_messages DROP COLUMN IF EXISTS conversation_id;
+ALTER TABLE dead_letter_messages DROP COLUMN IF EXISTS replay_count;
+ALTER TABLE dead_letter_messages DROP COLUMN IF EXISTS replayed_at;
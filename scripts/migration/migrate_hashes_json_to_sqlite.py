@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Migrate the document hash index from .hashes.json to the SQLite hash store.
+
+Workers import the JSON file automatically the first time they open the
+store, so this is only needed to migrate ahead of a deploy or to check the
+result. Safe to run while workers are live.
+
+Usage:
+    python scripts/migration/migrate_hashes_json_to_sqlite.py [documents_dir]
+"""
+import os
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from temporal_workflows.activities import hash_store
+
+
+def main() -> int:
+    documents_dir = sys.argv[1] if len(sys.argv) > 1 else os.getenv("PERSISTENT_DOCUMENTS_DIR", "/app/documents")
+    legacy_path = os.path.join(documents_dir, hash_store.LEGACY_INDEX_FILENAME)
+
+    if not os.path.exists(legacy_path):
+        print(f"No legacy index at {legacy_path}; nothing to migrate")
+    else:
+        added = hash_store.migrate_legacy_index(documents_dir)
+        print(f"✓ Imported {added} entries from {legacy_path}")
+
+    total = len(hash_store.load_all(documents_dir))
+    print(f"Hash store {hash_store.db_path(documents_dir)} now holds {total} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
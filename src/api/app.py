@@ -8,11 +8,9 @@ from typing import Optional
 
 import aiohttp
 from dotenv import load_dotenv
-from fastapi import FastAPI, Header
+from fastapi import FastAPI
 import uvicorn
-from pydantic import BaseModel
 
-from src.api.auth import verify_internal_key
 from src.core.identity_health_monitor import get_identity_token_health_monitor
 from src.matrix.identity_client_pool import get_identity_client_pool
 
@@ -22,6 +20,7 @@ from src.api.routes.agent_sync import (
     router as agent_sync_router,
 )
 from src.api.routes.messaging import (
+    RECENT_FANOUT_CONCURRENCY,
     GetMessagesResponse,
     ListRoomsResponse,
     LoginResponse,
@@ -32,6 +31,7 @@ from src.api.routes.messaging import (
 )
 from src.api.routes.messaging import GetMessagesRequest, LoginRequest, SendMessageRequest
 from src.api.routes.portal_links import PortalLinkRequest, router as portal_links_router
+from src.api.routes.room_join import router as room_join_router
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -72,12 +72,7 @@ if IDENTITY_API_AVAILABLE and identity_router and dm_router and internal_router:
 app.include_router(messaging_router)
 app.include_router(agent_sync_router)
 app.include_router(portal_links_router)
-
-
-class AutoJoinRequest(BaseModel):
-    user_id: str
-    access_token: str
-    homeserver: str
+app.include_router(room_join_router)
 
 
 class MatrixAPIClient:
@@ -177,11 +172,20 @@ class MatrixAPIClient:
         except Exception as e:
             return SendMessageResponse(success=False, message=f"Error sending message: {str(e)}")
 
-    async def get_messages(self, homeserver: str, access_token: str, room_id: str, limit: int = 5):
+    async def get_messages(
+        self,
+        homeserver: str,
+        access_token: str,
+        room_id: str,
+        limit: int = 5,
+        from_token: Optional[str] = None,
+    ):
         try:
             url = f"{homeserver}/_matrix/client/v3/rooms/{room_id}/messages"
             headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
             params = {"dir": "b", "limit": limit, "filter": json.dumps({"types": ["m.room.message"]})}
+            if from_token:
+                params["from"] = from_token
 
             session = await self._get_session()
             async with session.get(url, headers=headers, params=params) as response:
@@ -208,7 +212,12 @@ class MatrixAPIClient:
         except Exception as e:
             return GetMessagesResponse(success=False, message=f"Error getting messages: {str(e)}")
 
-    async def list_rooms(self, homeserver: str, access_token: str):
+    async def list_rooms(
+        self,
+        homeserver: str,
+        access_token: str,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ):
         try:
             url = f"{homeserver}/_matrix/client/v3/joined_rooms"
             headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
@@ -218,10 +227,15 @@ class MatrixAPIClient:
                 if response.status == 200:
                     result = await response.json()
                     room_ids = result.get("joined_rooms", [])
-                    rooms = []
-                    for room_id in room_ids:
-                        room_name = await self.get_room_name(homeserver, access_token, room_id, session=session)
-                        rooms.append(RoomInfo(room_id=room_id, room_name=room_name))
+                    # Room names resolve concurrently, bounded like the /messages/recent fan-out
+                    semaphore = semaphore or asyncio.Semaphore(max(1, RECENT_FANOUT_CONCURRENCY))
+
+                    async def _named(room_id: str) -> RoomInfo:
+                        async with semaphore:
+                            room_name = await self.get_room_name(homeserver, access_token, room_id, session=session)
+                        return RoomInfo(room_id=room_id, room_name=room_name)
+
+                    rooms = list(await asyncio.gather(*(_named(room_id) for room_id in room_ids)))
                     return ListRoomsResponse(success=True, rooms=rooms, message=f"Found {len(rooms)} rooms")
                 error_text = await response.text()
                 return ListRoomsResponse(success=False, message=f"Failed to list rooms: {error_text}")
@@ -269,6 +283,11 @@ async def start_identity_token_monitor():
     client_pool = get_identity_client_pool()
     await client_pool.start()
     app.state.identity_client_pool = client_pool
+    from src.api.routes.identity_health import get_identity_health_reporter
+
+    health_reporter = get_identity_health_reporter()
+    await health_reporter.start()
+    app.state.identity_health_reporter = health_reporter
 
 
 @app.on_event("shutdown")
@@ -276,6 +295,9 @@ async def stop_identity_token_monitor():
     matrix_api_client = getattr(app.state, "matrix_client", None)
     if matrix_api_client:
         await matrix_api_client.close()
+    health_reporter = getattr(app.state, "identity_health_reporter", None)
+    if health_reporter:
+        await health_reporter.stop()
     client_pool = getattr(app.state, "identity_client_pool", None)
     if client_pool:
         await client_pool.stop()
@@ -289,57 +311,6 @@ async def root():
     return {"message": "Matrix API", "version": "1.0.0", "status": "running"}
 
 
-@app.post("/rooms/auto-join")
-async def auto_join_rooms(request: AutoJoinRequest, x_internal_key: str = Header(...)):
-    verify_internal_key(x_internal_key)
-    user_id = request.user_id
-    access_token = request.access_token
-    homeserver = request.homeserver
-    try:
-        from src.core.mapping_service import get_all_mappings
-
-        mappings = get_all_mappings()
-        if not mappings:
-            return {"success": False, "message": "No agent mappings found", "joined_rooms": []}
-
-        joined_rooms = []
-        failed_rooms = []
-        for _, mapping in mappings.items():
-            room_id = mapping.get("room_id")
-            if not room_id:
-                continue
-
-            check_url = f"{homeserver}/_matrix/client/v3/rooms/{room_id}/joined_members"
-            headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
-            session = await matrix_client._get_session()
-            async with session.get(check_url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if user_id in data.get("joined", {}):
-                        joined_rooms.append({"room_id": room_id, "agent_name": mapping.get("agent_name"), "status": "already_joined"})
-                        continue
-
-            join_url = f"{homeserver}/_matrix/client/v3/rooms/{room_id}/join"
-            async with session.post(join_url, headers=headers, json={}) as join_response:
-                if join_response.status == 200:
-                    joined_rooms.append({"room_id": room_id, "agent_name": mapping.get("agent_name"), "status": "joined"})
-                    logger.info(f"Auto-joined {user_id} to room {room_id} for agent {mapping.get('agent_name')}")
-                else:
-                    error_text = await join_response.text()
-                    failed_rooms.append({"room_id": room_id, "agent_name": mapping.get("agent_name"), "error": error_text})
-                    logger.warning(f"Failed to join {user_id} to room {room_id}: {error_text}")
-
-        return {
-            "success": True,
-            "message": f"Joined {len(joined_rooms)} rooms, {len(failed_rooms)} failed",
-            "joined_rooms": joined_rooms,
-            "failed_rooms": failed_rooms,
-        }
-    except Exception as e:
-        logger.error(f"Error in auto-join: {e}")
-        return {"success": False, "message": f"Error: {str(e)}", "joined_rooms": [], "failed_rooms": []}
-
-
 @app.get("/health")
 async def health_check():
     return {
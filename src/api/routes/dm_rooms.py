@@ -2,11 +2,15 @@
 DM room management endpoints — create, list, lookup, reconcile, delete.
 """
 
+import asyncio
+import json
 import logging
-from typing import List, Optional
+import os
+from typing import AsyncIterator, Dict, List, Optional, Set
 from urllib.parse import unquote
 
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
 
 from src.api.schemas.identity import (
     DMRoomCreate,
@@ -28,6 +32,8 @@ logger = logging.getLogger(__name__)
 
 dm_router = APIRouter(prefix="/api/v1", tags=["dm-rooms"])
 
+DM_RECONCILE_CONCURRENCY = int(os.getenv("DM_RECONCILE_CONCURRENCY", "8"))
+
 
 @dm_router.post("/dm-rooms", response_model=DMRoomResponse, status_code=status.HTTP_201_CREATED)
 async def create_or_get_dm_room(request: DMRoomCreate):
@@ -52,25 +58,58 @@ async def list_dm_rooms(user_mxid: Optional[str] = None):
     )
 
 
-@dm_router.post("/dm-rooms/reconcile-names", response_model=DMRoomNameReconcileResponse)
-async def reconcile_dm_room_names(request: DMRoomNameReconcileRequest):
-    identity_service = get_identity_service()
-    dm_room_service = get_dm_room_service()
-
-    dm_rooms = dm_room_service.get_all()
-    if request.limit > 0:
-        dm_rooms = dm_rooms[: request.limit]
-
-    checked = 0
-    agent_dm_rooms = 0
-    mismatched_rooms = 0
-    profile_mismatch_count = 0
-    profiles_synced_count = 0
-    failed = 0
-    changes: List[DMRoomNameReconcileDiff] = []
-
-    for room in dm_rooms:
-        checked += 1
+class DMRoomNameReconciler:
+    """One reconciliation run over a set of DM rooms.
+
+    Rooms are checked concurrently (at most ``concurrency`` at a time).
+    Identity lookups, Matrix display-name fetches and profile syncs are done
+    once per identity for the whole run and shared by every room the
+    identity appears in — agent identities typically sit in hundreds of DMs.
+    """
+
+    def __init__(self, request: DMRoomNameReconcileRequest, concurrency: Optional[int] = None):
+        self.request = request
+        self.concurrency = max(1, DM_RECONCILE_CONCURRENCY if concurrency is None else concurrency)
+        self.identity_service = get_identity_service()
+        self._identities: Dict[str, object] = {}
+        self._display_names: Dict[str, asyncio.Task] = {}
+        self._profile_syncs: Dict[str, asyncio.Task] = {}
+        self._synced_identities: Set[str] = set()
+
+        self.checked = 0
+        self.agent_dm_rooms = 0
+        self.mismatched_rooms = 0
+        self.profile_mismatches = 0
+        self.failed = 0
+
+    def _identity(self, mxid: str):
+        if mxid not in self._identities:
+            self._identities[mxid] = self.identity_service.get_by_mxid(mxid)
+        return self._identities[mxid]
+
+    def _display_name(self, identity) -> "asyncio.Task":
+        identity_id = str(identity.id)
+        task = self._display_names.get(identity_id)
+        if task is None:
+            task = asyncio.ensure_future(_get_matrix_display_name(str(identity.mxid), str(identity.access_token)))
+            self._display_names[identity_id] = task
+        return task
+
+    def _profile_sync(self, identity_id: str, display_name: str) -> "asyncio.Task":
+        task = self._profile_syncs.get(identity_id)
+        if task is None:
+            task = asyncio.ensure_future(_sync_identity_profile(identity_id, display_name))
+            self._profile_syncs[identity_id] = task
+        return task
+
+    def _remember_display_name(self, identity_id: str, display_name: str) -> None:
+        """Replace the cached Matrix display name once a profile sync has set it."""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(display_name)
+        self._display_names[identity_id] = future
+
+    async def check_room(self, room) -> Optional[DMRoomNameReconcileDiff]:
+        self.checked += 1
         room_id = str(room.room_id)
         participants = [str(room.participant_1), str(room.participant_2)]
         participant_identity_ids: List[str] = []
@@ -80,7 +119,7 @@ async def reconcile_dm_room_names(request: DMRoomNameReconcileRequest):
 
         identity_by_mxid = {}
         for mxid in participants:
-            identity = identity_service.get_by_mxid(mxid)
+            identity = self._identity(mxid)
             if identity is not None:
                 identity_by_mxid[mxid] = identity
                 participant_identity_ids.append(str(identity.id))
@@ -93,22 +132,18 @@ async def reconcile_dm_room_names(request: DMRoomNameReconcileRequest):
                 break
 
         if agent_identity_id is None:
-            continue
-        agent_dm_rooms += 1
+            return None
+        self.agent_dm_rooms += 1
 
         room_name: Optional[str] = None
-        access_token_identity = identity_by_mxid.get(str(room.participant_1)) or identity_by_mxid.get(str(room.participant_2))
+        access_token_identity = identity_by_mxid.get(participants[0]) or identity_by_mxid.get(participants[1])
         if access_token_identity is not None and access_token_identity.access_token is not None:
             room_name = await _get_room_name(room_id, str(access_token_identity.access_token))
 
-        p1_name = None
-        p2_name = None
-        p1_identity = identity_by_mxid.get(str(room.participant_1))
-        p2_identity = identity_by_mxid.get(str(room.participant_2))
-        if p1_identity is not None and p1_identity.display_name is not None:
-            p1_name = str(p1_identity.display_name)
-        if p2_identity is not None and p2_identity.display_name is not None:
-            p2_name = str(p2_identity.display_name)
+        p1_identity = identity_by_mxid.get(participants[0])
+        p2_identity = identity_by_mxid.get(participants[1])
+        p1_name = str(p1_identity.display_name) if p1_identity is not None and p1_identity.display_name is not None else None
+        p2_name = str(p2_identity.display_name) if p2_identity is not None and p2_identity.display_name is not None else None
         expected_room_name = f"{p1_name} ↔ {p2_name}" if p1_name is not None and p2_name is not None else None
         room_name_mismatch = expected_room_name is not None and room_name is not None and room_name != expected_room_name
 
@@ -120,52 +155,119 @@ async def reconcile_dm_room_names(request: DMRoomNameReconcileRequest):
 
             actual_display_name = None
             if identity.access_token is not None:
-                actual_display_name = await _get_matrix_display_name(str(identity.mxid), str(identity.access_token))
+                actual_display_name = await self._display_name(identity)
 
             if actual_display_name != expected_display_name:
-                profile_mismatch_count += 1
+                self.profile_mismatches += 1
                 profile_mismatches.append(identity_id)
-                if not request.dry_run and request.sync_profiles:
+                if not self.request.dry_run and self.request.sync_profiles:
                     try:
-                        await _sync_identity_profile(identity_id, expected_display_name)
+                        await self._profile_sync(identity_id, expected_display_name)
                         profiles_synced.append(identity_id)
-                        profiles_synced_count += 1
+                        self._synced_identities.add(identity_id)
+                        self._remember_display_name(identity_id, expected_display_name)
                     except Exception as exc:
                         errors.append(f"profile_sync_failed:{identity_id}:{exc}")
 
         has_mismatch = room_name_mismatch or bool(profile_mismatches)
         if has_mismatch:
-            mismatched_rooms += 1
-
+            self.mismatched_rooms += 1
         if errors:
-            failed += 1
-
-        if has_mismatch or errors:
-            changes.append(
-                DMRoomNameReconcileDiff(
-                    room_id=room_id,
-                    agent_identity_id=agent_identity_id,
-                    participant_identity_ids=participant_identity_ids,
-                    room_name=room_name,
-                    expected_room_name=expected_room_name,
-                    room_name_mismatch=room_name_mismatch,
-                    profile_mismatches=profile_mismatches,
-                    profiles_synced=profiles_synced,
-                    errors=errors,
-                )
-            )
-
-    return DMRoomNameReconcileResponse(
-        success=True,
-        dry_run=request.dry_run,
-        checked=checked,
-        agent_dm_rooms=agent_dm_rooms,
-        mismatched_rooms=mismatched_rooms,
-        profile_mismatches=profile_mismatch_count,
-        profiles_synced=profiles_synced_count,
-        failed=failed,
-        changes=changes,
-    )
+            self.failed += 1
+        if not (has_mismatch or errors):
+            return None
+
+        return DMRoomNameReconcileDiff(
+            room_id=room_id,
+            agent_identity_id=agent_identity_id,
+            participant_identity_ids=participant_identity_ids,
+            room_name=room_name,
+            expected_room_name=expected_room_name,
+            room_name_mismatch=room_name_mismatch,
+            profile_mismatches=profile_mismatches,
+            profiles_synced=profiles_synced,
+            errors=errors,
+        )
+
+    async def iter_changes(self, dm_rooms) -> AsyncIterator[DMRoomNameReconcileDiff]:
+        """Yield diffs as rooms finish (completion order, not input order)."""
+        rooms = iter(dm_rooms)
+        results: "asyncio.Queue[object]" = asyncio.Queue()
+        done = object()
+
+        async def _worker() -> None:
+            try:
+                for room in rooms:
+                    try:
+                        diff = await self.check_room(room)
+                    except Exception as exc:
+                        logger.warning(f"DM reconcile failed for {getattr(room, 'room_id', '?')}: {exc}")
+                        self.failed += 1
+                        diff = DMRoomNameReconcileDiff(room_id=str(room.room_id), errors=[f"reconcile_failed:{exc}"])
+                    if diff is not None:
+                        await results.put(diff)
+            finally:
+                await results.put(done)
+
+        workers = [asyncio.ensure_future(_worker()) for _ in range(self.concurrency)]
+        try:
+            remaining = len(workers)
+            while remaining:
+                item = await results.get()
+                if item is done:
+                    remaining -= 1
+                    continue
+                yield item
+        finally:
+            for worker in workers:
+                worker.cancel()
+            for task in (*self._display_names.values(), *self._profile_syncs.values()):
+                task.cancel()
+
+    def summary(self, changes: Optional[List[DMRoomNameReconcileDiff]] = None) -> DMRoomNameReconcileResponse:
+        return DMRoomNameReconcileResponse(
+            success=True,
+            dry_run=self.request.dry_run,
+            checked=self.checked,
+            agent_dm_rooms=self.agent_dm_rooms,
+            mismatched_rooms=self.mismatched_rooms,
+            profile_mismatches=self.profile_mismatches,
+            profiles_synced=len(self._synced_identities),
+            failed=self.failed,
+            changes=changes or [],
+        )
+
+
+def _reconcile_targets(request: DMRoomNameReconcileRequest):
+    dm_rooms = get_dm_room_service().get_all()
+    if request.limit > 0:
+        dm_rooms = dm_rooms[: request.limit]
+    return dm_rooms
+
+
+@dm_router.post("/dm-rooms/reconcile-names", response_model=DMRoomNameReconcileResponse)
+async def reconcile_dm_room_names(request: DMRoomNameReconcileRequest):
+    dm_rooms = _reconcile_targets(request)
+    order = {str(room.room_id): index for index, room in enumerate(dm_rooms)}
+    reconciler = DMRoomNameReconciler(request)
+    changes = [diff async for diff in reconciler.iter_changes(dm_rooms)]
+    changes.sort(key=lambda diff: order.get(diff.room_id, len(order)))
+    return reconciler.summary(changes)
+
+
+@dm_router.post("/dm-rooms/reconcile-names/stream")
+async def stream_reconcile_dm_room_names(request: DMRoomNameReconcileRequest):
+    """NDJSON variant: one ``{"type": "change"}`` line per diff, then a ``summary`` line."""
+    dm_rooms = _reconcile_targets(request)
+    reconciler = DMRoomNameReconciler(request)
+
+    async def _lines() -> AsyncIterator[str]:
+        async for diff in reconciler.iter_changes(dm_rooms):
+            yield json.dumps({"type": "change", **diff.model_dump()}) + "\n"
+        summary = reconciler.summary().model_dump(exclude={"changes"})
+        yield json.dumps({"type": "summary", **summary}) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
 
 
 @dm_router.get("/dm-rooms/lookup", response_model=DMRoomResponse)
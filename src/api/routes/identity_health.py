@@ -1,12 +1,22 @@
 """
 Identity health endpoint — checks token validity, name consistency,
 DM room integrity, and Letta coverage.
+
+The report is built by IdentityHealthReporter in the background and served
+from its last snapshot. The expensive part — validating each access token
+and fetching each Matrix display name — is cached per identity and only
+redone (with bounded concurrency) for identities whose mxid, token or
+display name changed, or whose last check is older than
+IDENTITY_HEALTH_PROBE_TTL_SECONDS. DB, mapping and Letta state is cheap and
+re-read on every refresh.
 """
 
 import asyncio
 import logging
+import os
 import time
-from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
 
 from fastapi import APIRouter
 
@@ -30,218 +40,329 @@ logger = logging.getLogger(__name__)
 
 health_router = APIRouter()
 
+IDENTITY_HEALTH_REFRESH_SECONDS = int(os.getenv("IDENTITY_HEALTH_REFRESH_SECONDS", "300"))
+IDENTITY_HEALTH_PROBE_TTL_SECONDS = int(os.getenv("IDENTITY_HEALTH_PROBE_TTL_SECONDS", "3600"))
+IDENTITY_HEALTH_CONCURRENCY = int(os.getenv("IDENTITY_HEALTH_CONCURRENCY", "8"))
+
+
+@dataclass
+class _IdentityProbe:
+    fingerprint: Tuple[str, str, Optional[str]]
+    token_valid: bool
+    token_error: Optional[str]
+    matrix_display_name: Optional[str]
+    checked_at: int
+
+
+@dataclass
+class IdentityHealthSnapshot:
+    built_at: int
+    # (record, "healthy" | "degraded" | "critical") for every identity
+    entries: List[Tuple[IdentityHealthRecord, str]] = field(default_factory=list)
+    letta_agent_ids: Set[str] = field(default_factory=set)
+    probed: int = 0
+
+    def report(self, identity_type: Optional[str] = None) -> dict:
+        entries = self.entries
+        if identity_type is not None:
+            entries = [(r, s) for r, s in entries if r.identity_type == identity_type]
+
+        def _count(issue: str) -> int:
+            return sum(1 for record, _ in entries if issue in record.issues)
+
+        checked = len(entries)
+        healthy = sum(1 for _, severity in entries if severity == "healthy")
+        critical = sum(1 for _, severity in entries if severity == "critical")
+        token_invalid = _count("token_invalid")
+        name_mismatches = sum(
+            1 for record, _ in entries for issue in record.issues if issue.startswith("name_mismatch_")
+        )
+
+        letta_identity_ids = {
+            record.identity_id
+            for record, _ in entries
+            if record.identity_type == "letta" and record.identity_id.startswith("letta_")
+        }
+        expected_letta_identity_ids = {f"letta_{agent_id}" for agent_id in self.letta_agent_ids}
+
+        return {
+            "success": True,
+            "checked": checked,
+            "healthy": healthy,
+            "degraded": checked - healthy - critical,
+            "critical": critical,
+            "coverage_percentage": (healthy / checked * 100.0) if checked else 100.0,
+            "last_reconciliation_at": self.built_at,
+            "stale_token_count": token_invalid,
+            "name_mismatch_count": name_mismatches,
+            "token_invalid": token_invalid,
+            "name_mismatches": name_mismatches,
+            "password_mismatches": _count("password_mismatch_identity_vs_mapping"),
+            "invalid_mxid": _count("invalid_mxid_format"),
+            "invalid_dm_rooms": _count("invalid_dm_room_reference"),
+            "coverage": IdentityHealthCoverage(
+                letta_agents_total=len(self.letta_agent_ids),
+                letta_identities_total=len(letta_identity_ids),
+                missing_letta_identities=sorted(expected_letta_identity_ids - letta_identity_ids),
+            ),
+            "actionable_agents": [
+                {
+                    "agent_id": record.identity_id[6:] if record.identity_id.startswith("letta_") else None,
+                    "identity_id": record.identity_id,
+                    "mxid": record.mxid,
+                    "issues": record.issues,
+                }
+                for record, _ in entries
+                if record.issues
+            ],
+            "records": [record for record, _ in entries],
+        }
 
-@health_router.get("/identities/health", response_model=IdentityHealthResponse)
-async def identity_health(identity_type: Optional[str] = None):
-    identity_service = get_identity_service()
-    dm_room_service = get_dm_room_service()
-    monitor = get_identity_token_health_monitor()
-    letta_service = LettaService()
 
-    identities = identity_service.get_all(active_only=False)
-    if identity_type is not None:
-        identities = [i for i in identities if str(i.identity_type) == identity_type]
+def _fingerprint(identity) -> Tuple[str, str, Optional[str]]:
+    display_name = str(identity.display_name) if identity.display_name is not None else None
+    return (str(identity.mxid), str(identity.access_token or ""), display_name)
 
+
+def _letta_agent_names() -> Dict[str, str]:
     try:
-        letta_agents = letta_service.list_agents(limit=1000)
+        letta_agents = LettaService().list_agents(limit=1000)
     except Exception:
         letta_agents = []
 
-    letta_name_by_agent_id: dict[str, str] = {}
+    names: Dict[str, str] = {}
     for agent in letta_agents:
         agent_id_raw = getattr(agent, "id", None)
         agent_name_raw = getattr(agent, "name", None)
         if agent_id_raw is None or agent_name_raw is None:
             continue
-        letta_name_by_agent_id[str(agent_id_raw)] = str(agent_name_raw)
-
-    mappings = get_all_mappings(include_removed=False)
-    all_dm_rooms = dm_room_service.get_all()
-    known_mxids = {str(i.mxid) for i in identities}
-
-    checked = 0
-    healthy = 0
-    degraded = 0
-    critical = 0
-    token_invalid = 0
-    name_mismatches = 0
-    password_mismatches = 0
-    invalid_mxid = 0
-    invalid_dm_rooms = 0
-
-    letta_identity_ids = {
-        str(i.id)
-        for i in identities
-        if str(i.identity_type) == "letta" and str(i.id).startswith("letta_")
-    }
-    expected_letta_identity_ids = {f"letta_{agent_id}" for agent_id in letta_name_by_agent_id}
-    missing_letta_identities = sorted(list(expected_letta_identity_ids - letta_identity_ids))
-
-    records: List[IdentityHealthRecord] = []
-    actionable_agents: List[dict[str, object]] = []
-    now_ts = int(time.time())
-
-    identities_with_tokens = [
-        identity
-        for identity in identities
-        if identity.access_token is not None and str(identity.access_token)
-    ]
-
-    token_validation_by_identity: Dict[str, tuple[bool, Optional[str]]] = {}
-    if identities_with_tokens:
-        token_results = await asyncio.gather(
-            *(monitor._validate_identity_token(identity) for identity in identities_with_tokens),
-            return_exceptions=True,
-        )
-        for identity, result in zip(identities_with_tokens, token_results):
-            identity_id = str(identity.id)
-            if isinstance(result, BaseException):
-                token_validation_by_identity[identity_id] = (False, str(result))
-            else:
-                valid = bool(result)
-                token_validation_by_identity[identity_id] = (
-                    valid,
-                    None if valid else "token_invalid",
+        names[str(agent_id_raw)] = str(agent_name_raw)
+    return names
+
+
+class IdentityHealthReporter:
+    def __init__(self, interval_seconds: Optional[int] = None) -> None:
+        self.interval_seconds = interval_seconds or IDENTITY_HEALTH_REFRESH_SECONDS
+        self.snapshot: Optional[IdentityHealthSnapshot] = None
+        self._probes: Dict[str, _IdentityProbe] = {}
+        self._refresh_lock = asyncio.Lock()
+        self._background_refresh: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info("Started identity health reporter (interval=%ss)", self.interval_seconds)
+
+    async def stop(self) -> None:
+        if not self._task:
+            return
+        self._stop_event.set()
+        await self._task
+        self._task = None
+        logger.info("Stopped identity health reporter")
+
+    async def _run_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                snapshot = await self.refresh()
+                logger.info(
+                    "Identity health snapshot: identities=%s probed=%s",
+                    len(snapshot.entries),
+                    snapshot.probed,
                 )
+            except Exception as exc:
+                logger.error("Identity health refresh failed: %s", exc, exc_info=True)
+
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                continue
+
+    async def get_snapshot(self, force_refresh: bool = False) -> IdentityHealthSnapshot:
+        """Cached snapshot; refreshes inline only when there is none (or when forced)."""
+        snapshot = self.snapshot
+        if snapshot is None or force_refresh:
+            return await self.refresh(force=force_refresh)
+
+        stale = int(time.time()) - snapshot.built_at > self.interval_seconds
+        if stale and not self._refresh_lock.locked() and (
+            self._background_refresh is None or self._background_refresh.done()
+        ):
+            self._background_refresh = asyncio.create_task(self.refresh())
+        return snapshot
+
+    async def refresh(self, force: bool = False) -> IdentityHealthSnapshot:
+        async with self._refresh_lock:
+            identities = get_identity_service().get_all(active_only=False)
+            letta_name_by_agent_id = await asyncio.to_thread(_letta_agent_names)
+            probed = await self._probe_changed(identities, force=force)
+            snapshot = self._build_snapshot(identities, letta_name_by_agent_id)
+            snapshot.probed = probed
+            self.snapshot = snapshot
+            return snapshot
+
+    async def _probe_changed(self, identities, force: bool = False) -> int:
+        now_ts = int(time.time())
+        with_tokens = {
+            str(identity.id): identity
+            for identity in identities
+            if identity.access_token is not None and str(identity.access_token)
+        }
+        for identity_id in set(self._probes) - set(with_tokens):
+            del self._probes[identity_id]
+
+        due = []
+        for identity_id, identity in with_tokens.items():
+            probe = self._probes.get(identity_id)
+            if (
+                force
+                or probe is None
+                or probe.fingerprint != _fingerprint(identity)
+                or now_ts - probe.checked_at > IDENTITY_HEALTH_PROBE_TTL_SECONDS
+            ):
+                due.append(identity)
+        if not due:
+            return 0
+
+        monitor = get_identity_token_health_monitor()
+        session = await _get_identity_http_session()
+        semaphore = asyncio.Semaphore(max(1, IDENTITY_HEALTH_CONCURRENCY))
+
+        async def _probe(identity) -> None:
+            async with semaphore:
+                try:
+                    valid = bool(await monitor._validate_identity_token(identity))
+                    token_error = None if valid else "token_invalid"
+                except Exception as exc:
+                    valid, token_error = False, str(exc)
+                try:
+                    display_name = await _get_matrix_display_name(
+                        str(identity.mxid),
+                        str(identity.access_token),
+                        session=session,
+                    )
+                except Exception:
+                    display_name = None
+            self._probes[str(identity.id)] = _IdentityProbe(
+                fingerprint=_fingerprint(identity),
+                token_valid=valid,
+                token_error=token_error,
+                matrix_display_name=display_name if isinstance(display_name, str) else None,
+                checked_at=int(time.time()),
+            )
 
-    matrix_display_name_by_identity: Dict[str, Optional[str]] = {}
-    if identities_with_tokens:
-        shared_session = await _get_identity_http_session()
-        display_name_results = await asyncio.gather(
-            *(
-                _get_matrix_display_name(
-                    str(identity.mxid),
-                    str(identity.access_token),
-                    session=shared_session,
-                )
-                for identity in identities_with_tokens
-            ),
-            return_exceptions=True,
-        )
-        for identity, result in zip(identities_with_tokens, display_name_results):
-            identity_id = str(identity.id)
-            if isinstance(result, BaseException):
-                matrix_display_name_by_identity[identity_id] = None
-            else:
-                matrix_display_name_by_identity[identity_id] = (
-                    result if isinstance(result, str) else None
-                )
+        await asyncio.gather(*(_probe(identity) for identity in due))
+        return len(due)
 
-    for identity in identities:
-        checked += 1
-        identity_id = str(identity.id)
-        identity_type_value = str(identity.identity_type)
-        mxid = str(identity.mxid)
-        identity_display_name = str(identity.display_name) if identity.display_name is not None else None
-        access_token = str(identity.access_token) if identity.access_token is not None else ""
-        password_hash = str(identity.password_hash) if identity.password_hash is not None else None
-
-        issues: List[str] = []
-
-        mxid_valid = _is_valid_mxid(mxid)
-        if not mxid_valid:
-            invalid_mxid += 1
-            issues.append("invalid_mxid_format")
-
-        token_valid = False
-        token_error: Optional[str] = None
-        if access_token:
-            token_valid, token_error = token_validation_by_identity.get(
-                identity_id,
-                (False, "token_invalid"),
-            )
-        else:
-            token_error = "missing_access_token"
-        if not token_valid:
-            token_invalid += 1
-            issues.append("token_invalid")
-
-        matrix_display_name: Optional[str] = matrix_display_name_by_identity.get(identity_id)
-
-        mapping_agent_name: Optional[str] = None
-        mapping_password: Optional[str] = None
-        identity_mapping_name_match: Optional[bool] = None
-        password_consistent: Optional[bool] = None
-        identity_letta_name_match: Optional[bool] = None
-        letta_display_name: Optional[str] = None
-
-        if identity_id.startswith("letta_"):
-            agent_id = identity_id[6:]
-            mapping = mappings.get(agent_id)
-            if mapping is not None:
-                mapping_agent_name = str(mapping.get("agent_name") or "") or None
-                mapping_password = str(mapping.get("matrix_password") or "") or None
-                if identity_display_name is not None and mapping_agent_name is not None:
-                    identity_mapping_name_match = identity_display_name == mapping_agent_name
-                if password_hash is not None and mapping_password is not None:
-                    password_consistent = password_hash == mapping_password
-                    if not password_consistent:
-                        password_mismatches += 1
-                        issues.append("password_mismatch_identity_vs_mapping")
-
-            letta_display_name = letta_name_by_agent_id.get(agent_id)
-            if identity_display_name is not None and letta_display_name is not None:
-                identity_letta_name_match = identity_display_name == letta_display_name
-
-        identity_matrix_name_match: Optional[bool] = None
-        if identity_display_name is not None and matrix_display_name is not None:
-            identity_matrix_name_match = identity_display_name == matrix_display_name
-
-        if identity_matrix_name_match is False:
-            name_mismatches += 1
-            issues.append("name_mismatch_identity_vs_matrix")
-        if identity_letta_name_match is False:
-            name_mismatches += 1
-            issues.append("name_mismatch_identity_vs_letta")
-        if identity_mapping_name_match is False:
-            name_mismatches += 1
-            issues.append("name_mismatch_identity_vs_mapping")
-
-        dm_for_user = [
-            room
-            for room in all_dm_rooms
-            if str(room.participant_1) == mxid or str(room.participant_2) == mxid
-        ]
-        dm_rooms_valid = True
-        for room in dm_for_user:
-            room_id = str(room.room_id)
+    def _build_snapshot(self, identities, letta_name_by_agent_id: Dict[str, str]) -> IdentityHealthSnapshot:
+        now_ts = int(time.time())
+        mappings = get_all_mappings(include_removed=False)
+        known_mxids = {str(i.mxid) for i in identities}
+
+        dm_rooms_by_mxid: Dict[str, list] = {}
+        for room in get_dm_room_service().get_all():
             p1 = str(room.participant_1)
             p2 = str(room.participant_2)
-            room_id_valid = room_id.startswith("!") and ":" in room_id
-            participants_exist = p1 in known_mxids and p2 in known_mxids
-            if not room_id_valid or not participants_exist:
-                dm_rooms_valid = False
-                break
-
-        if not dm_rooms_valid:
-            invalid_dm_rooms += 1
-            issues.append("invalid_dm_room_reference")
-
-        if not issues:
-            healthy += 1
-        elif "invalid_mxid_format" in issues or ("token_invalid" in issues and password_hash is None):
-            critical += 1
-        else:
-            degraded += 1
-
-        if issues:
-            actionable_agents.append(
-                {
-                    "agent_id": identity_id[6:] if identity_id.startswith("letta_") else None,
-                    "identity_id": identity_id,
-                    "mxid": mxid,
-                    "issues": issues,
-                }
-            )
+            dm_rooms_by_mxid.setdefault(p1, []).append(room)
+            if p2 != p1:
+                dm_rooms_by_mxid.setdefault(p2, []).append(room)
+
+        snapshot = IdentityHealthSnapshot(built_at=now_ts, letta_agent_ids=set(letta_name_by_agent_id))
+        for identity in identities:
+            identity_id = str(identity.id)
+            mxid = str(identity.mxid)
+            identity_display_name = str(identity.display_name) if identity.display_name is not None else None
+            access_token = str(identity.access_token) if identity.access_token is not None else ""
+            password_hash = str(identity.password_hash) if identity.password_hash is not None else None
+
+            issues: List[str] = []
+
+            mxid_valid = _is_valid_mxid(mxid)
+            if not mxid_valid:
+                issues.append("invalid_mxid_format")
+
+            probe = self._probes.get(identity_id) if access_token else None
+            token_valid = False
+            token_error: Optional[str] = None
+            token_checked_at = now_ts
+            matrix_display_name: Optional[str] = None
+            if probe is not None:
+                token_valid = probe.token_valid
+                token_error = probe.token_error
+                token_checked_at = probe.checked_at
+                matrix_display_name = probe.matrix_display_name
+            elif access_token:
+                token_error = "token_invalid"
+            else:
+                token_error = "missing_access_token"
+            if not token_valid:
+                issues.append("token_invalid")
+
+            mapping_agent_name: Optional[str] = None
+            identity_mapping_name_match: Optional[bool] = None
+            password_consistent: Optional[bool] = None
+            identity_letta_name_match: Optional[bool] = None
+            letta_display_name: Optional[str] = None
+
+            if identity_id.startswith("letta_"):
+                agent_id = identity_id[6:]
+                mapping = mappings.get(agent_id)
+                if mapping is not None:
+                    mapping_agent_name = str(mapping.get("agent_name") or "") or None
+                    mapping_password = str(mapping.get("matrix_password") or "") or None
+                    if identity_display_name is not None and mapping_agent_name is not None:
+                        identity_mapping_name_match = identity_display_name == mapping_agent_name
+                    if password_hash is not None and mapping_password is not None:
+                        password_consistent = password_hash == mapping_password
+                        if not password_consistent:
+                            issues.append("password_mismatch_identity_vs_mapping")
+
+                letta_display_name = letta_name_by_agent_id.get(agent_id)
+                if identity_display_name is not None and letta_display_name is not None:
+                    identity_letta_name_match = identity_display_name == letta_display_name
+
+            identity_matrix_name_match: Optional[bool] = None
+            if identity_display_name is not None and matrix_display_name is not None:
+                identity_matrix_name_match = identity_display_name == matrix_display_name
+
+            if identity_matrix_name_match is False:
+                issues.append("name_mismatch_identity_vs_matrix")
+            if identity_letta_name_match is False:
+                issues.append("name_mismatch_identity_vs_letta")
+            if identity_mapping_name_match is False:
+                issues.append("name_mismatch_identity_vs_mapping")
+
+            dm_for_user = dm_rooms_by_mxid.get(mxid, [])
+            dm_rooms_valid = True
+            for room in dm_for_user:
+                room_id = str(room.room_id)
+                room_id_valid = room_id.startswith("!") and ":" in room_id
+                participants_exist = str(room.participant_1) in known_mxids and str(room.participant_2) in known_mxids
+                if not room_id_valid or not participants_exist:
+                    dm_rooms_valid = False
+                    break
+
+            if not dm_rooms_valid:
+                issues.append("invalid_dm_room_reference")
+
+            if not issues:
+                severity = "healthy"
+            elif "invalid_mxid_format" in issues or ("token_invalid" in issues and password_hash is None):
+                severity = "critical"
+            else:
+                severity = "degraded"
 
-        records.append(
-            IdentityHealthRecord(
+            record = IdentityHealthRecord(
                 identity_id=identity_id,
-                identity_type=identity_type_value,
+                identity_type=str(identity.identity_type),
                 mxid=mxid,
                 is_active=bool(identity.is_active),
                 token_valid=token_valid,
-                token_checked_at=now_ts,
+                token_checked_at=token_checked_at,
                 token_error=token_error,
                 identity_display_name=identity_display_name,
                 matrix_display_name=matrix_display_name,
@@ -256,30 +377,22 @@ async def identity_health(identity_type: Optional[str] = None):
                 dm_rooms_valid=dm_rooms_valid,
                 issues=issues,
             )
-        )
+            snapshot.entries.append((record, severity))
+
+        return snapshot
+
+
+_reporter: Optional[IdentityHealthReporter] = None
 
-    coverage = IdentityHealthCoverage(
-        letta_agents_total=len(letta_name_by_agent_id),
-        letta_identities_total=len(letta_identity_ids),
-        missing_letta_identities=missing_letta_identities,
-    )
-
-    return {
-        "success": True,
-        "checked": checked,
-        "healthy": healthy,
-        "degraded": degraded,
-        "critical": critical,
-        "coverage_percentage": (healthy / checked * 100.0) if checked else 100.0,
-        "last_reconciliation_at": now_ts,
-        "stale_token_count": token_invalid,
-        "name_mismatch_count": name_mismatches,
-        "token_invalid": token_invalid,
-        "name_mismatches": name_mismatches,
-        "password_mismatches": password_mismatches,
-        "invalid_mxid": invalid_mxid,
-        "invalid_dm_rooms": invalid_dm_rooms,
-        "coverage": coverage,
-        "actionable_agents": actionable_agents,
-        "records": records,
-    }
+
+def get_identity_health_reporter() -> IdentityHealthReporter:
+    global _reporter
+    if _reporter is None:
+        _reporter = IdentityHealthReporter()
+    return _reporter
+
+
+@health_router.get("/identities/health", response_model=IdentityHealthResponse)
+async def identity_health(identity_type: Optional[str] = None, refresh: bool = False):
+    snapshot = await get_identity_health_reporter().get_snapshot(force_refresh=refresh)
+    return snapshot.report(identity_type)
@@ -1,4 +1,10 @@
-from typing import List, Optional
+import asyncio
+import heapq
+import os
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import List, Optional, Tuple
 
 from fastapi import APIRouter, Header, Request
 from pydantic import BaseModel
@@ -175,45 +181,116 @@ async def list_rooms(homeserver: str, raw_request: Request, access_token: str =
     return result
 
 
+# /messages/recent fans out one /messages call per joined room; keep that bounded
+# and briefly cache each room page so dashboards polling the endpoint don't
+# re-fetch every room on every refresh.
+RECENT_FANOUT_CONCURRENCY = int(os.getenv("MATRIX_API_RECENT_CONCURRENCY", "8"))
+RECENT_PAGE_CACHE_TTL_SECONDS = float(os.getenv("MATRIX_API_RECENT_CACHE_TTL_SECONDS", "5"))
+_RECENT_PAGE_CACHE_MAX = 2048
+
+# (homeserver, access_token, room_id, since_token, limit) -> (expires_at, messages)
+_recent_page_cache: "OrderedDict[Tuple[str, str, str, Optional[str], int], Tuple[float, List[MatrixMessage]]]" = OrderedDict()
+
+
+def clear_recent_message_cache() -> None:
+    _recent_page_cache.clear()
+
+
+async def _fetch_room_page(
+    matrix_client,
+    semaphore: asyncio.Semaphore,
+    homeserver: str,
+    access_token: str,
+    room_id: str,
+    limit: int,
+    since: Optional[str],
+) -> List[MatrixMessage]:
+    key = (homeserver, access_token, room_id, since, limit)
+    cached = _recent_page_cache.get(key)
+    if cached is not None:
+        if cached[0] > time.monotonic():
+            _recent_page_cache.move_to_end(key)
+            return cached[1]
+        _recent_page_cache.pop(key, None)
+
+    async with semaphore:
+        if since:
+            result = await matrix_client.get_messages(homeserver, access_token, room_id, limit=limit, from_token=since)
+        else:
+            result = await matrix_client.get_messages(homeserver, access_token, room_id, limit=limit)
+
+    if not result.success:
+        return []
+    messages = list(result.messages)
+    if RECENT_PAGE_CACHE_TTL_SECONDS > 0:
+        _recent_page_cache[key] = (time.monotonic() + RECENT_PAGE_CACHE_TTL_SECONDS, messages)
+        while len(_recent_page_cache) > _RECENT_PAGE_CACHE_MAX:
+            _recent_page_cache.popitem(last=False)
+    return messages
+
+
+def _merge_newest(
+    pages: List[Tuple[RoomInfo, List[MatrixMessage]]], count: Optional[int] = None
+) -> List[dict]:
+    """k-way merge of per-room pages, newest first, stopping after ``count`` messages (all if None).
+
+    get_messages returns each page oldest-first, so walking it backwards gives
+    an already-sorted newest-first stream per room.
+    """
+    streams = [
+        ((msg.timestamp, room, msg) for msg in reversed(messages))
+        for room, messages in pages
+        if messages
+    ]
+    merged = heapq.merge(*streams, key=lambda item: item[0], reverse=True)
+    return [
+        {
+            "room_id": room.room_id,
+            "room_name": room.room_name,
+            "sender": msg.sender,
+            "body": msg.body,
+            "timestamp": msg.timestamp,
+            "formatted_time": msg.formatted_time,
+            "event_id": msg.event_id,
+        }
+        for _, room, msg in islice(merged, count)
+    ]
+
+
 @router.get("/messages/recent")
-async def get_recent_messages(homeserver: str, raw_request: Request, limit: int = 10, access_token: str = Header(..., alias="X-Access-Token")):
+async def get_recent_messages(
+    homeserver: str,
+    raw_request: Request,
+    limit: int = 10,
+    since: Optional[str] = None,
+    access_token: str = Header(..., alias="X-Access-Token"),
+):
     try:
         matrix_client = get_matrix_client(raw_request)
-        rooms_result = await matrix_client.list_rooms(homeserver, access_token)
+        # One bound shared by the room-name lookups and the per-room page fetches
+        semaphore = asyncio.Semaphore(max(1, RECENT_FANOUT_CONCURRENCY))
+        rooms_result = await matrix_client.list_rooms(homeserver, access_token, semaphore=semaphore)
         if not rooms_result.success:
             return {"success": False, "message": f"Failed to get rooms: {rooms_result.message}"}
 
-        all_messages = []
         per_room_limit = limit if limit > 0 else 50
-
-        for room in rooms_result.rooms:
-            messages_result = await matrix_client.get_messages(
-                homeserver,
-                access_token,
-                room.room_id,
-                limit=per_room_limit,
+        room_pages = await asyncio.gather(
+            *(
+                _fetch_room_page(matrix_client, semaphore, homeserver, access_token, room.room_id, per_room_limit, since)
+                for room in rooms_result.rooms
             )
-
-            if messages_result.success:
-                for msg in messages_result.messages:
-                    message_with_room = {
-                        "room_id": room.room_id,
-                        "room_name": room.room_name,
-                        "sender": msg.sender,
-                        "body": msg.body,
-                        "timestamp": msg.timestamp,
-                        "formatted_time": msg.formatted_time,
-                        "event_id": msg.event_id,
-                    }
-                    all_messages.append(message_with_room)
-
-        all_messages.sort(key=lambda x: x["timestamp"], reverse=True)
-        recent_messages = all_messages[:limit]
+        )
+        pages = list(zip(rooms_result.rooms, room_pages))
+        if limit > 0:
+            recent_messages = _merge_newest(pages, limit)
+        else:
+            # Plain [:limit] semantics: 0 returns nothing, -n drops the n oldest
+            recent_messages = _merge_newest(pages)[:limit]
 
         return {
             "success": True,
             "messages": recent_messages,
-            "total_found": len(all_messages),
+            "total_found": sum(len(messages) for messages in room_pages),
             "limit": limit,
             "message": f"Retrieved {len(recent_messages)} most recent messages from {len(rooms_result.rooms)} rooms",
         }
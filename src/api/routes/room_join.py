@@ -0,0 +1,232 @@
+"""
+Bulk auto-join of a user into every agent room.
+
+POST /rooms/auto-join used to walk the agent mappings and, per room, GET
+``joined_members`` and then POST ``/join`` — hundreds of sequential round
+trips held on one request worker. It now starts a background job instead:
+
+  * one ``/joined_rooms`` call for the joining user gives the rooms they are
+    already in; only the set difference is joined,
+  * joins run concurrently (AUTO_JOIN_CONCURRENCY) and back off on 429 using
+    the homeserver's ``retry_after_ms`` / ``Retry-After``,
+  * the response carries a ``job_id``; GET /rooms/auto-join/{job_id} reports
+    progress and, once finished, the per-room results.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from pydantic import BaseModel
+
+from src.api.auth import verify_internal_key
+
+
+router = APIRouter(prefix="", tags=["rooms"])
+logger = logging.getLogger(__name__)
+
+AUTO_JOIN_CONCURRENCY = int(os.getenv("AUTO_JOIN_CONCURRENCY", "8"))
+AUTO_JOIN_MAX_ATTEMPTS = int(os.getenv("AUTO_JOIN_MAX_ATTEMPTS", "5"))
+AUTO_JOIN_BASE_BACKOFF_SECONDS = float(os.getenv("AUTO_JOIN_BASE_BACKOFF_SECONDS", "1.0"))
+AUTO_JOIN_MAX_BACKOFF_SECONDS = 30.0
+# Finished jobs stay pollable for this long
+AUTO_JOIN_JOB_RETENTION_SECONDS = 3600.0
+
+
+class AutoJoinRequest(BaseModel):
+    user_id: str
+    access_token: str
+    homeserver: str
+
+
+@dataclass
+class AutoJoinJob:
+    job_id: str
+    user_id: str
+    total: int
+    status: str = "running"  # "running" | "completed" | "failed"
+    joined_rooms: List[dict] = field(default_factory=list)
+    failed_rooms: List[dict] = field(default_factory=list)
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def completed(self) -> int:
+        return len(self.joined_rooms) + len(self.failed_rooms)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "joined": sum(1 for r in self.joined_rooms if r["status"] == "joined"),
+            "already_joined": sum(1 for r in self.joined_rooms if r["status"] == "already_joined"),
+            "failed": len(self.failed_rooms),
+            "joined_rooms": list(self.joined_rooms),
+            "failed_rooms": list(self.failed_rooms),
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+_jobs: Dict[str, AutoJoinJob] = {}
+
+
+def get_job(job_id: str) -> Optional[AutoJoinJob]:
+    return _jobs.get(job_id)
+
+
+def _prune_jobs() -> None:
+    cutoff = time.time() - AUTO_JOIN_JOB_RETENTION_SECONDS
+    for job_id in [j.job_id for j in _jobs.values() if j.finished_at and j.finished_at < cutoff]:
+        _jobs.pop(job_id, None)
+
+
+def _retry_delay(attempt: int, body: Optional[dict], headers) -> float:
+    retry_after_ms = (body or {}).get("retry_after_ms")
+    if isinstance(retry_after_ms, (int, float)) and retry_after_ms > 0:
+        delay = retry_after_ms / 1000
+    else:
+        try:
+            delay = float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            delay = AUTO_JOIN_BASE_BACKOFF_SECONDS * (2 ** (attempt - 1))
+    return min(delay, AUTO_JOIN_MAX_BACKOFF_SECONDS)
+
+
+async def fetch_joined_rooms(session, homeserver: str, access_token: str) -> Optional[Set[str]]:
+    """Rooms the token's user is joined to, or None if the homeserver won't say."""
+    url = f"{homeserver}/_matrix/client/v3/joined_rooms"
+    headers = {"Authorization": f"Bearer {access_token}"}
+    try:
+        async with session.get(url, headers=headers) as response:
+            if response.status == 200:
+                data = await response.json()
+                return set(data.get("joined_rooms", []))
+            logger.warning(f"joined_rooms returned {response.status}; joining every agent room")
+    except Exception as e:
+        logger.warning(f"joined_rooms failed ({e}); joining every agent room")
+    return None
+
+
+async def _join_room(session, homeserver: str, access_token: str, room_id: str) -> Optional[str]:
+    """Join ``room_id``; returns None on success or the last error text."""
+    url = f"{homeserver}/_matrix/client/v3/rooms/{room_id}/join"
+    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+    error_text = "join not attempted"
+    for attempt in range(1, AUTO_JOIN_MAX_ATTEMPTS + 1):
+        try:
+            async with session.post(url, headers=headers, json={}) as response:
+                if response.status == 200:
+                    return None
+                error_text = await response.text()
+                if response.status != 429:
+                    return error_text
+                try:
+                    body = await response.json(content_type=None)
+                except Exception:
+                    body = None
+                delay = _retry_delay(attempt, body, response.headers)
+        except Exception as e:
+            error_text = str(e)
+            delay = _retry_delay(attempt, None, {})
+        if attempt < AUTO_JOIN_MAX_ATTEMPTS:
+            logger.debug(f"Join {room_id} attempt {attempt} failed, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    return error_text
+
+
+async def run_auto_join_job(
+    job: AutoJoinJob,
+    session,
+    homeserver: str,
+    access_token: str,
+    rooms: Dict[str, Optional[str]],
+) -> AutoJoinJob:
+    """Join ``job.user_id`` to every room in ``rooms`` (room_id -> agent name)."""
+    try:
+        already = await fetch_joined_rooms(session, homeserver, access_token) or set()
+        to_join = []
+        for room_id, agent_name in rooms.items():
+            if room_id in already:
+                job.joined_rooms.append({"room_id": room_id, "agent_name": agent_name, "status": "already_joined"})
+            else:
+                to_join.append((room_id, agent_name))
+
+        semaphore = asyncio.Semaphore(max(1, AUTO_JOIN_CONCURRENCY))
+
+        async def _join(room_id: str, agent_name: Optional[str]) -> None:
+            async with semaphore:
+                error = await _join_room(session, homeserver, access_token, room_id)
+            if error is None:
+                job.joined_rooms.append({"room_id": room_id, "agent_name": agent_name, "status": "joined"})
+                logger.info(f"Auto-joined {job.user_id} to room {room_id} for agent {agent_name}")
+            else:
+                job.failed_rooms.append({"room_id": room_id, "agent_name": agent_name, "error": error})
+                logger.warning(f"Failed to join {job.user_id} to room {room_id}: {error}")
+
+        await asyncio.gather(*(_join(room_id, agent_name) for room_id, agent_name in to_join))
+        job.status = "completed"
+    except Exception as e:
+        logger.error(f"Error in auto-join job {job.job_id}: {e}")
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        job.finished_at = time.time()
+    return job
+
+
+@router.post("/rooms/auto-join")
+async def auto_join_rooms(request: AutoJoinRequest, raw_request: Request, x_internal_key: str = Header(...)):
+    verify_internal_key(x_internal_key)
+    try:
+        from src.core.mapping_service import get_all_mappings
+
+        mappings = get_all_mappings()
+        if not mappings:
+            return {"success": False, "message": "No agent mappings found", "joined_rooms": []}
+
+        rooms: Dict[str, Optional[str]] = {}
+        for mapping in mappings.values():
+            room_id = mapping.get("room_id")
+            if room_id and room_id not in rooms:
+                rooms[room_id] = mapping.get("agent_name")
+
+        _prune_jobs()
+        job = AutoJoinJob(job_id=uuid.uuid4().hex, user_id=request.user_id, total=len(rooms))
+        _jobs[job.job_id] = job
+
+        session = await raw_request.app.state.matrix_client._get_session()
+        job.task = asyncio.create_task(
+            run_auto_join_job(job, session, request.homeserver, request.access_token, rooms)
+        )
+
+        return {
+            "success": True,
+            "message": f"Auto-join started for {len(rooms)} rooms",
+            "job_id": job.job_id,
+            "status": job.status,
+            "total": job.total,
+        }
+    except Exception as e:
+        logger.error(f"Error in auto-join: {e}")
+        return {"success": False, "message": f"Error: {str(e)}", "joined_rooms": [], "failed_rooms": []}
+
+
+@router.get("/rooms/auto-join/{job_id}")
+async def get_auto_join_job(job_id: str, x_internal_key: str = Header(...)):
+    verify_internal_key(x_internal_key)
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Auto-join job not found")
+    return {"success": job.status != "failed", **job.to_dict()}
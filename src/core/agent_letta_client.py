@@ -19,8 +19,8 @@ class AgentLettaClientMixin:
             from concurrent.futures import ThreadPoolExecutor
 
             sdk_config = LettaConfig(
-                base_url="http://192.168.50.90:8289",
-                api_key="lettaSecurePass123",
+                base_url=self.config.letta_api_url,
+                api_key=self.config.letta_token,
                 timeout=30.0,
                 max_retries=3
             )
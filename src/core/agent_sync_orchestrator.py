@@ -127,15 +127,16 @@ class AgentSyncOrchestratorMixin:
                     logger.warning(f"⚠️  Failed to ensure {user_id} in {agent['name']}'s room")
 
     async def _set_missing_avatars(self, existing_mappings):
+        agents = []
         for agent in existing_mappings:
             mapping = self.mappings.get(agent["id"])
             if not mapping:
                 continue
             if not (mapping.created and mapping.room_created and mapping.room_id and mapping.matrix_user_id):
                 continue
-            asyncio.create_task(
-                self.set_default_avatar_for_agent(agent["name"], mapping.matrix_user_id)
-            )
+            agents.append((agent["name"], mapping.matrix_user_id))
+        if agents:
+            asyncio.create_task(self.reconcile_avatars(agents))
 
     async def _cleanup_removed_agents(self, letta_agent_ids, existing_mappings):
         removed_agents = existing_mappings - letta_agent_ids
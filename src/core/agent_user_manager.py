@@ -13,7 +13,7 @@ import asyncio
 import logging
 import os
 import time
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 
 import aiohttp
 
@@ -113,7 +113,9 @@ class AgentUserManager(
             save_mappings_callback=self.save_mappings
         )
 
-        self._avatar_service = AvatarService(self.config, self.logger)
+        self._avatar_service = AvatarService(
+            self.config, self.logger, cache_dir=os.path.join(self.data_dir, "avatar_cache")
+        )
         self._avatar_service.user_manager = self.user_manager
         self._avatar_service.mappings = self.mappings
 
@@ -258,5 +260,8 @@ class AgentUserManager(
     async def set_default_avatar_for_agent(self, agent_name: str, matrix_user_id: str) -> bool:
         return await self._avatar_service.set_default_avatar_for_agent(agent_name, matrix_user_id)
 
+    async def reconcile_avatars(self, agents: List[Tuple[str, str]]) -> Dict[str, int]:
+        return await self._avatar_service.reconcile_avatars(agents)
+
     def _generate_avatar_image(self, agent_name: str, size: int = 128) -> Optional[bytes]:
         return self._avatar_service._generate_avatar_image(agent_name, size)
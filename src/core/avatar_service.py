@@ -3,9 +3,11 @@
 
 import hashlib
 import io
+import json
+import os
 import asyncio
 import logging
-from typing import Any, Dict, Optional, Set
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
 
 import aiohttp
 
@@ -22,10 +24,16 @@ except ImportError:
 
 DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=10)
 
+# Bump when _generate_avatar_image output changes so cached renders are redone
+AVATAR_STYLE_VERSION = 1
+AVATAR_SIZE = 128
+AVATAR_RECONCILE_CONCURRENCY = int(os.getenv("AVATAR_RECONCILE_CONCURRENCY", "8"))
+UPLOAD_INDEX_FILENAME = "uploads.json"
+
 
 class AvatarService:
 
-    def __init__(self, config, logger: logging.Logger):
+    def __init__(self, config, logger: logging.Logger, cache_dir: Optional[str] = None):
         self.config = config
         self.logger = logger
         self.homeserver_url = config.homeserver_url
@@ -35,6 +43,12 @@ class AvatarService:
         self._avatar_sync_in_flight: Set[str] = set()
         self._session: Optional[aiohttp.ClientSession] = None
         self._session_lock = asyncio.Lock()
+        # Rendered PNGs by (name, size, style) and uploads by content hash.
+        # cache_dir=None keeps both in memory only.
+        self.cache_dir = cache_dir
+        self._rendered: Dict[str, bytes] = {}
+        self._uploads: Optional[Dict[str, str]] = None
+        self._upload_locks: Dict[str, asyncio.Lock] = {}
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is not None and not self._session.closed:
@@ -144,17 +158,14 @@ class AvatarService:
                 self.logger.warning(f"No token obtained for {agent_name}")
                 return False
 
-            avatar_bytes = self._generate_avatar_image(agent_name, size=128)
+            avatar_bytes = await self.get_avatar_bytes(agent_name)
             if not avatar_bytes:
                 self.logger.warning(f"Failed to generate avatar for {agent_name}")
                 return False
 
-            filename = f"{username}_avatar.png"
-            avatar_url = await self.user_manager.upload_avatar(
-                avatar_bytes,
-                filename,
-                "image/png",
-                agent_token,
+            content_hash = hashlib.sha256(avatar_bytes).hexdigest()
+            avatar_url = await self._upload_once(
+                content_hash, avatar_bytes, f"{username}_avatar.png", agent_token
             )
 
             if not avatar_url:
@@ -171,6 +182,8 @@ class AvatarService:
                 self._avatar_resolved_users.add(matrix_user_id)
                 self.logger.info(f"Successfully set avatar for agent {agent_name}")
             else:
+                # The media may be gone (purged/other homeserver); upload afresh next time
+                await self._forget_upload(content_hash)
                 self.logger.warning(f"Failed to set avatar for agent {agent_name}")
 
             return success
@@ -184,6 +197,127 @@ class AvatarService:
         finally:
             self._avatar_sync_in_flight.discard(matrix_user_id)
 
+    async def reconcile_avatars(
+        self,
+        agents: Iterable[Tuple[str, str]],
+        concurrency: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """Ensure every (agent_name, matrix_user_id) has an avatar, a few at a time."""
+        limit = concurrency or AVATAR_RECONCILE_CONCURRENCY
+        semaphore = asyncio.Semaphore(max(1, limit))
+
+        async def _one(agent_name: str, matrix_user_id: str) -> bool:
+            async with semaphore:
+                return await self.set_default_avatar_for_agent(agent_name, matrix_user_id)
+
+        pending = [(name, mxid) for name, mxid in agents if mxid not in self._avatar_resolved_users]
+        results = await asyncio.gather(*(_one(name, mxid) for name, mxid in pending))
+        summary = {
+            "checked": len(pending),
+            "ok": sum(1 for r in results if r),
+            "failed": sum(1 for r in results if not r),
+        }
+        if pending:
+            self.logger.info(
+                f"Avatar reconciliation: {summary['ok']}/{summary['checked']} ok, "
+                f"{summary['failed']} failed"
+            )
+        return summary
+
+    async def get_avatar_bytes(self, agent_name: str, size: int = AVATAR_SIZE) -> Optional[bytes]:
+        """Rendered avatar PNG, from memory, then disk, then a render in a worker thread."""
+        key = hashlib.sha256(f"{AVATAR_STYLE_VERSION}:{size}:{agent_name}".encode()).hexdigest()
+        cached = self._rendered.get(key)
+        if cached is not None:
+            return cached
+
+        path = os.path.join(self.cache_dir, f"{key}.png") if self.cache_dir else None
+        avatar_bytes = await asyncio.to_thread(self._load_or_render, agent_name, size, path)
+        if avatar_bytes:
+            self._rendered[key] = avatar_bytes
+        return avatar_bytes
+
+    def _load_or_render(self, agent_name: str, size: int, path: Optional[str]) -> Optional[bytes]:
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    return f.read()
+            except OSError as e:
+                self.logger.debug(f"Could not read cached avatar {path}: {e}")
+
+        avatar_bytes = self._generate_avatar_image(agent_name, size=size)
+        if avatar_bytes and path:
+            self._write_atomic(path, avatar_bytes)
+        return avatar_bytes
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.debug(f"Could not write avatar cache {path}: {e}")
+
+    async def _upload_once(
+        self, content_hash: str, avatar_bytes: bytes, filename: str, token: str
+    ) -> Optional[str]:
+        """Upload unless identical bytes already have an mxc:// URL on this homeserver."""
+        lock = self._upload_locks.setdefault(content_hash, asyncio.Lock())
+        async with lock:
+            uploads = await self._get_upload_index()
+            existing = uploads.get(content_hash)
+            if existing:
+                self.logger.debug(f"Reusing uploaded avatar {existing} for {filename}")
+                return existing
+
+            avatar_url = await self.user_manager.upload_avatar(
+                avatar_bytes,
+                filename,
+                "image/png",
+                token,
+            )
+            if avatar_url:
+                uploads[content_hash] = avatar_url
+                await asyncio.to_thread(self._save_upload_index, dict(uploads))
+            return avatar_url
+
+    async def _forget_upload(self, content_hash: str) -> None:
+        uploads = await self._get_upload_index()
+        if uploads.pop(content_hash, None) is not None:
+            await asyncio.to_thread(self._save_upload_index, dict(uploads))
+
+    async def _get_upload_index(self) -> Dict[str, str]:
+        if self._uploads is None:
+            self._uploads = await asyncio.to_thread(self._load_upload_index)
+        return self._uploads
+
+    def _load_upload_index(self) -> Dict[str, str]:
+        if not self.cache_dir:
+            return {}
+        path = os.path.join(self.cache_dir, UPLOAD_INDEX_FILENAME)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable avatar upload index {path}: {e}")
+            return {}
+        if data.get("homeserver_url") != self.homeserver_url:
+            return {}
+        return dict(data.get("uploads", {}))
+
+    def _save_upload_index(self, uploads: Dict[str, str]) -> None:
+        if not self.cache_dir:
+            return
+        payload = {"homeserver_url": self.homeserver_url, "uploads": uploads}
+        self._write_atomic(
+            os.path.join(self.cache_dir, UPLOAD_INDEX_FILENAME),
+            json.dumps(payload, indent=2, sort_keys=True).encode(),
+        )
+
     def _generate_avatar_image(self, agent_name: str, size: int = 256) -> Optional[bytes]:
         if not HAS_PIL or Image is None or ImageDraw is None or ImageFont is None:
             return None
@@ -0,0 +1,163 @@
+"""
+Write-behind tracking of conversation activity.
+
+``last_message_at`` on room and inter-agent conversations only feeds
+analytics and stale-conversation cleanup, so the message path records
+touches in memory and a background flusher writes them out in one
+executemany UPDATE per table every CONVERSATION_ACTIVITY_FLUSH_SECONDS.
+Pending touches are flushed on stop() and before stale cleanup.
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from src.models.conversation import InterAgentConversationDB, RoomConversationDB
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_ACTIVITY_FLUSH_SECONDS = float(os.getenv("CONVERSATION_ACTIVITY_FLUSH_SECONDS", "30"))
+
+RoomKey = Tuple[str, str, Optional[str], Optional[str]]
+InterAgentKey = Tuple[str, str, str, Optional[str]]
+
+
+class ConversationActivityTracker:
+    def __init__(self, interval_seconds: Optional[float] = None) -> None:
+        self.interval_seconds = (
+            interval_seconds if interval_seconds is not None else CONVERSATION_ACTIVITY_FLUSH_SECONDS
+        )
+        self._lock = threading.Lock()
+        # Serialises flushes so a shutdown flush can't interleave with the loop's
+        self._flush_lock = threading.Lock()
+        self._room_touches: Dict[RoomKey, datetime] = {}
+        self._inter_agent_touches: Dict[InterAgentKey, datetime] = {}
+        self._stop_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.touches = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_errors = 0
+
+    def touch_room(
+        self,
+        room_id: str,
+        agent_id: str,
+        user_mxid: Optional[str] = None,
+        thread_event_id: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self._room_touches[(room_id, agent_id, user_mxid, thread_event_id)] = datetime.utcnow()
+            self.touches += 1
+        self._ensure_started()
+
+    def touch_inter_agent(
+        self,
+        source_agent_id: str,
+        target_agent_id: str,
+        room_id: str,
+        user_mxid: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self._inter_agent_touches[(source_agent_id, target_agent_id, room_id, user_mxid)] = datetime.utcnow()
+            self.touches += 1
+        self._ensure_started()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._room_touches) + len(self._inter_agent_touches)
+
+    def flush(self) -> int:
+        """Write pending touches to the database; returns rows updated."""
+        with self._flush_lock:
+            with self._lock:
+                room, self._room_touches = self._room_touches, {}
+                inter, self._inter_agent_touches = self._inter_agent_touches, {}
+            if not room and not inter:
+                return 0
+
+            written = 0
+            try:
+                written += RoomConversationDB().touch_many(room)
+                room = {}
+                written += InterAgentConversationDB().touch_many(inter)
+            except Exception as exc:
+                logger.warning("Conversation activity flush failed, will retry: %s", exc)
+                with self._lock:
+                    self._requeue(self._room_touches, room)
+                    self._requeue(self._inter_agent_touches, inter)
+                    self.flush_errors += 1
+                return written
+
+            with self._lock:
+                self.flushes += 1
+                self.rows_written += written
+            return written
+
+    @staticmethod
+    def _requeue(target: Dict, failed: Dict) -> None:
+        for key, at in failed.items():
+            newer = target.get(key)
+            if newer is None or newer < at:
+                target[key] = at
+
+    def _ensure_started(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop (sync callers): flushed explicitly
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._stop_event = asyncio.Event()
+        self._task = loop.create_task(self._run_loop())
+
+    async def start(self) -> None:
+        self._ensure_started()
+
+    async def stop(self) -> None:
+        if self._task is not None and self._task.get_loop() is asyncio.get_running_loop():
+            self._stop_event.set()
+            await self._task
+        self._task = None
+        await asyncio.to_thread(self.flush)
+
+    async def _run_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            if self._stop_event.is_set():
+                break
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as exc:
+                logger.error("Conversation activity flusher error: %s", exc, exc_info=True)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "touches": self.touches,
+                "pending": len(self._room_touches) + len(self._inter_agent_touches),
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+                "flush_errors": self.flush_errors,
+            }
+
+
+_tracker: Optional[ConversationActivityTracker] = None
+
+
+def get_conversation_activity_tracker() -> ConversationActivityTracker:
+    global _tracker
+    if _tracker is None:
+        _tracker = ConversationActivityTracker()
+    return _tracker
+
+
+def reset_conversation_activity_tracker() -> None:
+    """Drop the tracker singleton without flushing (useful for testing)."""
+    global _tracker
+    _tracker = None
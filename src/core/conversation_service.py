@@ -3,8 +3,13 @@ Conversation service for Letta 0.16.2 Conversations API integration.
 
 Manages room-to-conversation mappings for context isolation.
 """
+import asyncio
 import logging
-from typing import Optional, List, Tuple
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, List, Set, Tuple
 from sqlalchemy.exc import IntegrityError
 
 from letta_client import Letta, NotFoundError, APIError
@@ -16,11 +21,76 @@ from src.models.conversation import (
     InterAgentConversation,
 )
 from src.letta.client import get_letta_client
+from src.core.conversation_activity import get_conversation_activity_tracker
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_ISOLATED_BLOCK_LABELS = ["room_context", "conversation_summary", "active_tasks"]
 
+# (room_id, agent_id, user_mxid, thread_event_id) → conversation_id, shared by
+# every ConversationService instance (callers build a new one per message).
+# Entries skip the DB lookup and Letta verification until they are older than
+# CONVERSATION_VERIFY_TTL_SECONDS; then the next use re-verifies them.
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "4096"))
+CONVERSATION_VERIFY_TTL_SECONDS = float(os.getenv("CONVERSATION_VERIFY_TTL_SECONDS", "300"))
+
+ConversationKey = Tuple[str, str, Optional[str], Optional[str]]
+
+_cache: "OrderedDict[ConversationKey, Tuple[str, float]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_inflight: Dict[ConversationKey, "asyncio.Future[Tuple[str, bool]]"] = {}
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _cache_get(key: ConversationKey) -> Optional[str]:
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        conversation_id, verified_at = entry
+        if time.monotonic() - verified_at >= CONVERSATION_VERIFY_TTL_SECONDS:
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return conversation_id
+
+
+def _cache_put(key: ConversationKey, conversation_id: str) -> None:
+    with _cache_lock:
+        _cache[key] = (conversation_id, time.monotonic())
+        _cache.move_to_end(key)
+        while len(_cache) > CONVERSATION_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def reset_conversation_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def invalidate(key: ConversationKey) -> bool:
+    """Drop ``key`` so its next use re-verifies the conversation with Letta."""
+    with _cache_lock:
+        return _cache.pop(key, None) is not None
+
+
+def invalidate_conversation(conversation_id: str) -> int:
+    """Drop every cached key mapped to ``conversation_id`` (Letta reported it missing).
+
+    Send paths only know the conversation id, not the cache key it came from.
+    """
+    with _cache_lock:
+        keys = [key for key, (cached_id, _) in _cache.items() if cached_id == conversation_id]
+    for key in keys:
+        invalidate(key)
+    return len(keys)
+
+
+def _run_in_background(coro) -> None:
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 
 class ConversationService:
     """
@@ -213,13 +283,16 @@ class ConversationService:
         Get or create a conversation for a room+agent pair.
         
         Handles:
+        - In-memory cache of recently verified mappings (skips DB + Letta)
+        - Single-flight resolution: concurrent callers for the same key share
+          one lookup/creation
         - DB lookup for existing mapping
         - Strategy detection based on room membership
         - Letta conversation creation if needed
         - Race condition handling via unique constraint
         - Stale conversation recovery (DB record exists but Letta deleted)
         - Thread isolation: when thread_event_id is set, a separate conversation
-          is created for that Matrix thread
+          is created for that Matrix thread (seeded in the background)
         
         Args:
             room_id: Matrix room ID
@@ -237,8 +310,48 @@ class ConversationService:
             strategy = "per-thread"
         
         lookup_user = user_mxid if strategy == "per-user" else None
-        
-        existing = self.room_conv_db.get_by_room_and_agent(
+        key: ConversationKey = (room_id, agent_id, lookup_user, thread_event_id)
+
+        cached = _cache_get(key)
+        if cached is not None:
+            get_conversation_activity_tracker().touch_room(room_id, agent_id, lookup_user, thread_event_id)
+            return cached, False
+
+        pending = _inflight.get(key)
+        if pending is not None:
+            conversation_id, _ = await asyncio.shield(pending)
+            return conversation_id, False
+
+        future: "asyncio.Future[Tuple[str, bool]]" = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on a failed resolution; don't log it as unretrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        _inflight[key] = future
+        try:
+            result = await self._resolve_room_conversation(
+                key, strategy, room_name=room_name, user_mxid=user_mxid
+            )
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        finally:
+            _inflight.pop(key, None)
+
+    async def _resolve_room_conversation(
+        self,
+        key: "ConversationKey",
+        strategy: str,
+        room_name: Optional[str],
+        user_mxid: Optional[str],
+    ) -> Tuple[str, bool]:
+        room_id, agent_id, lookup_user, thread_event_id = key
+
+        existing = await asyncio.to_thread(
+            self.room_conv_db.get_by_room_and_agent,
             room_id=room_id,
             agent_id=agent_id,
             user_mxid=lookup_user,
@@ -246,15 +359,18 @@ class ConversationService:
         )
         
         if existing:
-            if self._verify_letta_conversation(existing.conversation_id):
-                self.room_conv_db.update_last_message(room_id, agent_id, lookup_user, thread_event_id)
+            if await asyncio.to_thread(self._verify_letta_conversation, existing.conversation_id):
+                get_conversation_activity_tracker().touch_room(room_id, agent_id, lookup_user, thread_event_id)
+                _cache_put(key, existing.conversation_id)
                 return existing.conversation_id, False
             else:
                 logger.warning(
                     f"Stale conversation {existing.conversation_id} for room {room_id}, "
                     f"agent {agent_id} - recreating"
                 )
-                self.room_conv_db.delete(room_id, agent_id, lookup_user, thread_event_id)
+                await asyncio.to_thread(
+                    self.room_conv_db.delete, room_id, agent_id, lookup_user, thread_event_id
+                )
         
         summary = f"Matrix room: {room_name or room_id}"
         if strategy == "per-user" and user_mxid:
@@ -264,13 +380,14 @@ class ConversationService:
             summary = f"{summary} (thread: {short_id})"
         
         try:
-            conversation_id = self._create_letta_conversation(agent_id, summary)
+            conversation_id = await asyncio.to_thread(self._create_letta_conversation, agent_id, summary)
         except APIError as e:
             logger.error(f"Failed to create Letta conversation: {e}")
             raise
         
         try:
-            self.room_conv_db.create(
+            await asyncio.to_thread(
+                self.room_conv_db.create,
                 room_id=room_id,
                 agent_id=agent_id,
                 conversation_id=conversation_id,
@@ -278,21 +395,15 @@ class ConversationService:
                 user_mxid=lookup_user,
                 thread_event_id=thread_event_id,
             )
+            _cache_put(key, conversation_id)
 
-            # Seed new thread conversations with main-timeline context
+            # Seed new thread conversations with main-timeline context, off the message path
             if thread_event_id:
-                main_conv = self.room_conv_db.get_by_room_and_agent(
-                    room_id=room_id,
-                    agent_id=agent_id,
-                    user_mxid=lookup_user,
-                    thread_event_id=None,  # main timeline
-                )
-                if main_conv:
-                    self._seed_thread_conversation(
-                        thread_conversation_id=conversation_id,
-                        main_conversation_id=main_conv.conversation_id,
-                        agent_id=agent_id,
+                _run_in_background(
+                    asyncio.to_thread(
+                        self._seed_new_thread, room_id, agent_id, lookup_user, conversation_id
                     )
+                )
 
             return conversation_id, True
             
@@ -301,18 +412,40 @@ class ConversationService:
                 f"Race condition: conversation already created for room {room_id}, "
                 f"agent {agent_id} - fetching existing"
             )
-            existing = self.room_conv_db.get_by_room_and_agent(
+            existing = await asyncio.to_thread(
+                self.room_conv_db.get_by_room_and_agent,
                 room_id=room_id,
                 agent_id=agent_id,
                 user_mxid=lookup_user,
                 thread_event_id=thread_event_id,
             )
             if existing:
+                _cache_put(key, existing.conversation_id)
                 return existing.conversation_id, False
             raise RuntimeError(
                 f"Failed to get or create conversation for room {room_id}, agent {agent_id}"
             )
 
+    def _seed_new_thread(
+        self,
+        room_id: str,
+        agent_id: str,
+        lookup_user: Optional[str],
+        thread_conversation_id: str,
+    ) -> None:
+        main_conv = self.room_conv_db.get_by_room_and_agent(
+            room_id=room_id,
+            agent_id=agent_id,
+            user_mxid=lookup_user,
+            thread_event_id=None,  # main timeline
+        )
+        if main_conv:
+            self._seed_thread_conversation(
+                thread_conversation_id=thread_conversation_id,
+                main_conversation_id=main_conv.conversation_id,
+                agent_id=agent_id,
+            )
+
     async def get_or_create_inter_agent_conversation(
         self,
         source_agent_id: str,
@@ -334,7 +467,8 @@ class ConversationService:
         Returns:
             Tuple of (conversation_id, created: bool)
         """
-        existing = self.inter_agent_db.get(
+        existing = await asyncio.to_thread(
+            self.inter_agent_db.get,
             source_agent_id=source_agent_id,
             target_agent_id=target_agent_id,
             room_id=room_id,
@@ -342,8 +476,8 @@ class ConversationService:
         )
         
         if existing:
-            if self._verify_letta_conversation(existing.conversation_id):
-                self.inter_agent_db.update_last_message(
+            if await asyncio.to_thread(self._verify_letta_conversation, existing.conversation_id):
+                get_conversation_activity_tracker().touch_inter_agent(
                     source_agent_id, target_agent_id, room_id, user_mxid
                 )
                 return existing.conversation_id, False
@@ -351,20 +485,24 @@ class ConversationService:
                 logger.warning(
                     f"Stale inter-agent conversation {existing.conversation_id} - recreating"
                 )
-                self.inter_agent_db.delete(
-                    source_agent_id, target_agent_id, room_id, user_mxid
+                await asyncio.to_thread(
+                    self.inter_agent_db.delete,
+                    source_agent_id, target_agent_id, room_id, user_mxid,
                 )
         
         summary = f"Inter-agent: {source_agent_id} -> {target_agent_id} in {room_id}"
         
         try:
-            conversation_id = self._create_letta_conversation(target_agent_id, summary)
+            conversation_id = await asyncio.to_thread(
+                self._create_letta_conversation, target_agent_id, summary
+            )
         except APIError as e:
             logger.error(f"Failed to create inter-agent conversation: {e}")
             raise
         
         try:
-            self.inter_agent_db.create(
+            await asyncio.to_thread(
+                self.inter_agent_db.create,
                 source_agent_id=source_agent_id,
                 target_agent_id=target_agent_id,
                 room_id=room_id,
@@ -375,7 +513,8 @@ class ConversationService:
             
         except IntegrityError:
             logger.info("Race condition: inter-agent conversation already created")
-            existing = self.inter_agent_db.get(
+            existing = await asyncio.to_thread(
+                self.inter_agent_db.get,
                 source_agent_id=source_agent_id,
                 target_agent_id=target_agent_id,
                 room_id=room_id,
@@ -415,8 +554,11 @@ class ConversationService:
         Returns:
             Tuple of (room_conversations_deleted, inter_agent_deleted)
         """
+        # Pending activity must land first or active conversations look stale
+        get_conversation_activity_tracker().flush()
         room_deleted = self.room_conv_db.delete_stale(days)
         inter_deleted = self.inter_agent_db.delete_stale(days)
+        reset_conversation_cache()
         
         logger.info(
             f"Cleaned up {room_deleted} room conversations and "
@@ -443,6 +585,7 @@ def get_conversation_service(
 
 
 def reset_conversation_service() -> None:
-    """Reset the service singleton (useful for testing)."""
+    """Reset the service singleton and conversation cache (useful for testing)."""
     global _service
     _service = None
+    reset_conversation_cache()
@@ -22,6 +22,8 @@ _mapping_cache: Optional[Dict[str, dict]] = None
 _cache_valid = False
 _cache_timestamp: Optional[float] = None
 _cache_ttl_seconds = int(os.getenv("MAPPING_CACHE_TTL_SECONDS", "300"))
+# Bumped on every invalidation/reload so derived indexes know when to rebuild
+_mapping_generation = 0
 
 
 def _is_cache_fresh() -> bool:
@@ -89,9 +91,15 @@ def _get_db():
 
 def invalidate_cache():
     """Invalidate the mapping cache - call after any write operation"""
-    global _cache_valid, _cache_timestamp
+    global _cache_valid, _cache_timestamp, _mapping_generation
     _cache_valid = False
     _cache_timestamp = None
+    _mapping_generation += 1
+
+
+def mapping_generation() -> int:
+    """Counter that changes whenever the mapping cache is invalidated or reloaded."""
+    return _mapping_generation
 
 
 def get_all_mappings(include_removed: bool = False) -> Dict[str, dict]:
@@ -101,7 +109,7 @@ def get_all_mappings(include_removed: bool = False) -> Dict[str, dict]:
     Returns:
         Dict mapping agent_id to mapping data (compatible with old JSON format)
     """
-    global _mapping_cache, _cache_valid, _cache_timestamp
+    global _mapping_cache, _cache_valid, _cache_timestamp, _mapping_generation
 
     _purge_expired_soft_deleted_mappings(grace_period_days=int(os.getenv("MAPPING_SOFT_DELETE_GRACE_DAYS", "7")))
 
@@ -117,6 +125,7 @@ def get_all_mappings(include_removed: bool = False) -> Dict[str, dict]:
         _mapping_cache = db.export_to_dict()
         _cache_valid = True
         _cache_timestamp = time.time()
+        _mapping_generation += 1
         materialized = {k: dict(v) for k, v in _mapping_cache.items()}
         enriched = {k: _enrich_with_identity(v) for k, v in materialized.items()}
         if include_removed:
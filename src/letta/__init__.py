@@ -1,25 +1,45 @@
-"""Letta SDK integration module."""
-
-from src.letta.client import (
-    LettaConfig,
-    LettaService,
-    get_letta_client,
-    get_letta_service,
-    reset_client,
-    Agent,
-)
-
-from src.letta.types import (
-    MessageRole,
-    MessageType,
-    AgentId,
-    RoomId,
-    UserId,
-    is_assistant_message,
-    is_tool_call,
-    extract_assistant_content,
-    extract_tool_calls,
-)
+"""Letta SDK integration module.
+
+Exports resolve lazily so that light submodules (e.g. ``ws_gateway_client``,
+used by the Temporal worker) can be imported without pulling in
+``letta_client`` through ``src.letta.client``.
+"""
+
+import importlib
+
+_LAZY_EXPORTS = {
+    # Client
+    "LettaConfig": "src.letta.client",
+    "LettaService": "src.letta.client",
+    "get_letta_client": "src.letta.client",
+    "get_letta_service": "src.letta.client",
+    "reset_client": "src.letta.client",
+    "Agent": "src.letta.client",
+    # Types
+    "MessageRole": "src.letta.types",
+    "MessageType": "src.letta.types",
+    "AgentId": "src.letta.types",
+    "RoomId": "src.letta.types",
+    "UserId": "src.letta.types",
+    "is_assistant_message": "src.letta.types",
+    "is_tool_call": "src.letta.types",
+    "extract_assistant_content": "src.letta.types",
+    "extract_tool_calls": "src.letta.types",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
 
 __all__ = [
     # Client
@@ -23,6 +23,23 @@ _EVENT_MAP: Dict[str, StreamEventType] = {
     "reasoning": StreamEventType.REASONING,
 }
 
+# Dropped by the gateway client before decoding when reasoning is filtered
+_SKIP_WITHOUT_REASONING = frozenset({"reasoning"})
+
+
+class _TruncatedFrame:
+    """Formats a raw frame for logging only if the record is emitted."""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.raw = raw
+
+    def __str__(self) -> str:
+        return str(
+            {k: (v[:200] if isinstance(v, str) and len(v) > 200 else v) for k, v in self.raw.items()}
+        )
+
 
 async def stream_via_gateway(
     client: GatewayClient,
@@ -72,25 +89,25 @@ async def stream_via_gateway(
         message=gateway_message,
         conversation_id=conversation_id,
         source=source,
+        skip_stream_events=() if include_reasoning else _SKIP_WITHOUT_REASONING,
     ):
+        if raw_event.get("status") == "running" and raw_event.get("event") == "tool_call":
+            # Partial-JSON snapshot dedup (see seen_tool_call_ids comment).
+            # Suppress intermediate snapshots before building an event; the
+            # 'completed' frame carries the fully-accumulated args.
+            logger.debug(
+                "[GW-STREAM] Suppressing running tool_call snapshot id=%s",
+                raw_event.get("tool_call_id"),
+            )
+            continue
+
         event = _parse_gateway_event(raw_event, include_reasoning)
         if event is None:
             continue
 
         if event.type == StreamEventType.TOOL_CALL:
-            # Partial-JSON snapshot dedup. See seen_tool_call_ids comment.
-            tc_status = event.metadata.get("tool_call_status")
-            tc_id = event.metadata.get("tool_call_id")
-            if tc_status == "running":
-                # Suppress intermediate snapshots; the 'completed' frame
-                # carries the fully-accumulated args. Render-side gets a
-                # single bubble per logical tool call.
-                logger.debug(
-                    "[GW-STREAM] Suppressing running tool_call snapshot id=%s",
-                    tc_id,
-                )
-                continue
             # tc_status == 'completed' OR status absent (legacy gateway)
+            tc_id = event.metadata.get("tool_call_id")
             if tc_id and tc_id in seen_tool_call_ids:
                 # Defensive: same id seen twice with non-running status
                 # (shouldn't happen per gateway contract, but log if it does).
@@ -199,8 +216,9 @@ def _parse_gateway_event(
 
     if event_type == "session_init":
         logger.debug(
-            f"[GW-STREAM] Session init: session={raw.get('session_id')} "
-            f"conversation={raw.get('conversation_id')}"
+            "[GW-STREAM] Session init: session=%s conversation=%s",
+            raw.get("session_id"),
+            raw.get("conversation_id"),
         )
         return None
 
@@ -211,7 +229,7 @@ def _parse_gateway_event(
             metadata={"error_type": "gateway", "code": raw.get("code")},
         )
 
-    logger.debug(f"[GW-STREAM] Unknown event type: {event_type}")
+    logger.debug("[GW-STREAM] Unknown event type: %s", event_type)
     return None
 
 
@@ -223,7 +241,7 @@ def _parse_stream_event(
     mapped_type = _EVENT_MAP.get(sub_event)
 
     if mapped_type is None:
-        logger.debug(f"[GW-STREAM] Unmapped stream event: {sub_event}")
+        logger.debug("[GW-STREAM] Unmapped stream event: %s", sub_event)
         return None
 
     if mapped_type == StreamEventType.REASONING and not include_reasoning:
@@ -248,10 +266,8 @@ def _parse_stream_event(
         tool_args = raw.get("tool_input") or raw.get("arguments")
         if tool_args:
             metadata["arguments"] = tool_args
-        logger.info(
-            "[GW-STREAM] TOOL_CALL raw=%s",
-            {k: (v[:200] if isinstance(v, str) and len(v) > 200 else v) for k, v in raw.items()},
-        )
+        if raw.get("status") != "running":
+            logger.info("[GW-STREAM] TOOL_CALL raw=%s", _TruncatedFrame(raw))
 
     elif mapped_type == StreamEventType.TOOL_RETURN:
         metadata["tool_name"] = raw.get("tool_name") or "unknown"
@@ -8,16 +8,65 @@ Each connection maps 1:1 to a letta-code-sdk Session on the gateway side.
 import asyncio
 import json
 import logging
+import re
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import Any, AsyncGenerator, Dict, Optional
+from typing import Any, AsyncGenerator, Collection, Dict, Optional, Tuple, Union
 
 import websockets
 from websockets.asyncio.client import ClientConnection
 
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+    orjson = None  # type: ignore
+
 logger = logging.getLogger("matrix_client.ws_gateway")
 
+# Inside a JSON string every '"' is escaped, so these only match real keys.
+_TYPE_FIELD = re.compile(r'"type"\s*:\s*"([^"\\]*)"')
+_EVENT_FIELD = re.compile(r'"event"\s*:\s*"([^"\\]*)"')
+
+
+def decode_gateway_frame(raw: Union[str, bytes]) -> Any:
+    """Decode one WS frame; orjson when installed. Raises ValueError/TypeError."""
+    if HAS_ORJSON:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def sniff_stream_event(raw: Union[str, bytes]) -> Optional[str]:
+    """
+    Return the stream sub-event of a frame without decoding it, or None when
+    that can't be told for certain.
+
+    Every frame has a top-level "type" and every stream frame a top-level
+    "event"; nested objects (tool_input) may repeat either key. So if "type"
+    appears exactly once with value "stream" and "event" exactly once, that
+    "event" is the top-level one.
+    """
+    if not isinstance(raw, str):
+        return None
+    types = _TYPE_FIELD.findall(raw)
+    if len(types) != 1 or types[0] != "stream":
+        return None
+    events = _EVENT_FIELD.findall(raw)
+    if len(events) != 1:
+        return None
+    return events[0]
+
+
+def _should_skip(raw: Union[str, bytes], skip_stream_events: Collection[str]) -> bool:
+    # Plain substring checks first: far cheaper than the regex scans on the
+    # large tool_call frames that can't be skipped anyway.
+    if not isinstance(raw, str) or not any(name in raw for name in skip_stream_events):
+        return False
+    return sniff_stream_event(raw) in skip_stream_events
+
 
 class GatewayUnavailableError(Exception):
     pass
@@ -30,6 +79,11 @@ class GatewaySessionError(Exception):
         self.request_id = request_id
 
 
+# (agent_id, conversation_id); conversation_id is None for the agent's default
+# conversation and for every session of a non-strict client
+_PoolKey = Tuple[str, Optional[str]]
+
+
 @dataclass
 class _PoolEntry:
     ws: ClientConnection
@@ -41,7 +95,7 @@ class _PoolEntry:
     in_use: bool = False  # True while send_message_streaming is iterating recv
 
 class GatewayClient:
-    """Async WebSocket client that pools connections per agent_id."""
+    """Async WebSocket client that pools connections per agent_id (and conversation, when strict)."""
 
     def __init__(
         self,
@@ -51,6 +105,7 @@ class GatewayClient:
         connect_timeout: float = 10.0,
         event_timeout: float = 300.0,  # 5 min per-event timeout (Opus thinking can be slow)
         api_key: Optional[str] = None,
+        strict_conversation: bool = False,
     ):
         self._gateway_url = gateway_url
         self._idle_timeout = idle_timeout
@@ -58,7 +113,10 @@ class GatewayClient:
         self._connect_timeout = connect_timeout
         self._api_key = api_key
         self._event_timeout = event_timeout
-        self._pool: Dict[str, _PoolEntry] = {}
+        # When True, sessions are pooled per (agent, conversation) so an agent in
+        # several rooms keeps one warm session for each of its conversations
+        self._strict_conversation = strict_conversation
+        self._pool: Dict[_PoolKey, _PoolEntry] = {}
         self._pool_lock = asyncio.Lock()
         self._pool_changed = asyncio.Condition(self._pool_lock)
         self._cleanup_task: Optional[asyncio.Task] = None
@@ -87,23 +145,33 @@ class GatewayClient:
         message: str,
         conversation_id: Optional[str] = None,
         source: Optional[Dict[str, str]] = None,
+        skip_stream_events: Collection[str] = (),
+        acquire_timeout: Optional[float] = None,
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Send a message through the gateway and yield raw WS events as dicts.
 
+        Stream frames whose sub-event is in *skip_stream_events* (e.g.
+        "reasoning" when the caller filters it) are dropped before decoding
+        when sniff_stream_event can identify them.
+
+        *acquire_timeout* bounds how long to wait for the agent's pooled
+        session while another turn holds it (defaults to connect_timeout).
+
         Automatically retries once on connection failure (dead WS, gateway restart).
 
         Raises GatewayUnavailableError if connection cannot be established after retry.
         Raises GatewaySessionError on protocol-level errors from the gateway.
         """
+        key = self._pool_key(agent_id, conversation_id)
         last_error: Optional[Exception] = None
         for attempt in range(2):  # attempt 0 = normal, attempt 1 = retry after reconnect
             if attempt > 0:
                 logger.info(f"[WS-GATEWAY] Retrying message for agent {agent_id} (attempt {attempt + 1})")
                 # Evict the dead connection so _get_or_create makes a fresh one
-                await self._evict(agent_id)
+                await self._evict(key)
 
-            entry = await self._get_or_create(agent_id, conversation_id)
+            entry = await self._get_or_create(agent_id, conversation_id, acquire_timeout=acquire_timeout)
             request_id = str(uuid.uuid4())
 
             try:
@@ -135,7 +203,7 @@ class GatewayClient:
                                 await entry.ws.send(json.dumps({"type": "abort"}))
                             except Exception:
                                 pass
-                            await self._evict(agent_id)
+                            await self._evict(key)
                             last_error = GatewayUnavailableError(
                                 f"Stream timed out after {self._event_timeout}s with no events"
                             )
@@ -144,9 +212,11 @@ class GatewayClient:
                             raise last_error
 
                         entry.last_used = time.monotonic()
+                        if skip_stream_events and _should_skip(raw, skip_stream_events):
+                            continue
                         try:
-                            event = json.loads(raw)
-                        except (json.JSONDecodeError, TypeError):
+                            event = decode_gateway_frame(raw)
+                        except (ValueError, TypeError):
                             logger.warning(f"[WS-GATEWAY] Non-JSON frame from gateway: {raw!r:.200}")
                             continue
 
@@ -180,7 +250,7 @@ class GatewayClient:
 
             except websockets.ConnectionClosed as exc:
                 logger.warning(f"[WS-GATEWAY] Connection closed for agent {agent_id}: {exc}")
-                await self._evict(agent_id)
+                await self._evict(key)
                 last_error = GatewayUnavailableError(f"WS connection closed: {exc}")
                 if attempt == 0:
                     continue  # Retry with fresh connection
@@ -190,13 +260,13 @@ class GatewayClient:
                 # Evict and retry once — fresh _connect_and_init will send session_start.
                 if attempt == 0 and "session_start" in str(exc).lower():
                     logger.warning(f"[WS-GATEWAY] Stale session for agent {agent_id}: {exc}, will reconnect")
-                    await self._evict(agent_id)
+                    await self._evict(key)
                     last_error = exc
                     continue
                 raise
             except Exception as exc:
                 logger.error(f"[WS-GATEWAY] Unexpected error for agent {agent_id}: {exc}", exc_info=True)
-                await self._evict(agent_id)
+                await self._evict(key)
                 last_error = GatewayUnavailableError(f"Gateway error: {exc}")
                 if attempt == 0:
                     continue  # Retry with fresh connection
@@ -240,7 +310,7 @@ class GatewayClient:
         result["events"] = events
         return result
 
-    async def abort(self, agent_id: str) -> bool:
+    async def abort(self, agent_id: str, conversation_id: Optional[str] = None) -> bool:
         """
         Send an abort frame to the gateway for the given agent,
         then evict the connection from the pool.
@@ -252,8 +322,9 @@ class GatewayClient:
 
         Returns True if the abort was sent, False if no active connection.
         """
+        key = self._pool_key(agent_id, conversation_id)
         async with self._pool_changed:
-            entry = self._pool.get(agent_id)
+            entry = self._pool.get(key)
             if not entry or not entry.healthy:
                 return False
             try:
@@ -262,16 +333,25 @@ class GatewayClient:
             except Exception as exc:
                 logger.warning(f"[WS-GATEWAY] Failed to send abort for {agent_id}: {exc}")
             # Always evict after abort — stale events may be buffered
-            self._pool.pop(agent_id, None)
+            self._pool.pop(key, None)
             await self._close_entry(entry)
             self._pool_changed.notify_all()
             return True
     # ── pool internals ────────────────────────────────────────────
 
+    def _pool_key(self, agent_id: str, conversation_id: Optional[str]) -> _PoolKey:
+        return (agent_id, (conversation_id or None) if self._strict_conversation else None)
+
     async def _get_or_create(
-        self, agent_id: str, conversation_id: Optional[str] = None
+        self,
+        agent_id: str,
+        conversation_id: Optional[str] = None,
+        acquire_timeout: Optional[float] = None,
     ) -> _PoolEntry:
-        wait_deadline = time.monotonic() + self._connect_timeout
+        if acquire_timeout is None:
+            acquire_timeout = self._connect_timeout
+        wait_deadline = time.monotonic() + acquire_timeout
+        key = self._pool_key(agent_id, conversation_id)
 
         while True:
             reserved_entry: Optional[_PoolEntry] = None
@@ -279,7 +359,7 @@ class GatewayClient:
             should_wait = False
 
             async with self._pool_changed:
-                entry = self._pool.get(agent_id)
+                entry = self._pool.get(key)
                 if entry and entry.healthy:
                     if entry.in_use:
                         if time.monotonic() >= wait_deadline:
@@ -322,7 +402,7 @@ class GatewayClient:
                     return reserved_entry
                 except Exception:
                     logger.info(f"[WS-GATEWAY] Stale connection for {agent_id}, reconnecting")
-                    await self._evict(agent_id)
+                    await self._evict(key)
                     continue
 
             if not should_connect:
@@ -331,7 +411,7 @@ class GatewayClient:
             new_entry = await self._connect_and_init(agent_id, conversation_id)
 
             async with self._pool_changed:
-                current = self._pool.get(agent_id)
+                current = self._pool.get(key)
                 if current and current.healthy:
                     if current.in_use:
                         # Race: another caller reserved entry while we were connecting
@@ -354,12 +434,12 @@ class GatewayClient:
                         current.in_use = True
                         return current
                 else:
-                    old = self._pool.get(agent_id)
+                    old = self._pool.get(key)
                     if old:
                         await self._close_entry(old)
                     new_entry.last_used = time.monotonic()
                     new_entry.in_use = True
-                    self._pool[agent_id] = new_entry
+                    self._pool[key] = new_entry
                     self._pool_changed.notify_all()
                     return new_entry
 
@@ -398,7 +478,7 @@ class GatewayClient:
 
         try:
             raw = await asyncio.wait_for(ws.recv(), timeout=self._connect_timeout)
-            init_event = json.loads(raw)
+            init_event = decode_gateway_frame(raw)
         except Exception as exc:
             await ws.close()
             raise GatewayUnavailableError(
@@ -430,9 +510,9 @@ class GatewayClient:
         )
         return entry
 
-    async def _evict(self, agent_id: str) -> None:
+    async def _evict(self, key: _PoolKey) -> None:
         async with self._pool_changed:
-            entry = self._pool.pop(agent_id, None)
+            entry = self._pool.pop(key, None)
             if entry:
                 await self._close_entry(entry)
             self._pool_changed.notify_all()
@@ -450,7 +530,7 @@ class GatewayClient:
             return False  # All connections are in use, can't evict any
         oldest_key = min(candidates, key=lambda k: candidates[k].last_used)
         entry = self._pool.pop(oldest_key)
-        logger.info(f"[WS-GATEWAY] Evicting idle connection for agent {oldest_key}")
+        logger.info(f"[WS-GATEWAY] Evicting idle connection for agent {entry.agent_id}")
         await self._close_entry(entry)
         return True
     async def _close_entry(self, entry: _PoolEntry) -> None:
@@ -473,16 +553,16 @@ class GatewayClient:
             to_ping = []
 
             async with self._pool_changed:
-                for agent_id, entry in list(self._pool.items()):
+                for key, entry in list(self._pool.items()):
                     if now - entry.last_used > self._idle_timeout:
-                        to_evict.append(agent_id)
+                        to_evict.append(key)
                     else:
-                        to_ping.append((agent_id, entry))
+                        to_ping.append((key, entry))
 
-                for agent_id in to_evict:
-                    entry = self._pool.pop(agent_id, None)
+                for key in to_evict:
+                    entry = self._pool.pop(key, None)
                     if entry:
-                        logger.info(f"[WS-GATEWAY] Closing idle session for agent {agent_id}")
+                        logger.info(f"[WS-GATEWAY] Closing idle session for agent {entry.agent_id}")
                         await self._close_entry(entry)
                 if to_evict:
                     self._pool_changed.notify_all()
@@ -491,7 +571,7 @@ class GatewayClient:
             # Skip entries with recent activity (within 120s) to avoid killing
             # connections that are actively streaming (e.g. during model escalation
             # where Opus thinking time can exceed 60s with no data frames).
-            for agent_id, entry in to_ping:
+            for key, entry in to_ping:
                 if entry.in_use:
                     continue  # Actively streaming — never health-check
                 if now - entry.last_used < 120:
@@ -499,8 +579,10 @@ class GatewayClient:
                 try:
                     await asyncio.wait_for(entry.ws.ping(), timeout=30.0)
                 except Exception:
-                    logger.warning(f"[WS-GATEWAY] Health ping failed for agent {agent_id}, evicting stale connection")
-                    await self._evict(agent_id)
+                    logger.warning(
+                        f"[WS-GATEWAY] Health ping failed for agent {entry.agent_id}, evicting stale connection"
+                    )
+                    await self._evict(key)
 
 _global_client: Optional[GatewayClient] = None
 _global_lock = asyncio.Lock()
@@ -9,6 +9,7 @@ Domain logic lives in focused modules:
   - fs_mode_handler: filesystem mode routing
   - message_router: _MessageCallbackRouter, message_callback
   - room_join: create_room_if_needed, join_room_if_needed
+  - sync_tuning: /sync filters, persisted since token, sync metrics
 """
 import asyncio
 import os
@@ -21,6 +22,7 @@ from nio import (
     RoomMessageText,
     RoomMessageMedia,
     RoomMessageAudio,
+    SyncResponse,
     UnknownEvent,
 )
 from nio.exceptions import RemoteProtocolError
@@ -30,6 +32,7 @@ from src.matrix.auth import MatrixAuthManager
 from src.matrix.file_handler import LettaFileHandler, FileUploadError
 from src.matrix.document_parser import DocumentParseConfig
 from src.core.agent_user_manager import run_agent_sync
+from src.core.conversation_activity import get_conversation_activity_tracker
 
 # ── Re-exports (backward compatibility) ─────────────────────────────
 from src.matrix.config import (  # noqa: F401
@@ -84,7 +87,11 @@ from src.matrix.file_callback import (  # noqa: F401
     poll_response_callback,
 )
 from src.matrix.fs_mode_handler import _maybe_handle_fs_mode  # noqa: F401
-from src.matrix.letta_code_service import handle_letta_code_command  # noqa: F401
+from src.matrix.letta_code_service import (  # noqa: F401
+    close_letta_code_session,
+    flush_letta_code_state,
+    handle_letta_code_command,
+)
 from src.matrix.message_router import (  # noqa: F401
     _MessageCallbackRouter,
     message_callback,
@@ -101,6 +108,13 @@ from src.matrix.room_join import (  # noqa: F401
     join_room_if_needed,
 )
 from src.matrix.message_processor import process_letta_message, MessageContext  # noqa: F401
+from src.matrix import sync_tuning
+from src.matrix.sync_tuning import (
+    SyncSettings,
+    SyncTokenStore,
+    instrument_sync_metrics,
+    run_initial_sync,
+)
 
 MATRIX_API_URL = os.getenv('MATRIX_API_URL', 'http://matrix-api:8000')
 
@@ -298,6 +312,7 @@ async def main():
         ocr_enabled=config.document_parsing_ocr_enabled,
         ocr_dpi=config.document_parsing_ocr_dpi,
         max_text_length=config.document_parsing_max_text_length,
+        cache_enabled=config.document_parsing_cache_enabled,
     )
 
     file_handler = LettaFileHandler(
@@ -347,39 +362,46 @@ async def main():
 
     logger.info('Starting sync loop to listen for messages, file uploads, and poll votes')
 
-    initial_sync_filter = {
-        'room': {
-            'timeline': {'limit': 0},
-            'state': {'lazy_load_members': True},
-        },
-        'presence': {'enabled': False},
-        'account_data': {'enabled': False},
-    }
-
-    sync_filter = {
-        'room': {
-            'timeline': {'limit': 50},
-            'state': {'lazy_load_members': True},
-        },
-        'presence': {'enabled': False},
-        'account_data': {'enabled': False},
-    }
+    sync_settings = SyncSettings.from_env()
+    token_store = None
+    if sync_settings.resume:
+        token_store = SyncTokenStore(
+            sync_settings.token_path,
+            client.user_id,
+            config.homeserver_url,
+            max_age_seconds=sync_settings.token_max_age_seconds,
+            save_interval_seconds=sync_settings.token_save_interval_seconds,
+        )
+        client.add_response_callback(token_store.on_sync_response, SyncResponse)
+    instrument_sync_metrics(client)
 
     try:
         auth_manager_global = auth_manager
 
         logger.info('Performing initial sync to skip historical messages')
-        await client.sync(timeout=30000, full_state=False, sync_filter=initial_sync_filter)
-        logger.info('Initial sync complete, now listening for new messages')
+        await run_initial_sync(client, sync_settings, token_store, logger)
+        if token_store:
+            token_store.save(client.next_batch, force=True)
+        logger.info(
+            'Initial sync complete, now listening for new messages',
+            extra={'sync': sync_tuning.snapshot()},
+        )
 
         await _set_all_agents_online(logger)
 
-        await client.sync_forever(timeout=5000, full_state=False, sync_filter=sync_filter)
+        await client.sync_forever(
+            timeout=sync_settings.timeout_ms, full_state=False, sync_filter=sync_settings.build_filter()
+        )
     except (MatrixClientError, RemoteProtocolError, asyncio.TimeoutError, aiohttp.ClientError) as e:
         logger.error('Error during sync', extra={'error': str(e)}, exc_info=True)
     finally:
+        if token_store:
+            token_store.save(client.next_batch, force=True)
         await _set_all_agents_offline(logger)
         await cancel_all_letta_tasks()
+        await get_conversation_activity_tracker().stop()
+        flush_letta_code_state()
+        await close_letta_code_session()
         logger.info('Closing client session')
         await client.close()
 
@@ -100,6 +100,7 @@ class Config:
     document_parsing_ocr_enabled: bool = True
     document_parsing_ocr_dpi: int = 200
     document_parsing_max_text_length: int = 50000
+    document_parsing_cache_enabled: bool = True
     # Temporal durable message delivery (opt-in)
     temporal_message_delivery: bool = False
     # Group gating configuration (per-room response modes)
@@ -149,6 +150,7 @@ class Config:
                 document_parsing_ocr_enabled=os.getenv("DOCUMENT_PARSING_OCR_ENABLED", "true").lower() == "true",
                 document_parsing_ocr_dpi=int(os.getenv("DOCUMENT_PARSING_OCR_DPI", "200")),
                 document_parsing_max_text_length=int(os.getenv("DOCUMENT_PARSING_MAX_TEXT_LENGTH", "50000")),
+                document_parsing_cache_enabled=os.getenv("DOCUMENT_PARSING_CACHE_ENABLED", "true").lower() == "true",
                 temporal_message_delivery=os.getenv("TEMPORAL_MESSAGE_DELIVERY", "false").lower() in ("true", "1", "yes"),
             )
             # Load group gating configuration
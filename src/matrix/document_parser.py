@@ -7,17 +7,25 @@ Follows the same pattern as src/voice/transcription.py:
 
 Supported formats: PDF, DOCX, PPTX, XLSX, CSV, HTML, EPUB, images, and more.
 OCR fallback for scanned PDFs via PyMuPDF → Tesseract.
+
+For large documents, iter_document_sections() streams the same extraction
+page-by-page (PDFs) or section-by-section (everything else) so downstream
+ingest can start before the whole file has been parsed or OCR'd.
 """
 
 import io
 import logging
 import os
 import tempfile
+from collections import deque
 from codecs import BOM_UTF16_BE, BOM_UTF16_LE, BOM_UTF32_BE, BOM_UTF32_LE, BOM_UTF8
-from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass, field
-from typing import Optional, Any
+from typing import Any, AsyncIterator, Optional
+
+from src.matrix import parse_cache
+from src.matrix.parse_worker_pool import ParseWorkerPool
 
 # Lazy import: retry_async is imported at call site to avoid pulling in
 # the heavy src.core.__init__ dependency chain (sqlalchemy, aiohttp, nio)
@@ -30,6 +38,11 @@ class DocumentParseRetryError(Exception):
     pass
 
 
+class DocumentParseError(Exception):
+    """Raised by iter_document_sections() when a document cannot be streamed."""
+    pass
+
+
 @dataclass
 class DocumentParseResult:
     """Result of document parsing, mirroring TranscriptionResult."""
@@ -40,6 +53,16 @@ class DocumentParseResult:
     error: Optional[str] = None
 
 
+@dataclass
+class DocumentSection:
+    """One incrementally-emitted slice of a document (a PDF page or a text section)."""
+    index: int
+    text: str
+    page_number: Optional[int] = None
+    page_count: Optional[int] = None
+    was_ocr: bool = False
+
+
 @dataclass
 class DocumentParseConfig:
     """Configuration for document parsing."""
@@ -49,6 +72,11 @@ class DocumentParseConfig:
     ocr_enabled: bool = True
     ocr_dpi: int = 200
     max_text_length: int = 50000
+    ocr_max_pages: int = 50
+    stream_section_chars: int = 20000
+    stream_ocr_concurrency: int = 4
+    # Opt-in when constructed directly; from_env() enables it by default
+    cache_enabled: bool = False
 
     @classmethod
     def from_env(cls) -> "DocumentParseConfig":
@@ -59,9 +87,57 @@ class DocumentParseConfig:
             ocr_enabled=os.getenv("DOCUMENT_PARSING_OCR_ENABLED", "true").lower() == "true",
             ocr_dpi=int(os.getenv("DOCUMENT_PARSING_OCR_DPI", "200")),
             max_text_length=int(os.getenv("DOCUMENT_PARSING_MAX_TEXT_LENGTH", "50000")),
+            ocr_max_pages=int(os.getenv("DOCUMENT_PARSING_OCR_MAX_PAGES", "50")),
+            stream_section_chars=int(os.getenv("DOCUMENT_PARSING_STREAM_SECTION_CHARS", "20000")),
+            stream_ocr_concurrency=int(os.getenv("DOCUMENT_PARSING_STREAM_OCR_CONCURRENCY", "4")),
+            cache_enabled=os.getenv("DOCUMENT_PARSING_CACHE_ENABLED", "true").lower() == "true",
         )
 
 
+# Bump when extraction logic changes so stale cached text is never served
+PARSER_VERSION = "1"
+_markitdown_version: Optional[str] = None
+
+
+def _cache_parser_version(config: DocumentParseConfig, stream: bool = False) -> str:
+    """Cache namespace: parser logic + MarkItDown release + output-affecting OCR settings.
+
+    The streaming path extracts per-page text (no MarkItDown, per-page OCR), so it
+    gets its own namespace rather than sharing entries with parse_document().
+    """
+    global _markitdown_version
+    if _markitdown_version is None:
+        try:
+            from importlib.metadata import PackageNotFoundError, version
+
+            _markitdown_version = version("markitdown")
+        except (ImportError, PackageNotFoundError, ValueError):
+            _markitdown_version = "unknown"
+    return (
+        f"v{PARSER_VERSION}/markitdown-{_markitdown_version}"
+        f"/ocr={int(config.ocr_enabled)}@{config.ocr_dpi}x{config.ocr_max_pages}"
+        + ("/mode=stream" if stream else "")
+    )
+
+
+async def _lookup_parse_cache(
+    file_path: str, config: DocumentParseConfig, content_hash: Optional[str], stream: bool = False
+) -> tuple[Optional[str], Optional["parse_cache.CachedParse"]]:
+    """Return (content_hash, cached) for a file, hashing it if the caller didn't."""
+    import asyncio
+
+    if not content_hash:
+        try:
+            content_hash = await asyncio.to_thread(parse_cache.hash_file, file_path)
+        except OSError as e:
+            logger.debug(f"Could not hash {file_path} for parse cache: {e}")
+            return None, None
+    cached = await asyncio.to_thread(
+        parse_cache.get_cached_parse, content_hash, _cache_parser_version(config, stream)
+    )
+    return content_hash, cached
+
+
 # MIME types that MarkItDown can handle (beyond what file_handler already routes)
 PARSEABLE_MIME_TYPES = {
     # Documents
@@ -122,23 +198,42 @@ def is_parseable_document(mime_type: str, filename: str) -> bool:
     return True
 
 
-# Dedicated process pool for CPU-bound parsing (avoids GIL contention)
-# Use 4 workers for parallel document processing (can handle 4 concurrent files)
-_process_pool = ProcessPoolExecutor(max_workers=4)
+# Dedicated process pool for CPU-bound parsing (avoids GIL contention).
+# Worker processes are only spawned on first use; see parse_worker_pool for
+# sizing, priority scheduling, per-job limits and worker recycling.
+# Setting DOCUMENT_PARSING_POOL_ENABLED=false runs jobs on the event loop's
+# default thread executor instead.
+_process_pool: Optional[ParseWorkerPool] = (
+    ParseWorkerPool.from_env()
+    if os.getenv("DOCUMENT_PARSING_POOL_ENABLED", "true").lower() == "true"
+    else None
+)
 
 
-def _get_process_pool(recreate: bool = False) -> ProcessPoolExecutor:
-    """Return a healthy process pool, recreating when requested."""
-    global _process_pool
-    is_broken = bool(getattr(_process_pool, "_broken", False))
-    if recreate or is_broken:
-        try:
-            _process_pool.shutdown(wait=False, cancel_futures=True)
-        except (RuntimeError, OSError) as pool_shutdown_error:
-            logger.debug("Process pool shutdown during recreate failed: %s", pool_shutdown_error)
-        _process_pool = ProcessPoolExecutor(max_workers=4)
+def _get_process_pool(recreate: bool = False) -> Optional[ParseWorkerPool]:
+    """Return the parse worker pool, restarting its workers if ``recreate`` and they are broken."""
+    if recreate and _process_pool is not None:
+        _process_pool.restart_if_broken()
     return _process_pool
 
+
+def get_parse_pool_metrics() -> dict:
+    """Queue depth / latency metrics for the parse worker pool."""
+    if _process_pool is None:
+        return {"started": False, "max_workers": 0}
+    return _process_pool.snapshot()
+
+
+async def _run_parse_job(fn, *args, priority: int = 0, timeout: Optional[float] = None):
+    """Run a CPU-bound parse job on the worker pool (smaller ``priority`` runs first)."""
+    import asyncio
+
+    pool = _get_process_pool()
+    if pool is None:
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(None, fn, *args), timeout=timeout)
+    return await pool.run(fn, *args, priority=priority, timeout=timeout)
+
 # Cached MarkItDown instance per worker process (avoids re-init per file).
 # MarkItDown() constructor initializes magika + requests.Session — reuse is safe.
 _md_instance: Optional[Any] = None
@@ -250,6 +345,73 @@ def _decode_text_file_with_fallbacks(file_path: str) -> tuple[str, Optional[str]
     return raw.decode("utf-8", errors="replace"), "; ".join(errors) if errors else None
 
 
+def _ocr_pdf_page(file_path: str, page_num: int, dpi: int = 200) -> str:
+    """
+    OCR a single PDF page (runs in process pool).
+
+    Used by iter_document_sections() so pages of one document are OCR'd in
+    parallel across pool workers instead of serially in a single task.
+    Returns extracted text or empty string.
+    """
+    try:
+        import fitz
+        from PIL import Image
+        pytesseract = __import__("pytesseract")
+    except ImportError as e:
+        logger.warning(f"OCR dependencies not available: {e}")
+        return ""
+
+    try:
+        doc = fitz.open(file_path)
+        try:
+            zoom = dpi / 72.0
+            pix = doc.load_page(page_num).get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+            img = Image.open(io.BytesIO(pix.tobytes("png")))
+            return (pytesseract.image_to_string(img) or "").strip()
+        finally:
+            doc.close()
+    except (RuntimeError, ValueError, TypeError, OSError, IndexError) as e:
+        logger.error(f"OCR failed for page {page_num + 1} of {file_path}: {e}")
+        return ""
+
+
+def _extract_pdf_page_texts(file_path: str, start: int, stop: int) -> tuple[list[str], int]:
+    """Extract text for pages [start, stop) with PyMuPDF. Returns (texts, page_count)."""
+    import fitz
+
+    doc = fitz.open(file_path)
+    try:
+        page_count = len(doc)
+        return [
+            doc.load_page(page_num).get_text() or ""
+            for page_num in range(start, min(stop, page_count))
+        ], page_count
+    finally:
+        doc.close()
+
+
+def _split_text_sections(text: str, section_chars: int) -> list[str]:
+    """Split text on paragraph boundaries into sections of at most ~section_chars."""
+    sections: list[str] = []
+    current: list[str] = []
+    current_len = 0
+    for paragraph in text.split("\n\n"):
+        para = paragraph.strip()
+        if not para:
+            continue
+        extra_len = len(para) + (2 if current else 0)
+        if current and current_len + extra_len > section_chars:
+            sections.append("\n\n".join(current))
+            current = [para]
+            current_len = len(para)
+        else:
+            current.append(para)
+            current_len += extra_len
+    if current:
+        sections.append("\n\n".join(current))
+    return sections
+
+
 def _ocr_pdf_pages(file_path: str, dpi: int = 200) -> str:
     """
     OCR fallback: render PDF pages to images, then OCR with Tesseract.
@@ -335,6 +497,7 @@ async def parse_document(
     file_path: str,
     filename: str = "document",
     config: Optional[DocumentParseConfig] = None,
+    content_hash: Optional[str] = None,
 ) -> DocumentParseResult:
     """
     Parse a document file and extract text content.
@@ -345,6 +508,8 @@ async def parse_document(
         file_path: Path to the downloaded file on disk.
         filename: Original filename (for display and extension detection).
         config: Optional parsing configuration.
+        content_hash: SHA-256 of the file if already known (skips re-hashing
+            for the parse cache lookup).
 
     Returns:
         DocumentParseResult with extracted text or error.
@@ -375,6 +540,20 @@ async def parse_document(
             error=f"Cannot read file: {e}",
         )
 
+    if config.cache_enabled:
+        content_hash, cached = await _lookup_parse_cache(file_path, config, content_hash)
+        if cached is not None:
+            logger.info(
+                f"Parse cache hit for {filename} (hash={content_hash[:12]}..., "
+                f"{len(cached.text)} chars) — skipping extraction"
+            )
+            return DocumentParseResult(
+                text=cached.text,
+                filename=filename,
+                page_count=cached.page_count,
+                was_ocr=cached.was_ocr,
+            )
+
     is_pdf = file_path.lower().endswith(".pdf")
 
     text = ""
@@ -397,7 +576,6 @@ async def parse_document(
                 )
 
     # Run MarkItDown conversion in a process pool with timeout + retry
-    loop = asyncio.get_event_loop()
     max_attempts = 3
     last_error = None
 
@@ -405,8 +583,10 @@ async def parse_document(
     if should_run_markitdown:
         async def _run_markitdown_once() -> tuple[str, Optional[int]]:
             try:
-                parsed_text, parsed_page_count, conv_error = await asyncio.wait_for(
-                    loop.run_in_executor(_get_process_pool(), _convert_with_markitdown, file_path),
+                parsed_text, parsed_page_count, conv_error = await _run_parse_job(
+                    _convert_with_markitdown,
+                    file_path,
+                    priority=file_size,
                     timeout=config.timeout_seconds,
                 )
                 if conv_error:
@@ -433,7 +613,7 @@ async def parse_document(
             except BrokenProcessPool as e:
                 _get_process_pool(recreate=True)
                 raise DocumentParseRetryError(f"Conversion failed: {e}") from e
-            except (RuntimeError, ValueError, TypeError, OSError, AssertionError) as e:
+            except (RuntimeError, ValueError, TypeError, OSError, AssertionError, MemoryError) as e:
                 if "not usable anymore" in str(e).lower():
                     _get_process_pool(recreate=True)
                 raise DocumentParseRetryError(f"Conversion failed: {e}") from e
@@ -459,15 +639,15 @@ async def parse_document(
 
     # OCR fallback for PDFs with no/useful text
     was_ocr = False
-    if (
-        config.ocr_enabled
-        and is_pdf
-        and _is_text_low_quality(text, page_count)
-    ):
+    ocr_needed = config.ocr_enabled and is_pdf and _is_text_low_quality(text, page_count)
+    if ocr_needed:
         logger.info(f"MarkItDown returned low-quality text for {filename} ({len(text)} chars), attempting OCR fallback")
         try:
-            ocr_text = await asyncio.wait_for(
-                loop.run_in_executor(_get_process_pool(), _ocr_pdf_pages, file_path, config.ocr_dpi),
+            ocr_text = await _run_parse_job(
+                _ocr_pdf_pages,
+                file_path,
+                config.ocr_dpi,
+                priority=file_size,
                 timeout=config.timeout_seconds,
             )
             if ocr_text.strip():
@@ -478,7 +658,7 @@ async def parse_document(
                 logger.warning(f"OCR fallback returned no text for {filename}")
         except asyncio.TimeoutError:
             logger.warning(f"OCR fallback timed out for {filename}")
-        except (RuntimeError, ValueError, TypeError, OSError, AssertionError) as e:
+        except (RuntimeError, ValueError, TypeError, OSError, AssertionError, MemoryError, BrokenProcessPool) as e:
             logger.warning(f"OCR fallback failed for {filename}: {e}")
 
     if not text:
@@ -501,9 +681,204 @@ async def parse_document(
         f"Document parsed successfully: {filename} "
         f"({len(result.text)} chars, pages={page_count}, ocr={was_ocr})"
     )
+
+    # Degraded text from a failed/empty OCR fallback is not cached, so the
+    # next upload of the same file gets another OCR attempt
+    if config.cache_enabled and content_hash and (was_ocr or not ocr_needed):
+        await asyncio.to_thread(
+            parse_cache.store_parse,
+            content_hash,
+            _cache_parser_version(config),
+            result.text,
+            page_count,
+            was_ocr,
+        )
     return result
 
 
+async def iter_document_sections(
+    file_path: str,
+    filename: str = "document",
+    config: Optional[DocumentParseConfig] = None,
+) -> AsyncIterator[DocumentSection]:
+    """
+    Stream a document as it is parsed, yielding DocumentSection objects in order.
+
+    PDFs are read page-by-page with PyMuPDF; pages whose text layer is empty
+    or garbled are OCR'd individually on the process pool, with at most
+    ``stream_ocr_concurrency`` pages in flight. Memory stays bounded by that
+    window regardless of page count, and page 1 is emitted while later pages
+    are still being rendered.
+
+    Other formats go through MarkItDown (which only converts whole files) and
+    are then emitted in paragraph-aligned sections of ``stream_section_chars``.
+    Content already in the parse cache is replayed the same way.
+
+    Raises:
+        DocumentParseError: if parsing is disabled, the file is unreadable or
+            too large, or no text could be extracted at all.
+    """
+    import asyncio
+
+    if config is None:
+        config = DocumentParseConfig.from_env()
+
+    if not config.enabled:
+        raise DocumentParseError("Document parsing is disabled")
+
+    try:
+        file_size = os.path.getsize(file_path)
+    except OSError as e:
+        raise DocumentParseError(f"Cannot read file: {e}") from e
+    if file_size > config.max_file_size_mb * 1024 * 1024:
+        raise DocumentParseError(
+            f"File too large ({file_size / 1024 / 1024:.1f}MB > {config.max_file_size_mb}MB limit)"
+        )
+
+    emitted = 0
+
+    is_pdf = file_path.lower().endswith(".pdf")
+    cached = None
+    content_hash = None
+    if config.cache_enabled and is_pdf:
+        # Non-PDFs consult the cache inside parse_document()
+        content_hash, cached = await _lookup_parse_cache(file_path, config, None, stream=True)
+
+    if cached is not None:
+        logger.info(f"Parse cache hit for {filename} — streaming cached text")
+        for section_text in _split_text_sections(cached.text, max(1, config.stream_section_chars)):
+            yield DocumentSection(
+                index=emitted,
+                text=section_text,
+                page_count=cached.page_count,
+                was_ocr=cached.was_ocr,
+            )
+            emitted += 1
+    elif is_pdf:
+        loop = asyncio.get_event_loop()
+        window = max(1, config.stream_ocr_concurrency)
+        pending: deque = deque()
+        page_count: Optional[int] = None
+        # Kept for the parse cache; a page whose OCR failed makes the text not worth caching
+        page_texts: list[str] = []
+        any_ocr = False
+        ocr_failed = False
+
+        async def _resolve(page_num: int, page_text: str, ocr_future) -> Optional[DocumentSection]:
+            nonlocal any_ocr, ocr_failed
+            was_ocr = False
+            if ocr_future is not None:
+                try:
+                    ocr_text = await ocr_future
+                except asyncio.TimeoutError:
+                    logger.warning(f"OCR timed out for page {page_num + 1} of {filename}")
+                    ocr_text = ""
+                except (BrokenProcessPool, RuntimeError, ValueError, TypeError, OSError, MemoryError) as e:
+                    logger.warning(f"OCR failed for page {page_num + 1} of {filename}: {e}")
+                    ocr_text = ""
+                if ocr_text.strip():
+                    page_text = ocr_text
+                    was_ocr = any_ocr = True
+                else:
+                    ocr_failed = True
+            page_text = page_text.strip()
+            if not page_text:
+                return None
+            if content_hash:
+                page_texts.append(page_text)
+            return DocumentSection(
+                index=0,
+                text=page_text,
+                page_number=page_num + 1,
+                page_count=page_count,
+                was_ocr=was_ocr,
+            )
+
+        page_num = 0
+        try:
+            while page_count is None or page_num < page_count:
+                try:
+                    batch, page_count = await loop.run_in_executor(
+                        None, _extract_pdf_page_texts, file_path, page_num, page_num + window
+                    )
+                except (ImportError, RuntimeError, ValueError, TypeError, OSError) as e:
+                    raise DocumentParseError(f"PDF extraction failed: {type(e).__name__}: {e}") from e
+
+                # Per-page OCR jobs are scheduled by their share of the file size
+                page_priority = file_size // max(page_count or 1, 1)
+                for page_text in batch:
+                    ocr_future = None
+                    if (
+                        config.ocr_enabled
+                        and page_num < config.ocr_max_pages
+                        and _is_text_low_quality(page_text)
+                    ):
+                        ocr_future = asyncio.ensure_future(
+                            _run_parse_job(
+                                _ocr_pdf_page,
+                                file_path,
+                                page_num,
+                                config.ocr_dpi,
+                                priority=page_priority,
+                                timeout=config.timeout_seconds,
+                            )
+                        )
+                    pending.append((page_num, page_text, ocr_future))
+                    page_num += 1
+
+                    # Emit completed head-of-line pages; block only when the window is full
+                    while pending and (
+                        len(pending) >= window
+                        or pending[0][2] is None
+                        or pending[0][2].done()
+                    ):
+                        section = await _resolve(*pending.popleft())
+                        if section is not None:
+                            section.index = emitted
+                            emitted += 1
+                            yield section
+
+                if not batch:
+                    break
+
+            while pending:
+                section = await _resolve(*pending.popleft())
+                if section is not None:
+                    section.index = emitted
+                    emitted += 1
+                    yield section
+
+            if content_hash and page_texts and not ocr_failed:
+                await asyncio.to_thread(
+                    parse_cache.store_parse,
+                    content_hash,
+                    _cache_parser_version(config, stream=True),
+                    "\n\n".join(page_texts),
+                    page_count,
+                    any_ocr,
+                )
+        finally:
+            # Consumer stopped early (or we raised): don't leave OCR jobs running
+            for _, _, ocr_future in pending:
+                if ocr_future is not None and not ocr_future.done():
+                    ocr_future.cancel()
+    else:
+        result = await parse_document(file_path, filename=filename, config=config)
+        if result.error:
+            raise DocumentParseError(result.error)
+        for section_text in _split_text_sections(result.text, max(1, config.stream_section_chars)):
+            yield DocumentSection(
+                index=emitted,
+                text=section_text,
+                page_count=result.page_count,
+                was_ocr=result.was_ocr,
+            )
+            emitted += 1
+
+    if emitted == 0:
+        raise DocumentParseError("No text could be extracted from the document")
+
+
 def format_document_for_agent(result: DocumentParseResult, caption: Optional[str] = None) -> str:
     """
     Format parsed document text for injection into a Letta agent message.
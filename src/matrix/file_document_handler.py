@@ -34,6 +34,7 @@ class FileDocumentHandlerMixin:
                 file_path=file_path,
                 filename=metadata.file_name,
                 config=self.document_parsing_config,
+                content_hash=self._downloaded_content_hash(file_path),
             )
 
             if result.error:
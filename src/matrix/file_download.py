@@ -1,7 +1,9 @@
+import hashlib
 import logging
 import os
 import tempfile
 import asyncio
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Optional
 
@@ -92,6 +94,10 @@ SUPPORTED_EXTENSIONS = {
 # File size limit (50MB)
 MAX_FILE_SIZE = 50 * 1024 * 1024
 
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# Hashes of downloaded temp files still in use; bounded in case a caller never discards one
+_MAX_TRACKED_HASHES = 256
+
 
 @dataclass
 class FileMetadata:
@@ -126,6 +132,7 @@ class FileDownloadService:
         self.logger = logger
         self._session: Optional[aiohttp.ClientSession] = None
         self._session_lock = asyncio.Lock()
+        self._content_hashes: "OrderedDict[str, str]" = OrderedDict()
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is not None and not self._session.closed:
@@ -143,6 +150,18 @@ class FileDownloadService:
             self._session = aiohttp.ClientSession(connector=connector)
             return self._session
 
+    def _remember_content_hash(self, path: str, digest: str) -> None:
+        self._content_hashes[path] = digest
+        while len(self._content_hashes) > _MAX_TRACKED_HASHES:
+            self._content_hashes.popitem(last=False)
+
+    def content_hash(self, path: str) -> Optional[str]:
+        """SHA-256 computed while downloading ``path`` (None if unknown)."""
+        return self._content_hashes.get(path)
+
+    def discard_content_hash(self, path: str) -> None:
+        self._content_hashes.pop(path, None)
+
     def extract_file_metadata(self, event: Event, room_id: str) -> Optional[FileMetadata]:
         """Extract file metadata from Matrix event"""
         try:
@@ -345,12 +364,28 @@ class FileDownloadService:
                     error_text = await response.text()
                     raise FileUploadError(f"Failed to download file: {response.status} - {error_text}")
 
-                # Write to temporary file
+                # Reject before reading the body when the server announces an oversized file
+                if response.content_length is not None and response.content_length > MAX_FILE_SIZE:
+                    raise FileUploadError(
+                        f"File '{metadata.file_name}' is {response.content_length} bytes, "
+                        f"exceeds the {MAX_FILE_SIZE} byte limit"
+                    )
+
+                # Write to temporary file, hashing in the same pass
+                hasher = hashlib.sha256()
+                received = 0
                 with open(temp_path, "wb") as f:
-                    async for chunk in response.content.iter_chunked(8192):
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        received += len(chunk)
+                        if received > MAX_FILE_SIZE:
+                            raise FileUploadError(
+                                f"File '{metadata.file_name}' exceeded the {MAX_FILE_SIZE} byte limit while downloading"
+                            )
+                        hasher.update(chunk)
                         f.write(chunk)
 
-            self.logger.info(f"Downloaded file to {temp_path} ({os.path.getsize(temp_path)} bytes)")
+            self._remember_content_hash(temp_path, hasher.hexdigest())
+            self.logger.info(f"Downloaded file to {temp_path} ({received} bytes)")
             return temp_path
 
         except (
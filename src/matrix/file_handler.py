@@ -252,6 +252,7 @@ class LettaFileHandler(
         try:
             yield file_path
         finally:
+            self._download_service.discard_content_hash(file_path)
             if file_path and os.path.exists(file_path):
                 try:
                     os.remove(file_path)
@@ -270,6 +271,9 @@ class LettaFileHandler(
     async def _download_matrix_file(self, metadata: FileMetadata) -> str:
         return await self._download_service.download_file(metadata)
 
+    def _downloaded_content_hash(self, file_path: str) -> Optional[str]:
+        return self._download_service.content_hash(file_path)
+
     def _get_embedding_config(self, agent_id: Optional[str] = None) -> dict:
         return self._source_manager.get_embedding_config(agent_id)
 
@@ -3,9 +3,14 @@ Image upload handling — base64 encoding for multimodal Letta messages.
 """
 
 import asyncio
+import base64
+import hashlib
 import io
 import logging
-from typing import Optional, Tuple
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 
 from PIL import Image
 
@@ -23,17 +28,74 @@ MAX_RAW_BYTES = 650 * 1024
 # anyway, so resizing here just saves bytes with no fidelity loss.
 MAX_DIMENSION = 1568
 JPEG_QUALITIES = (85, 75, 65, 55)
+MIN_JPEG_QUALITY = JPEG_QUALITIES[-1]
+# Aim a little under the budget when predicting from the proxy so the final
+# full-size encode rarely needs a second pass.
+_PREDICTION_HEADROOM = 0.92
+# Base64 payloads of recently encoded images, keyed by content hash
+ENCODE_CACHE_MAX_BYTES = int(os.getenv("MATRIX_IMAGE_ENCODE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_encode_cache: "OrderedDict[str, Tuple[str, str, int]]" = OrderedDict()
+_encode_cache_bytes = 0
+_lock = threading.Lock()
+_cache_hits = 0
+_cache_misses = 0
+_full_encodes = 0
+
+
+def _encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def _encode_full(img: Image.Image, quality: int) -> bytes:
+    global _full_encodes
+    with _lock:
+        _full_encodes += 1
+    return _encode_jpeg(img, quality)
+
+
+def _predict_quality(img: Image.Image, full_size_at_max: int) -> int:
+    """Bisect JPEG quality on a half-size proxy, scaled by the measured full/proxy ratio."""
+    proxy = img.reduce(2) if min(img.size) >= 64 else img
+    scale = full_size_at_max / max(1, len(_encode_jpeg(proxy, JPEG_QUALITIES[0])))
+    target = MAX_RAW_BYTES * _PREDICTION_HEADROOM
+
+    low, high = MIN_JPEG_QUALITY, JPEG_QUALITIES[0] - 1
+    best = MIN_JPEG_QUALITY
+    while low <= high:
+        quality = (low + high) // 2
+        if len(_encode_jpeg(proxy, quality)) * scale <= target:
+            best = quality
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best
+
+
+def _open_for_budget(file_path: str) -> Image.Image:
+    """Open and decode ``file_path``, letting JPEGs decode at a reduced DCT scale."""
+    with Image.open(file_path) as img:
+        if img.format == "JPEG" and max(img.size) > MAX_DIMENSION:
+            ratio = MAX_DIMENSION / max(img.size)
+            # draft picks the largest 1/2, 1/4, 1/8 DCT scale that stays >= the requested size
+            img.draft(img.mode, (int(img.size[0] * ratio), int(img.size[1] * ratio)))
+        img.load()
+    return img
 
 
 def _compress_to_budget(file_path: str) -> Tuple[bytes, str]:
     """Resize + re-encode the image so raw bytes ≤ MAX_RAW_BYTES.
 
     Returns (compressed_bytes, media_type). Prefers PNG when the source has
-    transparency and fits; otherwise flattens to JPEG and steps quality down.
-    Falls back to a halved, low-quality JPEG if nothing else fits.
+    transparency and fits; otherwise flattens to JPEG. One trial encode at
+    the top quality decides whether the image already fits; if not, the
+    quality is predicted on a downscaled proxy instead of re-encoding the
+    full image at every step. Falls back to a halved, low-quality JPEG if
+    nothing else fits.
     """
-    with Image.open(file_path) as img:
-        img.load()
+    img = _open_for_budget(file_path)
 
     original_size = img.size
     has_alpha = img.mode in ("RGBA", "LA") or (
@@ -59,16 +121,79 @@ def _compress_to_budget(file_path: str) -> Tuple[bytes, str]:
     elif img.mode != "RGB":
         img = img.convert("RGB")
 
-    for quality in JPEG_QUALITIES:
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=quality, optimize=True)
-        if buf.tell() <= MAX_RAW_BYTES:
-            return buf.getvalue(), "image/jpeg"
+    data = _encode_full(img, JPEG_QUALITIES[0])
+    if len(data) <= MAX_RAW_BYTES:
+        return data, "image/jpeg"
+
+    quality = _predict_quality(img, len(data))
+    while True:
+        data = _encode_full(img, quality)
+        if len(data) <= MAX_RAW_BYTES:
+            return data, "image/jpeg"
+        if quality <= MIN_JPEG_QUALITY:
+            break
+        quality = max(MIN_JPEG_QUALITY, quality - 10)
 
     halved = img.resize((img.size[0] // 2, img.size[1] // 2), Image.Resampling.LANCZOS)
-    buf = io.BytesIO()
-    halved.save(buf, format="JPEG", quality=55, optimize=True)
-    return buf.getvalue(), "image/jpeg"
+    return _encode_jpeg(halved, MIN_JPEG_QUALITY), "image/jpeg"
+
+
+def _file_digest(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_image_for_budget(file_path: str) -> Tuple[str, str, int]:
+    """Base64 payload for ``file_path``: (data, media_type, raw_byte_count).
+
+    Results are cached by content hash, so re-shared or forwarded images
+    skip decoding and encoding entirely.
+    """
+    global _encode_cache_bytes, _cache_hits, _cache_misses
+    key = f"{_file_digest(file_path)}:{MAX_RAW_BYTES}:{MAX_DIMENSION}"
+    with _lock:
+        cached = _encode_cache.get(key)
+        if cached is not None:
+            _encode_cache.move_to_end(key)
+            _cache_hits += 1
+            return cached
+        _cache_misses += 1
+
+    compressed_bytes, media_type = _compress_to_budget(file_path)
+    entry = (base64.standard_b64encode(compressed_bytes).decode("utf-8"), media_type, len(compressed_bytes))
+
+    with _lock:
+        if key not in _encode_cache and len(entry[0]) <= ENCODE_CACHE_MAX_BYTES:
+            _encode_cache[key] = entry
+            _encode_cache_bytes += len(entry[0])
+            while _encode_cache_bytes > ENCODE_CACHE_MAX_BYTES:
+                _, (evicted, _, _) = _encode_cache.popitem(last=False)
+                _encode_cache_bytes -= len(evicted)
+    return entry
+
+
+def snapshot() -> Dict[str, int]:
+    with _lock:
+        return {
+            "image_encode_cache_hits_total": _cache_hits,
+            "image_encode_cache_misses_total": _cache_misses,
+            "image_encode_full_encodes_total": _full_encodes,
+            "image_encode_cache_entries": len(_encode_cache),
+            "image_encode_cache_bytes": _encode_cache_bytes,
+        }
+
+
+def reset() -> None:
+    global _encode_cache_bytes, _cache_hits, _cache_misses, _full_encodes
+    with _lock:
+        _encode_cache.clear()
+        _encode_cache_bytes = 0
+        _cache_hits = 0
+        _cache_misses = 0
+        _full_encodes = 0
 
 
 class FileImageHandlerMixin:
@@ -76,19 +201,16 @@ class FileImageHandlerMixin:
 
     async def _handle_image_upload(self, metadata: FileMetadata, room_id: str, agent_id: Optional[str] = None) -> Optional[list]:
         """Handle image upload by sending as multimodal message to agent."""
-        import base64
-
         await self._notify(room_id, f"🖼️ Processing image: {metadata.file_name}")
 
         async with self._downloaded_file(metadata) as file_path:
-            compressed_bytes, media_type = await asyncio.to_thread(
-                _compress_to_budget, file_path
+            image_data, media_type, raw_len = await asyncio.to_thread(
+                encode_image_for_budget, file_path
             )
-            image_data = base64.standard_b64encode(compressed_bytes).decode("utf-8")
 
             logger.info(
                 f"Encoded image {metadata.file_name} as {media_type} base64 "
-                f"({len(compressed_bytes)} raw → {len(image_data)} chars)"
+                f"({raw_len} raw → {len(image_data)} chars)"
             )
 
             if metadata.caption:
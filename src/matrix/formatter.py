@@ -82,6 +82,46 @@ def format_message_envelope(
     return _compose_envelope(sections, text)
 
 
+def format_listen_digest_envelope(chat_id, group_name, messages) -> str:
+    """Compact envelope for a batch of listen-mode messages (see listen_digest).
+
+    *messages* are objects with ``sender``, ``sender_name``, ``timestamp`` and
+    ``text`` attributes, oldest first.
+    """
+    first_ts = messages[0].timestamp if messages else None
+    last_ts = messages[-1].timestamp if messages else None
+    metadata_lines = [
+        "- **Channel**: Matrix",
+        f"- **Chat ID**: {chat_id}",
+        f"- **Messages**: {len(messages)}",
+        f"- **From**: {_format_timestamp(first_ts)}",
+        f"- **To**: {_format_timestamp(last_ts)}",
+    ]
+    context_lines = ["- **Type**: Group chat"]
+    if group_name:
+        context_lines.append(f"- **Group**: {group_name}")
+    context_lines.extend([
+        "- **Mentioned**: no",
+        "- **Mode**: Listen-only digest — recent group messages that were not addressed to you. Any reply is discarded.",
+    ])
+    sections = [
+        "<system-reminder>",
+        "## Message Metadata",
+        *metadata_lines,
+        "",
+        "## Chat Context",
+        *context_lines,
+        "</system-reminder>",
+    ]
+    lines = []
+    for msg in messages:
+        sender_value = msg.sender_name if (msg.sender_name and msg.sender_name != msg.sender) else _extract_localpart(msg.sender)
+        dt = datetime.fromtimestamp(float(msg.timestamp) / 1000.0, tz=ZoneInfo("UTC")).astimezone(ZoneInfo("America/Toronto"))
+        text = (msg.text or "").strip().replace("\n", "\n  ")
+        lines.append(f"[{dt.strftime('%I:%M %p').lstrip('0')}] {sender_value}: {text}")
+    return _compose_envelope(sections, "\n".join(lines))
+
+
 def format_inter_agent_envelope(sender_agent_name, sender_agent_id, text, chat_id, message_id, timestamp, reply_to_event_id: Optional[str] = None, reply_to_sender: Optional[str] = None) -> str:
     metadata_lines = [
         "- **Channel**: Matrix",
@@ -18,6 +18,7 @@ import aiohttp
 
 from src.matrix.config import Config, LettaApiError
 from src.core.retry import is_conversation_busy_error, retry_async
+from src.letta.ws_gateway_client import GatewaySessionError
 from src.matrix.conversations_metrics import increment_fallback, set_api_mode
 from src.matrix.agent_actions import (
     send_as_agent_with_event_id,
@@ -42,6 +43,35 @@ def _is_busy_error(error: Exception) -> bool:
     return "CONVERSATION_BUSY" in code or ("409" in message and "BUSY" in message)
 
 
+def _is_conversation_not_found_error(error: Union[Exception, str]) -> bool:
+    code = str(getattr(error, "code", "")).upper()
+    if "CONVERSATION" in code and "NOT_FOUND" in code:
+        return True
+    message = str(error).lower()
+    return "conversation" in message and ("not found" in message or "404" in message)
+
+
+async def _recover_missing_conversation(
+    config: Config,
+    room_id: str,
+    agent_id: str,
+    sender_id: str,
+    room_member_count: int,
+    logger: logging.Logger,
+    conversation_id: str,
+    thread_root_event_id: Optional[str] = None,
+) -> Optional[str]:
+    """Forget a conversation Letta no longer has and resolve (or recreate) it."""
+    from src.core.conversation_service import invalidate_conversation
+
+    invalidate_conversation(conversation_id)
+    logger.warning(f"[CONVERSATIONS] Conversation {conversation_id} not found in Letta, re-resolving")
+    return await _resolve_conversation_id(
+        config, room_id, agent_id, sender_id, room_member_count, logger,
+        thread_root_event_id=thread_root_event_id,
+    )
+
+
 def _shadow_fallback_enabled(
     config: Config,
     conversation_id: Optional[str],
@@ -441,6 +471,11 @@ async def send_to_letta_api_streaming(
 
             if event.type == StreamEventType.ERROR:
                 logger.error(f"[STREAMING] Error: {event.content}")
+                if conversation_id and _is_conversation_not_found_error(event.content or ""):
+                    # Too late to retry this streamed turn; the next message re-resolves
+                    from src.core.conversation_service import invalidate_conversation
+
+                    invalidate_conversation(conversation_id)
                 if not final_response:
                     final_response = f"Error: {event.content}"
 
@@ -550,13 +585,28 @@ async def send_to_letta_api(
         from src.letta.gateway_stream_reader import collect_via_gateway
 
         try:
-            gateway_result = await collect_via_gateway(
-                client=gateway_client,
-                agent_id=agent_id_to_use,
-                message=message_body,
-                conversation_id=conversation_id,
-                source={"channel": "matrix", "chatId": room_id} if room_id else None,
-            )
+            try:
+                gateway_result = await collect_via_gateway(
+                    client=gateway_client,
+                    agent_id=agent_id_to_use,
+                    message=message_body,
+                    conversation_id=conversation_id,
+                    source={"channel": "matrix", "chatId": room_id} if room_id else None,
+                )
+            except GatewaySessionError as session_error:
+                if not (conversation_id and _is_conversation_not_found_error(session_error)):
+                    raise
+                conversation_id = await _recover_missing_conversation(
+                    config, room_id or "", agent_id_to_use, sender_id, room_member_count, logger,
+                    conversation_id,
+                )
+                gateway_result = await collect_via_gateway(
+                    client=gateway_client,
+                    agent_id=agent_id_to_use,
+                    message=message_body,
+                    conversation_id=conversation_id,
+                    source={"channel": "matrix", "chatId": room_id} if room_id else None,
+                )
         except (LettaApiError, aiohttp.ClientError, asyncio.TimeoutError, RuntimeError, ValueError, TypeError, AssertionError) as collect_error:
             if _shadow_fallback_enabled(config, conversation_id, collect_error):
                 _log_shadow_fallback(
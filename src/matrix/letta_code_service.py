@@ -13,7 +13,7 @@ import json
 import logging
 import os
 import asyncio
-from typing import Any, Awaitable, Callable, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 import aiohttp
 
@@ -21,33 +21,121 @@ from src.matrix.config import Config, LettaCodeApiError
 
 
 # ── State Persistence ────────────────────────────────────────────────
+#
+# LETTACODE_STATE_PATH holds a compacted JSON snapshot ({room_id: state});
+# every update since the snapshot is appended to LETTACODE_STATE_PATH + ".log"
+# as one JSON line ({"room_id": ..., "updates": {...}}). Loading replays the
+# log over the snapshot. Appends are debounced while an event loop is running
+# and the log is folded back into the snapshot every
+# LETTA_CODE_STATE_COMPACT_EVERY entries.
 
 LETTACODE_STATE_PATH = os.getenv(
     "LETTA_CODE_STATE_PATH", "/app/data/letta_code_state.json"
 )
+LETTA_CODE_STATE_FLUSH_DELAY = float(os.getenv("LETTA_CODE_STATE_FLUSH_DELAY", "0.5"))
+LETTA_CODE_STATE_COMPACT_EVERY = int(os.getenv("LETTA_CODE_STATE_COMPACT_EVERY", "500"))
+
 _letta_code_state: Dict[str, Dict[str, Any]] = {}
+_pending_log_lines: List[str] = []
+_pending_log_path: Optional[str] = None
+_log_entries = 0
+_flush_handle: Optional[asyncio.TimerHandle] = None
+_flush_loop: Optional[asyncio.AbstractEventLoop] = None
+_room_locks: Dict[str, asyncio.Lock] = {}
+_state_logger = logging.getLogger(__name__)
+
+
+def _log_path(state_path: str) -> str:
+    return f"{state_path}.log"
 
 
 def _load_letta_code_state() -> None:
-    global _letta_code_state
+    global _letta_code_state, _log_entries
     if _letta_code_state:
         return
+    state: Dict[str, Dict[str, Any]] = {}
     try:
         if os.path.exists(LETTACODE_STATE_PATH):
             with open(LETTACODE_STATE_PATH, "r") as fh:
                 data = json.load(fh)
                 if isinstance(data, dict):
-                    _letta_code_state = data
+                    state = data
     except (OSError, json.JSONDecodeError, TypeError, ValueError):
-        _letta_code_state = {}
+        state = {}
+
+    entries = 0
+    try:
+        with open(_log_path(LETTACODE_STATE_PATH), "r") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                    room_id = entry["room_id"]
+                    state.setdefault(room_id, {}).update(entry["updates"])
+                    entries += 1
+                except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+                    continue  # torn final line after a crash
+    except OSError:
+        pass
+    _letta_code_state = state
+    _log_entries = entries
 
 
 def _save_letta_code_state() -> None:
+    """Write the full snapshot atomically and truncate the update log."""
+    global _log_entries
     dir_path = os.path.dirname(LETTACODE_STATE_PATH)
     if dir_path and not os.path.exists(dir_path):
         os.makedirs(dir_path, exist_ok=True)
-    with open(LETTACODE_STATE_PATH, "w") as fh:
+    tmp_path = f"{LETTACODE_STATE_PATH}.tmp"
+    with open(tmp_path, "w") as fh:
         json.dump(_letta_code_state, fh)
+    os.replace(tmp_path, LETTACODE_STATE_PATH)
+    try:
+        os.remove(_log_path(LETTACODE_STATE_PATH))
+    except FileNotFoundError:
+        pass
+    _log_entries = 0
+
+
+def flush_letta_code_state() -> None:
+    """Append buffered room updates to the log (compacting when it grows)."""
+    global _pending_log_lines, _pending_log_path, _log_entries, _flush_handle
+    if _flush_handle is not None:
+        _flush_handle.cancel()
+        _flush_handle = None
+    if not _pending_log_lines:
+        return
+    lines, path = _pending_log_lines, _pending_log_path or LETTACODE_STATE_PATH
+    _pending_log_lines, _pending_log_path = [], None
+
+    try:
+        dir_path = os.path.dirname(path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path, exist_ok=True)
+        with open(_log_path(path), "a") as fh:
+            fh.write("".join(lines))
+    except OSError as exc:
+        # Keep the updates buffered; the next update or shutdown retries
+        _state_logger.warning(f"Failed to persist Letta Code room state: {exc}")
+        _pending_log_lines, _pending_log_path = lines + _pending_log_lines, path
+        return
+    if path != LETTACODE_STATE_PATH:
+        return  # buffered for a state file that is no longer current
+    _log_entries += len(lines)
+    if _log_entries >= LETTA_CODE_STATE_COMPACT_EVERY:
+        _save_letta_code_state()
+
+
+def _schedule_flush() -> None:
+    global _flush_handle, _flush_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        flush_letta_code_state()
+        return
+    if _flush_handle is None or _flush_loop is not loop:
+        _flush_handle = loop.call_later(LETTA_CODE_STATE_FLUSH_DELAY, flush_letta_code_state)
+        _flush_loop = loop
 
 
 def get_letta_code_room_state(room_id: str) -> Dict[str, Any]:
@@ -58,16 +146,58 @@ def get_letta_code_room_state(room_id: str) -> Dict[str, Any]:
 def update_letta_code_room_state(
     room_id: str, updates: Dict[str, Any]
 ) -> Dict[str, Any]:
+    global _pending_log_path
     _load_letta_code_state()
     room_state = _letta_code_state.get(room_id, {})
     room_state.update(updates)
     _letta_code_state[room_id] = room_state
-    _save_letta_code_state()
+
+    if _pending_log_path not in (None, LETTACODE_STATE_PATH):
+        flush_letta_code_state()
+    _pending_log_path = LETTACODE_STATE_PATH
+    _pending_log_lines.append(json.dumps({"room_id": room_id, "updates": updates}) + "\n")
+    _schedule_flush()
     return dict(room_state)
 
 
+def _get_room_lock(room_id: str) -> asyncio.Lock:
+    lock = _room_locks.get(room_id)
+    if lock is None:
+        lock = _room_locks[room_id] = asyncio.Lock()
+    return lock
+
+
 # ── Letta Code API ───────────────────────────────────────────────────
 
+_letta_code_session: Optional[aiohttp.ClientSession] = None
+_letta_code_session_lock = asyncio.Lock()
+
+
+async def _get_letta_code_session() -> aiohttp.ClientSession:
+    global _letta_code_session
+    if _letta_code_session is not None and not _letta_code_session.closed:
+        return _letta_code_session
+
+    async with _letta_code_session_lock:
+        if _letta_code_session is not None and not _letta_code_session.closed:
+            return _letta_code_session
+        connector = aiohttp.TCPConnector(
+            limit=20,
+            limit_per_host=20,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+        )
+        _letta_code_session = aiohttp.ClientSession(connector=connector)
+        return _letta_code_session
+
+
+async def close_letta_code_session() -> None:
+    global _letta_code_session
+    if _letta_code_session is not None and not _letta_code_session.closed:
+        await _letta_code_session.close()
+    _letta_code_session = None
+
+
 async def call_letta_code_api(
     config: Config,
     method: str,
@@ -81,25 +211,25 @@ async def call_letta_code_api(
         raise LettaCodeApiError(503, "Letta Code API URL not configured")
     url = f"{base}{path}"
     client_timeout = aiohttp.ClientTimeout(total=timeout)
-    async with aiohttp.ClientSession(timeout=client_timeout) as session:
-        async with session.request(method, url, json=payload) as response:
-            text = await response.text()
-            data: Optional[Any] = None
-            if text:
-                try:
-                    data = json.loads(text)
-                except json.JSONDecodeError:
-                    data = {"raw": text}
-            if response.status >= 400:
-                message = ""
-                if isinstance(data, dict):
-                    message = data.get("error") or data.get("message") or ""
-                raise LettaCodeApiError(
-                    response.status, message or text or "Request failed", data
-                )
-            if data is None:
-                return {}
-            return data
+    session = await _get_letta_code_session()
+    async with session.request(method, url, json=payload, timeout=client_timeout) as response:
+        text = await response.text()
+        data: Optional[Any] = None
+        if text:
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError:
+                data = {"raw": text}
+        if response.status >= 400:
+            message = ""
+            if isinstance(data, dict):
+                message = data.get("error") or data.get("message") or ""
+            raise LettaCodeApiError(
+                response.status, message or text or "Request failed", data
+            )
+        if data is None:
+            return {}
+        return data
 
 
 # ── Project Resolution ───────────────────────────────────────────────
@@ -212,6 +342,139 @@ async def run_letta_code_task(
         return False
 
 
+# ── /fs-link and /fs-task ─────────────────────────────────────────
+
+async def _handle_fs_link(
+    room,
+    config: Config,
+    logger: logging.Logger,
+    send_fn: SendFn,
+    agent_id: str,
+    agent_name: str,
+    args: str,
+) -> bool:
+    project_dir = args if args else None
+
+    # Auto-detect path from VibSync if no path provided
+    if not project_dir and agent_name:
+        try:
+            projects_response = await call_letta_code_api(config, "GET", "/api/projects")
+            projects = projects_response.get("projects", [])
+            search_name = agent_name
+            if search_name.startswith("Huly - "):
+                search_name = search_name[7:]
+            for proj in projects:
+                if proj.get("name", "").lower() == search_name.lower():
+                    project_dir = proj.get("filesystem_path")
+                    if project_dir:
+                        logger.info(
+                            f"Auto-detected filesystem path for {agent_name}: {project_dir}"
+                        )
+                    break
+        except (LettaCodeApiError, aiohttp.ClientError, asyncio.TimeoutError, RuntimeError, ValueError) as e:
+            logger.warning(f"Failed to auto-detect filesystem path: {e}")
+
+    if not project_dir:
+        await send_fn(
+            room.room_id,
+            "Usage: /fs-link /path/to/project\n(Could not auto-detect path for this agent)",
+            config,
+            logger,
+        )
+        return True
+
+    payload = {
+        "agentId": agent_id,
+        "projectDir": project_dir,
+        "agentName": agent_name,
+    }
+    try:
+        response = await call_letta_code_api(config, "POST", "/api/letta-code/link", payload)
+        message = response.get("message") or f"Agent {agent_id} linked to {project_dir}"
+        update_letta_code_room_state(room.room_id, {"projectDir": project_dir})
+        await send_fn(room.room_id, message, config, logger)
+    except LettaCodeApiError as exc:
+        detail = ""
+        if isinstance(exc.details, dict):
+            detail = exc.details.get("error") or exc.details.get("message") or ""
+        await send_fn(
+            room.room_id,
+            f"Link failed ({exc.status_code}): {detail or str(exc)}",
+            config,
+            logger,
+        )
+    return True
+
+
+async def _handle_fs_task(
+    room,
+    config: Config,
+    logger: logging.Logger,
+    send_fn: SendFn,
+    agent_id: str,
+    args: str,
+    state: Dict[str, Any],
+) -> bool:
+    normalized = args.lower()
+    state_enabled = bool(state.get("enabled"))
+    if not args:
+        desired = not state_enabled
+    elif normalized in ("on", "enable", "start"):
+        desired = True
+    elif normalized in ("off", "disable", "stop"):
+        desired = False
+    elif normalized in ("status", "state"):
+        status = "ENABLED" if state_enabled else "DISABLED"
+        info = state.get("projectDir") or "not set"
+        environment = "Letta Code" if state_enabled else "Cloud-only"
+        await send_fn(
+            room.room_id,
+            f"Filesystem mode is {status}\nEnvironment: {environment}\nProject path: {info}",
+            config,
+            logger,
+        )
+        return True
+    else:
+        await send_fn(
+            room.room_id, "Usage: /fs-task [on|off|status]", config, logger
+        )
+        return True
+
+    if desired:
+        project_dir = state.get("projectDir")
+        if not project_dir:
+            project_dir = await resolve_letta_project_dir(
+                room.room_id, agent_id, config, logger
+            )
+        if not project_dir:
+            await send_fn(
+                room.room_id,
+                "Link a project with /fs-link before enabling filesystem mode.",
+                config,
+                logger,
+            )
+            return True
+        update_letta_code_room_state(
+            room.room_id, {"enabled": True, "projectDir": project_dir}
+        )
+        await send_fn(
+            room.room_id,
+            f"Filesystem mode ENABLED\nEnvironment: Letta Code (path: {project_dir})\n"
+            f"All new prompts will run inside the project workspace.",
+            config,
+            logger,
+        )
+    else:
+        update_letta_code_room_state(room.room_id, {"enabled": False})
+        await send_fn(
+            room.room_id,
+            "Filesystem mode DISABLED\nEnvironment: Cloud-only (standard Letta API).",
+            config,
+            logger,
+        )
+    return True
+
+
 # ── /fs-* Command Handler ───────────────────────────────────────────
 
 async def handle_letta_code_command(
@@ -250,64 +513,18 @@ async def handle_letta_code_command(
         agent_id = str(mapping.agent_id)
         agent_name = str(mapping.agent_name)
 
-    state = get_letta_code_room_state(room.room_id)
     parts = trimmed.split(" ", 1)
     command = parts[0].lower()
     args = parts[1].strip() if len(parts) > 1 else ""
 
-    # ── /fs-link ──────────────────────────────────────────────────
-    if command == "/fs-link":
-        project_dir = args if args else None
-
-        # Auto-detect path from VibSync if no path provided
-        if not project_dir and agent_name:
-            try:
-                projects_response = await call_letta_code_api(config, "GET", "/api/projects")
-                projects = projects_response.get("projects", [])
-                search_name = agent_name
-                if search_name.startswith("Huly - "):
-                    search_name = search_name[7:]
-                for proj in projects:
-                    if proj.get("name", "").lower() == search_name.lower():
-                        project_dir = proj.get("filesystem_path")
-                        if project_dir:
-                            logger.info(
-                                f"Auto-detected filesystem path for {agent_name}: {project_dir}"
-                            )
-                        break
-            except (LettaCodeApiError, aiohttp.ClientError, asyncio.TimeoutError, RuntimeError, ValueError) as e:
-                logger.warning(f"Failed to auto-detect filesystem path: {e}")
-
-        if not project_dir:
-            await send_fn(
-                room.room_id,
-                "Usage: /fs-link /path/to/project\n(Could not auto-detect path for this agent)",
-                config,
-                logger,
-            )
-            return True
-
-        payload = {
-            "agentId": agent_id,
-            "projectDir": project_dir,
-            "agentName": agent_name,
-        }
-        try:
-            response = await call_letta_code_api(config, "POST", "/api/letta-code/link", payload)
-            message = response.get("message") or f"Agent {agent_id} linked to {project_dir}"
-            update_letta_code_room_state(room.room_id, {"projectDir": project_dir})
-            await send_fn(room.room_id, message, config, logger)
-        except LettaCodeApiError as exc:
-            detail = ""
-            if isinstance(exc.details, dict):
-                detail = exc.details.get("error") or exc.details.get("message") or ""
-            await send_fn(
-                room.room_id,
-                f"Link failed ({exc.status_code}): {detail or str(exc)}",
-                config,
-                logger,
-            )
-        return True
+    # /fs-link and /fs-task read-modify-write room state across awaits;
+    # serialise them per room so concurrent commands can't interleave.
+    if command in ("/fs-link", "/fs-task"):
+        async with _get_room_lock(room.room_id):
+            state = get_letta_code_room_state(room.room_id)
+            if command == "/fs-link":
+                return await _handle_fs_link(room, config, logger, send_fn, agent_id, agent_name, args)
+            return await _handle_fs_task(room, config, logger, send_fn, agent_id, args, state)
 
     # ── /fs-run ───────────────────────────────────────────────────
     if command == "/fs-run":
@@ -371,65 +588,4 @@ async def handle_letta_code_command(
         )
         return True
 
-    # ── /fs-task ──────────────────────────────────────────────────
-    if command == "/fs-task":
-        normalized = args.lower()
-        state_enabled = bool(state.get("enabled"))
-        if not args:
-            desired = not state_enabled
-        elif normalized in ("on", "enable", "start"):
-            desired = True
-        elif normalized in ("off", "disable", "stop"):
-            desired = False
-        elif normalized in ("status", "state"):
-            status = "ENABLED" if state_enabled else "DISABLED"
-            info = state.get("projectDir") or "not set"
-            environment = "Letta Code" if state_enabled else "Cloud-only"
-            await send_fn(
-                room.room_id,
-                f"Filesystem mode is {status}\nEnvironment: {environment}\nProject path: {info}",
-                config,
-                logger,
-            )
-            return True
-        else:
-            await send_fn(
-                room.room_id, "Usage: /fs-task [on|off|status]", config, logger
-            )
-            return True
-
-        if desired:
-            project_dir = state.get("projectDir")
-            if not project_dir:
-                project_dir = await resolve_letta_project_dir(
-                    room.room_id, agent_id, config, logger
-                )
-            if not project_dir:
-                await send_fn(
-                    room.room_id,
-                    "Link a project with /fs-link before enabling filesystem mode.",
-                    config,
-                    logger,
-                )
-                return True
-            update_letta_code_room_state(
-                room.room_id, {"enabled": True, "projectDir": project_dir}
-            )
-            await send_fn(
-                room.room_id,
-                f"Filesystem mode ENABLED\nEnvironment: Letta Code (path: {project_dir})\n"
-                f"All new prompts will run inside the project workspace.",
-                config,
-                logger,
-            )
-        else:
-            update_letta_code_room_state(room.room_id, {"enabled": False})
-            await send_fn(
-                room.room_id,
-                "Filesystem mode DISABLED\nEnvironment: Cloud-only (standard Letta API).",
-                config,
-                logger,
-            )
-        return True
-
     return False
@@ -1,8 +1,12 @@
 import asyncio
+import bisect
 from collections import OrderedDict
 import functools
+import random
+import threading
 from concurrent.futures import ThreadPoolExecutor
-from typing import TYPE_CHECKING, Any, Dict, Optional
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from src.core.retry import retry_async
 
@@ -23,6 +27,209 @@ except ImportError:
 _executor = ThreadPoolExecutor(max_workers=4)
 _executor_semaphore = asyncio.Semaphore(4)
 
+_DONE_STATUSES = ("completed", "success", "done", "embedded")
+_FAILED_STATUSES = ("error", "failed")
+_MAX_CONSECUTIVE_ERRORS = 3
+# Poll interval grows by this factor on every tick without a status change,
+# up to interval * _POLL_BACKOFF_MAX_MULTIPLIER, with ±_POLL_JITTER jitter.
+_POLL_BACKOFF_FACTOR = 1.5
+_POLL_BACKOFF_MAX_MULTIPLIER = 8
+_POLL_JITTER = 0.2
+
+# Time from poll start to "embedded", in seconds (cumulative upper bounds)
+TIME_TO_EMBEDDED_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300)
+
+_metrics_lock = threading.Lock()
+_folder_listings = 0
+_outcomes: Dict[str, int] = {}
+_embedded_bucket_counts = [0] * (len(TIME_TO_EMBEDDED_BUCKETS) + 1)
+_embedded_seconds_sum = 0.0
+
+
+def _record_outcome(outcome: str, waited: Optional[float] = None) -> None:
+    global _embedded_seconds_sum
+    with _metrics_lock:
+        _outcomes[outcome] = _outcomes.get(outcome, 0) + 1
+        if waited is not None:
+            _embedded_bucket_counts[bisect.bisect_left(TIME_TO_EMBEDDED_BUCKETS, waited)] += 1
+            _embedded_seconds_sum += waited
+
+
+def snapshot() -> Dict[str, object]:
+    with _metrics_lock:
+        cumulative = 0
+        buckets: Dict[str, int] = {}
+        for bound, count in zip([*map(str, TIME_TO_EMBEDDED_BUCKETS), "+Inf"], _embedded_bucket_counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {
+            "letta_folder_status_listings_total": _folder_listings,
+            "letta_file_poll_outcomes": dict(_outcomes),
+            "letta_file_time_to_embedded_seconds_bucket": buckets,
+            "letta_file_time_to_embedded_seconds_sum": _embedded_seconds_sum,
+            "letta_file_time_to_embedded_seconds_count": cumulative,
+        }
+
+
+def reset() -> None:
+    global _folder_listings, _embedded_seconds_sum
+    with _metrics_lock:
+        _folder_listings = 0
+        _outcomes.clear()
+        _embedded_bucket_counts[:] = [0] * (len(TIME_TO_EMBEDDED_BUCKETS) + 1)
+        _embedded_seconds_sum = 0.0
+
+
+@dataclass
+class _PendingFile:
+    file_id: str
+    future: "asyncio.Future[bool]"
+    started_at: float
+    deadline: float
+    interval: float
+    missing: int = 0
+
+
+class _FolderStatusPoller:
+    """One listing loop per folder, resolving a future per pending file."""
+
+    def __init__(self, manager: "LettaSourceManager", source_id: str):
+        self.manager = manager
+        self.source_id = source_id
+        self.closed = False
+        self._pending: Dict[str, List[_PendingFile]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._errors = 0
+
+    async def wait_for(self, file_id: str, timeout: float, interval: float) -> bool:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        waiter = _PendingFile(file_id, loop.create_future(), now, now + timeout, interval)
+        self._pending.setdefault(file_id, []).append(waiter)
+        # A new file resets the backoff so it gets its first check promptly
+        self._wakeup.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return await waiter.future
+
+    def _resolve(self, waiter: _PendingFile, result: bool, outcome: str, now: float) -> None:
+        if not waiter.future.done():
+            waiter.future.set_result(result)
+        _record_outcome(outcome, now - waiter.started_at if outcome == "embedded" else None)
+
+    def _waiters(self) -> List[_PendingFile]:
+        return [w for waiters in self._pending.values() for w in waiters]
+
+    async def _run(self) -> None:
+        logger = self.manager.logger
+        loop = asyncio.get_running_loop()
+        delay = 0.0
+        try:
+            while self._pending:
+                base = min(w.interval for w in self._waiters())
+                changed = await self._tick(loop)
+                if not self._pending:
+                    break
+
+                if changed or self._wakeup.is_set():
+                    delay = base
+                else:
+                    delay = min(max(delay, base) * _POLL_BACKOFF_FACTOR, base * _POLL_BACKOFF_MAX_MULTIPLIER)
+                sleep_for = delay * random.uniform(1 - _POLL_JITTER, 1 + _POLL_JITTER)
+                nearest_deadline = min(w.deadline for w in self._waiters())
+                sleep_for = max(0.0, min(sleep_for, nearest_deadline - loop.time()))
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=sleep_for)
+                except asyncio.TimeoutError:
+                    pass
+        except Exception as e:
+            logger.error(f"Folder status poller for {self.source_id} crashed: {e}")
+        finally:
+            self.closed = True
+            for waiter in self._waiters():
+                if not waiter.future.done():
+                    self._resolve(waiter, False, "error", loop.time())
+            self._pending.clear()
+            if self.manager._status_pollers.get(self.source_id) is self:
+                del self.manager._status_pollers[self.source_id]
+
+    async def _tick(self, loop) -> bool:
+        """List the folder once and settle whatever it decides; True if any waiter finished."""
+        global _folder_listings
+        logger = self.manager.logger
+        settled = False
+
+        try:
+            files_page = await self.manager._run_sync(
+                self.manager.letta_client.folders.files.list,
+                self.source_id,
+            )
+            with _metrics_lock:
+                _folder_listings += 1
+            files = files_page.items if hasattr(files_page, "items") else files_page
+            by_id = {f.id: f for f in files}
+            self._errors = 0
+        except (RuntimeError, ValueError, TypeError, OSError) as e:
+            self._errors += 1
+            by_id = None
+            if self._errors >= _MAX_CONSECUTIVE_ERRORS:
+                logger.error(f"Error polling file status after {_MAX_CONSECUTIVE_ERRORS} attempts: {e}")
+            else:
+                logger.warning(f"Error polling file status: {e}")
+
+        now = loop.time()
+        for file_id in list(self._pending):
+            remaining = []
+            for waiter in self._pending[file_id]:
+                if waiter.future.done():
+                    continue
+                outcome = self._settle(waiter, by_id, now)
+                if outcome is None:
+                    remaining.append(waiter)
+                else:
+                    result, outcome_name = outcome
+                    self._resolve(waiter, result, outcome_name, now)
+                    settled = True
+            if remaining:
+                self._pending[file_id] = remaining
+            else:
+                del self._pending[file_id]
+        return settled
+
+    def _settle(self, waiter: _PendingFile, by_id, now: float):
+        logger = self.manager.logger
+        file_id = waiter.file_id
+
+        if by_id is None:
+            if self._errors >= _MAX_CONSECUTIVE_ERRORS:
+                return False, "error"
+        else:
+            file_data = by_id.get(file_id)
+            if file_data is None:
+                logger.warning(f"File {file_id} not found in folder {self.source_id}")
+                waiter.missing += 1
+                if waiter.missing >= _MAX_CONSECUTIVE_ERRORS:
+                    return False, "not_found"
+            else:
+                waiter.missing = 0
+                status = (file_data.processing_status or "").lower()
+                logger.debug(f"File {file_id} processing_status: {status}")
+                if status in _DONE_STATUSES:
+                    logger.info(f"File {file_id} processed successfully")
+                    return True, "embedded"
+                if status in _FAILED_STATUSES:
+                    error_msg = getattr(file_data, "error_message", "Unknown error")
+                    logger.error(f"File {file_id} processing failed: {error_msg}")
+                    return False, "failed"
+
+        if now >= waiter.deadline:
+            logger.warning(f"File {file_id} polling timed out after {waiter.deadline - waiter.started_at:g}s")
+            return False, "timeout"
+        return None
+
 
 class LettaSourceManager:
     def __init__(self, letta_client, config_defaults: dict, logger):
@@ -43,6 +250,7 @@ class LettaSourceManager:
         self._room_locks: Dict[str, asyncio.Lock] = {}
         self._room_lock_lru: "OrderedDict[str, None]" = OrderedDict()
         self._room_lock_max = int(config_defaults.get("room_lock_cache_max", 1024))
+        self._status_pollers: Dict[str, "_FolderStatusPoller"] = {}
 
     def _prune_room_locks_unlocked(self, exclude_room_id: Optional[str] = None) -> None:
         if len(self._room_locks) <= self._room_lock_max:
@@ -230,63 +438,19 @@ class LettaSourceManager:
         )
 
     async def poll_file_status(self, source_id: str, file_id: str, timeout: int = 300, interval: int = 2) -> bool:
+        """Wait until Letta has processed ``file_id`` (True) or it failed / timed out (False).
+
+        All pending files in a folder share one _FolderStatusPoller, so N
+        concurrent uploads cost one folder listing per tick instead of N.
+        """
         if file_id == "sync-complete":
             return True
 
-        elapsed = 0
-        consecutive_errors = 0
-        max_consecutive_errors = 3
-
-        while elapsed < timeout:
-            try:
-                files_page = await self._run_sync(
-                    self.letta_client.folders.files.list,
-                    source_id,
-                )
-                files = files_page.items if hasattr(files_page, "items") else files_page
-
-                file_data = None
-                for f in files:
-                    if f.id == file_id:
-                        file_data = f
-                        break
-
-                if not file_data:
-                    self.logger.warning(f"File {file_id} not found in folder {source_id}")
-                    consecutive_errors += 1
-                    if consecutive_errors >= max_consecutive_errors:
-                        return False
-                    await asyncio.sleep(interval)
-                    elapsed += interval
-                    continue
-
-                consecutive_errors = 0
-                status = (file_data.processing_status or "").lower()
-
-                self.logger.debug(f"File {file_id} processing_status: {status}")
-
-                if status in ["completed", "success", "done", "embedded"]:
-                    self.logger.info(f"File {file_id} processed successfully")
-                    return True
-                if status in ["error", "failed"]:
-                    error_msg = getattr(file_data, "error_message", "Unknown error")
-                    self.logger.error(f"File {file_id} processing failed: {error_msg}")
-                    return False
-
-                await asyncio.sleep(interval)
-                elapsed += interval
-
-            except (RuntimeError, ValueError, TypeError, OSError) as e:
-                consecutive_errors += 1
-                if consecutive_errors >= max_consecutive_errors:
-                    self.logger.error(f"Error polling file status after {max_consecutive_errors} attempts: {e}")
-                    return False
-                self.logger.warning(f"Error polling file status: {e}")
-                await asyncio.sleep(interval)
-                elapsed += interval
-
-        self.logger.warning(f"File {file_id} polling timed out after {timeout}s")
-        return False
+        poller = self._status_pollers.get(source_id)
+        if poller is None or poller.closed:
+            poller = _FolderStatusPoller(self, source_id)
+            self._status_pollers[source_id] = poller
+        return await poller.wait_for(file_id, timeout=timeout, interval=interval)
 
     async def get_or_create_folder(self, room_id: str, agent_id: Optional[str] = None) -> str:
         return await self.get_or_create_source(room_id, agent_id)
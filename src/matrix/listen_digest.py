@@ -0,0 +1,154 @@
+"""
+Digest buffering for listen-mode group rooms.
+
+In ``listen`` mode group gating marks un-mentioned messages ``silent``: the
+agent should see them (for memory) but never reply. Sending each one as its
+own Letta turn and discarding the response burns a full turn per line of
+chatter, so silent messages are buffered per ``(room_id, agent_id)`` instead
+and delivered as one compact digest envelope when
+
+  * the buffer reaches MATRIX_LISTEN_DIGEST_MAX_MESSAGES / _MAX_CHARS ("size"),
+  * the oldest message is MATRIX_LISTEN_DIGEST_MAX_AGE_SECONDS old ("age"), or
+  * a non-silent turn for the same room/agent is dispatched — the digest is
+    then prepended to that turn ("merged") so ordering is preserved and no
+    extra call is made.
+
+task_manager owns dispatch; this module only holds the buffers, timers and
+counters (see snapshot()).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("matrix_client.listen_digest")
+
+DIGEST_ENABLED = os.getenv("MATRIX_LISTEN_DIGEST", "true").lower() in ("true", "1", "yes")
+DIGEST_MAX_MESSAGES = int(os.getenv("MATRIX_LISTEN_DIGEST_MAX_MESSAGES", "20"))
+DIGEST_MAX_CHARS = int(os.getenv("MATRIX_LISTEN_DIGEST_MAX_CHARS", "8000"))
+DIGEST_MAX_AGE_SECONDS = float(os.getenv("MATRIX_LISTEN_DIGEST_MAX_AGE_SECONDS", "120"))
+# Re-check interval while the agent is busy with another turn
+_BUSY_RETRY_SECONDS = 5.0
+
+DigestKey = Tuple[str, str]
+OnDue = Callable[[DigestKey, str], None]
+
+
+@dataclass
+class DigestEntry:
+    sender: str
+    sender_name: str
+    text: str
+    event_id: Optional[str]
+    timestamp: int
+
+
+@dataclass
+class PendingDigest:
+    entries: List[DigestEntry] = field(default_factory=list)
+    chars: int = 0
+    # Latest dispatch context (room, config, logger, ...) supplied by the caller
+    context: Any = None
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+_pending: Dict[DigestKey, PendingDigest] = {}
+
+_lock = threading.Lock()
+_messages_buffered = 0
+_digests_sent = 0
+_digests_merged = 0
+_letta_calls_saved = 0
+_flush_reasons: Dict[str, int] = {}
+
+
+def add(key: DigestKey, entry: DigestEntry, context: Any, on_due: OnDue) -> None:
+    """Buffer a silent message; ``on_due(key, reason)`` fires when the digest should go out."""
+    global _messages_buffered
+    pending = _pending.setdefault(key, PendingDigest())
+    pending.entries.append(entry)
+    pending.chars += len(entry.text)
+    pending.context = context
+    with _lock:
+        _messages_buffered += 1
+
+    loop = asyncio.get_running_loop()
+    if len(pending.entries) >= DIGEST_MAX_MESSAGES or pending.chars >= DIGEST_MAX_CHARS:
+        _cancel_timer(pending)
+        pending.timer = loop.call_soon(on_due, key, "size")
+    elif pending.timer is None:
+        pending.timer = loop.call_later(DIGEST_MAX_AGE_SECONDS, on_due, key, "age")
+
+
+def defer(key: DigestKey, on_due: OnDue, reason: str, delay: Optional[float] = None) -> None:
+    """Re-arm the flush for ``key`` (used while the agent is busy with another turn)."""
+    pending = _pending.get(key)
+    if pending is None:
+        return
+    _cancel_timer(pending)
+    pending.timer = asyncio.get_running_loop().call_later(
+        _BUSY_RETRY_SECONDS if delay is None else delay, on_due, key, reason
+    )
+
+
+def take(key: DigestKey, reason: str) -> Optional[PendingDigest]:
+    """Remove and return the buffered digest for ``key`` (None if empty).
+
+    ``reason`` is "merged" when the digest rides along with a non-silent
+    turn, otherwise the trigger ("size" / "age") of a standalone digest turn.
+    """
+    global _digests_sent, _digests_merged, _letta_calls_saved
+    pending = _pending.pop(key, None)
+    if pending is None:
+        return None
+    _cancel_timer(pending)
+    if not pending.entries:
+        return None
+    with _lock:
+        if reason == "merged":
+            _digests_merged += 1
+            _letta_calls_saved += len(pending.entries)
+        else:
+            _digests_sent += 1
+            _letta_calls_saved += len(pending.entries) - 1
+        _flush_reasons[reason] = _flush_reasons.get(reason, 0) + 1
+    return pending
+
+
+def pending_count(key: DigestKey) -> int:
+    pending = _pending.get(key)
+    return len(pending.entries) if pending else 0
+
+
+def _cancel_timer(pending: PendingDigest) -> None:
+    if pending.timer is not None:
+        pending.timer.cancel()
+        pending.timer = None
+
+
+def snapshot() -> Dict[str, object]:
+    with _lock:
+        return {
+            "listen_digest_messages_buffered_total": _messages_buffered,
+            "listen_digest_sent_total": _digests_sent,
+            "listen_digest_merged_total": _digests_merged,
+            "listen_digest_letta_calls_saved_total": _letta_calls_saved,
+            "listen_digest_pending_messages": sum(len(p.entries) for p in _pending.values()),
+            "flush_reasons": dict(_flush_reasons),
+        }
+
+
+def reset() -> None:
+    global _messages_buffered, _digests_sent, _digests_merged, _letta_calls_saved
+    for pending in _pending.values():
+        _cancel_timer(pending)
+    _pending.clear()
+    with _lock:
+        _messages_buffered = 0
+        _digests_sent = 0
+        _digests_merged = 0
+        _letta_calls_saved = 0
+        _flush_reasons.clear()
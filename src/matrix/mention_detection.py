@@ -9,9 +9,11 @@ Three detection methods in priority order:
 import logging
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 
-from src.matrix.mention_routing import strip_reply_fallback
+from src.matrix.mention_index import get_mention_index
+from src.matrix.mention_routing import ParsedMessage, parse_message, pill_user_ids
 
 logger = logging.getLogger(__name__)
 
@@ -23,8 +25,34 @@ class MentionResult:
     matched_text: Optional[str] = None
 
 
+@dataclass(frozen=True)
+class _BotMatcher:
+    needle: str                        # lower-cased "@localpart", substring prefilter
+    full: Optional[re.Pattern]         # @localpart:domain
+    bare: re.Pattern                   # @localpart not followed by ":"
+
+
 # ── internal helpers ─────────────────────────────────────────────────
 
+@lru_cache(maxsize=512)
+def _bot_matcher(bot_user_id: str) -> Optional[_BotMatcher]:
+    """Compiled text matchers for one bot, built once per bot user id."""
+    if not bot_user_id or not bot_user_id.startswith("@"):
+        return None
+    parts = bot_user_id[1:].split(":", 1)
+    localpart = parts[0]
+    domain = parts[1] if len(parts) > 1 else ""
+    if not localpart:
+        return None
+    full = (
+        re.compile(rf"@{re.escape(localpart)}:{re.escape(domain)}\b", re.IGNORECASE)
+        if domain
+        else None
+    )
+    bare = re.compile(rf"@{re.escape(localpart)}(?!:)\b", re.IGNORECASE)
+    return _BotMatcher(needle=f"@{localpart}".lower(), full=full, bare=bare)
+
+
 def _check_pill(
     event_source: Optional[Dict],
     bot_user_id: str,
@@ -32,37 +60,40 @@ def _check_pill(
     """Check MSC 3952 m.mentions.user_ids."""
     if not event_source or not isinstance(event_source, dict):
         return False, None
-    content = event_source.get("content", {})
-    if not isinstance(content, dict):
-        return False, None
-    mentions = content.get("m.mentions", {})
-    if not isinstance(mentions, dict):
-        return False, None
-    user_ids = mentions.get("user_ids", [])
-    if isinstance(user_ids, list) and bot_user_id in user_ids:
+    if bot_user_id in pill_user_ids(event_source.get("content", {})):
         return True, bot_user_id
     return False, None
 
 
-def _check_text(body: str, bot_user_id: str) -> Tuple[bool, Optional[str]]:
+def _check_text(
+    body: str,
+    bot_user_id: str,
+    parsed: Optional[ParsedMessage] = None,
+) -> Tuple[bool, Optional[str]]:
     """Match bot's full MXID or bare @localpart (but not @localpart:other.server)."""
-    if not body or not bot_user_id or not bot_user_id.startswith("@"):
+    if not body:
         return False, None
-    clean = strip_reply_fallback(body)
-    parts = bot_user_id[1:].split(":", 1)
-    localpart = parts[0]
-    domain = parts[1] if len(parts) > 1 else ""
-    if not localpart:
+    matcher = _bot_matcher(bot_user_id)
+    if matcher is None:
         return False, None
+    parsed = parsed or parse_message(body)
+    if matcher.needle not in parsed.clean_lower:
+        return False, None
+    # Agent bots: answer from the message's shared mention-index pass when it
+    # has the hit; leftmost-longest overlap can hide @localpart behind a
+    # longer name match, so a miss falls through to the bot's own matchers
+    agent_id = get_mention_index().agent_id_for_mxid(bot_user_id)
+    if agent_id:
+        for match in parsed.agent_mentions():
+            if match.agent_id == agent_id and match.kind in ("mxid", "localpart"):
+                return True, match.text
     # 1. Try full MXID match (@localpart:domain)
-    if domain:
-        full_pat = re.compile(rf"@{re.escape(localpart)}:{re.escape(domain)}\b", re.IGNORECASE)
-        m = full_pat.search(clean)
+    if matcher.full is not None:
+        m = matcher.full.search(parsed.clean_body)
         if m:
             return True, m.group(0)
     # 2. Bare @localpart only if NOT followed by : (avoids matching @bot:other.server)
-    bare_pat = re.compile(rf"@{re.escape(localpart)}(?!:)\b", re.IGNORECASE)
-    m = bare_pat.search(clean)
+    m = matcher.bare.search(parsed.clean_body)
     if m:
         return True, m.group(0)
     return False, None
@@ -71,11 +102,12 @@ def _check_text(body: str, bot_user_id: str) -> Tuple[bool, Optional[str]]:
 def _check_regex(
     body: str,
     compiled_patterns: List[re.Pattern],
+    parsed: Optional[ParsedMessage] = None,
 ) -> Tuple[bool, Optional[str]]:
     """Custom regex patterns from config."""
     if not body or not compiled_patterns:
         return False, None
-    clean = strip_reply_fallback(body)
+    clean = (parsed or parse_message(body)).clean_body
     for pat in compiled_patterns:
         m = pat.search(clean)
         if m:
@@ -100,13 +132,16 @@ def detect_matrix_mention(
     if hit:
         return MentionResult(True, "pill", text)
 
+    # One reply-strip / lower-case pass shared by the text and regex checks
+    parsed = parse_message(body) if body else None
+
     # 2. @localpart text (pass full MXID for domain-aware matching)
-    hit, text = _check_text(body, bot_user_id)
+    hit, text = _check_text(body, bot_user_id, parsed)
     if hit:
         return MentionResult(True, "text", text)
 
     # 3. regex
-    hit, text = _check_regex(body, compiled_patterns or [])
+    hit, text = _check_regex(body, compiled_patterns or [], parsed)
     if hit:
         return MentionResult(True, "regex", text)
 
@@ -0,0 +1,285 @@
+"""
+Shared @mention index over all agent mappings.
+
+Mention routing, pill formatting and mention detection used to run
+``FRIENDLY_MENTION_PATTERN`` over a message and then resolve every ``@Name``
+candidate with a linear scan of all mappings — O(mentions × agents) per
+message, done once per consumer. This module compiles every agent name,
+``Huly - `` short name, agent id, MXID localpart and full MXID into a single
+Aho-Corasick automaton so one pass over the message finds every known
+mention. Only ``@tokens`` that match nothing exactly fall back to the old
+fuzzy (substring) name lookup, and those results are memoized per index.
+
+The index is rebuilt lazily when the mapping cache is invalidated or
+reloaded (``mapping_service.mapping_generation``) and at most every
+``MAPPING_CACHE_TTL_SECONDS`` so identity display-name changes are picked up.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.core.mapping_service import get_all_mappings, mapping_generation
+
+logger = logging.getLogger(__name__)
+
+# Regex for friendly @mentions - single word only (multi-word names come from the automaton)
+FRIENDLY_MENTION_PATTERN = re.compile(r'@([A-Za-z][A-Za-z0-9_\-]*)')
+
+_INDEX_TTL_SECONDS = int(os.getenv("MAPPING_CACHE_TTL_SECONDS", "300"))
+_FUZZY_CACHE_SIZE = 1024
+
+# When the same pattern text is registered by several kinds, the earlier kind wins
+_KIND_PRIORITY = ("mxid", "localpart", "agent_id", "name")
+_NAME_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-")
+
+
+@dataclass(frozen=True)
+class MentionMatch:
+    start: int
+    end: int
+    text: str
+    agent_id: str
+    agent_name: str
+    matrix_user_id: str
+    kind: str  # "mxid" | "localpart" | "agent_id" | "name" | "fuzzy"
+
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton over lower-cased string patterns."""
+
+    def __init__(self, patterns: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._lengths = [len(p) for p in patterns]
+
+        for pattern_id, pattern in enumerate(patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(pattern_id)
+
+        # Breadth-first fail links; outputs are merged along them
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield ``(start, end, pattern_id)`` for every occurrence in ``text``."""
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pattern_id in out[node]:
+                yield i + 1 - lengths[pattern_id], i + 1, pattern_id
+
+
+def _lower_same_length(text: str) -> str:
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters (e.g. "İ") expand when lower-cased; keep offsets aligned
+    return "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+
+class MentionIndex:
+    """Compiled view of the agent mappings for one-pass mention extraction."""
+
+    def __init__(self, mappings: Dict[str, dict], generation: int = 0):
+        self.generation = generation
+        self.built_at = time.monotonic()
+        self._mappings: Dict[str, dict] = {}
+        self._names: List[Tuple[str, str]] = []
+        self._mxids: Dict[str, str] = {}
+        self._fuzzy_cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._fuzzy_lock = threading.Lock()
+
+        registered: Dict[str, Tuple[str, str]] = {}
+
+        def _register(pattern: str, kind: str, agent_id: str) -> None:
+            pattern = pattern.lower()
+            if len(pattern) < 2:
+                return
+            current = registered.get(pattern)
+            # First mapping wins per pattern (matches the old first-hit scan); kinds by priority
+            if current is None or _KIND_PRIORITY.index(kind) < _KIND_PRIORITY.index(current[0]):
+                registered[pattern] = (kind, agent_id)
+
+        for agent_id, mapping in mappings.items():
+            agent_id = str(mapping.get("agent_id") or agent_id)
+            self._mappings[agent_id] = mapping
+            agent_name = str(mapping.get("agent_name") or "")
+            mxid = str(mapping.get("matrix_user_id") or "")
+
+            if mxid.startswith("@"):
+                self._mxids[mxid.lower()] = agent_id
+                _register(mxid, "mxid", agent_id)
+                _register(mxid.split(":", 1)[0], "localpart", agent_id)
+            _register(f"@{agent_id}", "agent_id", agent_id)
+            if agent_name:
+                name_lower = agent_name.lower()
+                self._names.append((name_lower, agent_id))
+                _register(f"@{agent_name}", "name", agent_id)
+                if name_lower.startswith("huly - ") and len(name_lower) > 7:
+                    _register(f"@{agent_name[7:]}", "name", agent_id)
+
+        self._patterns: List[Tuple[str, str, str]] = [
+            (pattern, kind, agent_id) for pattern, (kind, agent_id) in registered.items()
+        ]
+        self._automaton = AhoCorasick([pattern for pattern, _, _ in self._patterns])
+
+    def __len__(self) -> int:
+        return len(self._mappings)
+
+    def expired(self) -> bool:
+        return time.monotonic() - self.built_at > _INDEX_TTL_SECONDS
+
+    def agent_id_for_mxid(self, mxid: str) -> Optional[str]:
+        return self._mxids.get(mxid.lower())
+
+    def _match(self, start: int, end: int, text: str, kind: str, agent_id: str) -> MentionMatch:
+        mapping = self._mappings[agent_id]
+        return MentionMatch(
+            start=start,
+            end=end,
+            text=text[start:end],
+            agent_id=agent_id,
+            agent_name=str(mapping.get("agent_name") or ""),
+            matrix_user_id=str(mapping.get("matrix_user_id") or ""),
+            kind=kind,
+        )
+
+    @staticmethod
+    def _at_boundary(text: str, start: int, end: int, kind: str) -> bool:
+        nxt = text[end] if end < len(text) else ""
+        if kind == "mxid":
+            # "@a:b.com" must not be the prefix of "@a:b.com.evil" / "@a:b.community"
+            if nxt and (nxt.isalnum() or nxt == "_"):
+                return False
+            if nxt in (".", "-") and end + 1 < len(text) and text[end + 1].isalnum():
+                return False
+            return True
+        if kind == "localpart":
+            # Bare @localpart, but not @localpart:other.server
+            return not nxt or not (nxt.isalnum() or nxt in "_:")
+        # Names / agent ids: skip emails and longer @tokens that merely start with a name
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        return not nxt or nxt not in _NAME_CHARS
+
+    def resolve_fuzzy(self, name: str) -> Optional[str]:
+        """Agent id for a partial ``@name`` (case-insensitive substring of an agent name)."""
+        name_lower = name.lower()
+        with self._fuzzy_lock:
+            if name_lower in self._fuzzy_cache:
+                self._fuzzy_cache.move_to_end(name_lower)
+                return self._fuzzy_cache[name_lower]
+
+        agent_id = None
+        for agent_name_lower, candidate in self._names:
+            if name_lower in agent_name_lower:
+                agent_id = candidate
+                break
+
+        with self._fuzzy_lock:
+            self._fuzzy_cache[name_lower] = agent_id
+            if len(self._fuzzy_cache) > _FUZZY_CACHE_SIZE:
+                self._fuzzy_cache.popitem(last=False)
+        return agent_id
+
+    def find_mentions(self, text: str, fuzzy: bool = True) -> List[MentionMatch]:
+        """Return non-overlapping agent mentions in ``text`` in order of appearance.
+
+        Overlaps resolve leftmost-longest, so a full MXID wins over its
+        localpart and "@Huly - Project" over "@Huly". With ``fuzzy``, single
+        ``@tokens`` left unmatched are resolved as partial agent names.
+        """
+        if not text or "@" not in text:
+            return []
+
+        lowered = _lower_same_length(text)
+        candidates: List[Tuple[int, int, str, str]] = []
+        for start, end, pattern_id in self._automaton.iter_matches(lowered):
+            _, kind, agent_id = self._patterns[pattern_id]
+            if self._at_boundary(text, start, end, kind):
+                candidates.append((start, end, kind, agent_id))
+
+        candidates.sort(key=lambda c: (c[0], -(c[1] - c[0])))
+        matches: List[MentionMatch] = []
+        covered_until = 0
+        for start, end, kind, agent_id in candidates:
+            if start < covered_until:
+                continue
+            matches.append(self._match(start, end, text, kind, agent_id))
+            covered_until = end
+
+        if fuzzy and self._names:
+            spans = [(m.start, m.end) for m in matches]
+            fuzzy_matches = []
+            for token in FRIENDLY_MENTION_PATTERN.finditer(text):
+                start = token.start()
+                if any(s <= start < e for s, e in spans):
+                    continue
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                agent_id = self.resolve_fuzzy(token.group(1))
+                if agent_id:
+                    fuzzy_matches.append(self._match(start, token.end(), text, "fuzzy", agent_id))
+            if fuzzy_matches:
+                matches = sorted(matches + fuzzy_matches, key=lambda m: m.start)
+
+        return matches
+
+
+_index: Optional[MentionIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_mention_index() -> MentionIndex:
+    """Process-wide mention index, rebuilt when the mappings change."""
+    global _index
+    index = _index
+    if index is not None and index.generation == mapping_generation() and not index.expired():
+        return index
+
+    with _index_lock:
+        index = _index
+        if index is not None and index.generation == mapping_generation() and not index.expired():
+            return index
+        mappings = get_all_mappings()
+        # get_all_mappings may itself reload and bump the generation; record it afterwards
+        index = MentionIndex(mappings, generation=mapping_generation())
+        _index = index
+        logger.debug(f"Built mention index over {len(index)} agents ({len(index._patterns)} patterns)")
+        return index
+
+
+def reset_mention_index() -> None:
+    global _index
+    with _index_lock:
+        _index = None
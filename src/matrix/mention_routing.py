@@ -11,6 +11,8 @@ import os
 import re
 import asyncio
 import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Any, List, Tuple, Optional
 
 import aiohttp
@@ -18,18 +20,14 @@ import aiohttp
 from src.core.mapping_service import (
     get_mapping_by_agent_id,
     get_mapping_by_matrix_user,
-    get_mapping_by_agent_name,
-    get_all_mappings,
 )
+from src.matrix.mention_index import MentionIndex, MentionMatch, get_mention_index
 
 logger = logging.getLogger(__name__)
 
 # Regex for Matrix user IDs: @localpart:domain
 MXID_PATTERN = re.compile(r'@([a-zA-Z0-9._=\-/]+):([a-zA-Z0-9.\-]+\.[a-zA-Z]{2,})')
 
-# Regex for friendly @mentions - single word only (multi-word names matched via partial/fuzzy)
-FRIENDLY_MENTION_PATTERN = re.compile(r'@([A-Za-z][A-Za-z0-9_\-]*)')
-
 # Special pattern for "Huly - ProjectName" style (with hyphen separator)  
 HULY_MENTION_PATTERN = re.compile(r'@(Huly\s*-\s*[A-Za-z][A-Za-z0-9_\-\s]*)', re.IGNORECASE)
 
@@ -94,6 +92,47 @@ def strip_reply_fallback(body: str) -> str:
     return '\n'.join(new_message_lines).strip()
 
 
+@dataclass(eq=False)
+class ParsedMessage:
+    """A message body parsed once and shared by gating, routing and pill detection.
+
+    Obtain via parse_message(); the reply-fallback strip and lower-casing are
+    done once per distinct body, and agent mentions are resolved lazily once
+    per mention index.
+    """
+    body: str
+    clean_body: str
+    clean_lower: str
+    _mentions: Optional[List[MentionMatch]] = field(default=None, repr=False)
+    _mentions_index: Optional[MentionIndex] = field(default=None, repr=False)
+
+    def agent_mentions(self) -> List[MentionMatch]:
+        index = get_mention_index()
+        if self._mentions is None or self._mentions_index is not index:
+            self._mentions = index.find_mentions(self.clean_body)
+            self._mentions_index = index
+        return self._mentions
+
+
+@lru_cache(maxsize=256)
+def parse_message(body: str) -> ParsedMessage:
+    clean_body = strip_reply_fallback(body)
+    return ParsedMessage(body=body, clean_body=clean_body, clean_lower=clean_body.lower())
+
+
+def pill_user_ids(content: Optional[dict]) -> List[str]:
+    """MSC 3952 ``m.mentions.user_ids`` from event content (malformed fields → [])."""
+    if not isinstance(content, dict):
+        return []
+    mentions = content.get("m.mentions") or {}
+    if not isinstance(mentions, dict):
+        return []
+    user_ids = mentions.get("user_ids") or []
+    if not isinstance(user_ids, list):
+        return []
+    return [mxid for mxid in user_ids if isinstance(mxid, str)]
+
+
 def extract_agent_mentions(body: str) -> List[Tuple[str, str, str]]:
     """
     Extract @agent mentions from message body.
@@ -101,34 +140,15 @@ def extract_agent_mentions(body: str) -> List[Tuple[str, str, str]]:
     Returns list of (matched_text, agent_id, agent_name) tuples.
     Strips reply fallback before parsing to avoid matching quoted content.
     Deduplicates by agent_id.
+    
+    Full MXIDs, localparts and agent names are found in a single pass over
+    the shared mention index; see mention_index.MentionIndex.find_mentions.
     """
-    clean_body = strip_reply_fallback(body)
     found_agents: dict[str, Tuple[str, str, str]] = {}
     
-    # 1. Check for full Matrix user ID mentions (@agent_xxx:domain)
-    for match in AGENT_MXID_PATTERN.finditer(clean_body):
-        full_mxid = match.group(0)
-        mapping = get_mapping_by_matrix_user(full_mxid)
-        if mapping:
-            agent_id = mapping["agent_id"]
-            if agent_id not in found_agents:
-                found_agents[agent_id] = (full_mxid, agent_id, mapping["agent_name"])
-    
-    # 2. Check for friendly @Name mentions
-    for match in FRIENDLY_MENTION_PATTERN.finditer(clean_body):
-        name = match.group(1)
-        full_match = match.group(0)
-        
-        # Skip if it looks like an email (has @ before and text after with @)
-        start = match.start()
-        if start > 0 and clean_body[start-1].isalnum():
-            continue
-            
-        mapping = get_mapping_by_agent_name(name, fuzzy=True)
-        if mapping:
-            agent_id = mapping["agent_id"]
-            if agent_id not in found_agents:
-                found_agents[agent_id] = (full_match, agent_id, mapping["agent_name"])
+    for match in parse_message(body).agent_mentions():
+        if match.agent_id not in found_agents:
+            found_agents[match.agent_id] = (match.text, match.agent_id, match.agent_name)
     
     return list(found_agents.values())
 
@@ -141,17 +161,14 @@ def extract_opencode_mentions(body: str, content: Optional[dict] = None) -> List
     # then merge with body matches for clients that don't emit pills.
     found: set[str] = set()
 
-    if content:
-        mentions = content.get("m.mentions") or {}
-        if isinstance(mentions, dict):
-            user_ids = mentions.get("user_ids") or []
-            if isinstance(user_ids, list):
-                for mxid in user_ids:
-                    if isinstance(mxid, str) and OC_MXID_PATTERN.fullmatch(mxid):
-                        found.add(mxid)
+    for mxid in pill_user_ids(content):
+        if OC_MXID_PATTERN.fullmatch(mxid):
+            found.add(mxid)
 
-    clean_body = strip_reply_fallback(body)
-    for match in OC_MXID_PATTERN.finditer(clean_body):
+    parsed = parse_message(body)
+    if "@oc_" not in parsed.clean_lower:
+        return list(found)
+    for match in OC_MXID_PATTERN.finditer(parsed.clean_body):
         found.add(match.group(0))
     return list(found)
 
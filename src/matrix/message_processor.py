@@ -8,7 +8,7 @@ Orchestrates:
   3. Message envelope formatting
   4. Read receipts
   5. Streaming vs non-streaming Letta send
-  6. Silent mode suppression (group gating)
+  6. Silent mode suppression (group gating) and listen-mode digests
   7. Gateway-down retry buffering
   8. Error alerting
 
@@ -93,31 +93,65 @@ async def _dispatch_via_temporal(
             logger.warning("[TEMPORAL] Client unavailable, falling back to direct path")
             return False
 
-        from temporal_workflows.workflows.message_delivery import (
-            MessageDeliveryWorkflow,
-            MessageDeliveryInput,
-        )
+        task_queue = os.getenv("TEMPORAL_TASK_QUEUE", "matrix-file-queue")
+        body = message_body if isinstance(message_body, str) else str(message_body)
 
-        workflow_id = f"msg-delivery-{event_id}"
+        if os.getenv("TEMPORAL_DELIVERY_MODE", "mailbox").lower() == "per_message":
+            from temporal_workflows.workflows.message_delivery import (
+                MessageDeliveryWorkflow,
+                MessageDeliveryInput,
+            )
 
-        await client.start_workflow(
-            MessageDeliveryWorkflow.run,
-            MessageDeliveryInput(
-                room_id=room_id,
-                agent_id=agent_id,
-                message_body=message_body if isinstance(message_body, str) else str(message_body),
-                sender=sender,
-                event_id=event_id,
-                conversation_id=conversation_id,
-                is_streaming=is_streaming,
-                source_channel="matrix",
-                reply_to_event_id=reply_to_event_id,
-                thread_root_event_id=thread_root_event_id,
-                thread_latest_event_id=thread_latest_event_id,
-            ),
-            id=workflow_id,
-            task_queue=os.getenv("TEMPORAL_TASK_QUEUE", "matrix-file-queue"),
-        )
+            workflow_id = f"msg-delivery-{event_id}"
+
+            await client.start_workflow(
+                MessageDeliveryWorkflow.run,
+                MessageDeliveryInput(
+                    room_id=room_id,
+                    agent_id=agent_id,
+                    message_body=body,
+                    sender=sender,
+                    event_id=event_id,
+                    conversation_id=conversation_id,
+                    is_streaming=is_streaming,
+                    source_channel="matrix",
+                    reply_to_event_id=reply_to_event_id,
+                    thread_root_event_id=thread_root_event_id,
+                    thread_latest_event_id=thread_latest_event_id,
+                ),
+                id=workflow_id,
+                task_queue=task_queue,
+            )
+        else:
+            from temporal_workflows.workflows.agent_mailbox import (
+                AgentMailboxInput,
+                AgentMailboxWorkflow,
+                MailboxMessage,
+                mailbox_workflow_id,
+            )
+
+            # Signal-with-start: appends to the agent's running mailbox, or starts one
+            workflow_id = mailbox_workflow_id(agent_id)
+            await client.start_workflow(
+                AgentMailboxWorkflow.run,
+                AgentMailboxInput(agent_id=agent_id),
+                id=workflow_id,
+                task_queue=task_queue,
+                start_signal="enqueue",
+                start_signal_args=[
+                    MailboxMessage(
+                        room_id=room_id,
+                        message_body=body,
+                        sender=sender,
+                        event_id=event_id,
+                        conversation_id=conversation_id,
+                        source_channel="matrix",
+                        reply_to_event_id=reply_to_event_id,
+                        thread_root_event_id=thread_root_event_id,
+                        thread_latest_event_id=thread_latest_event_id,
+                    )
+                ],
+            )
 
         logger.info(
             f"[TEMPORAL] Dispatched message delivery workflow: {workflow_id} "
@@ -151,6 +185,8 @@ class MessageContext:
     client: Optional[AsyncClient] = None
     silent_mode: bool = False
     auth_manager: Any = None
+    # Buffered listen-mode digest envelope to deliver ahead of this message (same turn)
+    listen_digest: Optional[str] = None
 
 async def process_letta_message(ctx: MessageContext) -> None:
     """
@@ -321,6 +357,10 @@ async def process_letta_message(ctx: MessageContext) -> None:
                 f"[MATRIX-CONTEXT] Added context for sender {event_sender}"
             )
 
+        if ctx.listen_digest and isinstance(message_to_send, str):
+            message_to_send = f"{ctx.listen_digest}\n\n{message_to_send}"
+            logger.info(f"[LISTEN-DIGEST] Prepended buffered listen-mode digest to turn in {room_id}")
+
         if original_event_id:
             asyncio.create_task(
                 send_read_receipt_as_agent(room_id, original_event_id, config, logger)
@@ -538,6 +578,54 @@ async def process_letta_message(ctx: MessageContext) -> None:
         asyncio.create_task(notify_agent_ready(effective_agent_id))
 
 
+async def process_listen_digest(
+    *,
+    room_id: str,
+    room_display_name: str,
+    room_agent_id: Optional[str],
+    entries: list,
+    config: Config,
+    logger: logging.Logger,
+) -> None:
+    """Deliver buffered listen-mode messages to Letta as one silent turn.
+
+    Always uses the direct gateway path (never Temporal) so the response can
+    be discarded; see listen_digest for when this runs.
+    """
+    if not entries:
+        return
+    effective_agent_id = room_agent_id or config.letta_agent_id
+    envelope = matrix_formatter.format_listen_digest_envelope(
+        room_id, room_display_name or room_id, entries
+    )
+    last_event_id = entries[-1].event_id
+    if last_event_id:
+        asyncio.create_task(
+            send_read_receipt_as_agent(room_id, last_event_id, config, logger)
+        )
+    asyncio.create_task(notify_agent_busy(effective_agent_id))
+    try:
+        await send_to_letta_api(envelope, entries[-1].sender, config, logger, room_id)
+        logger.info(
+            f"[LISTEN-DIGEST] Delivered {len(entries)} listen-mode messages to "
+            f"{effective_agent_id} in one turn ({room_id}); response suppressed"
+        )
+    except (
+        LettaApiError,
+        LettaClientAPIError,
+        aiohttp.ClientError,
+        asyncio.TimeoutError,
+        OSError,
+        RuntimeError,
+        ValueError,
+    ) as e:
+        logger.warning(
+            f"[LISTEN-DIGEST] Failed to deliver {len(entries)} listen-mode messages in {room_id}: {e}"
+        )
+    finally:
+        asyncio.create_task(notify_agent_ready(effective_agent_id))
+
+
 # ── Error Handling Helpers ───────────────────────────────────────────
 
 async def _handle_letta_api_error(
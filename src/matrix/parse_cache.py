@@ -0,0 +1,218 @@
+"""
+Persistent parse-result cache keyed by content hash + parser version.
+
+Shared by the in-process LettaFileHandler path and the Temporal parse
+activity (both go through document_parser.parse_document), so identical
+bytes uploaded again — to the same room or a different one — skip
+MarkItDown and OCR entirely.
+
+Storage is a single SQLite table (WAL mode, safe across processes and
+containers sharing the data volume). Text is zlib-compressed and the table
+is kept under DOCUMENT_PARSING_CACHE_MAX_MB by evicting least-recently-used
+rows. Each process keeps one connection open (guarded by _lock) instead of
+reconnecting and re-running the schema DDL per lookup.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+logger = logging.getLogger("matrix_client.parse_cache")
+
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+_stores = 0
+_evictions = 0
+# (path, pid, connection); reopened when the path changes or after a fork
+_conn: Optional[tuple] = None
+
+
+@dataclass
+class CachedParse:
+    text: str
+    page_count: Optional[int] = None
+    was_ocr: bool = False
+
+
+def _db_path() -> str:
+    return os.getenv("DOCUMENT_PARSING_CACHE_DB", "/app/data/document_parse_cache.db")
+
+
+def _max_bytes() -> int:
+    return int(os.getenv("DOCUMENT_PARSING_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+
+def _get_connection() -> sqlite3.Connection:
+    """The process-wide connection; callers must hold _lock."""
+    global _conn
+    path = _db_path()
+    if _conn is not None:
+        conn_path, conn_pid, conn = _conn
+        if conn_path == path and conn_pid == os.getpid():
+            return conn
+        _close_connection()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS parse_cache ("
+        " content_hash TEXT NOT NULL,"
+        " parser_version TEXT NOT NULL,"
+        " text BLOB NOT NULL,"
+        " page_count INTEGER,"
+        " was_ocr INTEGER NOT NULL DEFAULT 0,"
+        " size_bytes INTEGER NOT NULL,"
+        " created_at REAL NOT NULL,"
+        " last_access REAL NOT NULL,"
+        " PRIMARY KEY (content_hash, parser_version))"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_parse_cache_lru ON parse_cache (last_access)")
+    _conn = (path, os.getpid(), conn)
+    return conn
+
+
+def _close_connection() -> None:
+    global _conn
+    if _conn is None:
+        return
+    _, conn_pid, conn = _conn
+    _conn = None
+    if conn_pid == os.getpid():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's bytes (same digest the download activity records)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def get_cached_parse(content_hash: str, parser_version: str) -> Optional[CachedParse]:
+    """Return the cached parse for this content, or None on a miss."""
+    global _hits, _misses
+    if not content_hash:
+        return None
+
+    try:
+        with _lock:
+            conn = _get_connection()
+            try:
+                row = conn.execute(
+                    "SELECT text, page_count, was_ocr FROM parse_cache"
+                    " WHERE content_hash = ? AND parser_version = ?",
+                    (content_hash, parser_version),
+                ).fetchone()
+                if row is None:
+                    _misses += 1
+                    return None
+                conn.execute(
+                    "UPDATE parse_cache SET last_access = ?"
+                    " WHERE content_hash = ? AND parser_version = ?",
+                    (time.time(), content_hash, parser_version),
+                )
+                conn.commit()
+                _hits += 1
+            except sqlite3.Error:
+                _close_connection()
+                raise
+        return CachedParse(
+            text=zlib.decompress(row[0]).decode("utf-8"),
+            page_count=row[1],
+            was_ocr=bool(row[2]),
+        )
+    except (sqlite3.Error, OSError, zlib.error, UnicodeDecodeError) as e:
+        logger.warning(f"Parse cache lookup failed for {content_hash[:12]}...: {e}")
+        return None
+
+
+def store_parse(
+    content_hash: str,
+    parser_version: str,
+    text: str,
+    page_count: Optional[int] = None,
+    was_ocr: bool = False,
+) -> bool:
+    """Store a successful parse and evict LRU rows beyond the size budget."""
+    global _stores, _evictions
+    if not content_hash or not text:
+        return False
+
+    blob = zlib.compress(text.encode("utf-8"), 6)
+    max_bytes = _max_bytes()
+    if len(blob) > max_bytes:
+        return False
+
+    now = time.time()
+    try:
+        with _lock:
+            conn = _get_connection()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO parse_cache"
+                    " (content_hash, parser_version, text, page_count, was_ocr, size_bytes, created_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (content_hash, parser_version, blob, page_count, int(was_ocr), len(blob), now, now),
+                )
+                total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM parse_cache").fetchone()[0]
+                if total > max_bytes:
+                    rows = conn.execute(
+                        "SELECT content_hash, parser_version, size_bytes FROM parse_cache"
+                        " ORDER BY last_access ASC"
+                    ).fetchall()
+                    for row_hash, row_version, size_bytes in rows:
+                        if total <= max_bytes:
+                            break
+                        if (row_hash, row_version) == (content_hash, parser_version):
+                            continue
+                        conn.execute(
+                            "DELETE FROM parse_cache WHERE content_hash = ? AND parser_version = ?",
+                            (row_hash, row_version),
+                        )
+                        total -= size_bytes
+                        _evictions += 1
+                conn.commit()
+                _stores += 1
+            except sqlite3.Error:
+                _close_connection()
+                raise
+        return True
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Parse cache store failed for {content_hash[:12]}...: {e}")
+        return False
+
+
+def snapshot() -> Dict[str, object]:
+    with _lock:
+        lookups = _hits + _misses
+        return {
+            "hits": _hits,
+            "misses": _misses,
+            "hit_rate": round(_hits / lookups, 4) if lookups else 0.0,
+            "stores": _stores,
+            "evictions": _evictions,
+        }
+
+
+def reset() -> None:
+    global _hits, _misses, _stores, _evictions
+    with _lock:
+        _close_connection()
+        _hits = 0
+        _misses = 0
+        _stores = 0
+        _evictions = 0
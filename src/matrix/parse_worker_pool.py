@@ -0,0 +1,382 @@
+"""
+Parse Worker Pool — lazily-started, size-aware process pool for document parsing.
+
+Replaces the import-time ProcessPoolExecutor(max_workers=4) in document_parser:
+
+  - No worker processes exist until the first job is submitted.
+  - Worker count is derived from available cores and memory (overridable).
+  - Each job runs under a per-job timeout (SIGALRM inside the worker) and an
+    optional address-space cap, so one pathological file cannot wedge a worker.
+  - Workers are recycled after N jobs to contain MarkItDown / PyMuPDF leaks.
+  - Jobs wait in a priority heap keyed by size, so a small upload is never
+    queued behind a 500-page PDF. Waiting jobs age (priority_aging_per_second
+    is subtracted per second queued) so a large upload is not starved by a
+    steady stream of small ones. Only `max_workers` jobs are ever handed to
+    the executor, which keeps its internal FIFO from defeating the priority.
+  - A broken or wedged executor is replaced once: restarts name the executor
+    they saw fail, so late failures from an old pool never discard a new one.
+  - Queue depth, wait and run latency are tracked for snapshot().
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("matrix_client.parse_worker_pool")
+
+# Rough peak RSS of one MarkItDown/OCR job; used only for sizing the pool.
+_DEFAULT_JOB_MEMORY_ESTIMATE_MB = 768
+_MAX_DEFAULT_WORKERS = 8
+# Extra time the parent waits beyond the in-worker alarm before declaring a worker stuck
+_HARD_TIMEOUT_GRACE_SECONDS = 15.0
+# 1 MiB of input per second waited: a 60 MB PDF outranks fresh small uploads after a minute
+_DEFAULT_PRIORITY_AGING_PER_SECOND = 1024 * 1024
+
+
+class ParseJobTimeout(Exception):
+    """Raised inside a worker when a job exceeds its time budget."""
+    pass
+
+
+@dataclass
+class ParseWorkerPoolConfig:
+    """Configuration for the parse worker pool."""
+    max_workers: int = 0  # 0 = auto-size from cores/memory
+    max_tasks_per_child: int = 25
+    job_memory_limit_mb: int = 0  # 0 = no per-job address-space cap
+    job_memory_estimate_mb: int = _DEFAULT_JOB_MEMORY_ESTIMATE_MB
+    # Priority units (input bytes) a waiting job gains per second queued
+    priority_aging_per_second: float = _DEFAULT_PRIORITY_AGING_PER_SECOND
+
+    @classmethod
+    def from_env(cls) -> "ParseWorkerPoolConfig":
+        return cls(
+            max_workers=int(os.getenv("DOCUMENT_PARSING_POOL_WORKERS", "0")),
+            max_tasks_per_child=int(os.getenv("DOCUMENT_PARSING_POOL_MAX_TASKS_PER_CHILD", "25")),
+            job_memory_limit_mb=int(os.getenv("DOCUMENT_PARSING_JOB_MEMORY_LIMIT_MB", "0")),
+            job_memory_estimate_mb=int(
+                os.getenv("DOCUMENT_PARSING_JOB_MEMORY_ESTIMATE_MB", str(_DEFAULT_JOB_MEMORY_ESTIMATE_MB))
+            ),
+            priority_aging_per_second=float(
+                os.getenv("DOCUMENT_PARSING_PRIORITY_AGING_PER_SECOND", str(_DEFAULT_PRIORITY_AGING_PER_SECOND))
+            ),
+        )
+
+
+def _available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def _available_memory_mb() -> Optional[int]:
+    """Best-effort available memory, honouring a cgroup v2 limit when present."""
+    available: Optional[int] = None
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) // 1024
+                    break
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            raw = f.read().strip()
+        if raw != "max":
+            limit_mb = int(raw) // (1024 * 1024)
+            with open("/sys/fs/cgroup/memory.current") as f:
+                used_mb = int(f.read().strip()) // (1024 * 1024)
+            cgroup_free = max(0, limit_mb - used_mb)
+            available = cgroup_free if available is None else min(available, cgroup_free)
+    except (OSError, ValueError):
+        pass
+
+    return available
+
+
+def compute_worker_count(config: ParseWorkerPoolConfig) -> int:
+    """Pick a worker count from cores and memory unless explicitly configured."""
+    if config.max_workers > 0:
+        return config.max_workers
+
+    workers = min(_available_cpus(), _MAX_DEFAULT_WORKERS)
+    memory_mb = _available_memory_mb()
+    per_job_mb = config.job_memory_limit_mb or config.job_memory_estimate_mb
+    if memory_mb is not None and per_job_mb > 0:
+        workers = min(workers, memory_mb // per_job_mb)
+    return max(1, workers)
+
+
+def _init_parse_worker(job_memory_limit_mb: int) -> None:
+    """Worker initializer: apply the per-job address-space cap."""
+    if job_memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+
+        limit = job_memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f"Could not apply parse worker memory limit: {e}")
+
+
+def _raise_job_timeout(signum, frame) -> None:
+    raise ParseJobTimeout("Parse job exceeded its time budget")
+
+
+def _run_job(fn: Callable[..., Any], timeout_seconds: Optional[float], *args: Any) -> Any:
+    """Run fn(*args) with a SIGALRM-based timeout when executing in a worker's main thread."""
+    use_alarm = bool(timeout_seconds) and threading.current_thread() is threading.main_thread()
+    if not use_alarm:
+        return fn(*args)
+
+    import signal
+
+    previous = signal.signal(signal.SIGALRM, _raise_job_timeout)
+    previous_remaining, _ = signal.setitimer(signal.ITIMER_REAL, float(timeout_seconds))
+    started = time.monotonic()
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+        if previous_remaining > 0:
+            # Re-arm whatever alarm was pending before this job
+            signal.setitimer(
+                signal.ITIMER_REAL,
+                max(0.001, previous_remaining - (time.monotonic() - started)),
+            )
+
+
+class ParseWorkerPool:
+    """Priority-scheduled wrapper around a lazily-created ProcessPoolExecutor."""
+
+    def __init__(self, config: Optional[ParseWorkerPoolConfig] = None):
+        self.config = config or ParseWorkerPoolConfig()
+        self.max_workers = compute_worker_count(self.config)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self._running = 0
+        self._seq = itertools.count()
+        self._reset_metrics()
+
+    @classmethod
+    def from_env(cls) -> "ParseWorkerPool":
+        return cls(ParseWorkerPoolConfig.from_env())
+
+    # -------------------------------------------------------------------
+    # Executor lifecycle
+    # -------------------------------------------------------------------
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is not None and getattr(self._executor, "_broken", False):
+                self._discard_executor(terminate=False)
+            if self._executor is None:
+                kwargs: Dict[str, Any] = {
+                    "max_workers": self.max_workers,
+                    "initializer": _init_parse_worker,
+                    "initargs": (self.config.job_memory_limit_mb,),
+                }
+                if self.config.max_tasks_per_child > 0:
+                    # Worker recycling is only supported with the spawn start method
+                    kwargs["max_tasks_per_child"] = self.config.max_tasks_per_child
+                    kwargs["mp_context"] = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(**kwargs)
+                logger.info(
+                    f"Started parse worker pool: workers={self.max_workers}, "
+                    f"max_tasks_per_child={self.config.max_tasks_per_child}, "
+                    f"job_memory_limit_mb={self.config.job_memory_limit_mb or 'none'}"
+                )
+            return self._executor
+
+    def _discard_executor(self, terminate: bool) -> None:
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        if terminate:
+            # A wedged worker ignores cancel_futures; kill processes so slots free up
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                try:
+                    process.terminate()
+                except (OSError, AttributeError) as e:
+                    logger.debug(f"Failed to terminate parse worker: {e}")
+        try:
+            executor.shutdown(wait=False, cancel_futures=True)
+        except (RuntimeError, OSError) as e:
+            logger.debug(f"Parse worker pool shutdown failed: {e}")
+
+    def restart(self, terminate: bool = False, executor: Optional[ProcessPoolExecutor] = None) -> bool:
+        """Drop the current executor; a fresh one is created on the next job.
+
+        With ``executor``, only if that executor is still the current one, so
+        every job that saw the same pool break triggers a single restart.
+        """
+        with self._executor_lock:
+            if executor is not None and self._executor is not executor:
+                return False
+            if self._executor is not None:
+                self._restarts += 1
+            self._discard_executor(terminate=terminate)
+            return True
+
+    def restart_if_broken(self) -> bool:
+        """Restart only when the current executor is marked broken."""
+        executor = self._executor
+        if executor is None or not getattr(executor, "_broken", False):
+            return False
+        return self.restart(executor=executor)
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            self._discard_executor(terminate=False)
+
+    # -------------------------------------------------------------------
+    # Priority slots
+    # -------------------------------------------------------------------
+
+    async def _acquire(self, priority: int) -> None:
+        if self._running < self.max_workers and not self._waiters:
+            self._running += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        # Every waiter ages at the same rate, so ordering by priority minus the
+        # aging bonus reduces to this key fixed at enqueue time
+        key = priority + self.config.priority_aging_per_second * time.monotonic()
+        heapq.heappush(self._waiters, (key, next(self._seq), waiter))
+        self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed to us after cancellation — pass it on
+                self._release()
+            else:
+                self._waiters = [w for w in self._waiters if w[2] is not waiter]
+                heapq.heapify(self._waiters)
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._running -= 1
+
+    # -------------------------------------------------------------------
+    # Job execution
+    # -------------------------------------------------------------------
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        priority: int = 0,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Run fn(*args) in a worker process.
+
+        Lower ``priority`` values run first (callers pass the input size).
+        Raises asyncio.TimeoutError when the job exceeds ``timeout``.
+        """
+        queued_at = time.monotonic()
+        self._submitted += 1
+        await self._acquire(priority)
+        started_at = time.monotonic()
+        self._record_wait(started_at - queued_at)
+
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._ensure_executor()
+            hard_timeout = timeout + _HARD_TIMEOUT_GRACE_SECONDS if timeout else None
+            try:
+                future = loop.run_in_executor(executor, _run_job, fn, timeout, *args)
+                result = await asyncio.wait_for(future, timeout=hard_timeout)
+            except ParseJobTimeout as e:
+                self._timed_out += 1
+                raise asyncio.TimeoutError(str(e)) from e
+            except asyncio.TimeoutError:
+                self._timed_out += 1
+                logger.warning(
+                    f"Parse worker ignored its {timeout}s alarm; terminating pool workers"
+                )
+                self.restart(terminate=True, executor=executor)
+                raise
+            except BrokenProcessPool:
+                self._failed += 1
+                self.restart(executor=executor)
+                raise
+            except Exception:
+                self._failed += 1
+                raise
+            self._completed += 1
+            return result
+        finally:
+            self._record_run(time.monotonic() - started_at)
+            self._release()
+
+    # -------------------------------------------------------------------
+    # Metrics
+    # -------------------------------------------------------------------
+
+    def _reset_metrics(self) -> None:
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._restarts = 0
+        self._max_queue_depth = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+        self._run_count = 0
+
+    def _record_wait(self, seconds: float) -> None:
+        self._wait_total += seconds
+        self._wait_max = max(self._wait_max, seconds)
+
+    def _record_run(self, seconds: float) -> None:
+        self._run_total += seconds
+        self._run_max = max(self._run_max, seconds)
+        self._run_count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        started = self._submitted - len(self._waiters)
+        return {
+            "started": self.started,
+            "max_workers": self.max_workers,
+            "running": self._running,
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self._max_queue_depth,
+            "jobs_submitted": self._submitted,
+            "jobs_completed": self._completed,
+            "jobs_failed": self._failed,
+            "jobs_timed_out": self._timed_out,
+            "restarts": self._restarts,
+            "avg_wait_ms": round(self._wait_total * 1000 / started, 1) if started > 0 else 0.0,
+            "max_wait_ms": round(self._wait_max * 1000, 1),
+            "avg_run_ms": round(self._run_total * 1000 / self._run_count, 1) if self._run_count else 0.0,
+            "max_run_ms": round(self._run_max * 1000, 1),
+        }
+
+    def reset_metrics(self) -> None:
+        self._reset_metrics()
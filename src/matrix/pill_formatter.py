@@ -13,12 +13,8 @@ import logging
 import re
 from typing import List, Optional, Tuple
 
-from src.core.mapping_service import get_mapping_by_agent_name, get_mapping_by_matrix_user
-from src.matrix.mention_routing import (
-    FRIENDLY_MENTION_PATTERN,
-    MXID_PATTERN,
-    OC_MXID_PATTERN,
-)
+from src.matrix.mention_index import get_mention_index
+from src.matrix.mention_routing import OC_MXID_PATTERN
 
 logger = logging.getLogger(__name__)
 
@@ -46,48 +42,24 @@ def _resolve_mentions(plain_text: str) -> List[Tuple[str, str, str]]:
     results: list[Tuple[str, str, str]] = []
     resolved_spans: list[Tuple[int, int]] = []
 
-    # 1. Full MXIDs (@user:domain) — highest priority
-    for match in MXID_PATTERN.finditer(plain_text):
+    # 1. OpenCode MXIDs (not agent mappings) — use MXID as display name
+    for match in OC_MXID_PATTERN.finditer(plain_text):
         full_mxid = match.group(0)
+        resolved_spans.append(match.span())
         if full_mxid in seen_texts:
             continue
+        results.append((full_mxid, full_mxid, full_mxid))
+        seen_texts.add(full_mxid)
 
-        mapping = get_mapping_by_matrix_user(full_mxid)
-        if mapping:
-            display_name = mapping.get("agent_name", full_mxid)
-            results.append((full_mxid, full_mxid, display_name))
-            seen_texts.add(full_mxid)
-            resolved_spans.append(match.span())
-        elif OC_MXID_PATTERN.match(full_mxid):
-            # OpenCode MXIDs — use MXID as display name
-            results.append((full_mxid, full_mxid, full_mxid))
-            seen_texts.add(full_mxid)
-            resolved_spans.append(match.span())
-
-    # 2. Friendly @Name mentions
-    for match in FRIENDLY_MENTION_PATTERN.finditer(plain_text):
-        name = match.group(1)
-        full_match = match.group(0)
-        span = match.span()
-
-        # Skip if overlaps with already-resolved MXID match
-        if any(s[0] <= span[0] < s[1] for s in resolved_spans):
+    # 2. Agent MXIDs, localparts and names — one pass over the shared mention index
+    for match in get_mention_index().find_mentions(plain_text):
+        # Skip if overlaps with an OpenCode MXID
+        if any(s[0] <= match.start < s[1] for s in resolved_spans):
             continue
-
-        # Skip email-like patterns
-        if span[0] > 0 and plain_text[span[0] - 1].isalnum():
+        if match.text in seen_texts or not match.matrix_user_id:
             continue
-
-        if full_match in seen_texts:
-            continue
-
-        mapping = get_mapping_by_agent_name(name, fuzzy=True)
-        if mapping:
-            mxid = mapping["matrix_user_id"]
-            display_name = mapping.get("agent_name", name)
-            results.append((full_match, mxid, display_name))
-            seen_texts.add(full_match)
-            resolved_spans.append(span)
+        results.append((match.text, match.matrix_user_id, match.agent_name or match.matrix_user_id))
+        seen_texts.add(match.text)
 
     return results
 
@@ -0,0 +1,324 @@
+"""
+Sync loop tuning — per-deployment /sync filters, a persisted since token,
+and response size / parse time counters.
+
+main() runs one initial sync (timeline limit 0, so history is skipped) and
+then sync_forever. Both filters are built from SyncSettings.from_env():
+
+  * MATRIX_SYNC_TIMELINE_LIMIT     — timeline events per room per sync (50)
+  * MATRIX_SYNC_LAZY_LOAD_MEMBERS  — only send member state for timeline senders
+  * MATRIX_SYNC_EVENT_TYPES        — comma-separated timeline whitelist (all);
+                                     must keep m.room.message and poll responses
+  * MATRIX_SYNC_NOT_EVENT_TYPES    — timeline types to drop
+  * MATRIX_SYNC_STATE_EVENT_TYPES  — state whitelist (all)
+  * MATRIX_SYNC_EXCLUDE_EPHEMERAL  — drop typing / receipts (true)
+
+Presence and account data (global and per room) are always filtered out;
+no callback reads them.
+
+With MATRIX_SYNC_RESUME the latest ``next_batch`` is written to
+MATRIX_SYNC_TOKEN_PATH (atomically, at most every
+MATRIX_SYNC_TOKEN_SAVE_INTERVAL seconds, and on shutdown). On restart the
+initial sync continues from that token instead of starting from scratch, so
+nothing is delivered twice. MATRIX_SYNC_CATCH_UP also replays messages sent
+while the client was down, up to the timeline limit per room. A token that
+is too old, belongs to another account, or is rejected by the homeserver
+falls back to a fresh initial sync. The resumed sync still carries full
+room state so nio knows every room's name; MATRIX_SYNC_RESUME_FULL_STATE=false
+skips it for the fastest restart, but rooms then have no names until their
+state changes.
+
+instrument_sync_metrics() times nio's decoding of every SyncResponse and
+counts response bytes. The totals are in snapshot().
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from nio import SyncResponse
+
+logger = logging.getLogger("matrix_client.sync_tuning")
+
+# Single responses slower than this to decode are logged as warnings
+SLOW_PARSE_SECONDS = float(os.getenv("MATRIX_SYNC_SLOW_PARSE_SECONDS", "1.0"))
+
+_lock = threading.Lock()
+_responses = 0
+_errors = 0
+_bytes_total = 0
+_bytes_max = 0
+_parse_seconds_total = 0.0
+_parse_seconds_max = 0.0
+_last_joined_rooms = 0
+_last_timeline_events = 0
+_token_saves = 0
+_resumed = False
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {'1', 'true', 'yes', 'on'}
+
+
+def _env_list(name: str) -> Optional[List[str]]:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return None
+    return [item.strip() for item in raw.split(',') if item.strip()]
+
+
+@dataclass
+class SyncSettings:
+    timeline_limit: int = 50
+    lazy_load_members: bool = True
+    event_types: Optional[List[str]] = None
+    not_event_types: List[str] = field(default_factory=list)
+    state_event_types: Optional[List[str]] = None
+    exclude_ephemeral: bool = True
+    timeout_ms: int = 5000
+    initial_timeout_ms: int = 30000
+    resume: bool = True
+    # Send full room state with a resumed sync so nio knows every room's name
+    resume_full_state: bool = True
+    catch_up: bool = False
+    token_path: str = "/app/data/matrix_sync_token.json"
+    token_max_age_seconds: float = 86400.0
+    token_save_interval_seconds: float = 5.0
+
+    @classmethod
+    def from_env(cls) -> "SyncSettings":
+        data_dir = os.getenv("MATRIX_DATA_DIR", "/app/data")
+        return cls(
+            timeline_limit=int(os.getenv("MATRIX_SYNC_TIMELINE_LIMIT", "50")),
+            lazy_load_members=_env_bool("MATRIX_SYNC_LAZY_LOAD_MEMBERS", True),
+            event_types=_env_list("MATRIX_SYNC_EVENT_TYPES"),
+            not_event_types=_env_list("MATRIX_SYNC_NOT_EVENT_TYPES") or [],
+            state_event_types=_env_list("MATRIX_SYNC_STATE_EVENT_TYPES"),
+            exclude_ephemeral=_env_bool("MATRIX_SYNC_EXCLUDE_EPHEMERAL", True),
+            timeout_ms=int(os.getenv("MATRIX_SYNC_TIMEOUT_MS", "5000")),
+            initial_timeout_ms=int(os.getenv("MATRIX_SYNC_INITIAL_TIMEOUT_MS", "30000")),
+            resume=_env_bool("MATRIX_SYNC_RESUME", True),
+            resume_full_state=_env_bool("MATRIX_SYNC_RESUME_FULL_STATE", True),
+            catch_up=_env_bool("MATRIX_SYNC_CATCH_UP", False),
+            token_path=os.getenv("MATRIX_SYNC_TOKEN_PATH", os.path.join(data_dir, "matrix_sync_token.json")),
+            token_max_age_seconds=float(os.getenv("MATRIX_SYNC_TOKEN_MAX_AGE_SECONDS", "86400")),
+            token_save_interval_seconds=float(os.getenv("MATRIX_SYNC_TOKEN_SAVE_INTERVAL", "5")),
+        )
+
+    def build_filter(self, initial: bool = False) -> Dict[str, Any]:
+        """The /sync filter dict; ``initial`` drops the timeline to skip history."""
+        timeline: Dict[str, Any] = {"limit": 0 if initial else self.timeline_limit}
+        if self.event_types is not None:
+            timeline["types"] = list(self.event_types)
+        if self.not_event_types:
+            timeline["not_types"] = list(self.not_event_types)
+        state: Dict[str, Any] = {"lazy_load_members": self.lazy_load_members}
+        if self.state_event_types is not None:
+            state["types"] = list(self.state_event_types)
+        room: Dict[str, Any] = {
+            "timeline": timeline,
+            "state": state,
+            "account_data": {"types": []},
+        }
+        if self.exclude_ephemeral:
+            room["ephemeral"] = {"types": []}
+        return {
+            "room": room,
+            "presence": {"types": []},
+            "account_data": {"types": []},
+        }
+
+
+class SyncTokenStore:
+    """The latest ``next_batch`` for one account, kept in a small JSON file."""
+
+    def __init__(
+        self,
+        path: str,
+        user_id: str,
+        homeserver_url: str,
+        max_age_seconds: float = 86400.0,
+        save_interval_seconds: float = 5.0,
+    ) -> None:
+        self.path = path
+        self.user_id = user_id
+        self.homeserver_url = homeserver_url
+        self.max_age_seconds = max_age_seconds
+        self.save_interval_seconds = save_interval_seconds
+        self._saved_token: Optional[str] = None
+        self._last_save = 0.0
+
+    def load(self) -> Optional[str]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f'Could not read sync token from {self.path}: {e}')
+            return None
+        if not isinstance(data, dict):
+            return None
+        if data.get('user_id') != self.user_id or data.get('homeserver_url') != self.homeserver_url:
+            logger.info('Stored sync token belongs to another account, ignoring it')
+            return None
+        age = time.time() - float(data.get('saved_at') or 0)
+        if age > self.max_age_seconds:
+            logger.info(f'Stored sync token is {age:.0f}s old, starting a fresh sync')
+            return None
+        token = data.get('next_batch')
+        self._saved_token = token
+        return token or None
+
+    def save(self, token: Optional[str], force: bool = False) -> bool:
+        """Write ``token`` unless it is unchanged or the last write was too recent."""
+        global _token_saves
+        if not token or token == self._saved_token:
+            return False
+        now = time.monotonic()
+        if not force and now - self._last_save < self.save_interval_seconds:
+            return False
+        payload = {
+            'next_batch': token,
+            'user_id': self.user_id,
+            'homeserver_url': self.homeserver_url,
+            'saved_at': time.time(),
+        }
+        tmp_path = f'{self.path}.tmp'
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f'Could not save sync token to {self.path}: {e}')
+            return False
+        self._saved_token = token
+        self._last_save = now
+        with _lock:
+            _token_saves += 1
+        return True
+
+    async def on_sync_response(self, response: SyncResponse) -> None:
+        """nio response callback for sync_forever."""
+        self.save(response.next_batch)
+
+
+def _record_response(response: Any, body_bytes: int, parse_seconds: float) -> None:
+    global _responses, _errors, _bytes_total, _bytes_max, _parse_seconds_total, _parse_seconds_max
+    global _last_joined_rooms, _last_timeline_events
+    if not isinstance(response, SyncResponse):
+        with _lock:
+            _errors += 1
+        return
+    joined = response.rooms.join
+    timeline_events = sum(len(room.timeline.events) for room in joined.values())
+    with _lock:
+        _responses += 1
+        _bytes_total += body_bytes
+        _bytes_max = max(_bytes_max, body_bytes)
+        _parse_seconds_total += parse_seconds
+        _parse_seconds_max = max(_parse_seconds_max, parse_seconds)
+        _last_joined_rooms = len(joined)
+        _last_timeline_events = timeline_events
+    if parse_seconds >= SLOW_PARSE_SECONDS:
+        logger.warning(
+            f'Slow sync response: {body_bytes} bytes, {len(joined)} rooms, '
+            f'{timeline_events} timeline events decoded in {parse_seconds * 1000:.0f}ms'
+        )
+    else:
+        logger.debug(
+            f'Sync response: {body_bytes} bytes, {len(joined)} rooms, '
+            f'{timeline_events} timeline events decoded in {parse_seconds * 1000:.1f}ms'
+        )
+
+
+def instrument_sync_metrics(client: Any) -> None:
+    """Record body size and decode time of every SyncResponse this client builds."""
+    create_matrix_response = client.create_matrix_response
+
+    async def _create_matrix_response(response_class, transport_response, *args, **kwargs):
+        if response_class is not SyncResponse:
+            return await create_matrix_response(response_class, transport_response, *args, **kwargs)
+        # read() caches the body, so the timed part below is JSON decoding + nio's parse
+        body = await transport_response.read()
+        start = time.perf_counter()
+        response = await create_matrix_response(response_class, transport_response, *args, **kwargs)
+        _record_response(response, len(body), time.perf_counter() - start)
+        return response
+
+    client.create_matrix_response = _create_matrix_response
+
+
+async def run_initial_sync(
+    client: Any,
+    settings: SyncSettings,
+    token_store: Optional[SyncTokenStore],
+    logger: logging.Logger,
+) -> Any:
+    """Resume from the stored token if there is a usable one, else a fresh history-skipping sync."""
+    global _resumed
+    since = token_store.load() if token_store else None
+    if since:
+        # timeout=0: nothing new since the token must not long-poll startup
+        response = await client.sync(
+            timeout=0,
+            full_state=settings.resume_full_state,
+            sync_filter=settings.build_filter(initial=not settings.catch_up),
+            since=since,
+        )
+        if isinstance(response, SyncResponse):
+            with _lock:
+                _resumed = True
+            logger.info(f'Resumed sync from stored token (catch_up={settings.catch_up})')
+            return response
+        logger.warning(f'Stored sync token was rejected, starting a fresh sync: {response}')
+
+    with _lock:
+        _resumed = False
+    return await client.sync(
+        timeout=settings.initial_timeout_ms,
+        full_state=False,
+        sync_filter=settings.build_filter(initial=True),
+    )
+
+
+def snapshot() -> Dict[str, object]:
+    with _lock:
+        return {
+            "sync_responses_total": _responses,
+            "sync_errors_total": _errors,
+            "sync_bytes_total": _bytes_total,
+            "sync_bytes_max": _bytes_max,
+            "sync_parse_seconds_total": _parse_seconds_total,
+            "sync_parse_seconds_max": _parse_seconds_max,
+            "sync_last_joined_rooms": _last_joined_rooms,
+            "sync_last_timeline_events": _last_timeline_events,
+            "sync_token_saves_total": _token_saves,
+            "sync_resumed": _resumed,
+        }
+
+
+def reset() -> None:
+    global _responses, _errors, _bytes_total, _bytes_max, _parse_seconds_total, _parse_seconds_max
+    global _last_joined_rooms, _last_timeline_events, _token_saves, _resumed
+    with _lock:
+        _responses = 0
+        _errors = 0
+        _bytes_total = 0
+        _bytes_max = 0
+        _parse_seconds_total = 0.0
+        _parse_seconds_max = 0.0
+        _last_joined_rooms = 0
+        _last_timeline_events = 0
+        _token_saves = 0
+        _resumed = False
@@ -3,6 +3,7 @@ Background Letta task management — dispatch, cancel, and track async tasks.
 
 Includes a per-room message queue so incoming messages received while an
 agent is busy are not dropped but processed after the current task finishes.
+Silent (listen-mode) messages bypass both and are batched by listen_digest.
 """
 
 import asyncio
@@ -15,9 +16,15 @@ from typing import Any, Dict, Optional, Tuple
 
 import aiohttp
 
+from src.matrix import formatter as matrix_formatter
+from src.matrix import listen_digest
 from src.matrix.agent_actions import send_as_agent
 from src.matrix.config import Config, LettaApiError, MatrixClientError
-from src.matrix.message_processor import MessageContext, process_letta_message
+from src.matrix.message_processor import (
+    MessageContext,
+    process_letta_message,
+    process_listen_digest,
+)
 
 logger = logging.getLogger("matrix_client")
 
@@ -51,6 +58,71 @@ class _QueuedMessage:
 _pending_queues: Dict[Tuple[str, str], collections.deque] = {}
 
 
+@dataclass
+class _DigestTarget:
+    """Where a buffered listen-mode digest is delivered when it flushes on its own."""
+    room_id: str
+    room_display_name: str
+    room_agent_id: Optional[str]
+    config: Any
+    logger: Any
+
+
+def _buffer_listen_message(key: Tuple[str, str], room, event, config, logger, room_agent_id, message_text) -> None:
+    source = getattr(event, 'source', None)
+    timestamp = source.get('origin_server_ts') if isinstance(source, dict) else None
+    sender_name = room.user_name(event.sender) if hasattr(room, 'user_name') else None
+    listen_digest.add(
+        key,
+        listen_digest.DigestEntry(
+            sender=event.sender,
+            sender_name=sender_name or event.sender,
+            text=message_text,
+            event_id=getattr(event, 'event_id', None),
+            timestamp=timestamp or int(time.time() * 1000),
+        ),
+        _DigestTarget(
+            room_id=room.room_id,
+            room_display_name=room.display_name or room.room_id,
+            room_agent_id=room_agent_id,
+            config=config,
+            logger=logger,
+        ),
+        _on_listen_digest_due,
+    )
+    logger.debug(
+        f'[LISTEN-DIGEST] Buffered silent message for {key} '
+        f'({listen_digest.pending_count(key)} pending)'
+    )
+
+
+def _on_listen_digest_due(key: Tuple[str, str], reason: str) -> None:
+    """Timer callback: send the buffered digest as its own turn once the agent is idle."""
+    existing = _active_letta_tasks.get(key)
+    if existing and not existing.done():
+        listen_digest.defer(key, _on_listen_digest_due, reason)
+        return
+    pending = listen_digest.take(key, reason)
+    if pending is None:
+        return
+    target: _DigestTarget = pending.context
+    target.logger.info(
+        f'[LISTEN-DIGEST] Flushing {len(pending.entries)} silent messages for {key} (reason={reason})'
+    )
+    task = asyncio.get_event_loop().create_task(
+        process_listen_digest(
+            room_id=target.room_id,
+            room_display_name=target.room_display_name,
+            room_agent_id=target.room_agent_id,
+            entries=pending.entries,
+            config=target.config,
+            logger=target.logger,
+        )
+    )
+    task.add_done_callback(lambda t: _on_letta_task_done(key, t))
+    _active_letta_tasks[key] = task
+
+
 def _on_letta_task_done(key: Tuple[str, str], task: asyncio.Task) -> None:
     _active_letta_tasks.pop(key, None)
     if task.cancelled():
@@ -194,6 +266,11 @@ async def _dispatch_letta_task(
     auth_manager=None,
 ) -> bool:
     task_key = (room.room_id, room_agent_id or 'unknown')
+    silent_mode = bool(gating_result and gating_result.silent) if gating_result else False
+    if silent_mode and listen_digest.DIGEST_ENABLED:
+        _buffer_listen_message(task_key, room, event, config, logger, room_agent_id, message_text)
+        return True
+
     thread_event_id: Optional[str] = None
     thread_latest_event_id: Optional[str] = None
     reply_event_id_for_notice: Optional[str] = None
@@ -276,7 +353,12 @@ async def _dispatch_letta_task(
 
     event_source = getattr(event, 'source', None)
     event_source = event_source if isinstance(event_source, dict) else None
-    silent_mode = bool(gating_result and gating_result.silent) if gating_result else False
+    digest_envelope = None
+    pending_digest = listen_digest.take(task_key, 'merged') if not silent_mode else None
+    if pending_digest is not None:
+        digest_envelope = matrix_formatter.format_listen_digest_envelope(
+            room.room_id, room.display_name or room.room_id, pending_digest.entries
+        )
     sender_display_name = room.user_name(event.sender) if hasattr(room, 'user_name') else None
     msg_ctx = MessageContext(
         event_body=message_text,
@@ -293,6 +375,7 @@ async def _dispatch_letta_task(
         client=client,
         silent_mode=silent_mode,
         auth_manager=auth_manager,
+        listen_digest=digest_envelope,
     )
     task = asyncio.create_task(process_letta_message(msg_ctx))
     task.add_done_callback(lambda t: _on_letta_task_done(task_key, t))
@@ -94,6 +94,7 @@ class TemporalFileWorkflowMixin:
             status_event_id=eid,
             file_size=metadata.file_size,
             conversation_id=conversation_id,
+            streaming_parse=os.environ.get('DOCUMENT_PARSING_STREAMING', 'false').lower() == 'true',
         )
 
         workflow_id = f"file-{room_id}-{metadata.event_id}-{uuid.uuid4().hex[:8]}"
@@ -9,10 +9,10 @@ Tables:
 - inter_agent_conversations: Tracks conversations between agents for @mention routing
 """
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 from sqlalchemy import (
     Column, String, DateTime, Integer, Text,
-    Index, UniqueConstraint
+    Index, UniqueConstraint, bindparam, update
 )
 from sqlalchemy.orm import Session
 from .agent_mapping import Base, get_session_maker
@@ -322,6 +322,48 @@ class RoomConversationDB:
         finally:
             session.close()
 
+    def touch_many(
+        self,
+        touches: Dict[Tuple[str, str, Optional[str], Optional[str]], datetime],
+    ) -> int:
+        """
+        Set last_message_at for many conversations in one executemany UPDATE.
+        
+        Args:
+            touches: (room_id, agent_id, user_mxid, thread_event_id) → timestamp
+            
+        Returns:
+            Number of rows updated
+        """
+        if not touches:
+            return 0
+        table = RoomConversation.__table__
+        stmt = (
+            update(table)
+            .where(table.c.room_id == bindparam("b_room_id"))
+            .where(table.c.agent_id == bindparam("b_agent_id"))
+            .where(table.c.user_mxid.is_not_distinct_from(bindparam("b_user_mxid")))
+            .where(table.c.thread_event_id.is_not_distinct_from(bindparam("b_thread_event_id")))
+            .values(last_message_at=bindparam("b_last_message_at"))
+        )
+        params = [
+            {
+                "b_room_id": room_id,
+                "b_agent_id": agent_id,
+                "b_user_mxid": user_mxid,
+                "b_thread_event_id": thread_event_id,
+                "b_last_message_at": at,
+            }
+            for (room_id, agent_id, user_mxid, thread_event_id), at in touches.items()
+        ]
+        session = self.Session()
+        try:
+            result = session.execute(stmt, params)
+            session.commit()
+            return max(result.rowcount, 0)
+        finally:
+            session.close()
+
     def delete(
         self,
         room_id: str,
@@ -521,6 +563,48 @@ class InterAgentConversationDB:
         finally:
             session.close()
 
+    def touch_many(
+        self,
+        touches: Dict[Tuple[str, str, str, Optional[str]], datetime],
+    ) -> int:
+        """
+        Set last_message_at for many conversations in one executemany UPDATE.
+        
+        Args:
+            touches: (source_agent_id, target_agent_id, room_id, user_mxid) → timestamp
+            
+        Returns:
+            Number of rows updated
+        """
+        if not touches:
+            return 0
+        table = InterAgentConversation.__table__
+        stmt = (
+            update(table)
+            .where(table.c.source_agent_id == bindparam("b_source_agent_id"))
+            .where(table.c.target_agent_id == bindparam("b_target_agent_id"))
+            .where(table.c.room_id == bindparam("b_room_id"))
+            .where(table.c.user_mxid.is_not_distinct_from(bindparam("b_user_mxid")))
+            .values(last_message_at=bindparam("b_last_message_at"))
+        )
+        params = [
+            {
+                "b_source_agent_id": source_agent_id,
+                "b_target_agent_id": target_agent_id,
+                "b_room_id": room_id,
+                "b_user_mxid": user_mxid,
+                "b_last_message_at": at,
+            }
+            for (source_agent_id, target_agent_id, room_id, user_mxid), at in touches.items()
+        ]
+        session = self.Session()
+        try:
+            result = session.execute(stmt, params)
+            session.commit()
+            return max(result.rowcount, 0)
+        finally:
+            session.close()
+
     def delete(
         self,
         source_agent_id: str,
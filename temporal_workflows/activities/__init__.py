@@ -11,6 +11,7 @@ from .cleanup import (
 )
 from .common import (
     DownloadError,
+    DownloadTooLargeError,
     FileActivityError,
     IngestError,
     MatrixAPIError,
@@ -21,8 +22,10 @@ from .download import (
     MATRIX_ACCESS_TOKEN,
     MATRIX_HOMESERVER_URL,
     PERSISTENT_DOCUMENTS_DIR,
+    DOWNLOAD_MAX_ATTEMPTS,
     DownloadInput,
     DownloadResult,
+    MAX_DOWNLOAD_BYTES,
     _EXT_MAP,
     _HASH_INDEX_FILENAME,
     _HASH_LOCK_FILENAME,
@@ -34,7 +37,15 @@ from .download import (
     _sha256,
     download_file_from_matrix,
 )
-from .ingest import HAYHOOKS_INGEST_URL, IngestInput, IngestResult, ingest_to_haystack
+from .ingest import (
+    HAYHOOKS_INGEST_URL,
+    IngestInput,
+    IngestResult,
+    StreamingIngestInput,
+    StreamingIngestResult,
+    ingest_to_haystack,
+    stream_parse_and_ingest,
+)
 from .notify import (
     LETTA_GATEWAY_API_KEY,
     LETTA_GATEWAY_URL,
@@ -86,6 +97,8 @@ __all__ = [
     "ParseResult",
     "IngestInput",
     "IngestResult",
+    "StreamingIngestInput",
+    "StreamingIngestResult",
     "NotifyAgentInput",
     "NotifyAgentResult",
     "MatrixStatusInput",
@@ -95,11 +108,13 @@ __all__ = [
     "download_file_from_matrix",
     "parse_with_markitdown",
     "ingest_to_haystack",
+    "stream_parse_and_ingest",
     "notify_letta_agent",
     "update_matrix_status",
     "cleanup_file_artifacts",
     "FileActivityError",
     "DownloadError",
+    "DownloadTooLargeError",
     "ParseError",
     "IngestError",
     "NotifyError",
@@ -113,6 +128,8 @@ __all__ = [
     "LETTA_GATEWAY_API_KEY",
     "HAYHOOKS_INGEST_URL",
     "PERSISTENT_DOCUMENTS_DIR",
+    "MAX_DOWNLOAD_BYTES",
+    "DOWNLOAD_MAX_ATTEMPTS",
     "deliver_to_letta",
     "dead_letter_message",
     "send_delivery_ack",
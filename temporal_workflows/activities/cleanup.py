@@ -5,7 +5,8 @@ from dataclasses import dataclass
 from temporalio import activity
 
 from .common import FileActivityError
-from .download import _mutate_hash_index_locked
+from . import download as _download
+from . import hash_store
 
 
 @dataclass
@@ -45,17 +46,9 @@ async def cleanup_file_artifacts(input: CleanupArtifactsInput) -> CleanupArtifac
                     os.rmdir(parent)
 
             if input.file_hash:
-
-                def _remove_hash(index: dict) -> bool:
-                    entry = index.get(input.file_hash)
-                    if not entry:
-                        return False
-                    if input.persistent_path and entry.get("persistent_path") != input.persistent_path:
-                        return False
-                    index.pop(input.file_hash, None)
-                    return True
-
-                hash_entry_removed = _mutate_hash_index_locked(_remove_hash)
+                hash_entry_removed = hash_store.remove(
+                    _download.PERSISTENT_DOCUMENTS_DIR, input.file_hash, input.persistent_path
+                )
 
         elapsed = int((time.monotonic() - start) * 1000)
         activity.logger.info(
@@ -6,6 +6,10 @@ class DownloadError(FileActivityError):
     pass
 
 
+class DownloadTooLargeError(DownloadError):
+    pass
+
+
 class ParseError(FileActivityError):
     pass
 
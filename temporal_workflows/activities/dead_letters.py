@@ -0,0 +1,315 @@
+"""
+Dead-letter persistence and replay.
+
+DeadLetterBuffer collects rows from concurrent dead_letter_message executions
+and writes them to PostgreSQL in one transaction per flush (when
+DEAD_LETTER_BATCH_SIZE rows are buffered or DEAD_LETTER_FLUSH_INTERVAL seconds
+pass), sending a single ntfy summary per flush instead of one alert per
+message. Each caller still waits for the flush that contains its row, so an
+activity only completes once its dead letter is durable.
+
+replay_dead_letters re-drives stored dead letters through the per-agent
+mailbox workflow (oldest first per agent), rate limited, and marks each row
+replayed once Temporal has accepted it. Replays keep the original event_id
+(so a repeated failure upserts the same row back to pending) and dedupe in
+the mailbox on replay_dedupe_key instead. Used by scripts/admin/replay_dead_letters.py.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEAD_LETTER_BATCH_SIZE = int(os.getenv("DEAD_LETTER_BATCH_SIZE", "100"))
+DEAD_LETTER_FLUSH_INTERVAL = float(os.getenv("DEAD_LETTER_FLUSH_INTERVAL", "1.0"))
+
+_UPSERT_SQL = """
+    INSERT INTO dead_letter_messages
+        (event_id, room_id, agent_id, message_body, sender, error, attempts, conversation_id)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    ON CONFLICT (event_id) DO UPDATE SET
+        conversation_id = EXCLUDED.conversation_id,
+        error = EXCLUDED.error,
+        attempts = EXCLUDED.attempts,
+        failed_at = NOW(),
+        replayed_at = NULL
+"""
+
+
+@dataclass
+class DeadLetterRow:
+    event_id: str
+    room_id: str
+    agent_id: str
+    message_body: str
+    sender: str
+    error: str = ""
+    attempts: int = 0
+    conversation_id: str = ""
+
+    def as_params(self) -> tuple:
+        return (
+            self.event_id,
+            self.room_id,
+            self.agent_id,
+            self.message_body[:10000],  # Truncate very long messages
+            self.sender,
+            self.error[:2000] if self.error else "",
+            self.attempts,
+            self.conversation_id or "",
+        )
+
+
+class DeadLetterBuffer:
+    """Batches dead-letter inserts and alerts; see module docstring."""
+
+    def __init__(
+        self,
+        db_url: str,
+        ntfy_url: str,
+        ntfy_topic: str,
+        max_batch: int = DEAD_LETTER_BATCH_SIZE,
+        flush_interval: float = DEAD_LETTER_FLUSH_INTERVAL,
+    ):
+        self._db_url = db_url
+        self._ntfy_url = ntfy_url
+        self._ntfy_topic = ntfy_topic
+        self._max_batch = max(1, max_batch)
+        self._flush_interval = flush_interval
+        self._pending: List[tuple[DeadLetterRow, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: set[asyncio.Task] = set()
+        self._flush_lock = asyncio.Lock()
+        self.flushes = 0
+        self.rows_written = 0
+
+    async def add(self, row: DeadLetterRow) -> None:
+        """Buffer ``row`` and wait until the flush containing it has run.
+
+        Raises the database error if that flush failed (the alert is still sent).
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future))
+        if len(self._pending) >= self._max_batch:
+            self._schedule_flush(0)
+        elif self._timer is None:
+            self._schedule_flush(self._flush_interval)
+        await future
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+
+            # Same event dead-lettered twice in one window: keep the latest
+            latest: Dict[str, DeadLetterRow] = {}
+            for row, _ in batch:
+                latest[row.event_id] = row
+            rows = list(latest.values())
+
+            db_error: Optional[Exception] = None
+            try:
+                await self._write(rows)
+                self.rows_written += len(rows)
+            except Exception as e:
+                db_error = e
+                logger.error(f"Failed to write {len(rows)} dead letters to DB: {e}")
+            self.flushes += 1
+
+            await self._alert(rows, db_error)
+
+            for _, future in batch:
+                if future.done():
+                    continue
+                if db_error is not None:
+                    future.set_exception(db_error)
+                else:
+                    future.set_result(None)
+
+    def _schedule_flush(self, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._timer = None
+        task = asyncio.ensure_future(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _write(self, rows: Sequence[DeadLetterRow]) -> None:
+        import asyncpg
+
+        conn = await asyncpg.connect(self._db_url)
+        try:
+            async with conn.transaction():
+                await conn.executemany(_UPSERT_SQL, [row.as_params() for row in rows])
+        finally:
+            await conn.close()
+
+    async def _alert(self, rows: Sequence[DeadLetterRow], db_error: Optional[Exception]) -> None:
+        if len(rows) == 1:
+            row = rows[0]
+            title = "Dead Letter: Message delivery failed"
+            content = (
+                f"Message to agent {row.agent_id} failed after {row.attempts} attempts.\n"
+                f"Room: {row.room_id}\n"
+                f"Event: {row.event_id}\n"
+                f"Sender: {row.sender}\n"
+                f"Error: {row.error[:200] if row.error else 'Unknown'}"
+            )
+        else:
+            per_agent = Counter(row.agent_id for row in rows)
+            agents = ", ".join(f"{agent} ({count})" for agent, count in per_agent.most_common(10))
+            title = f"Dead Letter: {len(rows)} message deliveries failed"
+            content = (
+                f"{len(rows)} messages dead-lettered across {len(per_agent)} agents.\n"
+                f"Agents: {agents}\n"
+                f"First error: {rows[0].error[:200] if rows[0].error else 'Unknown'}"
+            )
+        if db_error is not None:
+            content += f"\nDB write FAILED: {str(db_error)[:200]}"
+
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                await client.post(
+                    f"{self._ntfy_url}/{self._ntfy_topic}",
+                    headers={"Title": title, "Priority": "high", "Tags": "warning,skull"},
+                    content=content,
+                )
+        except Exception as ntfy_err:
+            logger.warning(f"Failed to send ntfy alert: {ntfy_err}")
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+_PENDING_SQL = """
+    SELECT id, event_id, room_id, agent_id, message_body, sender, attempts,
+           conversation_id, replay_count
+    FROM dead_letter_messages
+    WHERE replayed_at IS NULL
+      AND ($1::text[] IS NULL OR agent_id = ANY($1::text[]))
+    ORDER BY agent_id, created_at, id
+    LIMIT $2
+"""
+
+_MARK_REPLAYED_SQL = """
+    UPDATE dead_letter_messages
+    SET replayed_at = NOW(), replay_count = replay_count + 1
+    WHERE id = ANY($1::int[])
+"""
+
+
+@dataclass
+class ReplayProgress:
+    total: int
+    replayed: int = 0
+    failed: int = 0
+    started_at: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.replayed / elapsed if elapsed > 0 else 0.0
+
+
+def replay_dedupe_key(row: Any) -> str:
+    """Mailbox dedupe key for replaying ``row``.
+
+    The mailbox remembers the original event_id, and a row may be replayed
+    more than once, so each replay gets its own key.
+    """
+    return f"{row['event_id']}#replay-{(row['replay_count'] or 0) + 1}"
+
+
+async def fetch_pending(conn: Any, agent_ids: Optional[List[str]] = None, limit: int = 10000) -> List[Any]:
+    return list(await conn.fetch(_PENDING_SQL, agent_ids or None, limit))
+
+
+async def replay_dead_letters(
+    conn: Any,
+    enqueue: Callable[[Any], Awaitable[None]],
+    *,
+    agent_ids: Optional[List[str]] = None,
+    limit: int = 10000,
+    rate_per_second: float = 5.0,
+    mark_batch: int = 50,
+    dry_run: bool = False,
+    on_progress: Optional[Callable[[ReplayProgress], None]] = None,
+) -> ReplayProgress:
+    """Re-drive dead letters oldest-first per agent through ``enqueue``.
+
+    Agents are replayed concurrently but each agent's messages go out strictly
+    in order; a failure for one agent stops that agent (later messages would
+    otherwise overtake it) and leaves its remaining rows pending. The global
+    rate limit is shared across agents.
+    """
+    rows = await fetch_pending(conn, agent_ids, limit)
+    progress = ReplayProgress(total=len(rows), started_at=time.monotonic())
+    if dry_run or not rows:
+        return progress
+
+    by_agent: Dict[str, List[Any]] = {}
+    for row in rows:
+        by_agent.setdefault(row["agent_id"], []).append(row)
+
+    interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+    rate_lock = asyncio.Lock()
+    next_slot = [time.monotonic()]
+    to_mark: List[int] = []
+    mark_lock = asyncio.Lock()
+
+    async def _wait_for_slot() -> None:
+        async with rate_lock:
+            now = time.monotonic()
+            delay = next_slot[0] - now
+            next_slot[0] = max(now, next_slot[0]) + interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _mark(force: bool = False) -> None:
+        async with mark_lock:
+            if to_mark and (force or len(to_mark) >= mark_batch):
+                ids = list(to_mark)
+                to_mark.clear()
+                await conn.execute(_MARK_REPLAYED_SQL, ids)
+
+    async def _replay_agent(agent_rows: List[Any]) -> None:
+        for index, row in enumerate(agent_rows):
+            await _wait_for_slot()
+            try:
+                await enqueue(row)
+            except Exception as e:
+                remaining = len(agent_rows) - index
+                progress.failed += remaining
+                logger.error(
+                    f"Replay stopped for agent {row['agent_id']} at event {row['event_id']}: {e} "
+                    f"({remaining} left pending)"
+                )
+                if on_progress:
+                    on_progress(progress)
+                return
+            progress.replayed += 1
+            to_mark.append(row["id"])
+            await _mark()
+            if on_progress:
+                on_progress(progress)
+
+    try:
+        await asyncio.gather(*(_replay_agent(agent_rows) for agent_rows in by_agent.values()))
+    finally:
+        await _mark(force=True)
+    return progress
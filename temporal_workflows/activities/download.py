@@ -1,16 +1,22 @@
-import fcntl
+import asyncio
 import hashlib
-import json
+import logging
 import os
+import re
 import shutil
+import sqlite3
 import tempfile
 import time
 from dataclasses import dataclass
+from typing import Optional, Set
 
 import httpx
 from temporalio import activity
 
-from .common import DownloadError
+from . import hash_store
+from .common import DownloadError, DownloadTooLargeError
+
+logger = logging.getLogger(__name__)
 
 MATRIX_HOMESERVER_URL = os.getenv("MATRIX_HOMESERVER_URL", "http://tuwunel:6167")
 MATRIX_ACCESS_TOKEN = os.getenv("MATRIX_ACCESS_TOKEN", "")
@@ -19,6 +25,18 @@ PERSISTENT_DOCUMENTS_DIR = os.getenv("PERSISTENT_DOCUMENTS_DIR", "/app/documents
 _HASH_INDEX_FILENAME = ".hashes.json"
 _HASH_LOCK_FILENAME = ".hashes.lock"
 
+MAX_DOWNLOAD_BYTES = int(os.getenv("MATRIX_DOWNLOAD_MAX_MB", "50")) * 1024 * 1024
+_DOWNLOAD_CHUNK_BYTES = 256 * 1024
+# Retry budget of the download activity (the workflow's retry policy uses it);
+# the final attempt discards its partial file instead of leaving it for a resume
+DOWNLOAD_MAX_ATTEMPTS = 3
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-\d+/(?:\d+|\*)")
+
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_closing_clients: Set[asyncio.Future] = set()
+
 _EXT_MAP = {
     "application/pdf": ".pdf",
     "text/plain": ".txt",
@@ -39,6 +57,45 @@ _EXT_MAP = {
 }
 
 
+def _get_http_client() -> httpx.AsyncClient:
+    """Shared keep-alive client for media downloads, recreated if its event loop changed."""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        if _http_client is not None and not _http_client.is_closed:
+            _close_stale_client(_http_client, _http_client_loop)
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception as exc:
+        logger.debug(f"Error closing stale media client: {exc}")
+
+
+def _close_stale_client(
+    client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]
+) -> None:
+    """Close a client replaced by ``_get_http_client`` without leaking its pool.
+
+    Closed on its own loop when that loop is still running elsewhere,
+    otherwise on the current loop (its sockets are unusable either way).
+    """
+    current = asyncio.get_running_loop()
+    if loop is not None and loop is not current and loop.is_running() and not loop.is_closed():
+        future = asyncio.run_coroutine_threadsafe(_aclose_quietly(client), loop)
+    else:
+        future = current.create_task(_aclose_quietly(client))
+    _closing_clients.add(future)
+    future.add_done_callback(_closing_clients.discard)
+
+
 def _sha256(path: str) -> str:
     h = hashlib.sha256()
     with open(path, "rb") as f:
@@ -48,94 +105,56 @@ def _sha256(path: str) -> str:
 
 
 def _hash_index_paths() -> tuple[str, str]:
+    """Legacy JSON index/lock paths (imported into the SQLite store on first open)."""
     idx_path = os.path.join(PERSISTENT_DOCUMENTS_DIR, _HASH_INDEX_FILENAME)
     lock_path = os.path.join(PERSISTENT_DOCUMENTS_DIR, _HASH_LOCK_FILENAME)
     return idx_path, lock_path
 
 
 def _load_hash_index() -> dict:
-    idx_path, _ = _hash_index_paths()
-    if os.path.exists(idx_path):
-        try:
-            with open(idx_path, "r") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, OSError):
-            return {}
-    return {}
+    try:
+        return hash_store.load_all(PERSISTENT_DOCUMENTS_DIR)
+    except (sqlite3.Error, OSError):
+        return {}
 
 
 def _save_hash_index(index: dict) -> None:
-    idx_path, _ = _hash_index_paths()
-    tmp_path = idx_path + ".tmp"
-    with open(tmp_path, "w") as f:
-        json.dump(index, f, indent=2)
-    os.replace(tmp_path, idx_path)
+    hash_store.replace_all(PERSISTENT_DOCUMENTS_DIR, index)
 
 
 def _mutate_hash_index_locked(mutate_fn):
-    os.makedirs(PERSISTENT_DOCUMENTS_DIR, exist_ok=True)
-    idx_path, lock_path = _hash_index_paths()
+    return hash_store.mutate_all(PERSISTENT_DOCUMENTS_DIR, mutate_fn)
 
-    with open(lock_path, "a+") as lock_file:
-        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
-        try:
-            if os.path.exists(idx_path):
-                try:
-                    with open(idx_path, "r") as f:
-                        index = json.load(f)
-                except (json.JSONDecodeError, OSError):
-                    index = {}
-            else:
-                index = {}
-
-            result = mutate_fn(index)
-
-            tmp_path = idx_path + ".tmp"
-            with open(tmp_path, "w") as f:
-                json.dump(index, f, indent=2)
-            os.replace(tmp_path, idx_path)
-            return result
-        finally:
-            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
-
-
-def _persist_file(temp_path: str, file_name: str, mxc_url: str) -> tuple[str, str, bool]:
-    file_hash = ""
+
+def _persist_file(
+    temp_path: str, file_name: str, mxc_url: str, file_hash: str = ""
+) -> tuple[str, str, bool]:
     try:
-        file_hash = _sha256(temp_path)
+        file_hash = file_hash or _sha256(temp_path)
 
-        def _persist_under_lock(index: dict) -> tuple[str, str, bool]:
-            if file_hash in index:
-                existing = index[file_hash]
-                import logging
+        media_id = mxc_url.split("/")[-1] if mxc_url else "unknown"
+        dest_dir = os.path.join(PERSISTENT_DOCUMENTS_DIR, media_id)
+        dest_path = os.path.join(dest_dir, file_name)
 
-                logging.getLogger(__name__).info(
-                    f"Duplicate detected: {file_name} matches existing "
-                    f"{existing.get('filename')} (hash={file_hash[:12]}...)"
-                )
-                return existing.get("persistent_path", ""), file_hash, True
+        # Claim the hash row first so concurrent duplicates never both copy
+        existing = hash_store.claim(PERSISTENT_DOCUMENTS_DIR, file_hash, file_name, mxc_url, dest_path)
+        if existing is not None:
+            logger.info(
+                f"Duplicate detected: {file_name} matches existing "
+                f"{existing.get('filename')} (hash={file_hash[:12]}...)"
+            )
+            return existing.get("persistent_path", ""), file_hash, True
 
-            media_id = mxc_url.split("/")[-1] if mxc_url else "unknown"
-            dest_dir = os.path.join(PERSISTENT_DOCUMENTS_DIR, media_id)
+        try:
             os.makedirs(dest_dir, exist_ok=True)
-
-            dest_path = os.path.join(dest_dir, file_name)
             shutil.copy2(temp_path, dest_path)
-
-            index[file_hash] = {
-                "filename": file_name,
-                "mxc_url": mxc_url,
-                "persistent_path": dest_path,
-                "ts": time.time(),
-            }
-            return dest_path, file_hash, False
-
-        return _mutate_hash_index_locked(_persist_under_lock)
+        except Exception:
+            hash_store.remove(PERSISTENT_DOCUMENTS_DIR, file_hash, dest_path)
+            raise
+        return dest_path, file_hash, False
 
     except Exception as exc:
-        import logging
-
-        logging.getLogger(__name__).warning(f"Failed to persist file {file_name}: {exc}")
+        logger.warning(f"Failed to persist file {file_name}: {exc}")
         return "", file_hash, False
 
 
@@ -156,6 +175,130 @@ class DownloadResult:
     is_duplicate: bool = False
 
 
+def _partial_download_path(mxc_url: str, suffix: str) -> str:
+    """Stable temp path for an in-progress download so a retried attempt can resume it.
+
+    Keyed by workflow id + mxc URL: retries of the same workflow share the
+    partial file, concurrent workflows for the same media do not.
+    """
+    owner = activity.info().workflow_id if activity.in_activity() else ""
+    key = hashlib.sha1(f"{owner}:{mxc_url}".encode("utf-8")).hexdigest()[:20]
+    return os.path.join(tempfile.gettempdir(), f"matrix-dl-{key}{suffix}.part")
+
+
+def _remove_partial(part_path: str) -> None:
+    try:
+        os.unlink(part_path)
+    except FileNotFoundError:
+        pass
+
+
+def _is_final_attempt() -> bool:
+    return not activity.in_activity() or activity.info().attempt >= DOWNLOAD_MAX_ATTEMPTS
+
+
+def _content_range_start(response: httpx.Response) -> Optional[int]:
+    match = _CONTENT_RANGE_RE.match(response.headers.get("content-range", "").strip())
+    return int(match.group(1)) if match else None
+
+
+def _hash_existing_prefix(path: str) -> tuple["hashlib._Hash", int]:
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+            size += len(chunk)
+    return h, size
+
+
+async def _stream_to_file(
+    client: httpx.AsyncClient,
+    download_url: str,
+    headers: dict,
+    part_path: str,
+    file_name: str,
+    max_bytes: int,
+) -> tuple[int, str]:
+    """Stream ``download_url`` into ``part_path`` and return ``(size, sha256)``.
+
+    Hashes while writing so the file is never re-read, rejects oversized media
+    from Content-Length before reading the body (and from the running byte
+    count when the header is missing or wrong), and resumes an existing
+    partial file with a Range request. A 206 whose Content-Range does not
+    start at the resume offset is discarded and the download restarts from 0.
+    """
+    if os.path.exists(part_path) and os.path.getsize(part_path) > 0:
+        hasher, received = _hash_existing_prefix(part_path)
+        size = await _stream_range(
+            client, download_url, headers, part_path, file_name, max_bytes, hasher, received
+        )
+        if size is not None:
+            return size
+        _remove_partial(part_path)
+
+    size = await _stream_range(
+        client, download_url, headers, part_path, file_name, max_bytes, hashlib.sha256(), 0
+    )
+    if size is None:
+        raise DownloadError(f"Unexpected partial response downloading {file_name}")
+    return size
+
+
+async def _stream_range(
+    client: httpx.AsyncClient,
+    download_url: str,
+    headers: dict,
+    part_path: str,
+    file_name: str,
+    max_bytes: int,
+    hasher: "hashlib._Hash",
+    received: int,
+) -> Optional[tuple[int, str]]:
+    """One GET from byte ``received``; None when a 206 does not line up with it."""
+    request_headers = dict(headers)
+    if received:
+        request_headers["Range"] = f"bytes={received}-"
+
+    async with client.stream("GET", download_url, headers=request_headers) as response:
+        if response.status_code == 206:
+            start = _content_range_start(response)
+            if not received or start != received:
+                activity.logger.warning(
+                    f"Content-Range {response.headers.get('content-range')!r} does not match "
+                    f"resume offset {received} for {file_name}; restarting download"
+                )
+                return None
+            mode = "ab"
+            activity.logger.info(f"Resuming {file_name} download at byte {received}")
+        elif response.status_code == 200:
+            # Server ignored the Range header (or there was nothing to resume)
+            mode = "wb"
+            hasher = hashlib.sha256()
+            received = 0
+        else:
+            body = (await response.aread())[:500].decode("utf-8", errors="replace")
+            raise DownloadError(f"HTTP {response.status_code} downloading {file_name}: {body}")
+
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit() and received + int(content_length) > max_bytes:
+            raise DownloadTooLargeError(
+                f"{file_name} is {received + int(content_length)} bytes, exceeds the {max_bytes} byte limit"
+            )
+
+        with open(part_path, mode) as f:
+            async for chunk in response.aiter_bytes(_DOWNLOAD_CHUNK_BYTES):
+                received += len(chunk)
+                if received > max_bytes:
+                    raise DownloadTooLargeError(
+                        f"{file_name} exceeded the {max_bytes} byte limit while downloading"
+                    )
+                hasher.update(chunk)
+                f.write(chunk)
+
+    return received, hasher.hexdigest()
+
+
 @activity.defn
 async def download_file_from_matrix(input: DownloadInput) -> DownloadResult:
     start = time.monotonic()
@@ -175,29 +318,25 @@ async def download_file_from_matrix(input: DownloadInput) -> DownloadResult:
     )
 
     suffix = _EXT_MAP.get(input.file_type, ".bin")
-    temp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    temp_path = temp.name
-    temp.close()
+    part_path = _partial_download_path(input.mxc_url, suffix)
 
     headers = {}
     if MATRIX_ACCESS_TOKEN:
         headers["Authorization"] = f"Bearer {MATRIX_ACCESS_TOKEN}"
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(download_url, headers=headers)
-            if response.status_code != 200:
-                raise DownloadError(
-                    f"HTTP {response.status_code} downloading {input.file_name}: "
-                    f"{response.text[:500]}"
-                )
-            with open(temp_path, "wb") as f:
-                f.write(response.content)
+        client = _get_http_client()
+        file_size, file_hash = await _stream_to_file(
+            client, download_url, headers, part_path, input.file_name, MAX_DOWNLOAD_BYTES
+        )
 
-        file_size = os.path.getsize(temp_path)
+        temp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+        temp_path = temp.name
+        temp.close()
+        os.replace(part_path, temp_path)
 
         persistent_path, file_hash, is_duplicate = _persist_file(
-            temp_path, input.file_name, input.mxc_url
+            temp_path, input.file_name, input.mxc_url, file_hash=file_hash
         )
 
         elapsed = int((time.monotonic() - start) * 1000)
@@ -216,14 +355,20 @@ async def download_file_from_matrix(input: DownloadInput) -> DownloadResult:
         )
 
     except DownloadError:
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
+        # Bad status or over the size cap: a retry must start from scratch
+        if os.path.exists(part_path):
+            os.unlink(part_path)
         raise
     except httpx.TimeoutException as e:
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
+        # Keep the partial file for the next attempt to resume with a Range request
+        if _is_final_attempt():
+            _remove_partial(part_path)
         raise DownloadError(f"Timeout downloading {input.file_name}: {e}") from e
+    except httpx.TransportError as e:
+        if _is_final_attempt():
+            _remove_partial(part_path)
+        raise DownloadError(f"Error downloading {input.file_name}: {e}") from e
     except Exception as e:
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
+        if os.path.exists(part_path):
+            os.unlink(part_path)
         raise DownloadError(f"Error downloading {input.file_name}: {e}") from e
@@ -0,0 +1,274 @@
+"""
+SQLite-backed content-hash index for persisted documents.
+
+Replaces the flock-guarded ``.hashes.json`` file, which was rewritten in full
+on every download and cleanup. Each operation here touches a single row
+(primary-key lookup / upsert / delete) in a WAL-mode database, so concurrent
+activity workers only contend on SQLite's short write lock instead of a
+global file lock held across JSON load + dump.
+
+A legacy JSON index found next to the database is imported automatically on
+open (rows already in the store win) and renamed to ``.hashes.json.migrated``.
+
+Each process keeps one open connection per documents directory; operations
+are serialised on a module lock since activities may run on worker threads.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HASH_DB_FILENAME = ".hashes.db"
+LEGACY_INDEX_FILENAME = ".hashes.json"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS document_hashes ("
+    " file_hash TEXT PRIMARY KEY,"
+    " filename TEXT NOT NULL DEFAULT '',"
+    " mxc_url TEXT NOT NULL DEFAULT '',"
+    " persistent_path TEXT NOT NULL DEFAULT '',"
+    " ts REAL NOT NULL)"
+)
+
+_lock = threading.RLock()
+# (db path, pid) -> open connection
+_connections: Dict[Tuple[str, int], sqlite3.Connection] = {}
+
+
+def db_path(documents_dir: str) -> str:
+    return os.path.join(documents_dir, HASH_DB_FILENAME)
+
+
+def _row_to_entry(row) -> Dict[str, object]:
+    return {
+        "filename": row[0],
+        "mxc_url": row[1],
+        "persistent_path": row[2],
+        "ts": row[3],
+    }
+
+
+def _connect(documents_dir: str) -> sqlite3.Connection:
+    os.makedirs(documents_dir, exist_ok=True)
+    # Autocommit; explicit BEGIN IMMEDIATE where a read-then-write must be atomic
+    conn = sqlite3.connect(
+        db_path(documents_dir), timeout=30, isolation_level=None, check_same_thread=False
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(_SCHEMA)
+
+    legacy_path = os.path.join(documents_dir, LEGACY_INDEX_FILENAME)
+    if os.path.exists(legacy_path):
+        _import_legacy_index(conn, legacy_path)
+    return conn
+
+
+@contextmanager
+def _connection(documents_dir: str) -> Iterator[sqlite3.Connection]:
+    """Yield this process's connection for ``documents_dir`` under the module lock."""
+    path = db_path(documents_dir)
+    key = (path, os.getpid())
+    with _lock:
+        conn = _connections.get(key)
+        if conn is not None and not os.path.exists(path):
+            # Database file was removed underneath us; reconnect
+            _connections.pop(key, None)
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = _connect(documents_dir)
+            _connections[key] = conn
+        try:
+            yield conn
+        except sqlite3.Error:
+            _connections.pop(key, None)
+            conn.close()
+            raise
+
+
+def close_connections() -> None:
+    """Close every cached connection (tests, worker shutdown)."""
+    with _lock:
+        pid = os.getpid()
+        for (_, conn_pid), conn in list(_connections.items()):
+            if conn_pid == pid:
+                conn.close()
+        _connections.clear()
+
+
+def _import_legacy_index(conn: sqlite3.Connection, legacy_path: str) -> int:
+    try:
+        with open(legacy_path, "r") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return 0  # another worker finished the migration first
+    except (json.JSONDecodeError, OSError) as e:
+        logger.warning(f"Skipping unreadable legacy hash index {legacy_path}: {e}")
+        return 0
+    if not isinstance(index, dict):
+        index = {}
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO document_hashes"
+            " (file_hash, filename, mxc_url, persistent_path, ts) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    file_hash,
+                    entry.get("filename", "") or "",
+                    entry.get("mxc_url", "") or "",
+                    entry.get("persistent_path", "") or "",
+                    float(entry.get("ts") or time.time()),
+                )
+                for file_hash, entry in index.items()
+                if isinstance(entry, dict)
+            ],
+        )
+        added = conn.total_changes - before
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+    try:
+        os.replace(legacy_path, legacy_path + ".migrated")
+    except FileNotFoundError:
+        pass
+    logger.info(f"Migrated {added} hash entries from {legacy_path}")
+    return added
+
+
+def migrate_legacy_index(documents_dir: str) -> int:
+    """Import ``.hashes.json`` into the store; returns the number of rows added.
+
+    Existing rows win over JSON entries and the JSON file is renamed to
+    ``.hashes.json.migrated`` afterwards. Safe to run concurrently with live
+    workers (INSERT OR IGNORE inside a write transaction).
+    """
+    legacy_path = os.path.join(documents_dir, LEGACY_INDEX_FILENAME)
+    conn = sqlite3.connect(db_path(documents_dir), timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        return _import_legacy_index(conn, legacy_path)
+    finally:
+        conn.close()
+
+
+def get_entry(documents_dir: str, file_hash: str) -> Optional[Dict[str, object]]:
+    with _connection(documents_dir) as conn:
+        row = conn.execute(
+            "SELECT filename, mxc_url, persistent_path, ts FROM document_hashes WHERE file_hash = ?",
+            (file_hash,),
+        ).fetchone()
+    return _row_to_entry(row) if row else None
+
+
+def claim(
+    documents_dir: str,
+    file_hash: str,
+    filename: str,
+    mxc_url: str,
+    persistent_path: str,
+) -> Optional[Dict[str, object]]:
+    """Atomically register ``file_hash`` unless it is already known.
+
+    Returns None when this caller won the claim (and should write the file),
+    or the existing entry when the content is a duplicate.
+    """
+    with _connection(documents_dir) as conn:
+        cur = conn.execute(
+            "INSERT INTO document_hashes (file_hash, filename, mxc_url, persistent_path, ts)"
+            " VALUES (?, ?, ?, ?, ?) ON CONFLICT(file_hash) DO NOTHING",
+            (file_hash, filename, mxc_url, persistent_path, time.time()),
+        )
+        if cur.rowcount == 1:
+            return None
+        row = conn.execute(
+            "SELECT filename, mxc_url, persistent_path, ts FROM document_hashes WHERE file_hash = ?",
+            (file_hash,),
+        ).fetchone()
+    return _row_to_entry(row) if row else {}
+
+
+def remove(documents_dir: str, file_hash: str, persistent_path: str = "") -> bool:
+    """Delete the entry for ``file_hash``; when ``persistent_path`` is given, only if it matches."""
+    with _connection(documents_dir) as conn:
+        if persistent_path:
+            cur = conn.execute(
+                "DELETE FROM document_hashes WHERE file_hash = ? AND persistent_path = ?",
+                (file_hash, persistent_path),
+            )
+        else:
+            cur = conn.execute("DELETE FROM document_hashes WHERE file_hash = ?", (file_hash,))
+        return cur.rowcount > 0
+
+
+def load_all(documents_dir: str) -> Dict[str, Dict[str, object]]:
+    with _connection(documents_dir) as conn:
+        rows = conn.execute(
+            "SELECT file_hash, filename, mxc_url, persistent_path, ts FROM document_hashes"
+        ).fetchall()
+    return {row[0]: _row_to_entry(row[1:]) for row in rows}
+
+
+def mutate_all(documents_dir: str, mutate_fn):
+    """Apply ``mutate_fn`` to the whole index as a dict inside one write transaction.
+
+    O(N) compatibility path for callers written against the JSON index;
+    download/cleanup use the row-level helpers above instead.
+    """
+    with _connection(documents_dir) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT file_hash, filename, mxc_url, persistent_path, ts FROM document_hashes"
+            ).fetchall()
+            before = {row[0]: _row_to_entry(row[1:]) for row in rows}
+            index = {k: dict(v) for k, v in before.items()}
+
+            result = mutate_fn(index)
+
+            removed = [k for k in before if k not in index]
+            changed = [
+                (
+                    k,
+                    v.get("filename", "") or "",
+                    v.get("mxc_url", "") or "",
+                    v.get("persistent_path", "") or "",
+                    float(v.get("ts") or time.time()),
+                )
+                for k, v in index.items()
+                if before.get(k) != v
+            ]
+            if removed:
+                conn.executemany("DELETE FROM document_hashes WHERE file_hash = ?", [(k,) for k in removed])
+            if changed:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO document_hashes"
+                    " (file_hash, filename, mxc_url, persistent_path, ts) VALUES (?, ?, ?, ?, ?)",
+                    changed,
+                )
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def replace_all(documents_dir: str, index: Dict[str, Dict[str, object]]) -> None:
+    def _replace(current: dict) -> None:
+        current.clear()
+        current.update(index)
+
+    mutate_all(documents_dir, _replace)
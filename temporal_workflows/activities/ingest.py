@@ -8,7 +8,7 @@ from typing import Optional
 import httpx
 from temporalio import activity
 
-from .common import IngestError
+from .common import IngestError, ParseError
 
 HAYHOOKS_INGEST_URL = os.getenv(
     "HAYHOOKS_INGEST_URL", "http://192.168.50.90:1416/ingest_document/run"
@@ -73,6 +73,76 @@ class IngestResult:
     error: Optional[str] = None
 
 
+def _delete_before_ingest_enabled() -> bool:
+    return os.getenv("HAYHOOKS_DELETE_BEFORE_INGEST", "true").lower() in (
+        "true",
+        "1",
+        "yes",
+    )
+
+
+async def _delete_existing_documents(client: httpx.AsyncClient, filename: str, room_id: str) -> None:
+    try:
+        delete_resp = await client.post(
+            HAYHOOKS_DELETE_BY_FILENAME_URL,
+            json={
+                "source_filename": filename,
+                "room_id": room_id,
+            },
+        )
+        if delete_resp.status_code == 404:
+            activity.logger.debug(
+                f"Delete endpoint not found or no docs to delete for {filename}, skipping"
+            )
+        elif delete_resp.status_code != 200:
+            activity.logger.warning(
+                f"Hayhooks delete HTTP {delete_resp.status_code} for {filename}: "
+                f"{delete_resp.text[:200]} — continuing with ingest"
+            )
+    except httpx.HTTPError as e:
+        activity.logger.warning(
+            f"Hayhooks delete failed for {filename}: {e} — continuing with ingest"
+        )
+
+
+async def _post_section(
+    client: httpx.AsyncClient,
+    text: str,
+    section_filename: str,
+    room_id: str,
+    sender: str,
+) -> int:
+    """POST one section to the Hayhooks ingest pipeline, returning chunks stored."""
+    payload = {
+        "text": text,
+        "filename": section_filename,
+        "room_id": room_id,
+        "sender": sender,
+    }
+
+    response = await client.post(HAYHOOKS_INGEST_URL, json=payload)
+
+    if response.status_code != 200:
+        raise IngestError(
+            f"Hayhooks HTTP {response.status_code} for {section_filename}: "
+            f"{response.text[:500]}"
+        )
+
+    result = response.json()
+    result_data = result
+    if isinstance(result.get("result"), str):
+        result_data = json.loads(result["result"])
+
+    status = result_data.get("status", "")
+    if status != "ok":
+        detail = result_data.get("detail", "Unknown error")
+        raise IngestError(
+            f"Hayhooks ingest error for {section_filename}: {detail}"
+        )
+
+    return int(result_data.get("chunks_stored", 0) or 0)
+
+
 @activity.defn
 async def ingest_to_haystack(input: IngestInput) -> IngestResult:
     start = time.monotonic()
@@ -85,33 +155,8 @@ async def ingest_to_haystack(input: IngestInput) -> IngestResult:
 
     try:
         async with httpx.AsyncClient(timeout=600.0) as client:
-            delete_enabled = os.getenv("HAYHOOKS_DELETE_BEFORE_INGEST", "true").lower() in (
-                "true",
-                "1",
-                "yes",
-            )
-            if delete_enabled:
-                try:
-                    delete_resp = await client.post(
-                        HAYHOOKS_DELETE_BY_FILENAME_URL,
-                        json={
-                            "source_filename": input.filename,
-                            "room_id": input.room_id,
-                        },
-                    )
-                    if delete_resp.status_code == 404:
-                        activity.logger.debug(
-                            f"Delete endpoint not found or no docs to delete for {input.filename}, skipping"
-                        )
-                    elif delete_resp.status_code != 200:
-                        activity.logger.warning(
-                            f"Hayhooks delete HTTP {delete_resp.status_code} for {input.filename}: "
-                            f"{delete_resp.text[:200]} — continuing with ingest"
-                        )
-                except httpx.HTTPError as e:
-                    activity.logger.warning(
-                        f"Hayhooks delete failed for {input.filename}: {e} — continuing with ingest"
-                    )
+            if _delete_before_ingest_enabled():
+                await _delete_existing_documents(client, input.filename, input.room_id)
 
             total_chunks = 0
             total_sections = len(sections)
@@ -122,34 +167,9 @@ async def ingest_to_haystack(input: IngestInput) -> IngestResult:
                     if total_sections == 1
                     else f"{input.filename} (part {idx}/{total_sections})"
                 )
-                payload = {
-                    "text": section,
-                    "filename": section_filename,
-                    "room_id": input.room_id,
-                    "sender": input.sender,
-                }
-
-                response = await client.post(HAYHOOKS_INGEST_URL, json=payload)
-
-                if response.status_code != 200:
-                    raise IngestError(
-                        f"Hayhooks HTTP {response.status_code} for {section_filename}: "
-                        f"{response.text[:500]}"
-                    )
-
-                result = response.json()
-                result_data = result
-                if isinstance(result.get("result"), str):
-                    result_data = json.loads(result["result"])
-
-                status = result_data.get("status", "")
-                if status != "ok":
-                    detail = result_data.get("detail", "Unknown error")
-                    raise IngestError(
-                        f"Hayhooks ingest error for {section_filename}: {detail}"
-                    )
-
-                total_chunks += int(result_data.get("chunks_stored", 0) or 0)
+                total_chunks += await _post_section(
+                    client, section, section_filename, input.room_id, input.sender
+                )
 
             elapsed = int((time.monotonic() - start) * 1000)
             activity.logger.info(
@@ -163,3 +183,127 @@ async def ingest_to_haystack(input: IngestInput) -> IngestResult:
         raise IngestError(f"Hayhooks timeout for {input.filename}: {e}") from e
     except Exception as e:
         raise IngestError(f"Unexpected error ingesting {input.filename}: {e}") from e
+
+
+@dataclass
+class StreamingIngestInput:
+    file_path: str
+    file_name: str
+    room_id: str
+    sender: str
+
+
+@dataclass
+class StreamingIngestResult:
+    success: bool
+    char_count: int = 0
+    page_count: Optional[int] = None
+    was_ocr: bool = False
+    chunks_stored: int = 0
+    sections_ingested: int = 0
+    parse_ms: int = 0
+    ingest_ms: int = 0
+    duration_ms: int = 0
+
+
+@activity.defn
+async def stream_parse_and_ingest(input: StreamingIngestInput) -> StreamingIngestResult:
+    """Parse a document page-by-page and ingest each batch as soon as it is ready.
+
+    Unlike parse_with_markitdown → ingest_to_haystack, the extracted text never
+    travels through workflow history and ingest of the first pages overlaps
+    with parsing/OCR of the rest. Batches are flushed once they reach
+    HAYHOOKS_INGEST_STREAM_SECTION_CHARS; the activity heartbeats per section
+    so a long OCR run is not mistaken for a stuck worker.
+    """
+    from src.matrix.document_parser import (
+        DocumentParseConfig,
+        DocumentParseError,
+        iter_document_sections,
+    )
+
+    start = time.monotonic()
+    flush_chars = int(os.getenv("HAYHOOKS_INGEST_STREAM_SECTION_CHARS", "50000"))
+    activity.logger.info(f"Streaming parse+ingest: {input.file_name}")
+
+    result = StreamingIngestResult(success=False)
+    ingest_seconds = 0.0
+    buffer: list[str] = []
+    buffer_len = 0
+
+    try:
+        async with httpx.AsyncClient(timeout=600.0) as client:
+
+            async def _flush() -> None:
+                nonlocal buffer, buffer_len, ingest_seconds
+                text = _normalize_text("\n\n".join(buffer))
+                buffer, buffer_len = [], 0
+                if not text:
+                    return
+                flush_start = time.monotonic()
+                # Delete stale copies lazily so a parse failure never drops the old index
+                if result.sections_ingested == 0 and _delete_before_ingest_enabled():
+                    await _delete_existing_documents(client, input.file_name, input.room_id)
+                result.sections_ingested += 1
+                section_filename = f"{input.file_name} (part {result.sections_ingested})"
+                result.chunks_stored += await _post_section(
+                    client, text, section_filename, input.room_id, input.sender
+                )
+                ingest_seconds += time.monotonic() - flush_start
+
+            try:
+                async for section in iter_document_sections(
+                    input.file_path,
+                    filename=input.file_name,
+                    config=DocumentParseConfig.from_env(),
+                ):
+                    if activity.in_activity():
+                        activity.heartbeat(section.index)
+                    result.char_count += len(section.text)
+                    result.page_count = section.page_count or result.page_count
+                    result.was_ocr = result.was_ocr or section.was_ocr
+                    buffer.append(section.text)
+                    buffer_len += len(section.text)
+                    if buffer_len >= flush_chars:
+                        await _flush()
+            except DocumentParseError as e:
+                raise ParseError(f"Streaming parse failed for {input.file_name}: {e}") from e
+
+            if result.char_count < 10:
+                raise ParseError(
+                    f"Insufficient content extracted from {input.file_name} ({result.char_count} chars)"
+                )
+            if buffer:
+                await _flush()
+
+        # Retryable failures keep the file for the next attempt; the workflow
+        # removes it via cleanup_file_artifacts if every attempt fails.
+        _remove_temp_file(input.file_path)
+        elapsed = time.monotonic() - start
+        result.success = True
+        result.duration_ms = int(elapsed * 1000)
+        result.ingest_ms = int(ingest_seconds * 1000)
+        result.parse_ms = max(0, result.duration_ms - result.ingest_ms)
+        activity.logger.info(
+            f"Streamed {input.file_name}: {result.char_count} chars, "
+            f"{result.sections_ingested} section(s), {result.chunks_stored} chunks, "
+            f"OCR={result.was_ocr}, {result.duration_ms}ms"
+        )
+        return result
+
+    except ParseError:
+        # Non-retryable: no later attempt needs the file
+        _remove_temp_file(input.file_path)
+        raise
+    except IngestError:
+        raise
+    except httpx.TimeoutException as e:
+        raise IngestError(f"Hayhooks timeout for {input.file_name}: {e}") from e
+    except Exception as e:
+        raise IngestError(f"Unexpected error streaming {input.file_name}: {e}") from e
+
+
+def _remove_temp_file(file_path: str) -> None:
+    if file_path and os.path.exists(file_path):
+        os.unlink(file_path)
+        activity.logger.debug(f"Cleaned up temp file: {file_path}")
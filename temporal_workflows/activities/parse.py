@@ -12,6 +12,8 @@ from .common import ParseError
 class ParseInput:
     file_path: str
     file_name: str
+    # SHA-256 from the download activity; lets parse_document hit the parse cache without re-hashing
+    file_hash: str = ""
 
 
 @dataclass
@@ -36,6 +38,7 @@ async def parse_with_markitdown(input: ParseInput) -> ParseResult:
             file_path=input.file_path,
             filename=input.file_name,
             config=config,
+            content_hash=input.file_hash or None,
         )
 
         if result.error:
@@ -22,7 +22,9 @@ from temporalio.worker import Worker, UnsandboxedWorkflowRunner
 # Import workflows and activities
 from temporal_workflows.workflows import file_processing
 from temporal_workflows.workflows import message_delivery
+from temporal_workflows.workflows import agent_mailbox
 from temporal_workflows import activities
+from temporal_workflows.activities import deliver
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -71,11 +73,13 @@ async def run_worker() -> None:
         workflows=[
             file_processing.FileProcessingWorkflow,
             message_delivery.MessageDeliveryWorkflow,
+            agent_mailbox.AgentMailboxWorkflow,
         ],
         activities=[
             activities.download_file_from_matrix,
             activities.parse_with_markitdown,
             activities.ingest_to_haystack,
+            activities.stream_parse_and_ingest,
             activities.notify_letta_agent,
             activities.update_matrix_status,
             activities.cleanup_file_artifacts,
@@ -92,7 +96,7 @@ async def run_worker() -> None:
 
     logger.info(
         f"Worker started. Polling queue={TEMPORAL_TASK_QUEUE}. "
-        f"Registered: FileProcessingWorkflow + MessageDeliveryWorkflow + 9 activities"
+        f"Registered: FileProcessingWorkflow + MessageDeliveryWorkflow + AgentMailboxWorkflow + 10 activities"
     )
 
     # Graceful shutdown on SIGINT/SIGTERM
@@ -109,6 +113,8 @@ async def run_worker() -> None:
     async with worker:
         await shutdown_event.wait()
 
+    await deliver.close_gateway_pool()
+
     logger.info("Worker shutdown complete")
 
 
@@ -1,5 +1,11 @@
 """Temporal workflow definitions for Matrix file processing."""
 
+from temporal_workflows.workflows.agent_mailbox import (
+    AgentMailboxWorkflow,
+    AgentMailboxInput,
+    AgentMailboxResult,
+    MailboxMessage,
+)
 from temporal_workflows.workflows.file_processing import FileProcessingWorkflow
 from temporal_workflows.workflows.message_delivery import (
     MessageDeliveryWorkflow,
@@ -14,4 +20,8 @@ __all__ = [
     "MessageDeliveryInput",
     "MessageDeliveryResult",
     "DeliveryStatus",
+    "AgentMailboxWorkflow",
+    "AgentMailboxInput",
+    "AgentMailboxResult",
+    "MailboxMessage",
 ]
@@ -0,0 +1,291 @@
+"""
+AgentMailboxWorkflow — One long-running delivery workflow per Letta agent.
+
+Replaces the one-workflow-per-Matrix-message pattern of MessageDeliveryWorkflow.
+Inbound messages are delivered to the mailbox with signal-with-start
+(workflow id ``agent-mailbox-{agent_id}``), so a busy agent costs one
+workflow instead of one per message.
+
+Loop:
+  1. Wait for queued messages (or exit after MAILBOX_IDLE_TIMEOUT with an empty queue)
+  2. Take the head message plus consecutive messages for the same room/conversation
+     that arrived while the agent was busy, and deliver them as one turn
+  3. On success → send_delivery_ack per message; on permanent failure → dead_letter_message
+  4. Continue-as-new (carrying the queue) when history grows
+
+Messages are delivered strictly in arrival order. Queue depth is exposed via
+the get_queue_depth / get_status queries.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from temporalio import workflow
+
+with workflow.unsafe.imports_passed_through():
+    from temporal_workflows.activities.deliver import (
+        deliver_to_letta,
+        dead_letter_message,
+        send_delivery_ack,
+        DeliverToLettaInput,
+        DeadLetterInput,
+        DeliveryAckInput,
+    )
+    from temporal_workflows.workflows.message_delivery import (
+        _ACK_RETRY,
+        _DEAD_LETTER_RETRY,
+        _DELIVER_RETRY,
+    )
+
+
+MAILBOX_IDLE_TIMEOUT = timedelta(minutes=10)
+MAX_BATCH_MESSAGES = 10
+MAX_BATCH_CHARS = 20000
+# Continue-as-new well before Temporal's history limits even if the server doesn't suggest it
+MAX_DELIVERIES_PER_RUN = 200
+# Recently seen event ids kept for signal dedupe (carried across continue-as-new)
+_SEEN_EVENT_IDS_LIMIT = 500
+
+
+def mailbox_workflow_id(agent_id: str) -> str:
+    return f"agent-mailbox-{agent_id}"
+
+
+@dataclass
+class MailboxMessage:
+    """A single inbound Matrix message queued for an agent."""
+    room_id: str
+    message_body: str
+    sender: str
+    event_id: str
+    conversation_id: str = ""
+    source_channel: str = "matrix"
+    reply_to_event_id: Optional[str] = None
+    thread_root_event_id: Optional[str] = None
+    thread_latest_event_id: Optional[str] = None
+    # Overrides event_id for signal dedupe (dead-letter replays keep the original event_id)
+    dedupe_key: str = ""
+
+
+@dataclass
+class AgentMailboxInput:
+    agent_id: str
+    # State carried over continue-as-new
+    pending: List[MailboxMessage] = field(default_factory=list)
+    seen_event_ids: List[str] = field(default_factory=list)
+    delivered_total: int = 0
+
+
+@dataclass
+class AgentMailboxResult:
+    agent_id: str
+    delivered: int = 0
+    dead_lettered: int = 0
+
+
+def _is_batchable(body: str) -> bool:
+    """Multimodal content arrays (JSON lists) are sent on their own, never merged."""
+    return not body.lstrip().startswith("[{")
+
+
+def take_batch(
+    queue: List[MailboxMessage],
+    max_messages: int = MAX_BATCH_MESSAGES,
+    max_chars: int = MAX_BATCH_CHARS,
+) -> List[MailboxMessage]:
+    """Pop the next delivery batch from the head of ``queue``.
+
+    The batch is the head message plus the consecutive messages behind it for
+    the same room and conversation, so ordering is preserved and one agent
+    turn never mixes conversations.
+    """
+    if not queue:
+        return []
+    head = queue[0]
+    batch = [head]
+    chars = len(head.message_body)
+    if _is_batchable(head.message_body):
+        for msg in queue[1:]:
+            if len(batch) >= max_messages:
+                break
+            if (msg.room_id, msg.conversation_id) != (head.room_id, head.conversation_id):
+                break
+            if not _is_batchable(msg.message_body) or chars + len(msg.message_body) > max_chars:
+                break
+            batch.append(msg)
+            chars += len(msg.message_body)
+    del queue[: len(batch)]
+    return batch
+
+
+def combine_batch(batch: List[MailboxMessage]) -> str:
+    if len(batch) == 1:
+        return batch[0].message_body
+    return "\n\n".join(msg.message_body for msg in batch)
+
+
+@workflow.defn
+class AgentMailboxWorkflow:
+    """Per-agent ordered mailbox fed by the ``enqueue`` signal."""
+
+    def __init__(self) -> None:
+        self._queue: List[MailboxMessage] = []
+        self._seen_event_ids: List[str] = []
+        self._seen_lookup: set = set()
+        self._in_flight = 0
+        self._delivered = 0
+        self._dead_lettered = 0
+        self._delivered_total = 0
+        self._last_error: Optional[str] = None
+
+    @workflow.run
+    async def run(self, input: AgentMailboxInput) -> AgentMailboxResult:
+        # Signals that arrived with signal-with-start are already queued; carried-over ones go first
+        self._queue[:0] = input.pending
+        for event_id in input.seen_event_ids:
+            self._remember(event_id)
+        self._delivered_total = input.delivered_total
+
+        while True:
+            try:
+                await workflow.wait_condition(lambda: bool(self._queue), timeout=MAILBOX_IDLE_TIMEOUT)
+            except TimeoutError:
+                pass
+            if not self._queue:
+                # Idle: finish; the next message's signal-with-start opens a new run
+                return AgentMailboxResult(
+                    agent_id=input.agent_id,
+                    delivered=self._delivered,
+                    dead_lettered=self._dead_lettered,
+                )
+
+            batch = take_batch(self._queue)
+            self._in_flight = len(batch)
+            await self._deliver_batch(input.agent_id, batch)
+            self._in_flight = 0
+
+            # enqueue is a synchronous handler, so no signal work is pending at this point
+            if self._delivered >= MAX_DELIVERIES_PER_RUN or workflow.info().is_continue_as_new_suggested():
+                workflow.continue_as_new(
+                    AgentMailboxInput(
+                        agent_id=input.agent_id,
+                        pending=list(self._queue),
+                        seen_event_ids=list(self._seen_event_ids),
+                        delivered_total=self._delivered_total,
+                    )
+                )
+
+    async def _deliver_batch(self, agent_id: str, batch: List[MailboxMessage]) -> None:
+        head = batch[0]
+        if len(batch) > 1:
+            workflow.logger.info(
+                f"Mailbox {agent_id}: delivering {len(batch)} queued messages as one turn "
+                f"(room={head.room_id}, queue_depth={len(self._queue)})"
+            )
+        try:
+            deliver_result = await workflow.execute_activity(
+                deliver_to_letta,
+                DeliverToLettaInput(
+                    agent_id=agent_id,
+                    message_body=combine_batch(batch),
+                    conversation_id=head.conversation_id,
+                    room_id=head.room_id,
+                    source_channel=head.source_channel,
+                ),
+                start_to_close_timeout=timedelta(minutes=30),
+                heartbeat_timeout=timedelta(seconds=60),
+                retry_policy=_DELIVER_RETRY,
+            )
+            if not deliver_result.success:
+                raise RuntimeError(deliver_result.error or "Delivery failed")
+        except Exception as e:
+            self._last_error = str(e)
+            workflow.logger.error(f"Mailbox {agent_id}: delivery failed, dead-lettering {len(batch)}: {e}")
+            # Start every dead letter together so they land in one buffered
+            # flush (one insert, one alert) instead of one flush each.
+            dl_results = await asyncio.gather(
+                *(
+                    workflow.execute_activity(
+                        dead_letter_message,
+                        DeadLetterInput(
+                            event_id=msg.event_id,
+                            room_id=msg.room_id,
+                            agent_id=agent_id,
+                            message_body=msg.message_body,
+                            sender=msg.sender,
+                            error=str(e),
+                            attempts=_DELIVER_RETRY.maximum_attempts,
+                            conversation_id=msg.conversation_id,
+                        ),
+                        start_to_close_timeout=timedelta(seconds=30),
+                        retry_policy=_DEAD_LETTER_RETRY,
+                    )
+                    for msg in batch
+                ),
+                return_exceptions=True,
+            )
+            for dl_result in dl_results:
+                if isinstance(dl_result, BaseException):
+                    workflow.logger.error(f"Dead letter also failed: {dl_result}")
+            self._dead_lettered += len(batch)
+            return
+
+        self._delivered += len(batch)
+        self._delivered_total += len(batch)
+        ack_results = await asyncio.gather(
+            *(
+                workflow.execute_activity(
+                    send_delivery_ack,
+                    DeliveryAckInput(room_id=msg.room_id, event_id=msg.event_id, agent_id=agent_id),
+                    start_to_close_timeout=timedelta(seconds=15),
+                    retry_policy=_ACK_RETRY,
+                )
+                for msg in batch
+                if msg.event_id
+            ),
+            return_exceptions=True,
+        )
+        for ack_result in ack_results:
+            if isinstance(ack_result, BaseException):
+                workflow.logger.warning(f"Delivery ack failed (best-effort): {ack_result}")
+
+    def _remember(self, event_id: str) -> None:
+        self._seen_event_ids.append(event_id)
+        self._seen_lookup.add(event_id)
+        if len(self._seen_event_ids) > _SEEN_EVENT_IDS_LIMIT:
+            self._seen_lookup.discard(self._seen_event_ids.pop(0))
+
+    # -------------------------------------------------------------------
+    # Signals
+    # -------------------------------------------------------------------
+
+    @workflow.signal
+    def enqueue(self, message: MailboxMessage) -> None:
+        """Append a message; duplicate event ids (client retries) are dropped."""
+        dedupe_key = message.dedupe_key or message.event_id
+        if dedupe_key:
+            if dedupe_key in self._seen_lookup:
+                return
+            self._remember(dedupe_key)
+        self._queue.append(message)
+
+    # -------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------
+
+    @workflow.query
+    def get_queue_depth(self) -> int:
+        return len(self._queue)
+
+    @workflow.query
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._queue),
+            "in_flight": self._in_flight,
+            "delivered": self._delivered,
+            "delivered_total": self._delivered_total,
+            "dead_lettered": self._dead_lettered,
+            "last_error": self._last_error,
+        }
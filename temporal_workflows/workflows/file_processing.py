@@ -6,6 +6,7 @@ Pipeline:
   2. download_file_from_matrix → temp file on disk
   3. parse_with_markitdown → extracted text
   4. ingest_to_haystack → chunks stored in Weaviate
+     (or 3+4 fused as stream_parse_and_ingest when streaming_parse is set)
   5. notify_letta_agent → agent knows document is searchable
   6. update_matrix_status → final status in room
 
@@ -24,21 +25,25 @@ from temporalio.common import RetryPolicy
 # Import activities through sandbox passthrough (same pattern as Letta/Graphiti)
 with workflow.unsafe.imports_passed_through():
     from ..activities import (
+        DOWNLOAD_MAX_ATTEMPTS,
         download_file_from_matrix,
         parse_with_markitdown,
         ingest_to_haystack,
+        stream_parse_and_ingest,
         notify_letta_agent,
         update_matrix_status,
         cleanup_file_artifacts,
         DownloadInput,
         ParseInput,
         IngestInput,
+        StreamingIngestInput,
         NotifyAgentInput,
         MatrixStatusInput,
         CleanupArtifactsInput,
         DownloadResult,
         ParseResult,
         IngestResult,
+        StreamingIngestResult,
         NotifyAgentResult,
         MatrixStatusResult,
         CleanupArtifactsResult,
@@ -97,6 +102,9 @@ class FileProcessingInput:
     # Optional Letta conversation ID for room-scoped context continuity
     conversation_id: Optional[str] = None
 
+    # Parse page-by-page and ingest while parsing (single fused activity)
+    streaming_parse: bool = False
+
 
 @dataclass
 class FileProcessingResult:
@@ -126,8 +134,9 @@ class FileProcessingResult:
 _DOWNLOAD_RETRY = RetryPolicy(
     initial_interval=timedelta(seconds=2),
     maximum_interval=timedelta(seconds=30),
-    maximum_attempts=3,
+    maximum_attempts=DOWNLOAD_MAX_ATTEMPTS,
     backoff_coefficient=2.0,
+    non_retryable_error_types=["DownloadTooLargeError"],
 )
 
 # CPU-bound: longer timeout, fewer retries (bad content won't get better)
@@ -147,6 +156,16 @@ _INGEST_RETRY = RetryPolicy(
     backoff_coefficient=2.0,
 )
 
+# Fused parse+ingest: retried like ingest (Hayhooks blips), but bad content
+# still fails fast
+_STREAM_INGEST_RETRY = RetryPolicy(
+    initial_interval=timedelta(seconds=5),
+    maximum_interval=timedelta(seconds=60),
+    maximum_attempts=3,
+    backoff_coefficient=2.0,
+    non_retryable_error_types=["ParseError"],
+)
+
 # API call: short timeout, moderate retries
 _NOTIFY_RETRY = RetryPolicy(
     initial_interval=timedelta(seconds=2),
@@ -386,15 +405,44 @@ class FileProcessingWorkflow:
             except Exception:
                 pass  # Best-effort
 
-            parse_result: ParseResult = await workflow.execute_activity(
-                parse_with_markitdown,
-                ParseInput(
-                    file_path=download_result.file_path,
-                    file_name=input.file_name,
-                ),
-                start_to_close_timeout=timedelta(seconds=300),
-                retry_policy=_PARSE_RETRY,
-            )
+            parse_result: ParseResult
+            ingest_result: IngestResult
+            if input.streaming_parse:
+                stream_result: StreamingIngestResult = await workflow.execute_activity(
+                    stream_parse_and_ingest,
+                    StreamingIngestInput(
+                        file_path=download_result.file_path,
+                        file_name=input.file_name,
+                        room_id=input.room_id,
+                        sender=input.sender,
+                    ),
+                    start_to_close_timeout=timedelta(seconds=900),
+                    heartbeat_timeout=timedelta(seconds=300),
+                    retry_policy=_STREAM_INGEST_RETRY,
+                )
+                parse_result = ParseResult(
+                    text="",
+                    page_count=stream_result.page_count,
+                    was_ocr=stream_result.was_ocr,
+                    char_count=stream_result.char_count,
+                    duration_ms=stream_result.parse_ms,
+                )
+                ingest_result = IngestResult(
+                    success=stream_result.success,
+                    chunks_stored=stream_result.chunks_stored,
+                    duration_ms=stream_result.ingest_ms,
+                )
+            else:
+                parse_result = await workflow.execute_activity(
+                    parse_with_markitdown,
+                    ParseInput(
+                        file_path=download_result.file_path,
+                        file_name=input.file_name,
+                        file_hash=download_result.file_hash,
+                    ),
+                    start_to_close_timeout=timedelta(seconds=300),
+                    retry_policy=_PARSE_RETRY,
+                )
             result.char_count = parse_result.char_count
             result.page_count = parse_result.page_count
             result.was_ocr = parse_result.was_ocr
@@ -416,7 +464,7 @@ class FileProcessingWorkflow:
             self._status = WorkflowStatus.INGESTING
 
             try:
-                if self._status_event_id:
+                if self._status_event_id and not input.streaming_parse:
                     await workflow.execute_activity(
                         update_matrix_status,
                         MatrixStatusInput(
@@ -431,17 +479,18 @@ class FileProcessingWorkflow:
             except Exception:
                 pass
 
-            ingest_result: IngestResult = await workflow.execute_activity(
-                ingest_to_haystack,
-                IngestInput(
-                    text=parse_result.text,
-                    filename=input.file_name,
-                    room_id=input.room_id,
-                    sender=input.sender,
-                ),
-                start_to_close_timeout=timedelta(seconds=600),
-                retry_policy=_INGEST_RETRY,
-            )
+            if not input.streaming_parse:
+                ingest_result = await workflow.execute_activity(
+                    ingest_to_haystack,
+                    IngestInput(
+                        text=parse_result.text,
+                        filename=input.file_name,
+                        room_id=input.room_id,
+                        sender=input.sender,
+                    ),
+                    start_to_close_timeout=timedelta(seconds=600),
+                    retry_policy=_INGEST_RETRY,
+                )
             result.chunks_stored = ingest_result.chunks_stored
             result.ingest_ms = ingest_result.duration_ms
             ingest_completed = True
@@ -145,7 +145,10 @@ class MessageDeliveryWorkflow:
                     room_id=input.room_id,
                     source_channel=input.source_channel,
                 ),
-                start_to_close_timeout=timedelta(seconds=300),
+                # The activity heartbeats while the agent streams, so a dead worker is
+                # detected within heartbeat_timeout; start_to_close only bounds very long turns.
+                start_to_close_timeout=timedelta(minutes=30),
+                heartbeat_timeout=timedelta(seconds=60),
                 retry_policy=_DELIVER_RETRY,
             )
 
@@ -204,6 +207,7 @@ class MessageDeliveryWorkflow:
                         sender=input.sender,
                         error=str(e),
                         attempts=result.attempts,
+                        conversation_id=input.conversation_id,
                     ),
                     start_to_close_timeout=timedelta(seconds=30),
                     retry_policy=_DEAD_LETTER_RETRY,
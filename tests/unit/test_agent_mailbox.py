@@ -0,0 +1,158 @@
+"""Tests for the per-agent mailbox workflow helpers and Temporal dispatch."""
+
+import logging
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from temporal_workflows.workflows.agent_mailbox import (
+    AgentMailboxInput,
+    AgentMailboxWorkflow,
+    MailboxMessage,
+    combine_batch,
+    mailbox_workflow_id,
+    take_batch,
+)
+
+
+def _msg(event_id, room="!a:test", body=None, conversation_id=""):
+    return MailboxMessage(
+        room_id=room,
+        message_body=body if body is not None else f"body {event_id}",
+        sender="@user:test",
+        event_id=event_id,
+        conversation_id=conversation_id,
+    )
+
+
+class TestTakeBatch:
+    def test_batches_consecutive_messages_for_same_room(self):
+        queue = [_msg("$1"), _msg("$2"), _msg("$3", room="!b:test"), _msg("$4")]
+
+        batch = take_batch(queue)
+
+        assert [m.event_id for m in batch] == ["$1", "$2"]
+        assert [m.event_id for m in queue] == ["$3", "$4"]
+
+    def test_never_mixes_conversations(self):
+        queue = [_msg("$1", conversation_id="c1"), _msg("$2", conversation_id="c2")]
+        assert [m.event_id for m in take_batch(queue)] == ["$1"]
+
+    def test_respects_message_and_char_limits(self):
+        queue = [_msg(f"${i}", body="x" * 100) for i in range(5)]
+        assert len(take_batch(list(queue), max_messages=3)) == 3
+        assert len(take_batch(list(queue), max_chars=250)) == 2
+
+    def test_multimodal_content_sent_alone(self):
+        queue = [_msg("$1"), _msg("$2", body='[{"type": "image"}]'), _msg("$3")]
+        assert [m.event_id for m in take_batch(queue)] == ["$1"]
+        assert [m.event_id for m in take_batch(queue)] == ["$2"]
+        assert [m.event_id for m in take_batch(queue)] == ["$3"]
+
+    def test_combine_preserves_order(self):
+        assert combine_batch([_msg("$1", body="first"), _msg("$2", body="second")]) == "first\n\nsecond"
+        assert combine_batch([_msg("$1", body="only")]) == "only"
+
+
+class TestMailboxSignals:
+    def test_enqueue_drops_duplicate_event_ids(self):
+        wf = AgentMailboxWorkflow()
+        wf.enqueue(_msg("$1"))
+        wf.enqueue(_msg("$1"))
+        wf.enqueue(_msg("$2"))
+
+        assert wf.get_queue_depth() == 2
+        assert wf.get_status()["queue_depth"] == 2
+
+    def test_dedupe_key_lets_replay_of_seen_event_through(self):
+        wf = AgentMailboxWorkflow()
+        wf.enqueue(_msg("$1"))
+        replay = _msg("$1")
+        replay.dedupe_key = "$1#replay-1"
+        wf.enqueue(replay)
+        wf.enqueue(replay)
+
+        assert wf.get_queue_depth() == 2
+        assert [m.event_id for m in wf._queue] == ["$1", "$1"]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_dead_letters_members_concurrently():
+    import asyncio
+
+    from temporal_workflows.activities import DeliverToLettaResult
+    from temporal_workflows.workflows import agent_mailbox
+
+    in_flight = 0
+    peak = 0
+    dead_lettered = []
+
+    async def fake_execute_activity(activity, arg, **kwargs):
+        nonlocal in_flight, peak
+        if activity is agent_mailbox.deliver_to_letta:
+            return DeliverToLettaResult(success=False, error="boom")
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if arg.event_id == "$2":
+            raise RuntimeError("db down")
+        dead_lettered.append(arg.event_id)
+
+    wf = AgentMailboxWorkflow()
+    batch = [_msg("$1"), _msg("$2"), _msg("$3")]
+    with patch.object(agent_mailbox.workflow, "execute_activity", fake_execute_activity), \
+            patch.object(agent_mailbox.workflow, "logger", logging.getLogger("test")):
+        await wf._deliver_batch("agent-1", batch)
+
+    assert peak == 3
+    assert dead_lettered == ["$1", "$3"]
+    assert wf._dead_lettered == 3
+
+
+@pytest.mark.asyncio
+async def test_dispatch_uses_signal_with_start(monkeypatch):
+    from src.matrix import message_processor
+
+    monkeypatch.delenv("TEMPORAL_DELIVERY_MODE", raising=False)
+    client = AsyncMock()
+    with patch.object(message_processor, "_get_temporal_client", AsyncMock(return_value=client)):
+        ok = await message_processor._dispatch_via_temporal(
+            room_id="!room:test",
+            agent_id="agent-1",
+            message_body="hello",
+            sender="@user:test",
+            event_id="$evt",
+            config=None,
+            logger=logging.getLogger("test"),
+        )
+
+    assert ok is True
+    args, kwargs = client.start_workflow.call_args
+    assert args[0] == AgentMailboxWorkflow.run
+    assert args[1] == AgentMailboxInput(agent_id="agent-1")
+    assert kwargs["id"] == mailbox_workflow_id("agent-1")
+    assert kwargs["start_signal"] == "enqueue"
+    assert kwargs["start_signal_args"][0].event_id == "$evt"
+    assert kwargs["start_signal_args"][0].message_body == "hello"
+
+
+@pytest.mark.asyncio
+async def test_dispatch_per_message_mode(monkeypatch):
+    from src.matrix import message_processor
+
+    monkeypatch.setenv("TEMPORAL_DELIVERY_MODE", "per_message")
+    client = AsyncMock()
+    with patch.object(message_processor, "_get_temporal_client", AsyncMock(return_value=client)):
+        await message_processor._dispatch_via_temporal(
+            room_id="!room:test",
+            agent_id="agent-1",
+            message_body="hello",
+            sender="@user:test",
+            event_id="$evt",
+            config=None,
+            logger=logging.getLogger("test"),
+        )
+
+    assert client.start_workflow.call_args.kwargs["id"] == "msg-delivery-$evt"
+    assert "start_signal" not in client.start_workflow.call_args.kwargs
@@ -14,7 +14,8 @@ from unittest.mock import Mock, patch
 import os
 
 # Import the FastAPI app
-from src.api.app import app, AutoJoinRequest
+from src.api.app import app
+from src.api.routes.room_join import AutoJoinRequest
 
 # Import the auth function
 from src.api.auth import verify_internal_key, INTERNAL_API_KEY
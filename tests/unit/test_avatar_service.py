@@ -1,3 +1,4 @@
+import asyncio
 import io
 from unittest.mock import AsyncMock, Mock, patch
 
@@ -158,3 +159,116 @@ async def test_set_default_avatar_for_agent_caches_successful_upload(avatar_serv
     assert session.post.call_count == 1
     avatar_service.user_manager.upload_avatar.assert_awaited_once()
     avatar_service.user_manager.set_user_avatar.assert_awaited_once()
+
+
+def _login_session():
+    check_response = AsyncMock()
+    check_response.status = 200
+    check_response.json = AsyncMock(return_value={})
+    check_response.__aenter__ = AsyncMock(return_value=check_response)
+    check_response.__aexit__ = AsyncMock(return_value=None)
+
+    login_response = AsyncMock()
+    login_response.status = 200
+    login_response.json = AsyncMock(return_value={"access_token": "agent-token"})
+    login_response.__aenter__ = AsyncMock(return_value=login_response)
+    login_response.__aexit__ = AsyncMock(return_value=None)
+
+    session = AsyncMock()
+    session.closed = False
+    session.get = Mock(return_value=check_response)
+    session.post = Mock(return_value=login_response)
+    return session
+
+
+def _service_with_agents(mock_config, cache_dir, count):
+    service = AvatarService(mock_config, Mock(), cache_dir=cache_dir)
+    service.user_manager = Mock()
+    service.user_manager.upload_avatar = AsyncMock(return_value="mxc://matrix.test/shared")
+    service.user_manager.set_user_avatar = AsyncMock(return_value=True)
+    service.mappings = {
+        f"agent-{n}": Mock(matrix_user_id=f"@agent_{n}:matrix.test", matrix_password="pw")
+        for n in range(count)
+    }
+    service._session = _login_session()
+    return service
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_rendered_avatar_is_cached_on_disk(mock_config, tmp_path):
+    if not HAS_PIL:
+        pytest.skip("Pillow not installed")
+
+    first = AvatarService(mock_config, Mock(), cache_dir=str(tmp_path))
+    rendered = await first.get_avatar_bytes("Meridian")
+
+    second = AvatarService(mock_config, Mock(), cache_dir=str(tmp_path))
+    with patch.object(second, "_generate_avatar_image") as mock_render:
+        cached = await second.get_avatar_bytes("Meridian")
+
+    mock_render.assert_not_called()
+    assert cached == rendered
+    assert len(list(tmp_path.glob("*.png"))) == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_identical_avatars_are_uploaded_once_across_restarts(mock_config, tmp_path):
+    if not HAS_PIL:
+        pytest.skip("Pillow not installed")
+
+    service = _service_with_agents(mock_config, str(tmp_path), 3)
+    summary = await service.reconcile_avatars(
+        [("Meridian", f"@agent_{n}:matrix.test") for n in range(3)]
+    )
+
+    assert summary == {"checked": 3, "ok": 3, "failed": 0}
+    service.user_manager.upload_avatar.assert_awaited_once()
+    assert service.user_manager.set_user_avatar.await_count == 3
+
+    restarted = _service_with_agents(mock_config, str(tmp_path), 1)
+    assert await restarted.set_default_avatar_for_agent("Meridian", "@agent_0:matrix.test")
+    restarted.user_manager.upload_avatar.assert_not_awaited()
+    restarted.user_manager.set_user_avatar.assert_awaited_once_with(
+        "@agent_0:matrix.test", "mxc://matrix.test/shared", "agent-token"
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failed_set_forgets_reused_upload(mock_config, tmp_path):
+    if not HAS_PIL:
+        pytest.skip("Pillow not installed")
+
+    service = _service_with_agents(mock_config, str(tmp_path), 2)
+    service.user_manager.set_user_avatar = AsyncMock(side_effect=[False, True])
+
+    assert not await service.set_default_avatar_for_agent("Meridian", "@agent_0:matrix.test")
+    assert await service.set_default_avatar_for_agent("Meridian", "@agent_1:matrix.test")
+
+    assert service.user_manager.upload_avatar.await_count == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_reconcile_avatars_is_bounded(mock_config, tmp_path):
+    service = AvatarService(mock_config, Mock(), cache_dir=str(tmp_path))
+    in_flight = 0
+    peak = 0
+
+    async def _slow_set(agent_name, matrix_user_id):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return matrix_user_id != "@agent_3:matrix.test"
+
+    with patch.object(service, "set_default_avatar_for_agent", side_effect=_slow_set):
+        summary = await service.reconcile_avatars(
+            [(f"Agent {n}", f"@agent_{n}:matrix.test") for n in range(10)], concurrency=3
+        )
+
+    assert peak == 3
+    assert summary == {"checked": 10, "ok": 9, "failed": 1}
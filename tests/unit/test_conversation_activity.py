@@ -0,0 +1,133 @@
+"""
+Unit tests for the write-behind conversation activity tracker.
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+from src.core import conversation_activity
+from src.core.conversation_activity import ConversationActivityTracker
+from src.core.conversation_service import ConversationService, reset_conversation_service
+from src.models.agent_mapping import Base
+from src.models.conversation import InterAgentConversationDB, RoomConversationDB
+
+
+@pytest.fixture
+def conversation_engine(monkeypatch):
+    engine = create_engine(
+        'sqlite:///:memory:',
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        echo=False
+    )
+    Base.metadata.create_all(engine)
+    import src.models.agent_mapping
+    monkeypatch.setattr(src.models.agent_mapping, 'get_engine', lambda: engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def updates(conversation_engine):
+    """Record UPDATE statements as (sql, executemany) pairs."""
+    seen = []
+
+    @event.listens_for(conversation_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            seen.append((statement, executemany))
+
+    return seen
+
+
+@pytest.fixture(autouse=True)
+def _fresh_singletons():
+    conversation_activity.reset_conversation_activity_tracker()
+    reset_conversation_service()
+    yield
+    conversation_activity.reset_conversation_activity_tracker()
+    reset_conversation_service()
+
+
+class TestConversationActivityTracker:
+
+    def test_touches_coalesce_into_one_update_per_table(self, conversation_engine, updates):
+        room_db = RoomConversationDB()
+        inter_db = InterAgentConversationDB()
+        for n in range(3):
+            room_db.create(f"!room{n}:matrix.test", "agent-001", f"conv-{n}")
+        inter_db.create("agent-001", "agent-002", "!room0:matrix.test", "inter-1")
+        updates.clear()
+
+        tracker = ConversationActivityTracker()
+        for _ in range(10):
+            for n in range(3):
+                tracker.touch_room(f"!room{n}:matrix.test", "agent-001")
+            tracker.touch_inter_agent("agent-001", "agent-002", "!room0:matrix.test")
+
+        assert updates == []
+        assert tracker.pending() == 4
+        assert tracker.flush() == 4
+        assert len(updates) == 2
+        assert updates[0][1] is True  # three room rows, one executemany
+        assert tracker.snapshot() == {
+            "touches": 40, "pending": 0, "flushes": 1, "rows_written": 4, "flush_errors": 0,
+        }
+        assert tracker.flush() == 0
+
+    def test_failed_flush_requeues_touches(self, conversation_engine):
+        tracker = ConversationActivityTracker()
+        tracker.touch_room("!room1:matrix.test", "agent-001")
+
+        with patch.object(RoomConversationDB, "touch_many", side_effect=RuntimeError("db down")):
+            assert tracker.flush() == 0
+
+        assert tracker.pending() == 1
+        assert tracker.snapshot()["flush_errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_pending_touches(self, conversation_engine):
+        room_db = RoomConversationDB()
+        room_db.create("!room1:matrix.test", "agent-001", "conv-1")
+        before = datetime.utcnow()
+
+        tracker = ConversationActivityTracker(interval_seconds=3600)
+        tracker.touch_room("!room1:matrix.test", "agent-001")
+        assert tracker._task is not None
+
+        await tracker.stop()
+
+        assert tracker._task is None
+        assert tracker.pending() == 0
+        assert room_db.get_by_room_and_agent("!room1:matrix.test", "agent-001").last_message_at >= before
+
+    @pytest.mark.asyncio
+    async def test_message_path_does_not_write_last_message_at(self, conversation_engine, updates):
+        letta = MagicMock()
+        letta.conversations.create.return_value = MagicMock(id="letta-conv-1")
+        service = ConversationService(letta_client=letta)
+
+        for _ in range(5):
+            await service.get_or_create_room_conversation(
+                room_id="!room1:matrix.test", agent_id="agent-001", room_member_count=5
+            )
+
+        assert updates == []
+        tracker = conversation_activity.get_conversation_activity_tracker()
+        assert tracker.pending() == 1
+        await tracker.stop()
+        assert len(updates) == 1
+
+    def test_cleanup_flushes_before_deleting(self, conversation_engine):
+        room_db = RoomConversationDB()
+        room_db.create("!room1:matrix.test", "agent-001", "conv-1")
+        room_db.touch_many({("!room1:matrix.test", "agent-001", None, None): datetime(2000, 1, 1)})
+
+        conversation_activity.get_conversation_activity_tracker().touch_room("!room1:matrix.test", "agent-001")
+        room_deleted, _ = ConversationService(letta_client=MagicMock()).cleanup_stale_conversations(days=30)
+
+        assert room_deleted == 0
+        assert room_db.get_by_room_and_agent("!room1:matrix.test", "agent-001") is not None
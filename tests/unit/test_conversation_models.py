@@ -158,6 +158,32 @@ class TestRoomConversation:
         assert updated is not None
         assert updated.last_message_at > original_time
 
+    def test_touch_many_matches_null_and_set_columns(self, room_conv_db):
+        room_conv_db.create("!room1:matrix.test", "agent-001", "conv-main")
+        room_conv_db.create(
+            "!room1:matrix.test", "agent-001", "conv-alice", strategy="per-user", user_mxid="@alice:matrix.test"
+        )
+        room_conv_db.create(
+            "!room1:matrix.test", "agent-001", "conv-thread", strategy="per-thread", thread_event_id="$root"
+        )
+        main_at = datetime(2030, 1, 1, 12, 0)
+        thread_at = datetime(2030, 1, 2, 12, 0)
+
+        written = room_conv_db.touch_many({
+            ("!room1:matrix.test", "agent-001", None, None): main_at,
+            ("!room1:matrix.test", "agent-001", None, "$root"): thread_at,
+            ("!room1:matrix.test", "agent-001", None, "$missing"): thread_at,
+        })
+
+        assert written == 2
+        assert room_conv_db.get_by_room_and_agent("!room1:matrix.test", "agent-001").last_message_at == main_at
+        assert room_conv_db.get_by_room_and_agent(
+            "!room1:matrix.test", "agent-001", thread_event_id="$root"
+        ).last_message_at == thread_at
+        assert room_conv_db.get_by_room_and_agent(
+            "!room1:matrix.test", "agent-001", user_mxid="@alice:matrix.test"
+        ).last_message_at < main_at
+
     def test_delete(self, room_conv_db):
         room_conv_db.create("!room1:matrix.test", "agent-001", "conv-001")
         
@@ -439,6 +465,21 @@ class TestInterAgentConversation:
         assert updated is not None
         assert updated.last_message_at > original_time
 
+    def test_touch_many(self, inter_agent_db):
+        inter_agent_db.create("agent-001", "agent-002", "!room1:matrix.test", "conv-1")
+        inter_agent_db.create("agent-001", "agent-002", "!room1:matrix.test", "conv-2", "@alice:matrix.test")
+        at = datetime(2030, 1, 1, 12, 0)
+
+        written = inter_agent_db.touch_many({
+            ("agent-001", "agent-002", "!room1:matrix.test", "@alice:matrix.test"): at,
+        })
+
+        assert written == 1
+        assert inter_agent_db.get(
+            "agent-001", "agent-002", "!room1:matrix.test", "@alice:matrix.test"
+        ).last_message_at == at
+        assert inter_agent_db.get("agent-001", "agent-002", "!room1:matrix.test").last_message_at < at
+
     def test_delete(self, inter_agent_db):
         inter_agent_db.create("agent-001", "agent-002", "!room1:matrix.test", "conv-1")
         
@@ -1,6 +1,10 @@
 """
 Unit tests for ConversationService.
 """
+import asyncio
+import threading
+import time
+
 import pytest
 from unittest.mock import MagicMock, Mock, patch, AsyncMock
 from sqlalchemy import create_engine
@@ -11,6 +15,7 @@ from letta_client import APIError, NotFoundError
 
 from src.models.agent_mapping import Base
 from src.models.conversation import RoomConversationDB, InterAgentConversationDB
+import src.core.conversation_service as conversation_module
 from src.core.conversation_service import (
     ConversationService,
     get_conversation_service,
@@ -256,8 +261,10 @@ class TestGetOrCreateRoomConversation:
         assert mock_letta_client.conversations.create.call_count == 2
 
     @pytest.mark.asyncio
-    async def test_stale_conversation_recovery(self, conversation_service, mock_letta_client):
+    async def test_stale_conversation_recovery(self, conversation_service, mock_letta_client, monkeypatch):
         """DB record exists but Letta conversation deleted = recreate."""
+        # Re-verify on every call instead of trusting the cached mapping
+        monkeypatch.setattr(conversation_module, "CONVERSATION_VERIFY_TTL_SECONDS", 0)
         # First create returns existing conversation
         mock_conv1 = MagicMock()
         mock_conv1.id = "letta-conv-stale"
@@ -333,6 +340,150 @@ class TestGetOrCreateRoomConversation:
             )
 
 
+class TestConversationResolverCache:
+    """Tests for the cached, single-flight room conversation resolver."""
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_skips_db_lookup_and_verification(self, conversation_service, mock_letta_client):
+        mock_conv = MagicMock()
+        mock_conv.id = "letta-conv-cached"
+        mock_letta_client.conversations.create.return_value = mock_conv
+
+        await conversation_service.get_or_create_room_conversation(
+            room_id="!room1:matrix.test", agent_id="agent-001", room_member_count=5
+        )
+        with patch.object(
+            conversation_service.room_conv_db, "get_by_room_and_agent", wraps=conversation_service.room_conv_db.get_by_room_and_agent
+        ) as lookup:
+            conv_id, created = await conversation_service.get_or_create_room_conversation(
+                room_id="!room1:matrix.test", agent_id="agent-001", room_member_count=5
+            )
+
+        assert (conv_id, created) == ("letta-conv-cached", False)
+        lookup.assert_not_called()
+        mock_letta_client.conversations.retrieve.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cache_is_shared_across_service_instances(
+        self, conversation_service, mock_letta_client
+    ):
+        mock_conv = MagicMock()
+        mock_conv.id = "letta-conv-shared"
+        mock_letta_client.conversations.create.return_value = mock_conv
+
+        await conversation_service.get_or_create_room_conversation(
+            room_id="!room1:matrix.test", agent_id="agent-001", room_member_count=5
+        )
+        other = ConversationService(letta_client=mock_letta_client)
+        conv_id, created = await other.get_or_create_room_conversation(
+            room_id="!room1:matrix.test", agent_id="agent-001", room_member_count=5
+        )
+
+        assert (conv_id, created) == ("letta-conv-shared", False)
+        mock_letta_client.conversations.retrieve.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_invalidated_conversation_is_reverified_and_recreated(
+        self, conversation_service, mock_letta_client
+    ):
+        first, second = MagicMock(), MagicMock()
+        first.id, second.id = "letta-conv-deleted", "letta-conv-new"
+        mock_letta_client.conversations.create.side_effect = [first, second]
+
+        await conversation_service.get_or_create_room_conversation(
+            room_id="!room1:matrix.test", agent_id="agent-001", room_member_count=5
+        )
+        mock_letta_client.conversations.retrieve.side_effect = make_not_found_error()
+
+        assert conversation_module.invalidate_conversation("letta-conv-deleted") == 1
+        conv_id, created = await conversation_service.get_or_create_room_conversation(
+            room_id="!room1:matrix.test", agent_id="agent-001", room_member_count=5
+        )
+
+        assert (conv_id, created) == ("letta-conv-new", True)
+        mock_letta_client.conversations.retrieve.assert_called_once_with("letta-conv-deleted")
+        assert conversation_module.invalidate_conversation("letta-conv-deleted") == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_messages_create_one_conversation(
+        self, conversation_service, mock_letta_client
+    ):
+        def _slow_create(**kwargs):
+            time.sleep(0.05)
+            conv = MagicMock()
+            conv.id = "letta-conv-thread"
+            return conv
+
+        mock_letta_client.conversations.create.side_effect = _slow_create
+
+        results = await asyncio.gather(*(
+            conversation_service.get_or_create_room_conversation(
+                room_id="!room1:matrix.test",
+                agent_id="agent-001",
+                room_member_count=5,
+                thread_event_id="$thread-root",
+            )
+            for _ in range(5)
+        ))
+
+        assert mock_letta_client.conversations.create.call_count == 1
+        assert {conv_id for conv_id, _ in results} == {"letta-conv-thread"}
+        assert sum(created for _, created in results) == 1
+        assert conversation_module._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_resolution_propagates_to_waiters(self, conversation_service, mock_letta_client):
+        def _failing_create(**kwargs):
+            time.sleep(0.02)
+            raise make_api_error("Service unavailable")
+
+        mock_letta_client.conversations.create.side_effect = _failing_create
+
+        results = await asyncio.gather(
+            *(
+                conversation_service.get_or_create_room_conversation(
+                    room_id="!room1:matrix.test", agent_id="agent-001", room_member_count=5
+                )
+                for _ in range(3)
+            ),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, APIError) for r in results)
+        assert mock_letta_client.conversations.create.call_count == 1
+        assert conversation_module._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_thread_seeding_runs_off_the_message_path(self, conversation_service, mock_letta_client):
+        conv_ids = iter(["letta-conv-main", "letta-conv-thread"])
+        mock_letta_client.conversations.create.side_effect = lambda **kwargs: MagicMock(id=next(conv_ids))
+        await conversation_service.get_or_create_room_conversation(
+            room_id="!room1:matrix.test", agent_id="agent-001", room_member_count=5
+        )
+
+        release = threading.Event()
+        seeded = []
+
+        def _blocking_seed(thread_conversation_id, main_conversation_id, agent_id):
+            release.wait(5)
+            seeded.append((thread_conversation_id, main_conversation_id))
+
+        with patch.object(conversation_service, "_seed_thread_conversation", side_effect=_blocking_seed):
+            conv_id, created = await conversation_service.get_or_create_room_conversation(
+                room_id="!room1:matrix.test",
+                agent_id="agent-001",
+                room_member_count=5,
+                thread_event_id="$thread-root",
+            )
+            assert (conv_id, created) == ("letta-conv-thread", True)
+            assert seeded == []
+
+            release.set()
+            await asyncio.gather(*conversation_module._background_tasks)
+
+        assert seeded == [("letta-conv-thread", "letta-conv-main")]
+
+
 class TestGetOrCreateInterAgentConversation:
     """Tests for get_or_create_inter_agent_conversation."""
 
@@ -0,0 +1,219 @@
+"""Tests for batched dead-letter writes and replay."""
+
+import asyncio
+
+import pytest
+
+from temporal_workflows.activities import dead_letters
+from temporal_workflows.activities.dead_letters import (
+    DeadLetterBuffer,
+    DeadLetterRow,
+    replay_dead_letters,
+    replay_dedupe_key,
+)
+
+
+def _row(event_id, agent_id="agent-1", error="boom"):
+    return DeadLetterRow(
+        event_id=event_id,
+        room_id="!room:matrix.test",
+        agent_id=agent_id,
+        message_body=f"body {event_id}",
+        sender="@user:matrix.test",
+        error=error,
+        attempts=3,
+    )
+
+
+class _RecordingBuffer(DeadLetterBuffer):
+    def __init__(self, fail_write=False, **kwargs):
+        super().__init__("postgresql://test", "http://ntfy", "alerts", **kwargs)
+        self.writes = []
+        self.alerts = []
+        self._fail_write = fail_write
+
+    async def _write(self, rows):
+        if self._fail_write:
+            raise RuntimeError("db down")
+        self.writes.append([row.event_id for row in rows])
+
+    async def _alert(self, rows, db_error):
+        self.alerts.append((len(rows), db_error))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_adds_share_one_write_and_alert():
+    buffer = _RecordingBuffer(flush_interval=0.01)
+
+    await asyncio.gather(*(buffer.add(_row(f"$e{i}")) for i in range(5)))
+
+    assert buffer.writes == [["$e0", "$e1", "$e2", "$e3", "$e4"]]
+    assert len(buffer.alerts) == 1
+    assert buffer.flushes == 1
+    assert buffer.rows_written == 5
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_without_waiting_for_interval():
+    buffer = _RecordingBuffer(max_batch=2, flush_interval=60)
+
+    await asyncio.wait_for(asyncio.gather(buffer.add(_row("$a")), buffer.add(_row("$b"))), timeout=1)
+
+    assert buffer.writes == [["$a", "$b"]]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_event_in_one_flush_keeps_latest():
+    buffer = _RecordingBuffer(flush_interval=0.01)
+
+    await asyncio.gather(buffer.add(_row("$e", error="first")), buffer.add(_row("$e", error="second")))
+
+    assert buffer.writes == [["$e"]]
+    assert buffer.rows_written == 1
+
+
+@pytest.mark.asyncio
+async def test_db_failure_still_alerts_and_raises_to_callers():
+    buffer = _RecordingBuffer(fail_write=True, flush_interval=0.01)
+
+    results = await asyncio.gather(buffer.add(_row("$a")), buffer.add(_row("$b")), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(buffer.alerts) == 1
+    assert isinstance(buffer.alerts[0][1], RuntimeError)
+
+
+def test_row_params_truncate_long_fields():
+    row = _row("$e", error="x" * 5000)
+    row.message_body = "y" * 20000
+
+    params = row.as_params()
+
+    assert len(params[3]) == 10000
+    assert len(params[5]) == 2000
+
+
+def test_row_params_carry_conversation_id():
+    row = _row("$e")
+    row.conversation_id = "conv-1"
+
+    assert row.as_params()[7] == "conv-1"
+    assert "conversation_id = EXCLUDED.conversation_id" in dead_letters._UPSERT_SQL
+
+
+class _ReplayConn:
+    def __init__(self, rows):
+        self.rows = rows
+        self.marked = []
+        self.fetch_args = None
+
+    async def fetch(self, query, agent_ids, limit):
+        self.fetch_args = (agent_ids, limit)
+        rows = [r for r in self.rows if agent_ids is None or r["agent_id"] in agent_ids]
+        return rows[:limit]
+
+    async def execute(self, query, ids):
+        self.marked.extend(ids)
+
+
+def _pending(row_id, agent_id, event_id):
+    return {
+        "id": row_id,
+        "event_id": event_id,
+        "room_id": "!room:matrix.test",
+        "agent_id": agent_id,
+        "message_body": f"body {event_id}",
+        "sender": "@user:matrix.test",
+        "attempts": 3,
+        "conversation_id": "",
+        "replay_count": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_replay_preserves_per_agent_order_and_marks_rows():
+    conn = _ReplayConn(
+        [
+            _pending(1, "agent-a", "$a1"),
+            _pending(2, "agent-a", "$a2"),
+            _pending(3, "agent-b", "$b1"),
+            _pending(4, "agent-a", "$a3"),
+        ]
+    )
+    sent = []
+
+    async def _enqueue(row):
+        sent.append(row["event_id"])
+
+    progress = await replay_dead_letters(conn, _enqueue, rate_per_second=0, mark_batch=2)
+
+    assert [e for e in sent if e.startswith("$a")] == ["$a1", "$a2", "$a3"]
+    assert sorted(conn.marked) == [1, 2, 3, 4]
+    assert progress.replayed == 4
+    assert progress.failed == 0
+
+
+@pytest.mark.asyncio
+async def test_replay_failure_stops_only_that_agent():
+    conn = _ReplayConn(
+        [
+            _pending(1, "agent-a", "$a1"),
+            _pending(2, "agent-a", "$a2"),
+            _pending(3, "agent-a", "$a3"),
+            _pending(4, "agent-b", "$b1"),
+        ]
+    )
+
+    async def _enqueue(row):
+        if row["event_id"] == "$a2":
+            raise RuntimeError("temporal unavailable")
+
+    progress = await replay_dead_letters(conn, _enqueue, rate_per_second=0)
+
+    assert sorted(conn.marked) == [1, 4]
+    assert progress.replayed == 2
+    assert progress.failed == 2
+
+
+@pytest.mark.asyncio
+async def test_replay_dry_run_does_not_enqueue_or_mark():
+    conn = _ReplayConn([_pending(1, "agent-a", "$a1")])
+
+    async def _enqueue(row):
+        raise AssertionError("dry run must not enqueue")
+
+    progress = await replay_dead_letters(conn, _enqueue, agent_ids=["agent-a"], limit=5, dry_run=True)
+
+    assert progress.total == 1
+    assert conn.marked == []
+    assert conn.fetch_args == (["agent-a"], 5)
+
+
+@pytest.mark.asyncio
+async def test_replay_is_rate_limited(monkeypatch):
+    conn = _ReplayConn([_pending(i, f"agent-{i}", f"$e{i}") for i in range(4)])
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def _sleep(delay):
+        sleeps.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(dead_letters.asyncio, "sleep", _sleep)
+
+    async def _enqueue(row):
+        return None
+
+    await replay_dead_letters(conn, _enqueue, rate_per_second=10)
+
+    # First message goes immediately; the other three wait for 0.1s slots
+    assert len(sleeps) == 3
+    assert max(sleeps) == pytest.approx(0.3, abs=0.05)
+
+
+def test_replay_dedupe_key_is_unique_per_replay():
+    row = _pending(1, "agent-a", "$a1")
+    assert replay_dedupe_key(row) == "$a1#replay-1"
+
+    row["replay_count"] = 2
+    assert replay_dedupe_key(row) == "$a1#replay-3"
@@ -0,0 +1,148 @@
+import asyncio
+import json
+from dataclasses import dataclass
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routes import dm_rooms
+from src.api.routes.dm_rooms import DMRoomNameReconciler, dm_router
+from src.api.schemas.identity import DMRoomNameReconcileRequest
+from src.models.identity import Identity
+
+
+AGENT = Identity(
+    id="letta_agent-1",
+    identity_type="letta",
+    mxid="@agent_1:matrix.test",
+    access_token="agent_tok",
+    display_name="Meridian",
+)
+
+
+def _user(n: int) -> Identity:
+    return Identity(
+        id=f"user_{n}",
+        identity_type="custom",
+        mxid=f"@user{n}:matrix.test",
+        access_token=f"user_tok_{n}",
+        display_name=f"User {n}",
+    )
+
+
+@dataclass
+class _FakeDMRoom:
+    room_id: str
+    participant_1: str
+    participant_2: str
+
+
+USERS = {f"@user{n}:matrix.test": _user(n) for n in range(6)}
+ROOMS = [_FakeDMRoom(f"!dm{n}:matrix.test", AGENT.mxid, f"@user{n}:matrix.test") for n in range(6)]
+
+
+@pytest.fixture
+def identity_service():
+    service = MagicMock()
+    service.get_by_mxid.side_effect = lambda mxid: AGENT if mxid == AGENT.mxid else USERS.get(mxid)
+    with patch("src.api.routes.dm_rooms.get_identity_service", return_value=service):
+        yield service
+
+
+def _display_names(agent_name):
+    async def _display_name(mxid, token):
+        return agent_name if mxid == AGENT.mxid else USERS[mxid].display_name
+
+    return _display_name
+
+
+@pytest.fixture
+def room_names():
+    async def _room_name(room_id, token):
+        n = room_id[3]
+        return f"Meridian ↔ User {n}" if n != "0" else "stale name"
+
+    with patch("src.api.routes.dm_rooms._get_room_name", side_effect=_room_name) as mock_room_name:
+        yield mock_room_name
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_profile_fetch_and_sync_are_shared_across_rooms(identity_service, room_names):
+    with (
+        patch("src.api.routes.dm_rooms._get_matrix_display_name", side_effect=_display_names("Old Name")) as mock_display,
+        patch("src.api.routes.dm_rooms._sync_identity_profile", new_callable=AsyncMock) as mock_sync,
+    ):
+        reconciler = DMRoomNameReconciler(DMRoomNameReconcileRequest(dry_run=False), concurrency=3)
+        changes = [diff async for diff in reconciler.iter_changes(ROOMS)]
+
+    agent_fetches = [c for c in mock_display.call_args_list if c.args[0] == AGENT.mxid]
+    assert len(agent_fetches) == 1
+    assert mock_display.call_count == 1 + len(USERS)
+    mock_sync.assert_awaited_once_with("letta_agent-1", "Meridian")
+    assert identity_service.get_by_mxid.call_count == 1 + len(USERS)
+
+    # The three rooms in flight before the sync report it; later rooms see the synced name
+    assert len(changes) == 3
+    assert all(diff.profiles_synced == ["letta_agent-1"] for diff in changes)
+    summary = reconciler.summary()
+    assert summary.checked == summary.agent_dm_rooms == 6
+    assert summary.profile_mismatches == 3
+    assert summary.profiles_synced == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_rooms_are_checked_concurrently_with_a_limit(identity_service):
+    in_flight = 0
+    peak = 0
+
+    async def _slow_room_name(room_id, token):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return None
+
+    with (
+        patch("src.api.routes.dm_rooms._get_room_name", side_effect=_slow_room_name),
+        patch("src.api.routes.dm_rooms._get_matrix_display_name", side_effect=_display_names("Meridian")),
+    ):
+        reconciler = DMRoomNameReconciler(DMRoomNameReconcileRequest(), concurrency=4)
+        changes = [diff async for diff in reconciler.iter_changes(ROOMS)]
+
+    assert changes == []
+    assert peak == 4
+    assert reconciler.summary().checked == 6
+
+
+@pytest.mark.unit
+def test_endpoints_return_batch_and_ndjson(identity_service, room_names, monkeypatch):
+    monkeypatch.setattr(dm_rooms, "DM_RECONCILE_CONCURRENCY", 2)
+    dm_room_service = MagicMock()
+    dm_room_service.get_all.return_value = ROOMS
+    app = FastAPI()
+    app.include_router(dm_router)
+
+    with (
+        patch("src.api.routes.dm_rooms.get_dm_room_service", return_value=dm_room_service),
+        patch("src.api.routes.dm_rooms._get_matrix_display_name", side_effect=_display_names("Meridian")),
+    ):
+        client = TestClient(app)
+        batch = client.post("/api/v1/dm-rooms/reconcile-names", json={"dry_run": True}).json()
+        stream = client.post("/api/v1/dm-rooms/reconcile-names/stream", json={"dry_run": True})
+
+    assert batch["checked"] == 6
+    assert batch["mismatched_rooms"] == 1
+    assert [c["room_id"] for c in batch["changes"]] == ["!dm0:matrix.test"]
+
+    assert stream.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in stream.text.splitlines()]
+    assert [line["type"] for line in lines] == ["change", "summary"]
+    assert lines[0]["room_name"] == "stale name"
+    assert lines[0]["room_name_mismatch"] is True
+    assert lines[1]["checked"] == 6
+    assert "changes" not in lines[1]
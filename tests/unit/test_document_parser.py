@@ -510,3 +510,97 @@ class TestParseDocumentVcfFallback:
             result = await parse_document(str(f), "report.pdf", config=config)
 
             assert result.error is not None
+
+
+# ---------------------------------------------------------------------------
+# iter_document_sections — streaming parse mode
+# ---------------------------------------------------------------------------
+
+class TestIterDocumentSections:
+    @pytest.fixture
+    def pdf_file(self, tmp_path):
+        """Three text pages followed by one blank (scanned-looking) page."""
+        import fitz
+
+        doc = fitz.open()
+        for i in range(3):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Page {i + 1} " + "readable words here " * 4)
+        doc.new_page()
+        path = tmp_path / "mixed.pdf"
+        doc.save(str(path))
+        doc.close()
+        return str(path)
+
+    @staticmethod
+    async def _collect(*args, **kwargs):
+        from src.matrix.document_parser import iter_document_sections
+
+        return [section async for section in iter_document_sections(*args, **kwargs)]
+
+    @pytest.mark.asyncio
+    async def test_pdf_yields_pages_in_order_and_ocrs_only_blank_pages(self, pdf_file):
+        config = DocumentParseConfig(ocr_enabled=True, stream_ocr_concurrency=2, timeout_seconds=10.0)
+
+        with patch("src.matrix.document_parser._process_pool", None), \
+             patch("src.matrix.document_parser._ocr_pdf_page", return_value="OCR page text") as mock_ocr:
+            sections = await self._collect(pdf_file, "mixed.pdf", config=config)
+
+        assert [s.page_number for s in sections] == [1, 2, 3, 4]
+        assert [s.index for s in sections] == [0, 1, 2, 3]
+        assert all(s.page_count == 4 for s in sections)
+        assert sections[0].text.startswith("Page 1")
+        assert sections[3].text == "OCR page text"
+        assert sections[3].was_ocr is True
+        assert not any(s.was_ocr for s in sections[:3])
+        mock_ocr.assert_called_once_with(pdf_file, 3, config.ocr_dpi)
+
+    @pytest.mark.asyncio
+    async def test_pdf_blank_page_skipped_when_ocr_disabled(self, pdf_file):
+        config = DocumentParseConfig(ocr_enabled=False)
+
+        with patch("src.matrix.document_parser._ocr_pdf_page") as mock_ocr:
+            sections = await self._collect(pdf_file, "mixed.pdf", config=config)
+
+        assert [s.page_number for s in sections] == [1, 2, 3]
+        mock_ocr.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_non_pdf_split_into_sections(self, tmp_path):
+        f = tmp_path / "notes.txt"
+        f.write_text("placeholder")
+        config = DocumentParseConfig(stream_section_chars=30, timeout_seconds=10.0, max_file_size_mb=1)
+        paragraphs = "\n\n".join(f"Paragraph number {i} text" for i in range(4))
+
+        with patch("src.matrix.document_parser._process_pool", None), \
+             patch("src.matrix.document_parser._convert_with_markitdown", return_value=(paragraphs, None, None)):
+            sections = await self._collect(str(f), "notes.txt", config=config)
+
+        assert len(sections) == 4
+        assert [s.index for s in sections] == [0, 1, 2, 3]
+        assert sections[2].text == "Paragraph number 2 text"
+
+    @pytest.mark.asyncio
+    async def test_disabled_raises(self, tmp_path):
+        from src.matrix.document_parser import DocumentParseError
+
+        f = tmp_path / "notes.txt"
+        f.write_text("hello")
+        with pytest.raises(DocumentParseError, match="disabled"):
+            await self._collect(str(f), "notes.txt", config=DocumentParseConfig(enabled=False))
+
+    @pytest.mark.asyncio
+    async def test_no_text_raises(self, tmp_path):
+        import fitz
+        from src.matrix.document_parser import DocumentParseError
+
+        doc = fitz.open()
+        doc.new_page()
+        path = tmp_path / "blank.pdf"
+        doc.save(str(path))
+        doc.close()
+
+        with patch("src.matrix.document_parser._process_pool", None), \
+             patch("src.matrix.document_parser._ocr_pdf_page", return_value=""):
+            with pytest.raises(DocumentParseError, match="No text"):
+                await self._collect(str(path), "blank.pdf", config=DocumentParseConfig(timeout_seconds=10.0))
@@ -1,5 +1,7 @@
+import hashlib
 import logging
 import os
+import tempfile
 from types import SimpleNamespace
 from typing import cast
 from unittest.mock import patch
@@ -7,7 +9,7 @@ from unittest.mock import patch
 import pytest
 from nio import Event
 
-from src.matrix.file_download import FileDownloadService, FileMetadata, MAX_FILE_SIZE
+from src.matrix.file_download import FileDownloadService, FileMetadata, FileUploadError, MAX_FILE_SIZE
 
 
 def _build_event(content):
@@ -131,6 +133,7 @@ async def test_download_file_success_with_mocked_aiohttp():
     class FakeResponse:
         status = 200
         content = FakeContent()
+        content_length = None
 
         async def __aenter__(self):
             return self
@@ -166,6 +169,103 @@ async def test_download_file_success_with_mocked_aiohttp():
             assert f.read() == b"hello world"
         assert fake_session.request is not None
         assert fake_session.request[1] == {"Authorization": "Bearer matrix-token"}
+        assert service.content_hash(downloaded_path) == hashlib.sha256(b"hello world").hexdigest()
     finally:
         if os.path.exists(downloaded_path):
             os.unlink(downloaded_path)
+
+
+@pytest.mark.asyncio
+async def test_download_file_aborts_when_stream_exceeds_limit():
+    service = FileDownloadService("http://tuwunel:6167", "matrix-token", logging.getLogger("test"))
+    metadata = FileMetadata(
+        file_url="mxc://matrix.oculair.ca/media123",
+        file_name="huge.pdf",
+        file_type="application/pdf",
+        file_size=1024,  # client-reported size can lie
+        room_id="!room:matrix.oculair.ca",
+        sender="@user:matrix.oculair.ca",
+        timestamp=1700000000000,
+        event_id="$event123",
+    )
+    chunks_read = []
+
+    class FakeContent:
+        async def iter_chunked(self, size):
+            for _ in range(MAX_FILE_SIZE // size + 2):
+                chunks_read.append(size)
+                yield b"x" * size
+
+    class FakeResponse:
+        status = 200
+        content = FakeContent()
+        content_length = None  # chunked transfer, no header
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+    class FakeSession:
+        closed = False
+
+        def get(self, url, headers=None):
+            return FakeResponse()
+
+    service._session = FakeSession()
+    created = []
+    real_ntf = tempfile.NamedTemporaryFile
+
+    def _tracking_ntf(*args, **kwargs):
+        f = real_ntf(*args, **kwargs)
+        created.append(f.name)
+        return f
+
+    with patch("src.matrix.file_download.tempfile.NamedTemporaryFile", _tracking_ntf):
+        with pytest.raises(FileUploadError, match="byte limit"):
+            await service.download_file(metadata)
+
+    assert sum(chunks_read) <= MAX_FILE_SIZE + chunks_read[0]
+    assert created and not os.path.exists(created[0])
+
+
+@pytest.mark.asyncio
+async def test_download_file_rejects_large_content_length_before_reading():
+    service = FileDownloadService("http://tuwunel:6167", None, logging.getLogger("test"))
+    metadata = FileMetadata(
+        file_url="mxc://matrix.oculair.ca/media123",
+        file_name="huge.pdf",
+        file_type="application/pdf",
+        file_size=0,
+        room_id="!room:matrix.oculair.ca",
+        sender="@user:matrix.oculair.ca",
+        timestamp=1700000000000,
+        event_id="$event123",
+    )
+
+    class FakeContent:
+        async def iter_chunked(self, size):
+            raise AssertionError("body should not be read")
+            yield b""
+
+    class FakeResponse:
+        status = 200
+        content = FakeContent()
+        content_length = MAX_FILE_SIZE + 1
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+    class FakeSession:
+        closed = False
+
+        def get(self, url, headers=None):
+            return FakeResponse()
+
+    service._session = FakeSession()
+    with pytest.raises(FileUploadError, match="exceeds"):
+        await service.download_file(metadata)
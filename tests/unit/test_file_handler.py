@@ -502,3 +502,82 @@ async def test_notify_handles_callback_exception_gracefully():
     # Should not raise, should return None on error
     assert result is None
     failing_callback.assert_awaited_once()
+
+
+# ---------------------------------------------------------------------------
+# encode_image_for_budget tests
+# ---------------------------------------------------------------------------
+
+def _write_noise_image(path: str, size, fmt: str = "JPEG") -> None:
+    # Random pixels are the worst case for JPEG, so these never fit at q85
+    Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)).save(path, format=fmt, quality=95)
+
+
+@pytest.fixture
+def image_encoder():
+    from src.matrix import file_image_handler
+
+    file_image_handler.reset()
+    yield file_image_handler
+    file_image_handler.reset()
+
+
+def test_encode_large_photo_fits_budget_in_few_full_encodes(image_encoder, tmp_path):
+    path = str(tmp_path / "photo.jpg")
+    _write_noise_image(path, (4032, 3024))
+
+    data, media_type, raw_len = image_encoder.encode_image_for_budget(path)
+
+    assert media_type == "image/jpeg"
+    assert raw_len <= image_encoder.MAX_RAW_BYTES
+    assert len(base64.standard_b64decode(data)) == raw_len
+    with Image.open(io.BytesIO(base64.standard_b64decode(data))) as img:
+        assert max(img.size) == image_encoder.MAX_DIMENSION
+    # One trial at the top quality plus (usually) one predicted encode
+    assert image_encoder.snapshot()["image_encode_full_encodes_total"] <= 3
+
+
+def test_encode_small_image_uses_single_encode(image_encoder, tmp_path):
+    path = str(tmp_path / "tiny.png")
+    _write_tiny_image(path, "PNG")
+
+    _, media_type, _ = image_encoder.encode_image_for_budget(path)
+
+    assert media_type == "image/jpeg"
+    assert image_encoder.snapshot()["image_encode_full_encodes_total"] == 1
+
+
+def test_encode_cache_skips_repeat_images(image_encoder, tmp_path):
+    first_path = str(tmp_path / "a.jpg")
+    _write_noise_image(first_path, (800, 600))
+    copy_path = str(tmp_path / "forwarded.jpg")
+    with open(first_path, "rb") as src, open(copy_path, "wb") as dst:
+        dst.write(src.read())
+
+    with patch.object(image_encoder, "_compress_to_budget", wraps=image_encoder._compress_to_budget) as compress:
+        first = image_encoder.encode_image_for_budget(first_path)
+        again = image_encoder.encode_image_for_budget(copy_path)
+
+    assert first == again
+    compress.assert_called_once()
+    stats = image_encoder.snapshot()
+    assert stats["image_encode_cache_hits_total"] == 1
+    assert stats["image_encode_cache_misses_total"] == 1
+
+
+def test_encode_cache_is_bounded(image_encoder, tmp_path, monkeypatch):
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"img{i}.jpg")
+        _write_noise_image(path, (200, 200))
+        paths.append(path)
+    sizes = [len(image_encoder.encode_image_for_budget(p)[0]) for p in paths[:1]]
+    image_encoder.reset()
+    monkeypatch.setattr(image_encoder, "ENCODE_CACHE_MAX_BYTES", int(sizes[0] * 2.5))
+
+    for path in paths:
+        image_encoder.encode_image_for_budget(path)
+
+    stats = image_encoder.snapshot()
+    assert stats["image_encode_cache_entries"] == 2
+    assert stats["image_encode_cache_bytes"] <= image_encoder.ENCODE_CACHE_MAX_BYTES
@@ -12,6 +12,7 @@ code in project directories using Letta Code CLI instead of cloud-only API:
 Run these tests with:
     pytest tests/unit/test_filesystem_commands.py -v
 """
+import asyncio
 import pytest
 import json
 import tempfile
@@ -176,12 +177,11 @@ class TestLettaCodeStateManagement:
             assert result["projectDir"] == "/opt/project"
             assert result["enabled"] is True
             
-            # Verify state was persisted
-            assert state_file.exists()
-            with open(state_file) as f:
-                saved_data = json.load(f)
-                assert "!room:test.com" in saved_data
-                assert saved_data["!room:test.com"]["projectDir"] == "/opt/project"
+            # Verify state was persisted (update log, replayed on load)
+            lcs_module._letta_code_state = {}
+            saved = get_letta_code_room_state("!room:test.com")
+            assert saved["projectDir"] == "/opt/project"
+            assert saved["enabled"] is True
 
     def test_update_letta_code_room_state_updates_existing(self, tmp_path):
         """Test updating existing room state"""
@@ -209,6 +209,64 @@ class TestLettaCodeStateManagement:
             assert result["enabled"] is True
 
 
+    @pytest.mark.asyncio
+    async def test_updates_are_debounced_into_the_log(self, tmp_path):
+        """Updates inside the event loop are buffered, then appended in one write"""
+        state_file = tmp_path / "letta_code_state.json"
+        log_file = tmp_path / "letta_code_state.json.log"
+
+        with patch('src.matrix.letta_code_service.LETTACODE_STATE_PATH', str(state_file)):
+            import src.matrix.letta_code_service as lcs_module
+            lcs_module._letta_code_state = {}
+
+            for n in range(5):
+                update_letta_code_room_state(f"!room{n}:test.com", {"enabled": True})
+            assert not log_file.exists()
+
+            lcs_module.flush_letta_code_state()
+            assert len(log_file.read_text().splitlines()) == 5
+            assert not state_file.exists()
+
+            lcs_module._letta_code_state = {}
+            assert get_letta_code_room_state("!room4:test.com") == {"enabled": True}
+
+    def test_log_is_compacted_into_snapshot(self, tmp_path):
+        """Once the log is long enough it is folded into the JSON snapshot"""
+        state_file = tmp_path / "letta_code_state.json"
+        log_file = tmp_path / "letta_code_state.json.log"
+
+        with patch('src.matrix.letta_code_service.LETTACODE_STATE_PATH', str(state_file)), \
+             patch('src.matrix.letta_code_service.LETTA_CODE_STATE_COMPACT_EVERY', 3):
+            import src.matrix.letta_code_service as lcs_module
+            lcs_module._letta_code_state = {}
+
+            update_letta_code_room_state("!room:test.com", {"projectDir": "/opt/a"})
+            update_letta_code_room_state("!room:test.com", {"enabled": True})
+            assert log_file.exists()
+            update_letta_code_room_state("!room:test.com", {"projectDir": "/opt/b"})
+
+            assert not log_file.exists()
+            with open(state_file) as f:
+                assert json.load(f) == {"!room:test.com": {"projectDir": "/opt/b", "enabled": True}}
+
+    def test_torn_log_line_is_ignored_on_load(self, tmp_path):
+        """A partially written final log line doesn't discard earlier updates"""
+        state_file = tmp_path / "letta_code_state.json"
+        with open(state_file, 'w') as f:
+            json.dump({"!room:test.com": {"projectDir": "/opt/old"}}, f)
+        log_file = tmp_path / "letta_code_state.json.log"
+        log_file.write_text(
+            json.dumps({"room_id": "!room:test.com", "updates": {"projectDir": "/opt/new"}})
+            + '\n{"room_id": "!room:te'
+        )
+
+        with patch('src.matrix.letta_code_service.LETTACODE_STATE_PATH', str(state_file)):
+            import src.matrix.letta_code_service as lcs_module
+            lcs_module._letta_code_state = {}
+
+            assert get_letta_code_room_state("!room:test.com") == {"projectDir": "/opt/new"}
+
+
 # ============================================================================
 # resolve_letta_project_dir Tests
 # ============================================================================
@@ -982,3 +1040,71 @@ class TestFilesystemCommandIntegration:
                 # Verify task was executed
                 task_call = [call for call in mock_api.call_args_list if '/api/letta-code/task' in str(call)]
                 assert len(task_call) == 1
+
+
+# ============================================================================
+# Pooled client and per-room serialisation
+# ============================================================================
+
+@pytest.mark.unit
+class TestLettaCodeClientAndLocks:
+
+    @pytest.mark.asyncio
+    async def test_api_calls_share_one_session(self, mock_config):
+        import src.matrix.letta_code_service as lcs_module
+
+        response = AsyncMock()
+        response.status = 200
+        response.text = AsyncMock(return_value='{"ok": true}')
+        response.__aenter__ = AsyncMock(return_value=response)
+        response.__aexit__ = AsyncMock(return_value=None)
+        session = Mock()
+        session.closed = False
+        session.request = Mock(return_value=response)
+
+        with patch.object(lcs_module, "_letta_code_session", None), \
+             patch("src.matrix.letta_code_service.aiohttp.ClientSession", return_value=session) as session_cls:
+            first = await call_letta_code_api(mock_config, "GET", "/api/projects")
+            second = await call_letta_code_api(mock_config, "GET", "/api/projects", timeout=5.0)
+
+        assert first == second == {"ok": True}
+        session_cls.assert_called_once()
+        assert session.request.call_count == 2
+        assert session.request.call_args.kwargs["timeout"].total == 5.0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_fs_task_toggles_are_serialised(
+        self, mock_room, mock_config, mock_logger, tmp_path
+    ):
+        """Two bare /fs-task toggles in one room end up enabled then disabled"""
+        state_file = tmp_path / "letta_code_state.json"
+
+        async def _slow_session(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return {"projectDir": "/opt/project"}
+
+        with patch('src.matrix.letta_code_service.LETTACODE_STATE_PATH', str(state_file)):
+            import src.matrix.letta_code_service as lcs_module
+            lcs_module._letta_code_state = {}
+            event = Mock(body="/fs-task", sender="@user:test.com")
+            mock_send = AsyncMock()
+
+            with patch('src.matrix.letta_code_service.call_letta_code_api', side_effect=_slow_session):
+                await asyncio.gather(*(
+                    handle_letta_code_command(
+                        room=mock_room,
+                        event=event,
+                        config=mock_config,
+                        logger=mock_logger,
+                        send_fn=mock_send,
+                        agent_id_hint="agent-test-123",
+                        agent_name_hint="Test Agent",
+                    )
+                    for _ in range(2)
+                ))
+            lcs_module.flush_letta_code_state()
+
+            assert get_letta_code_room_state(mock_room.room_id)["enabled"] is False
+            messages = [c.args[1] for c in mock_send.call_args_list]
+            assert messages[0].startswith("Filesystem mode ENABLED")
+            assert messages[1].startswith("Filesystem mode DISABLED")
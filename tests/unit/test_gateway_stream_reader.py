@@ -505,3 +505,45 @@ class TestPartialJsonToolCallDedup:
         assert types.index(StreamEventType.ASSISTANT) < types.index(StreamEventType.TOOL_CALL)
         assistant_ev = next(e for e in events if e.type == StreamEventType.ASSISTANT)
         assert assistant_ev.content == "Let me check."
+
+
+class TestFrameFastPath:
+
+    @pytest.mark.asyncio
+    async def test_reasoning_skip_is_requested_only_when_filtered(self):
+        seen = []
+
+        async def fake_stream(**kwargs):
+            seen.append(kwargs["skip_stream_events"])
+            yield {"type": "result"}
+
+        mock_client = MagicMock()
+        mock_client.send_message_streaming = fake_stream
+
+        _ = [ev async for ev in stream_via_gateway(mock_client, "agent-1", "msg")]
+        _ = [ev async for ev in stream_via_gateway(mock_client, "agent-1", "msg", include_reasoning=True)]
+
+        assert seen == [frozenset({"reasoning"}), ()]
+
+    @pytest.mark.asyncio
+    async def test_running_snapshots_are_not_parsed_or_logged(self):
+        raw_events = [
+            {"type": "stream", "event": "tool_call", "tool_name": "bash",
+             "tool_call_id": "tc-1", "tool_input": {"command": "x" * n}, "status": "running"}
+            for n in range(5)
+        ] + [{"type": "result"}]
+
+        async def fake_stream(**kwargs):
+            for e in raw_events:
+                yield e
+
+        mock_client = MagicMock()
+        mock_client.send_message_streaming = fake_stream
+
+        with patch("src.letta.gateway_stream_reader._parse_stream_event") as parse, \
+             patch("src.letta.gateway_stream_reader.logger") as mock_logger:
+            events = [ev async for ev in stream_via_gateway(mock_client, "agent-1", "msg")]
+
+        parse.assert_not_called()
+        mock_logger.info.assert_not_called()
+        assert [e.type for e in events] == [StreamEventType.STOP]
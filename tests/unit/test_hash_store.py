@@ -0,0 +1,139 @@
+"""Tests for temporal_workflows/activities/hash_store module."""
+
+import json
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from temporal_workflows import activities
+from temporal_workflows.activities import hash_store
+
+
+def _claim_in_process(documents_dir, file_hash, name):
+    return hash_store.claim(documents_dir, file_hash, name, f"mxc://server/{name}", f"/docs/{name}") is None
+
+
+class TestHashStore:
+    def test_claim_then_duplicate(self, tmp_path):
+        docs = str(tmp_path)
+        assert hash_store.claim(docs, "h1", "a.pdf", "mxc://s/a", "/docs/a/a.pdf") is None
+
+        existing = hash_store.claim(docs, "h1", "b.pdf", "mxc://s/b", "/docs/b/b.pdf")
+        assert existing["filename"] == "a.pdf"
+        assert existing["persistent_path"] == "/docs/a/a.pdf"
+        assert hash_store.get_entry(docs, "h1")["mxc_url"] == "mxc://s/a"
+
+    def test_remove_respects_persistent_path(self, tmp_path):
+        docs = str(tmp_path)
+        hash_store.claim(docs, "h1", "a.pdf", "mxc://s/a", "/docs/a/a.pdf")
+
+        assert hash_store.remove(docs, "h1", "/docs/other.pdf") is False
+        assert hash_store.remove(docs, "h1", "/docs/a/a.pdf") is True
+        assert hash_store.get_entry(docs, "h1") is None
+        assert hash_store.remove(docs, "h1") is False
+
+    def test_legacy_json_imported_once(self, tmp_path):
+        legacy = {
+            "h1": {"filename": "a.pdf", "mxc_url": "mxc://s/a", "persistent_path": "/docs/a", "ts": 1.0},
+            "h2": {"filename": "b.pdf", "mxc_url": "mxc://s/b", "persistent_path": "/docs/b", "ts": 2.0},
+        }
+        (tmp_path / ".hashes.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+        assert hash_store.load_all(str(tmp_path)) == legacy
+        assert not (tmp_path / ".hashes.json").exists()
+        assert (tmp_path / ".hashes.json.migrated").exists()
+
+    def test_migrate_keeps_existing_rows(self, tmp_path):
+        docs = str(tmp_path)
+        hash_store.claim(docs, "h1", "new.pdf", "mxc://s/new", "/docs/new")
+        legacy = {"h1": {"filename": "old.pdf", "persistent_path": "/docs/old", "ts": 1.0}}
+        (tmp_path / ".hashes.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+        assert hash_store.migrate_legacy_index(docs) == 0
+        assert hash_store.get_entry(docs, "h1")["filename"] == "new.pdf"
+
+    def test_mutate_all_compat(self, tmp_path):
+        docs = str(tmp_path)
+        hash_store.claim(docs, "h1", "a.pdf", "mxc://s/a", "/docs/a")
+        hash_store.claim(docs, "h2", "b.pdf", "mxc://s/b", "/docs/b")
+
+        def _mutate(index):
+            index.pop("h1")
+            index["h2"]["filename"] = "renamed.pdf"
+            index["h3"] = {"filename": "c.pdf", "mxc_url": "", "persistent_path": "/docs/c", "ts": 3.0}
+            return len(index)
+
+        assert hash_store.mutate_all(docs, _mutate) == 2
+        index = hash_store.load_all(docs)
+        assert set(index) == {"h2", "h3"}
+        assert index["h2"]["filename"] == "renamed.pdf"
+
+    def test_operations_reuse_one_connection(self, monkeypatch, tmp_path):
+        docs = str(tmp_path)
+        opened = []
+        real_connect = hash_store._connect
+
+        def _counting_connect(documents_dir):
+            opened.append(documents_dir)
+            return real_connect(documents_dir)
+
+        monkeypatch.setattr(hash_store, "_connect", _counting_connect)
+        hash_store.claim(docs, "h1", "a.pdf", "mxc://s/a", "/docs/a")
+        hash_store.get_entry(docs, "h1")
+        hash_store.load_all(docs)
+        hash_store.remove(docs, "h1")
+        assert opened == [docs]
+
+        # Removing the database file forces a fresh connection
+        for suffix in ("", "-wal", "-shm"):
+            path = hash_store.db_path(docs) + suffix
+            if os.path.exists(path):
+                os.remove(path)
+        assert hash_store.get_entry(docs, "h1") is None
+        assert opened == [docs, docs]
+
+    def test_concurrent_claims_single_winner_across_processes(self, tmp_path):
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(4) as pool:
+            wins = pool.starmap(
+                _claim_in_process, [(str(tmp_path), "same-hash", f"doc{i}") for i in range(8)]
+            )
+        assert wins.count(True) == 1
+        assert len(hash_store.load_all(str(tmp_path))) == 1
+
+
+def test_persist_file_many_threads_distinct_content(monkeypatch, tmp_path):
+    monkeypatch.setattr(activities, "PERSISTENT_DOCUMENTS_DIR", str(tmp_path))
+    sources = []
+    for i in range(20):
+        path = tmp_path / f"src{i}.txt"
+        path.write_text(f"content-{i % 10}", encoding="utf-8")
+        sources.append(path)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(
+            lambda i: activities._persist_file(str(sources[i]), f"doc{i}.txt", f"mxc://server/id{i}"),
+            range(20),
+        ))
+
+    assert [r[2] for r in results].count(False) == 10
+    index = activities._load_hash_index()
+    assert len(index) == 10
+    for entry in index.values():
+        assert os.path.exists(entry["persistent_path"])
+
+
+def test_persist_file_copy_failure_releases_claim(monkeypatch, tmp_path):
+    monkeypatch.setattr(activities, "PERSISTENT_DOCUMENTS_DIR", str(tmp_path))
+    source = tmp_path / "src.txt"
+    source.write_text("content", encoding="utf-8")
+
+    def _fail_copy(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("temporal_workflows.activities.download.shutil.copy2", _fail_copy)
+    path, file_hash, is_duplicate = activities._persist_file(str(source), "doc.txt", "mxc://server/id")
+
+    assert path == ""
+    assert is_duplicate is False
+    assert hash_store.get_entry(str(tmp_path), file_hash) is None
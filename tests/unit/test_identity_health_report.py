@@ -0,0 +1,142 @@
+import asyncio
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.api.routes import identity_health
+from src.api.routes.identity_health import IdentityHealthReporter
+from src.models.identity import Identity
+
+
+def _identity(identity_id, mxid, display_name, token="tok", identity_type="letta", password="pw"):
+    return Identity(
+        id=identity_id,
+        identity_type=identity_type,
+        mxid=mxid,
+        access_token=token,
+        password_hash=password,
+        display_name=display_name,
+        is_active=True,
+    )
+
+
+@pytest.fixture
+def identities():
+    return [
+        _identity("letta_agent-1", "@agent_1:matrix.test", "Meridian"),
+        _identity("letta_agent-2", "@agent_2:matrix.test", "BMO"),
+        _identity("admin", "@admin:matrix.test", "Admin", identity_type="custom", password=None),
+    ]
+
+
+@contextmanager
+def _environment(identities, matrix_names=None, valid_tokens=None):
+    identity_service = MagicMock()
+    identity_service.get_all.side_effect = lambda active_only=False: list(identities)
+    dm_room_service = MagicMock()
+    dm_room_service.get_all.return_value = []
+    monitor = MagicMock()
+    valid_tokens = valid_tokens if valid_tokens is not None else {i.id for i in identities}
+    monitor._validate_identity_token = AsyncMock(side_effect=lambda identity: identity.id in valid_tokens)
+    names = matrix_names or {}
+
+    async def _display_name(mxid, token, session=None):
+        return names.get(mxid, next(str(i.display_name) for i in identities if i.mxid == mxid))
+
+    agents = [SimpleNamespace(id="agent-1", name="Meridian"), SimpleNamespace(id="agent-2", name="BMO"),
+              SimpleNamespace(id="agent-3", name="Orphan")]
+    with (
+        patch("src.api.routes.identity_health.get_identity_service", return_value=identity_service),
+        patch("src.api.routes.identity_health.get_dm_room_service", return_value=dm_room_service),
+        patch("src.api.routes.identity_health.get_all_mappings", return_value={}),
+        patch("src.api.routes.identity_health.LettaService") as letta_cls,
+        patch("src.api.routes.identity_health.get_identity_token_health_monitor", return_value=monitor),
+        patch("src.api.routes.identity_health._get_identity_http_session", new_callable=AsyncMock),
+        patch("src.api.routes.identity_health._get_matrix_display_name", side_effect=_display_name) as display,
+    ):
+        letta_cls.return_value.list_agents.return_value = agents
+        yield SimpleNamespace(monitor=monitor, display=display)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_snapshot_report_matches_identity_state(identities):
+    with _environment(identities, matrix_names={"@agent_2:matrix.test": "Old BMO"}, valid_tokens={"letta_agent-1", "letta_agent-2"}):
+        snapshot = await IdentityHealthReporter().refresh()
+
+    report = snapshot.report()
+    assert report["checked"] == 3
+    assert report["healthy"] == 1
+    assert report["degraded"] == 1
+    assert report["critical"] == 1  # admin: token invalid and no password
+    assert report["name_mismatches"] == 1
+    assert report["token_invalid"] == 1
+    assert report["coverage"].missing_letta_identities == ["letta_agent-3"]
+    assert {a["identity_id"] for a in report["actionable_agents"]} == {"letta_agent-2", "admin"}
+
+    letta_only = snapshot.report("letta")
+    assert letta_only["checked"] == 2
+    assert letta_only["critical"] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_refresh_only_reprobes_changed_identities(identities):
+    reporter = IdentityHealthReporter()
+    with _environment(identities) as env:
+        first = await reporter.refresh()
+        assert first.probed == 3
+        assert env.monitor._validate_identity_token.await_count == 3
+
+        identities[1].display_name = "BMO v2"
+        second = await reporter.refresh()
+
+    assert second.probed == 1
+    assert env.monitor._validate_identity_token.await_count == 4
+    assert env.display.call_args.args[0] == "@agent_2:matrix.test"
+    checked_at = {r.identity_id: r.token_checked_at for r, _ in second.entries}
+    assert checked_at["letta_agent-1"] <= checked_at["letta_agent-2"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_probes_are_bounded(identities, monkeypatch):
+    monkeypatch.setattr(identity_health, "IDENTITY_HEALTH_CONCURRENCY", 2)
+    many = [_identity(f"letta_agent-{n}", f"@agent_{n}:matrix.test", f"Agent {n}") for n in range(8)]
+    in_flight = 0
+    peak = 0
+
+    async def _slow_validate(identity):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return True
+
+    with _environment(many) as env:
+        env.monitor._validate_identity_token = AsyncMock(side_effect=_slow_validate)
+        await IdentityHealthReporter().refresh()
+
+    assert peak == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_stale_snapshot_is_served_while_refreshing_in_background(identities):
+    reporter = IdentityHealthReporter(interval_seconds=60)
+    with _environment(identities) as env:
+        first = await reporter.get_snapshot()
+        assert await reporter.get_snapshot() is first
+
+        first.built_at -= 120
+        identities[0].display_name = "Meridian v2"
+        served = await reporter.get_snapshot()
+        assert served is first
+
+        await reporter._background_refresh
+        assert reporter.snapshot is not first
+        assert reporter.snapshot.probed == 1
+        assert env.monitor._validate_identity_token.await_count == 4
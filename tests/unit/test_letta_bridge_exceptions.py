@@ -385,6 +385,35 @@ async def test_shadow_mode_does_not_fallback_on_busy_error(mock_config, mock_log
                     assert metrics["letta_conversations_api_fallback_total"] == 0
 
 
+@pytest.mark.asyncio
+async def test_missing_conversation_is_invalidated_and_re_resolved(mock_config, mock_logger):
+    from src.letta.ws_gateway_client import GatewaySessionError
+
+    mock_config.letta_conversations_enabled = True
+
+    with patch("src.matrix.letta_bridge._get_gateway_client", return_value=AsyncMock()), \
+            patch("src.matrix.letta_bridge._resolve_agent_for_room", return_value=("agent-123", "TestAgent")), \
+            patch("src.matrix.letta_bridge._resolve_conversation_id", side_effect=["conv-gone", "conv-new"]), \
+            patch("src.core.conversation_service.invalidate_conversation") as mock_invalidate, \
+            patch("src.letta.gateway_stream_reader.collect_via_gateway") as mock_collect:
+        mock_collect.side_effect = [
+            GatewaySessionError(code="STREAM_ERROR", message="Conversation conv-gone not found"),
+            "recovered",
+        ]
+
+        result = await send_to_letta_api(
+            message_body="test message",
+            sender_id="@user:matrix.test",
+            config=mock_config,
+            logger=mock_logger,
+            room_id="!room:matrix.test",
+        )
+
+    assert result == "recovered"
+    mock_invalidate.assert_called_once_with("conv-gone")
+    assert [c.kwargs["conversation_id"] for c in mock_collect.call_args_list] == ["conv-gone", "conv-new"]
+
+
 @pytest.mark.asyncio
 async def test_streaming_stop_only_sends_fallback_terminal_message(mock_config, mock_logger):
     fallback_text = "Agent processed the request (no text response)."
@@ -4,6 +4,7 @@ from unittest.mock import MagicMock, AsyncMock, patch
 
 import pytest
 
+from src.matrix import letta_source_manager
 from src.matrix.letta_source_manager import LettaSourceManager
 
 
@@ -218,6 +219,73 @@ class TestPollFileStatus:
         result = await mgr.poll_file_status("folder-1", "file-123", timeout=5, interval=1)
         assert result is True
 
+    @pytest.fixture
+    def poll_metrics(self):
+        letta_source_manager.reset()
+        yield letta_source_manager
+        letta_source_manager.reset()
+
+    @staticmethod
+    def _file(file_id, status):
+        f = MagicMock()
+        f.id = file_id
+        f.processing_status = status
+        f.error_message = "bad pdf"
+        return f
+
+    @pytest.mark.asyncio
+    async def test_concurrent_files_share_one_listing_per_tick(self, poll_metrics):
+        mgr = _make_manager()
+        statuses = {f"file-{i}": "processing" for i in range(5)}
+        statuses["file-4"] = "failed"
+        listings = 0
+
+        def _list(source_id):
+            nonlocal listings
+            listings += 1
+            if listings >= 2:
+                for file_id in ("file-0", "file-1", "file-2", "file-3"):
+                    statuses[file_id] = "embedded"
+            return [self._file(file_id, status) for file_id, status in statuses.items()]
+
+        mgr.letta_client.folders.files.list.side_effect = _list
+
+        results = await asyncio.gather(
+            *(mgr.poll_file_status("folder-1", f"file-{i}", timeout=5, interval=0.01) for i in range(5))
+        )
+
+        assert results == [True, True, True, True, False]
+        assert listings <= 3
+        assert mgr._status_pollers == {}
+        stats = poll_metrics.snapshot()
+        assert stats["letta_file_poll_outcomes"] == {"embedded": 4, "failed": 1}
+        assert stats["letta_file_time_to_embedded_seconds_count"] == 4
+        assert stats["letta_file_time_to_embedded_seconds_bucket"]["1"] == 4
+
+    @pytest.mark.asyncio
+    async def test_backoff_grows_while_nothing_changes(self, poll_metrics, monkeypatch):
+        monkeypatch.setattr(letta_source_manager, "_POLL_JITTER", 0.0)
+        mgr = _make_manager()
+        mgr.letta_client.folders.files.list.return_value = [self._file("file-1", "processing")]
+
+        result = await mgr.poll_file_status("folder-1", "file-1", timeout=0.3, interval=0.02)
+
+        assert result is False
+        # Fixed 0.02s polling would list ~15 times; backoff (x1.5 up to 8x) lists far fewer
+        assert mgr.letta_client.folders.files.list.call_count <= 8
+        assert poll_metrics.snapshot()["letta_file_poll_outcomes"] == {"timeout": 1}
+
+    @pytest.mark.asyncio
+    async def test_missing_file_gives_up_after_three_listings(self, poll_metrics):
+        mgr = _make_manager()
+        mgr.letta_client.folders.files.list.return_value = []
+
+        result = await mgr.poll_file_status("folder-1", "file-1", timeout=5, interval=0.01)
+
+        assert result is False
+        assert mgr.letta_client.folders.files.list.call_count == 3
+        assert poll_metrics.snapshot()["letta_file_poll_outcomes"] == {"not_found": 1}
+
 
 class TestUploadToLetta:
     @pytest.mark.asyncio
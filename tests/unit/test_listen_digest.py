@@ -0,0 +1,175 @@
+"""Tests for listen-mode digest batching in the task manager."""
+
+import asyncio
+from dataclasses import dataclass
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.matrix import listen_digest
+from src.matrix.formatter import format_listen_digest_envelope
+from src.matrix.group_gating import GatingResult
+from src.matrix.task_manager import _active_letta_tasks, _dispatch_letta_task, _pending_queues
+
+
+@dataclass
+class _FakeRoom:
+    room_id: str = "!room:test"
+    display_name: str = "Ops Room"
+
+    def user_name(self, sender):
+        return sender.split(":")[0].lstrip("@").title()
+
+
+@dataclass
+class _FakeEvent:
+    sender: str = "@alice:test"
+    event_id: str = "$evt1"
+    source: dict = None
+
+
+SILENT = GatingResult(was_mentioned=False, mode="listen", method=None, silent=True, reason="listen")
+MENTIONED = GatingResult(was_mentioned=True, mode="listen", method="text", silent=False, reason="listen")
+
+KEY = ("!room:test", "agent-1")
+
+
+@pytest.fixture(autouse=True)
+def _clean_state():
+    listen_digest.reset()
+    _active_letta_tasks.clear()
+    _pending_queues.clear()
+    yield
+    listen_digest.reset()
+    _active_letta_tasks.clear()
+    _pending_queues.clear()
+
+
+@pytest.fixture
+def mock_process():
+    with patch("src.matrix.task_manager.process_letta_message", new_callable=AsyncMock) as m:
+        yield m
+
+
+@pytest.fixture
+def mock_digest_send():
+    with patch("src.matrix.task_manager.process_listen_digest", new_callable=AsyncMock) as m:
+        yield m
+
+
+async def _dispatch(text, gating, event_id="$evt", sender="@alice:test"):
+    return await _dispatch_letta_task(
+        room=_FakeRoom(),
+        event=_FakeEvent(sender=sender, event_id=event_id, source={"origin_server_ts": 1709294400000}),
+        config=MagicMock(),
+        logger=MagicMock(),
+        client=MagicMock(),
+        room_agent_id="agent-1",
+        gating_result=gating,
+        message_text=text,
+        user_reply_to_event_id=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_silent_messages_are_buffered_not_dispatched(mock_process, mock_digest_send):
+    for i in range(3):
+        assert await _dispatch(f"chatter {i}", SILENT, event_id=f"$e{i}") is True
+
+    mock_process.assert_not_called()
+    mock_digest_send.assert_not_called()
+    assert KEY not in _active_letta_tasks
+    assert listen_digest.pending_count(KEY) == 3
+
+
+@pytest.mark.asyncio
+async def test_size_threshold_flushes_one_digest_turn(mock_process, mock_digest_send, monkeypatch):
+    monkeypatch.setattr(listen_digest, "DIGEST_MAX_MESSAGES", 3)
+
+    for i in range(3):
+        await _dispatch(f"chatter {i}", SILENT, event_id=f"$e{i}")
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    mock_digest_send.assert_awaited_once()
+    kwargs = mock_digest_send.call_args.kwargs
+    assert [e.text for e in kwargs["entries"]] == ["chatter 0", "chatter 1", "chatter 2"]
+    assert kwargs["room_agent_id"] == "agent-1"
+    stats = listen_digest.snapshot()
+    assert stats["listen_digest_sent_total"] == 1
+    assert stats["listen_digest_letta_calls_saved_total"] == 2
+    assert stats["flush_reasons"] == {"size": 1}
+
+
+@pytest.mark.asyncio
+async def test_age_threshold_flushes(mock_process, mock_digest_send, monkeypatch):
+    monkeypatch.setattr(listen_digest, "DIGEST_MAX_AGE_SECONDS", 0.01)
+
+    await _dispatch("only message", SILENT)
+    await asyncio.sleep(0.05)
+
+    mock_digest_send.assert_awaited_once()
+    assert listen_digest.snapshot()["flush_reasons"] == {"age": 1}
+
+
+@pytest.mark.asyncio
+async def test_non_silent_turn_carries_pending_digest(mock_process, mock_digest_send):
+    await _dispatch("background chatter", SILENT, event_id="$e1", sender="@bob:test")
+    await _dispatch("@agent what do you think?", MENTIONED, event_id="$e2")
+    await asyncio.sleep(0)
+
+    mock_digest_send.assert_not_called()
+    mock_process.assert_awaited_once()
+    ctx = mock_process.call_args.args[0]
+    assert ctx.silent_mode is False
+    assert "Listen-only digest" in ctx.listen_digest
+    assert "Bob: background chatter" in ctx.listen_digest
+    assert listen_digest.pending_count(KEY) == 0
+    stats = listen_digest.snapshot()
+    assert stats["listen_digest_merged_total"] == 1
+    assert stats["listen_digest_letta_calls_saved_total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_waits_while_agent_busy(mock_process, mock_digest_send, monkeypatch):
+    monkeypatch.setattr(listen_digest, "DIGEST_MAX_MESSAGES", 1)
+    monkeypatch.setattr(listen_digest, "_BUSY_RETRY_SECONDS", 0.01)
+    busy = asyncio.get_running_loop().create_future()
+    _active_letta_tasks[KEY] = asyncio.ensure_future(busy)
+
+    await _dispatch("chatter", SILENT)
+    await asyncio.sleep(0.03)
+    mock_digest_send.assert_not_called()
+    assert listen_digest.pending_count(KEY) == 1
+
+    busy.set_result(None)
+    await asyncio.sleep(0)
+    _active_letta_tasks.pop(KEY, None)
+    await asyncio.sleep(0.03)
+    mock_digest_send.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_disabled_digest_keeps_per_message_turns(mock_process, mock_digest_send, monkeypatch):
+    monkeypatch.setattr(listen_digest, "DIGEST_ENABLED", False)
+
+    await _dispatch("chatter", SILENT)
+    await asyncio.sleep(0)
+
+    mock_process.assert_awaited_once()
+    assert mock_process.call_args.args[0].silent_mode is True
+    assert listen_digest.pending_count(KEY) == 0
+
+
+def test_digest_envelope_is_compact():
+    entries = [
+        listen_digest.DigestEntry("@alice:test", "Alice", "first line\nsecond line", "$1", 1709294400000),
+        listen_digest.DigestEntry("@bob:test", "@bob:test", "hi", "$2", 1709294460000),
+    ]
+    envelope = format_listen_digest_envelope("!room:test", "Ops Room", entries)
+
+    assert "- **Messages**: 2" in envelope
+    assert "- **Group**: Ops Room" in envelope
+    assert "Alice: first line\n  second line" in envelope
+    assert "] bob: hi" in envelope
+    assert envelope.count("<system-reminder>") == 1
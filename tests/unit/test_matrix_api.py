@@ -395,9 +395,164 @@ class TestListRoomsEndpoint:
         data = response.json()
         assert data["success"] is True
 
+    @pytest.mark.asyncio
+    async def test_list_rooms_resolves_names_concurrently_and_bounded(self, monkeypatch):
+        import asyncio
+        from src.api import app as app_module
+
+        monkeypatch.setattr(app_module, "RECENT_FANOUT_CONCURRENCY", 3)
+        in_flight = 0
+        peak = 0
+
+        async def fake_get_room_name(homeserver, access_token, room_id, session=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return f"name {room_id}"
+
+        room_ids = [f"!room{i}:matrix.test" for i in range(8)]
+        joined = AsyncMock()
+        joined.status = 200
+        joined.json = AsyncMock(return_value={"joined_rooms": room_ids})
+        joined.__aenter__ = AsyncMock(return_value=joined)
+        joined.__aexit__ = AsyncMock(return_value=None)
+        session = Mock()
+        session.get = Mock(return_value=joined)
+
+        api_client = app_module.MatrixAPIClient()
+        monkeypatch.setattr(api_client, "_get_session", AsyncMock(return_value=session))
+        monkeypatch.setattr(api_client, "get_room_name", fake_get_room_name)
+
+        result = await api_client.list_rooms("http://test:8008", "token123")
+
+        assert result.success is True
+        assert [room.room_id for room in result.rooms] == room_ids
+        assert result.rooms[0].room_name == "name !room0:matrix.test"
+        assert peak == 3
+
+
+def _msg(body, timestamp):
+    return MatrixMessage(
+        sender="@alice:matrix.test",
+        body=body,
+        timestamp=timestamp,
+        formatted_time=f"t{timestamp}",
+        event_id=f"${body}",
+    )
+
 
 @pytest.mark.unit
 class TestRecentMessagesEndpoint:
+    @pytest.fixture(autouse=True)
+    def _clear_page_cache(self):
+        from src.api.routes.messaging import clear_recent_message_cache
+
+        clear_recent_message_cache()
+        yield
+        clear_recent_message_cache()
+
+    def _get_recent(self, client, matrix_client, query):
+        original_client = app.state.matrix_client
+        app.state.matrix_client = matrix_client
+        try:
+            return client.get(f"/messages/recent?homeserver=http://test:8008&{query}", headers={"X-Access-Token": "token123"})
+        finally:
+            app.state.matrix_client = original_client
+
+    def test_recent_messages_merges_rooms_newest_first(self, client):
+        rooms = [RoomInfo(room_id=f"!room{i}:matrix.test", room_name=f"Room {i}") for i in range(3)]
+        # Pages come back oldest-first, as get_messages returns them
+        pages = {
+            "!room0:matrix.test": [_msg("a1", 10), _msg("a2", 40), _msg("a3", 70)],
+            "!room1:matrix.test": [_msg("b1", 20), _msg("b2", 50)],
+            "!room2:matrix.test": [_msg("c1", 30), _msg("c2", 60), _msg("c3", 80)],
+        }
+        matrix_client = Mock()
+        matrix_client.list_rooms = AsyncMock(return_value=ListRoomsResponse(success=True, rooms=rooms, message="ok"))
+        matrix_client.get_messages = AsyncMock(
+            side_effect=lambda hs, token, room_id, limit: GetMessagesResponse(
+                success=True, messages=pages[room_id], message="ok"
+            )
+        )
+
+        data = self._get_recent(client, matrix_client, "limit=4").json()
+
+        assert data["success"] is True
+        assert [m["body"] for m in data["messages"]] == ["c3", "a3", "c2", "b2"]
+        assert data["messages"][0]["room_name"] == "Room 2"
+        assert data["total_found"] == 8
+
+    def test_recent_messages_fanout_is_bounded(self, client, monkeypatch):
+        import asyncio
+        from src.api.routes import messaging
+
+        monkeypatch.setattr(messaging, "RECENT_FANOUT_CONCURRENCY", 3)
+        in_flight = 0
+        peak = 0
+
+        async def fake_get_messages(hs, token, room_id, limit):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return GetMessagesResponse(success=True, messages=[_msg(room_id, 1)], message="ok")
+
+        rooms = [RoomInfo(room_id=f"!room{i}:matrix.test", room_name=f"Room {i}") for i in range(10)]
+        matrix_client = Mock()
+        matrix_client.list_rooms = AsyncMock(return_value=ListRoomsResponse(success=True, rooms=rooms, message="ok"))
+        matrix_client.get_messages = fake_get_messages
+
+        data = self._get_recent(client, matrix_client, "limit=20").json()
+
+        assert data["success"] is True
+        assert len(data["messages"]) == 10
+        assert peak == 3
+
+    def test_recent_messages_caches_room_pages(self, client):
+        matrix_client = Mock()
+        matrix_client.list_rooms = AsyncMock(
+            return_value=ListRoomsResponse(
+                success=True,
+                rooms=[RoomInfo(room_id="!room1:matrix.test", room_name="Room 1")],
+                message="ok",
+            )
+        )
+        matrix_client.get_messages = AsyncMock(
+            return_value=GetMessagesResponse(success=True, messages=[_msg("hello", 5)], message="ok")
+        )
+
+        first = self._get_recent(client, matrix_client, "limit=5").json()
+        second = self._get_recent(client, matrix_client, "limit=5").json()
+        assert first["messages"] == second["messages"]
+        assert matrix_client.get_messages.await_count == 1
+
+        # A different since token is a different page
+        self._get_recent(client, matrix_client, "limit=5&since=t1-2")
+        assert matrix_client.get_messages.await_count == 2
+        matrix_client.get_messages.assert_awaited_with(
+            "http://test:8008", "token123", "!room1:matrix.test", limit=5, from_token="t1-2"
+        )
+
+    def test_recent_messages_does_not_cache_failures(self, client):
+        matrix_client = Mock()
+        matrix_client.list_rooms = AsyncMock(
+            return_value=ListRoomsResponse(
+                success=True,
+                rooms=[RoomInfo(room_id="!room1:matrix.test", room_name="Room 1")],
+                message="ok",
+            )
+        )
+        matrix_client.get_messages = AsyncMock(
+            return_value=GetMessagesResponse(success=False, message="rate limited")
+        )
+
+        self._get_recent(client, matrix_client, "limit=5")
+        self._get_recent(client, matrix_client, "limit=5")
+        assert matrix_client.get_messages.await_count == 2
+
     def test_recent_messages_uses_caller_limit_per_room(self, client):
         matrix_client = Mock()
 
@@ -500,6 +655,26 @@ class TestRecentMessagesEndpoint:
             "!room1:matrix.test",
             limit=50,
         )
+
+    def test_recent_messages_keeps_slice_semantics_for_non_positive_limit(self, client):
+        pages = {"!room1:matrix.test": [_msg("old", 10), _msg("mid", 20), _msg("new", 30)]}
+        matrix_client = Mock()
+        matrix_client.list_rooms = AsyncMock(
+            return_value=ListRoomsResponse(
+                success=True,
+                rooms=[RoomInfo(room_id="!room1:matrix.test", room_name="Room 1")],
+                message="ok",
+            )
+        )
+        matrix_client.get_messages = AsyncMock(
+            side_effect=lambda hs, token, room_id, limit: GetMessagesResponse(
+                success=True, messages=pages[room_id], message="ok"
+            )
+        )
+
+        assert self._get_recent(client, matrix_client, "limit=0").json()["messages"] == []
+        data = self._get_recent(client, matrix_client, "limit=-1").json()
+        assert [m["body"] for m in data["messages"]] == ["new", "mid"]
 
 
 # ============================================================================
@@ -231,6 +231,72 @@ class TestDetectMatrixMention:
         assert result.method is None
 
 
+class TestParsedMessageReuse:
+    BOT = "@meridian:matrix.oculair.ca"
+
+    def test_reply_strip_runs_once_per_body(self, monkeypatch):
+        from src.matrix import mention_routing
+
+        calls = []
+        real_strip = mention_routing.strip_reply_fallback
+
+        def _counting_strip(body):
+            calls.append(body)
+            return real_strip(body)
+
+        monkeypatch.setattr(mention_routing, "strip_reply_fallback", _counting_strip)
+        mention_routing.parse_message.cache_clear()
+        body = "> <@x:y.com> quoted\n\nunique body for strip count, hey bot"
+        patterns = [re.compile(r"\bhey bot\b", re.IGNORECASE)]
+
+        detect_matrix_mention(body, None, self.BOT, patterns)
+        mention_routing.extract_opencode_mentions(body)
+        mention_routing.parse_message(body)
+
+        assert calls == [body]
+
+    def test_bot_matchers_compiled_once(self, monkeypatch):
+        from src.matrix import mention_detection
+
+        mention_detection._bot_matcher.cache_clear()
+        compiled = []
+        real_compile = re.compile
+        monkeypatch.setattr(
+            mention_detection.re,
+            "compile",
+            lambda *args, **kwargs: compiled.append(args[0]) or real_compile(*args, **kwargs),
+        )
+
+        for body in ("hey @meridian", "hello @MERIDIAN there", "nothing here"):
+            _check_text(body, self.BOT)
+
+        assert len(compiled) == 2  # full MXID + bare localpart, built on first use only
+
+    def test_prefilter_skips_regex_when_localpart_absent(self):
+        hit, text = _check_text("@meridia is not the bot", self.BOT)
+        assert hit is False
+        assert text is None
+
+    def test_mapped_bot_falls_back_when_index_match_is_shadowed(self, monkeypatch):
+        from src.matrix import mention_detection, mention_routing
+
+        class _Index:
+            def agent_id_for_mxid(self, mxid):
+                return "agent-meridian"
+
+            def find_mentions(self, text, fuzzy=True):
+                return []  # @meridian swallowed by a longer overlapping name match
+
+        monkeypatch.setattr(mention_detection, "get_mention_index", lambda: _Index())
+        monkeypatch.setattr(mention_routing, "get_mention_index", lambda: _Index())
+        mention_routing.parse_message.cache_clear()
+
+        hit, text = _check_text("@Meridian Prime, ask @meridian", self.BOT)
+
+        assert hit is True
+        assert text.lower() == "@meridian"
+
+
 # ═══════════════════════════════════════════════════════════════════
 # group_gating tests
 # ═══════════════════════════════════════════════════════════════════
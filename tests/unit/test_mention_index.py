@@ -0,0 +1,130 @@
+"""Unit tests for the shared Aho-Corasick mention index."""
+
+from unittest.mock import patch
+
+import pytest
+
+from src.matrix import mention_index
+from src.matrix.mention_index import AhoCorasick, MentionIndex
+
+
+MAPPINGS = {
+    "agent-597b5756": {
+        "agent_id": "agent-597b5756",
+        "agent_name": "Meridian",
+        "matrix_user_id": "@agent_597b5756:matrix.oculair.ca",
+    },
+    "agent-870d3dfb": {
+        "agent_id": "agent-870d3dfb",
+        "agent_name": "Huly - matrix-tuwunel-deploy",
+        "matrix_user_id": "@agent_870d3dfb:matrix.oculair.ca",
+    },
+    "agent-bmo": {
+        "agent_id": "agent-bmo",
+        "agent_name": "BMO",
+        "matrix_user_id": "@agent_bmo:matrix.oculair.ca",
+    },
+}
+
+
+@pytest.fixture
+def index():
+    return MentionIndex(MAPPINGS)
+
+
+@pytest.fixture
+def shared_index():
+    mention_index.reset_mention_index()
+    with patch("src.matrix.mention_index.get_all_mappings", return_value=MAPPINGS) as mock_all:
+        yield mock_all
+    mention_index.reset_mention_index()
+
+
+class TestAhoCorasick:
+    def test_finds_overlapping_patterns(self):
+        automaton = AhoCorasick(["he", "she", "hers", "his"])
+        found = {(start, end) for start, end, _ in automaton.iter_matches("ushers")}
+        assert found == {(1, 4), (2, 4), (2, 6)}
+
+    def test_no_patterns(self):
+        assert list(AhoCorasick([]).iter_matches("anything")) == []
+
+
+class TestFindMentions:
+    def test_single_pass_finds_all_kinds(self, index):
+        text = "@Meridian, ping @agent_bmo:matrix.oculair.ca and @agent-870d3dfb"
+        matches = index.find_mentions(text)
+        assert [(m.agent_id, m.kind) for m in matches] == [
+            ("agent-597b5756", "name"),
+            ("agent-bmo", "mxid"),
+            ("agent-870d3dfb", "agent_id"),
+        ]
+        assert matches[1].text == "@agent_bmo:matrix.oculair.ca"
+
+    def test_case_insensitive_keeps_original_text(self, index):
+        matches = index.find_mentions("hey @MERIDIAN")
+        assert matches[0].text == "@MERIDIAN"
+        assert matches[0].agent_name == "Meridian"
+
+    def test_multi_word_name_wins_over_prefix(self, index):
+        matches = index.find_mentions("@Huly - matrix-tuwunel-deploy please check")
+        assert len(matches) == 1
+        assert matches[0].text == "@Huly - matrix-tuwunel-deploy"
+        assert matches[0].agent_id == "agent-870d3dfb"
+
+    def test_huly_short_name(self, index):
+        matches = index.find_mentions("@matrix-tuwunel-deploy please check")
+        assert matches[0].agent_id == "agent-870d3dfb"
+        assert matches[0].kind == "name"
+
+    def test_localpart_not_matched_before_other_server(self, index):
+        assert index.find_mentions("@agent_bmo:other.server hi", fuzzy=False) == []
+        assert index.find_mentions("@agent_bmo hi")[0].kind == "localpart"
+
+    def test_mxid_not_prefix_of_longer_domain(self, index):
+        assert index.find_mentions("@agent_bmo:matrix.oculair.ca.evil.com", fuzzy=False) == []
+        assert len(index.find_mentions("talk to @agent_bmo:matrix.oculair.ca.")) == 1
+
+    def test_name_requires_token_boundaries(self, index):
+        assert index.find_mentions("mail user@Meridian.com") == []
+        assert index.find_mentions("@Meridianx hello") == []
+
+    def test_fuzzy_fallback_is_memoized(self, index):
+        first = index.find_mentions("@Merid hi")
+        assert first[0].kind == "fuzzy"
+        assert first[0].agent_id == "agent-597b5756"
+
+        assert index._fuzzy_cache["merid"] == "agent-597b5756"
+        assert index.resolve_fuzzy("MERID") == "agent-597b5756"
+        assert index.resolve_fuzzy("unknownname") is None
+        assert "unknownname" in index._fuzzy_cache
+
+    def test_fuzzy_disabled(self, index):
+        assert index.find_mentions("@Merid hi", fuzzy=False) == []
+
+    def test_no_at_sign_short_circuits(self, index):
+        assert index.find_mentions("no mentions here") == []
+
+
+class TestSharedIndex:
+    def test_reused_until_mappings_change(self, shared_index):
+        first = mention_index.get_mention_index()
+        assert mention_index.get_mention_index() is first
+        assert shared_index.call_count == 1
+
+        from src.core import mapping_service
+        mapping_service.invalidate_cache()
+
+        rebuilt = mention_index.get_mention_index()
+        assert rebuilt is not first
+        assert shared_index.call_count == 2
+
+    def test_mention_detection_uses_index_for_agent_bots(self, shared_index):
+        from src.matrix.mention_detection import _check_text
+
+        hit, text = _check_text("hi @agent_bmo, status?", "@agent_bmo:matrix.oculair.ca")
+        assert hit is True
+        assert text == "@agent_bmo"
+
+        hit, _ = _check_text("hi @agent_bmo:other.server", "@agent_bmo:matrix.oculair.ca")
+        assert hit is False
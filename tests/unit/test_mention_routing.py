@@ -44,10 +44,12 @@ def sample_agent_mappings():
 @pytest.fixture
 def mock_mapping_service(sample_agent_mappings):
     """Mock the mapping service functions"""
+    from src.matrix import mention_index
+
+    mention_index.reset_mention_index()
     with patch('src.matrix.mention_routing.get_mapping_by_agent_id') as mock_by_id, \
          patch('src.matrix.mention_routing.get_mapping_by_matrix_user') as mock_by_user, \
-         patch('src.matrix.mention_routing.get_mapping_by_agent_name') as mock_by_name, \
-         patch('src.matrix.mention_routing.get_all_mappings') as mock_all:
+         patch('src.matrix.mention_index.get_all_mappings') as mock_all:
         
         def by_id(agent_id):
             return sample_agent_mappings.get(agent_id)
@@ -58,33 +60,16 @@ def mock_mapping_service(sample_agent_mappings):
                     return mapping
             return None
         
-        def by_name(name, fuzzy=True):
-            name_lower = name.lower()
-            for mapping in sample_agent_mappings.values():
-                agent_name = mapping["agent_name"].lower()
-                if fuzzy:
-                    # Check exact match or if search term is in agent name
-                    if name_lower == agent_name or name_lower in agent_name:
-                        return mapping
-                    # Handle "Huly - " prefix
-                    if agent_name.startswith("huly - ") and name_lower in agent_name[7:]:
-                        return mapping
-                else:
-                    if name_lower == agent_name:
-                        return mapping
-            return None
-        
         mock_by_id.side_effect = by_id
         mock_by_user.side_effect = by_user
-        mock_by_name.side_effect = by_name
         mock_all.return_value = sample_agent_mappings
         
         yield {
             "by_id": mock_by_id,
             "by_user": mock_by_user,
-            "by_name": mock_by_name,
             "all": mock_all,
         }
+    mention_index.reset_mention_index()
 
 
 @pytest.fixture
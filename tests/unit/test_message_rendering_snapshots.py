@@ -30,26 +30,12 @@ def mock_pill_mapping_service():
         },
     }
 
-    def by_user(mxid):
-        for value in mappings.values():
-            if value["matrix_user_id"] == mxid:
-                return value
-        return None
+    from src.matrix import mention_index
 
-    def by_name(name, fuzzy=True):
-        needle = (name or "").lower()
-        for value in mappings.values():
-            candidate = value["agent_name"].lower()
-            if needle == candidate:
-                return value
-            if fuzzy and needle in candidate:
-                return value
-        return None
-
-    with patch("src.matrix.pill_formatter.get_mapping_by_matrix_user", side_effect=by_user), patch(
-        "src.matrix.pill_formatter.get_mapping_by_agent_name", side_effect=by_name
-    ):
+    mention_index.reset_mention_index()
+    with patch("src.matrix.mention_index.get_all_mappings", return_value=mappings):
         yield
+    mention_index.reset_mention_index()
 
 
 @pytest.mark.parametrize(
@@ -0,0 +1,233 @@
+"""Tests for src/matrix/parse_cache module and its use by parse_document."""
+
+from unittest.mock import patch
+
+import pytest
+
+from src.matrix import parse_cache
+from src.matrix.document_parser import DocumentParseConfig, _cache_parser_version, parse_document
+
+
+@pytest.fixture(autouse=True)
+def cache_db(tmp_path, monkeypatch):
+    db_path = tmp_path / "parse_cache.db"
+    monkeypatch.setenv("DOCUMENT_PARSING_CACHE_DB", str(db_path))
+    parse_cache.reset()
+    yield db_path
+    parse_cache.reset()
+
+
+class TestParseCacheStore:
+    def test_miss_then_hit(self):
+        assert parse_cache.get_cached_parse("abc", "v1") is None
+
+        assert parse_cache.store_parse("abc", "v1", "Extracted text", page_count=3, was_ocr=True)
+        cached = parse_cache.get_cached_parse("abc", "v1")
+
+        assert cached is not None
+        assert cached.text == "Extracted text"
+        assert cached.page_count == 3
+        assert cached.was_ocr is True
+        snapshot = parse_cache.snapshot()
+        assert snapshot["hits"] == 1
+        assert snapshot["misses"] == 1
+        assert snapshot["hit_rate"] == 0.5
+        assert snapshot["stores"] == 1
+
+    def test_parser_version_isolates_entries(self):
+        parse_cache.store_parse("abc", "v1", "old parser output")
+        assert parse_cache.get_cached_parse("abc", "v2") is None
+
+    def test_empty_text_not_stored(self):
+        assert parse_cache.store_parse("abc", "v1", "") is False
+        assert parse_cache.get_cached_parse("abc", "v1") is None
+
+    def test_lru_eviction_keeps_recently_used(self, monkeypatch):
+        import os
+        import time
+
+        import zlib
+
+        payloads = {key: os.urandom(500).hex() for key in ("a", "b", "c")}
+        row_bytes = max(len(zlib.compress(p.encode("utf-8"), 6)) for p in payloads.values())
+        # Room for two rows but not three
+        monkeypatch.setattr(parse_cache, "_max_bytes", lambda: int(row_bytes * 2.5))
+
+        parse_cache.store_parse("a", "v1", payloads["a"])
+        time.sleep(0.01)
+        parse_cache.store_parse("b", "v1", payloads["b"])
+        time.sleep(0.01)
+        assert parse_cache.get_cached_parse("a", "v1") is not None  # refresh "a"
+        time.sleep(0.01)
+        parse_cache.store_parse("c", "v1", payloads["c"])
+
+        assert parse_cache.get_cached_parse("b", "v1") is None
+        assert parse_cache.get_cached_parse("a", "v1").text == payloads["a"]
+        assert parse_cache.get_cached_parse("c", "v1").text == payloads["c"]
+        assert parse_cache.snapshot()["evictions"] == 1
+
+    def test_unwritable_db_degrades_to_miss(self, monkeypatch, tmp_path):
+        blocker = tmp_path / "not_a_dir"
+        blocker.write_text("x")
+        monkeypatch.setenv("DOCUMENT_PARSING_CACHE_DB", str(blocker / "cache.db"))
+
+        assert parse_cache.store_parse("abc", "v1", "text") is False
+        assert parse_cache.get_cached_parse("abc", "v1") is None
+
+    def test_connection_reused_across_operations(self):
+        parse_cache.store_parse("abc", "v1", "text")
+        conn = parse_cache._get_connection()
+
+        assert parse_cache.get_cached_parse("abc", "v1") is not None
+        assert parse_cache._get_connection() is conn
+
+    def test_hash_file_matches_sha256(self, tmp_path):
+        import hashlib
+
+        f = tmp_path / "doc.bin"
+        f.write_bytes(b"hello world")
+        assert parse_cache.hash_file(str(f)) == hashlib.sha256(b"hello world").hexdigest()
+
+
+class TestParseDocumentUsesCache:
+    @pytest.fixture
+    def config(self):
+        return DocumentParseConfig(enabled=True, timeout_seconds=10.0, max_file_size_mb=1, cache_enabled=True)
+
+    @pytest.mark.asyncio
+    async def test_reupload_skips_markitdown(self, tmp_path, config):
+        first = tmp_path / "room1" / "notes.txt"
+        second = tmp_path / "room2" / "renamed.txt"
+        for f in (first, second):
+            f.parent.mkdir()
+            f.write_text("identical bytes uploaded twice")
+
+        with patch("src.matrix.document_parser._process_pool", None), \
+             patch("src.matrix.document_parser._convert_with_markitdown",
+                   return_value=("Parsed once", None, None)) as mock_convert:
+            result1 = await parse_document(str(first), "notes.txt", config=config)
+            result2 = await parse_document(str(second), "renamed.txt", config=config)
+
+        assert result1.text == result2.text == "Parsed once"
+        assert result2.filename == "renamed.txt"
+        assert mock_convert.call_count == 1
+        assert parse_cache.snapshot()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_known_hash_skips_rehash(self, tmp_path, config):
+        f = tmp_path / "notes.txt"
+        f.write_text("content")
+        parse_cache.store_parse("precomputed", _cache_parser_version(config), "From cache")
+
+        with patch("src.matrix.parse_cache.hash_file") as mock_hash, \
+             patch("src.matrix.document_parser._convert_with_markitdown") as mock_convert:
+            result = await parse_document(str(f), "notes.txt", config=config, content_hash="precomputed")
+
+        assert result.text == "From cache"
+        mock_hash.assert_not_called()
+        mock_convert.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_parse_not_cached(self, tmp_path, config):
+        f = tmp_path / "notes.txt"
+        f.write_text("content")
+
+        with patch("src.matrix.document_parser._process_pool", None), \
+             patch("src.matrix.document_parser._convert_with_markitdown",
+                   return_value=("", None, "SomeError: boom")):
+            result = await parse_document(str(f), "notes.txt", config=config)
+
+        assert result.error is not None
+        assert parse_cache.snapshot()["stores"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_ocr_fallback_not_cached(self, tmp_path, config):
+        import fitz
+
+        doc = fitz.open()
+        doc.new_page()
+        path = tmp_path / "scan.pdf"
+        doc.save(str(path))
+        doc.close()
+
+        with patch("src.matrix.document_parser._process_pool", None), \
+             patch("src.matrix.document_parser._convert_with_markitdown",
+                   return_value=("## scan.pdf", 1, None)), \
+             patch("src.matrix.document_parser._ocr_pdf_pages", side_effect=RuntimeError("tesseract crashed")):
+            result = await parse_document(str(path), "scan.pdf", config=config)
+
+        assert result.text == "## scan.pdf"
+        assert result.was_ocr is False
+        assert parse_cache.snapshot()["stores"] == 0
+
+    @pytest.mark.asyncio
+    async def test_ocr_settings_change_cache_namespace(self, tmp_path, config):
+        from dataclasses import replace
+
+        assert _cache_parser_version(config) != _cache_parser_version(replace(config, ocr_dpi=300))
+        assert _cache_parser_version(config) != _cache_parser_version(replace(config, ocr_enabled=False))
+        assert _cache_parser_version(config) != _cache_parser_version(replace(config, ocr_max_pages=5))
+        assert _cache_parser_version(config) != _cache_parser_version(config, stream=True)
+
+
+class TestStreamingParseUsesCache:
+    @pytest.fixture
+    def config(self):
+        return DocumentParseConfig(enabled=True, timeout_seconds=10.0, cache_enabled=True)
+
+    @pytest.fixture
+    def pdf_file(self, tmp_path):
+        """Two text pages and one blank page that needs OCR."""
+        import fitz
+
+        doc = fitz.open()
+        for i in range(2):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Page {i + 1} " + "readable words here " * 4)
+        doc.new_page()
+        path = tmp_path / "scan.pdf"
+        doc.save(str(path))
+        doc.close()
+        return str(path)
+
+    @staticmethod
+    async def _collect(*args, **kwargs):
+        from src.matrix.document_parser import iter_document_sections
+
+        return [section async for section in iter_document_sections(*args, **kwargs)]
+
+    @pytest.mark.asyncio
+    async def test_streamed_pdf_is_cached_and_replayed(self, pdf_file, config):
+        with patch("src.matrix.document_parser._process_pool", None), \
+             patch("src.matrix.document_parser._ocr_pdf_page", return_value="OCR page text") as mock_ocr:
+            first = await self._collect(pdf_file, "scan.pdf", config=config)
+            second = await self._collect(pdf_file, "scan.pdf", config=config)
+
+        assert mock_ocr.call_count == 1
+        assert parse_cache.snapshot()["hits"] == 1
+        assert "\n\n".join(s.text for s in second) == "\n\n".join(s.text for s in first)
+        assert second[0].was_ocr is True
+
+    @pytest.mark.asyncio
+    async def test_streamed_entry_not_served_to_parse_document(self, pdf_file, config):
+        with patch("src.matrix.document_parser._process_pool", None), \
+             patch("src.matrix.document_parser._ocr_pdf_page", return_value="OCR page text"):
+            await self._collect(pdf_file, "scan.pdf", config=config)
+
+        with patch("src.matrix.document_parser._process_pool", None), \
+             patch("src.matrix.document_parser._convert_with_markitdown",
+                   return_value=("# Converted " + "readable words here " * 10, 3, None)) as mock_convert:
+            result = await parse_document(pdf_file, "scan.pdf", config=config)
+
+        mock_convert.assert_called_once()
+        assert result.text.startswith("# Converted")
+        assert parse_cache.snapshot()["hits"] == 0
+
+    @pytest.mark.asyncio
+    async def test_streamed_pdf_with_failed_ocr_not_cached(self, pdf_file, config):
+        with patch("src.matrix.document_parser._process_pool", None), \
+             patch("src.matrix.document_parser._ocr_pdf_page", side_effect=RuntimeError("tesseract crashed")):
+            sections = await self._collect(pdf_file, "scan.pdf", config=config)
+
+        assert [s.page_number for s in sections] == [1, 2]
+        assert parse_cache.snapshot()["stores"] == 0
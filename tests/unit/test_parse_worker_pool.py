@@ -0,0 +1,232 @@
+"""Tests for src/matrix/parse_worker_pool module."""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.matrix import parse_worker_pool
+from src.matrix.parse_worker_pool import (
+    ParseJobTimeout,
+    ParseWorkerPool,
+    ParseWorkerPoolConfig,
+    _run_job,
+    compute_worker_count,
+)
+
+
+def _pool_with_threads(max_workers: int) -> tuple[ParseWorkerPool, ThreadPoolExecutor]:
+    """Pool whose jobs run on a thread executor so tests can observe scheduling."""
+    pool = ParseWorkerPool(ParseWorkerPoolConfig(max_workers=max_workers))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pool._ensure_executor = lambda: executor
+    return pool, executor
+
+
+# ---------------------------------------------------------------------------
+# Sizing
+# ---------------------------------------------------------------------------
+
+class TestComputeWorkerCount:
+    def test_explicit_override(self, monkeypatch):
+        monkeypatch.setattr(parse_worker_pool, "_available_cpus", lambda: 32)
+        assert compute_worker_count(ParseWorkerPoolConfig(max_workers=3)) == 3
+
+    def test_bounded_by_memory(self, monkeypatch):
+        monkeypatch.setattr(parse_worker_pool, "_available_cpus", lambda: 8)
+        monkeypatch.setattr(parse_worker_pool, "_available_memory_mb", lambda: 2048)
+        config = ParseWorkerPoolConfig(job_memory_estimate_mb=1024)
+        assert compute_worker_count(config) == 2
+
+    def test_memory_limit_takes_precedence_over_estimate(self, monkeypatch):
+        monkeypatch.setattr(parse_worker_pool, "_available_cpus", lambda: 8)
+        monkeypatch.setattr(parse_worker_pool, "_available_memory_mb", lambda: 4096)
+        config = ParseWorkerPoolConfig(job_memory_limit_mb=512, job_memory_estimate_mb=4096)
+        assert compute_worker_count(config) == 8
+
+    def test_never_below_one(self, monkeypatch):
+        monkeypatch.setattr(parse_worker_pool, "_available_cpus", lambda: 4)
+        monkeypatch.setattr(parse_worker_pool, "_available_memory_mb", lambda: 100)
+        assert compute_worker_count(ParseWorkerPoolConfig()) == 1
+
+    def test_unknown_memory_uses_cpus(self, monkeypatch):
+        monkeypatch.setattr(parse_worker_pool, "_available_cpus", lambda: 3)
+        monkeypatch.setattr(parse_worker_pool, "_available_memory_mb", lambda: None)
+        assert compute_worker_count(ParseWorkerPoolConfig()) == 3
+
+
+# ---------------------------------------------------------------------------
+# Lifecycle
+# ---------------------------------------------------------------------------
+
+class TestLifecycle:
+    def test_not_started_until_first_job(self):
+        pool = ParseWorkerPool(ParseWorkerPoolConfig(max_workers=1))
+        assert pool.started is False
+        assert pool.snapshot()["started"] is False
+
+    @pytest.mark.asyncio
+    async def test_workers_recycled_after_max_tasks(self):
+        pool = ParseWorkerPool(ParseWorkerPoolConfig(max_workers=1, max_tasks_per_child=1))
+        try:
+            first = await pool.run(os.getpid, timeout=30)
+            second = await pool.run(os.getpid, timeout=30)
+        finally:
+            pool.shutdown()
+
+        assert first != os.getpid()
+        assert first != second
+        assert pool.snapshot()["jobs_completed"] == 2
+
+
+# ---------------------------------------------------------------------------
+# Scheduling
+# ---------------------------------------------------------------------------
+
+class TestPriorityScheduling:
+    @pytest.mark.asyncio
+    async def test_smaller_jobs_run_before_larger_queued_jobs(self):
+        pool, executor = _pool_with_threads(max_workers=1)
+        order = []
+
+        def job(name, delay=0.0):
+            time.sleep(delay)
+            order.append(name)
+            return name
+
+        try:
+            blocker = asyncio.create_task(pool.run(job, "blocker", 0.2, priority=0))
+            await asyncio.sleep(0.05)
+            big = asyncio.create_task(pool.run(job, "big", priority=500_000_000))
+            small = asyncio.create_task(pool.run(job, "small", priority=1_000))
+            await asyncio.sleep(0.01)
+            assert pool.snapshot()["queue_depth"] == 2
+            await asyncio.gather(blocker, big, small)
+        finally:
+            executor.shutdown(wait=True)
+
+        assert order == ["blocker", "small", "big"]
+        snapshot = pool.snapshot()
+        assert snapshot["queue_depth"] == 0
+        assert snapshot["running"] == 0
+        assert snapshot["max_queue_depth"] == 2
+        assert snapshot["jobs_completed"] == 3
+        assert snapshot["max_wait_ms"] > 0
+
+    @pytest.mark.asyncio
+    async def test_long_waiting_large_job_is_not_starved(self):
+        pool, executor = _pool_with_threads(max_workers=1)
+        # 50 ms of waiting is worth 5 MB of priority
+        pool.config.priority_aging_per_second = 100_000_000
+        order = []
+
+        def job(name, delay=0.0):
+            time.sleep(delay)
+            order.append(name)
+
+        try:
+            blocker = asyncio.create_task(pool.run(job, "blocker", 0.2, priority=0))
+            await asyncio.sleep(0.05)
+            big = asyncio.create_task(pool.run(job, "big", priority=2_000_000))
+            await asyncio.sleep(0.05)
+            small = asyncio.create_task(pool.run(job, "small", priority=1_000))
+            await asyncio.gather(blocker, big, small)
+        finally:
+            executor.shutdown(wait=True)
+
+        assert order == ["blocker", "big", "small"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        pool, executor = _pool_with_threads(max_workers=1)
+        try:
+            blocker = asyncio.create_task(pool.run(time.sleep, 0.1))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.create_task(pool.run(time.sleep, 0))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            await blocker
+            assert await pool.run(lambda: "ok") == "ok"
+        finally:
+            executor.shutdown(wait=True)
+
+        assert pool.snapshot()["running"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failures_counted_and_slot_released(self):
+        pool, executor = _pool_with_threads(max_workers=1)
+
+        def boom():
+            raise ValueError("bad file")
+
+        try:
+            with pytest.raises(ValueError):
+                await pool.run(boom)
+            assert await pool.run(lambda: 42) == 42
+        finally:
+            executor.shutdown(wait=True)
+
+        snapshot = pool.snapshot()
+        assert snapshot["jobs_failed"] == 1
+        assert snapshot["jobs_completed"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Per-job timeout
+# ---------------------------------------------------------------------------
+
+class TestJobTimeout:
+    def test_run_job_alarm_interrupts_long_job(self):
+        with pytest.raises(ParseJobTimeout):
+            _run_job(time.sleep, 0.05, 5)
+
+    def test_run_job_without_timeout_runs_normally(self):
+        assert _run_job(sum, None, [1, 2, 3]) == 6
+
+    @pytest.mark.asyncio
+    async def test_worker_timeout_surfaces_as_asyncio_timeout(self):
+        pool, executor = _pool_with_threads(max_workers=1)
+
+        def slow():
+            raise ParseJobTimeout("Parse job exceeded its time budget")
+
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.run(slow, timeout=1)
+        finally:
+            executor.shutdown(wait=True)
+
+        assert pool.snapshot()["jobs_timed_out"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Restarts
+# ---------------------------------------------------------------------------
+
+class TestRestart:
+    def test_restart_ignores_executor_that_was_already_replaced(self):
+        pool = ParseWorkerPool(ParseWorkerPoolConfig(max_workers=1, max_tasks_per_child=0))
+        try:
+            broken = pool._ensure_executor()
+            assert pool.restart(executor=broken) is True
+            replacement = pool._ensure_executor()
+
+            # A second job that saw the same executor break must not discard the new one
+            assert pool.restart(executor=broken) is False
+            assert pool._executor is replacement
+            assert pool.snapshot()["restarts"] == 1
+        finally:
+            pool.shutdown()
+
+    def test_restart_if_broken_leaves_healthy_executor(self):
+        pool = ParseWorkerPool(ParseWorkerPoolConfig(max_workers=1, max_tasks_per_child=0))
+        try:
+            executor = pool._ensure_executor()
+            assert pool.restart_if_broken() is False
+            assert pool._executor is executor
+        finally:
+            pool.shutdown()
@@ -45,31 +45,12 @@ def sample_agent_mappings():
 @pytest.fixture
 def mock_mapping_service(sample_agent_mappings):
     """Mock the mapping service functions used by pill_formatter."""
-    with patch("src.matrix.pill_formatter.get_mapping_by_matrix_user") as mock_by_user, \
-         patch("src.matrix.pill_formatter.get_mapping_by_agent_name") as mock_by_name:
-
-        def by_user(mxid):
-            for mapping in sample_agent_mappings.values():
-                if mapping["matrix_user_id"] == mxid:
-                    return mapping
-            return None
-
-        def by_name(name, fuzzy=True):
-            name_lower = name.lower()
-            for mapping in sample_agent_mappings.values():
-                agent_name = mapping["agent_name"].lower()
-                if fuzzy:
-                    if name_lower == agent_name or name_lower in agent_name:
-                        return mapping
-                else:
-                    if name_lower == agent_name:
-                        return mapping
-            return None
-
-        mock_by_user.side_effect = by_user
-        mock_by_name.side_effect = by_name
-
-        yield {"by_user": mock_by_user, "by_name": mock_by_name}
+    from src.matrix import mention_index
+
+    mention_index.reset_mention_index()
+    with patch("src.matrix.mention_index.get_all_mappings", return_value=sample_agent_mappings) as mock_all:
+        yield {"all": mock_all}
+    mention_index.reset_mention_index()
 
 
 # =============================================================================
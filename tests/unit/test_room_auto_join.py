@@ -0,0 +1,151 @@
+"""Unit tests for the bulk /rooms/auto-join job."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.app import app
+from src.api.routes import room_join
+from src.api.routes.room_join import AutoJoinJob, run_auto_join_job
+
+
+HEADERS = {"x-internal-key": "matrix-identity-internal-key"}
+
+
+class _FakeResponse:
+    def __init__(self, status, body=None, headers=None):
+        self.status = status
+        self._body = body or {}
+        self.headers = headers or {}
+
+    async def json(self, content_type="application/json"):
+        return self._body
+
+    async def text(self):
+        return str(self._body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+
+class _FakeSession:
+    def __init__(self, joined_rooms, join_responses=None, delay=0.0):
+        self.joined_rooms = joined_rooms
+        self.join_responses = join_responses or {}
+        self.delay = delay
+        self.get_urls = []
+        self.join_calls = []
+        self.in_flight = 0
+        self.peak = 0
+
+    def get(self, url, headers=None):
+        self.get_urls.append(url)
+        return _FakeResponse(200, {"joined_rooms": self.joined_rooms})
+
+    def post(self, url, headers=None, json=None):
+        room_id = url.split("/rooms/")[1].rsplit("/join", 1)[0]
+        self.join_calls.append(room_id)
+        session = self
+
+        class _Join(_FakeResponse):
+            async def __aenter__(self_inner):
+                session.in_flight += 1
+                session.peak = max(session.peak, session.in_flight)
+                await asyncio.sleep(session.delay)
+                session.in_flight -= 1
+                return self_inner
+
+        queued = self.join_responses.get(room_id)
+        status, body = queued.pop(0) if queued else (200, {"room_id": room_id})
+        return _Join(status, body)
+
+
+@pytest.fixture(autouse=True)
+def _clean_jobs():
+    room_join._jobs.clear()
+    yield
+    room_join._jobs.clear()
+
+
+def _rooms(n):
+    return {f"!room{i}:test": f"Agent {i}" for i in range(n)}
+
+
+@pytest.mark.asyncio
+async def test_only_missing_rooms_are_joined():
+    session = _FakeSession(joined_rooms=["!room0:test", "!room2:test"])
+    job = AutoJoinJob(job_id="j1", user_id="@admin:test", total=4)
+
+    await run_auto_join_job(job, session, "http://hs", "tok", _rooms(4))
+
+    assert len(session.get_urls) == 1
+    assert session.get_urls[0].endswith("/joined_rooms")
+    assert sorted(session.join_calls) == ["!room1:test", "!room3:test"]
+    result = job.to_dict()
+    assert result["status"] == "completed"
+    assert result["joined"] == 2
+    assert result["already_joined"] == 2
+    assert result["completed"] == result["total"] == 4
+
+
+@pytest.mark.asyncio
+async def test_joins_are_bounded(monkeypatch):
+    monkeypatch.setattr(room_join, "AUTO_JOIN_CONCURRENCY", 3)
+    session = _FakeSession(joined_rooms=[], delay=0.01)
+    job = AutoJoinJob(job_id="j2", user_id="@admin:test", total=10)
+
+    await run_auto_join_job(job, session, "http://hs", "tok", _rooms(10))
+
+    assert len(session.join_calls) == 10
+    assert session.peak == 3
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_join_is_retried_after_hint():
+    session = _FakeSession(
+        joined_rooms=[],
+        join_responses={"!room0:test": [(429, {"errcode": "M_LIMIT_EXCEEDED", "retry_after_ms": 10})]},
+    )
+    job = AutoJoinJob(job_id="j3", user_id="@admin:test", total=1)
+
+    with patch("src.api.routes.room_join.asyncio.sleep", wraps=asyncio.sleep) as mock_sleep:
+        await run_auto_join_job(job, session, "http://hs", "tok", _rooms(1))
+
+    assert session.join_calls == ["!room0:test", "!room0:test"]
+    mock_sleep.assert_any_await(0.01)
+    assert job.to_dict()["joined"] == 1
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_failure_is_reported():
+    session = _FakeSession(joined_rooms=[], join_responses={"!room0:test": [(403, {"errcode": "M_FORBIDDEN"})]})
+    job = AutoJoinJob(job_id="j4", user_id="@admin:test", total=1)
+
+    await run_auto_join_job(job, session, "http://hs", "tok", _rooms(1))
+
+    assert session.join_calls == ["!room0:test"]
+    assert job.failed_rooms[0]["room_id"] == "!room0:test"
+    assert "M_FORBIDDEN" in job.failed_rooms[0]["error"]
+    assert job.status == "completed"
+
+
+def test_poll_returns_progress_and_unknown_job_is_404():
+    client = TestClient(app)
+    job = AutoJoinJob(job_id="known", user_id="@admin:test", total=3)
+    job.joined_rooms.append({"room_id": "!a:test", "agent_name": "A", "status": "joined"})
+    room_join._jobs[job.job_id] = job
+
+    response = client.get("/rooms/auto-join/known", headers=HEADERS)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "running"
+    assert data["completed"] == 1
+    assert data["total"] == 3
+
+    assert client.get("/rooms/auto-join/missing", headers=HEADERS).status_code == 404
+    assert client.get("/rooms/auto-join/known", headers={"x-internal-key": "wrong"}).status_code == 403
@@ -0,0 +1,190 @@
+"""Tests for the sync filter / since-token / sync metrics layer."""
+
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from nio import SyncError, SyncResponse
+
+from src.matrix import sync_tuning
+from src.matrix.sync_tuning import SyncSettings, SyncTokenStore, instrument_sync_metrics, run_initial_sync
+
+USER = "@letta:matrix.test"
+HOMESERVER = "http://synapse:8008"
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    sync_tuning.reset()
+    yield
+    sync_tuning.reset()
+
+
+def _sync_response(next_batch="s2", rooms=None):
+    return SyncResponse.from_dict({
+        "next_batch": next_batch,
+        "rooms": {"join": rooms or {}},
+    })
+
+
+class TestBuildFilter:
+
+    def test_default_filters_drop_presence_account_data_and_ephemeral(self):
+        settings = SyncSettings()
+
+        live = settings.build_filter()
+        initial = settings.build_filter(initial=True)
+
+        assert live["room"]["timeline"] == {"limit": 50}
+        assert initial["room"]["timeline"] == {"limit": 0}
+        assert live["room"]["state"] == {"lazy_load_members": True}
+        assert live["presence"] == {"types": []}
+        assert live["account_data"] == {"types": []}
+        assert live["room"]["account_data"] == {"types": []}
+        assert live["room"]["ephemeral"] == {"types": []}
+
+    def test_env_settings_shape_the_filter(self, monkeypatch):
+        monkeypatch.setenv("MATRIX_SYNC_TIMELINE_LIMIT", "10")
+        monkeypatch.setenv("MATRIX_SYNC_EVENT_TYPES", "m.room.message, m.poll.response")
+        monkeypatch.setenv("MATRIX_SYNC_NOT_EVENT_TYPES", "m.reaction")
+        monkeypatch.setenv("MATRIX_SYNC_STATE_EVENT_TYPES", "m.room.name,m.room.member")
+        monkeypatch.setenv("MATRIX_SYNC_LAZY_LOAD_MEMBERS", "false")
+        monkeypatch.setenv("MATRIX_SYNC_EXCLUDE_EPHEMERAL", "false")
+        monkeypatch.setenv("MATRIX_DATA_DIR", "/srv/data")
+
+        settings = SyncSettings.from_env()
+        room = settings.build_filter()["room"]
+
+        assert room["timeline"] == {
+            "limit": 10,
+            "types": ["m.room.message", "m.poll.response"],
+            "not_types": ["m.reaction"],
+        }
+        assert room["state"] == {"lazy_load_members": False, "types": ["m.room.name", "m.room.member"]}
+        assert "ephemeral" not in room
+        assert settings.token_path == "/srv/data/matrix_sync_token.json"
+
+
+class TestSyncTokenStore:
+
+    def test_round_trip_and_save_throttling(self, tmp_path):
+        path = str(tmp_path / "token.json")
+        store = SyncTokenStore(path, USER, HOMESERVER, save_interval_seconds=60)
+
+        assert store.load() is None
+        assert store.save("s1") is True
+        assert store.save("s2") is False  # within the save interval
+        assert store.save("s2", force=True) is True
+        assert store.save("s2", force=True) is False  # unchanged
+
+        assert SyncTokenStore(path, USER, HOMESERVER).load() == "s2"
+        assert sync_tuning.snapshot()["sync_token_saves_total"] == 2
+
+    def test_token_for_another_account_or_too_old_is_ignored(self, tmp_path):
+        path = str(tmp_path / "token.json")
+        SyncTokenStore(path, USER, HOMESERVER).save("s1")
+
+        assert SyncTokenStore(path, "@other:matrix.test", HOMESERVER).load() is None
+        assert SyncTokenStore(path, USER, "http://elsewhere:8008").load() is None
+
+        with open(path) as f:
+            data = json.load(f)
+        data["saved_at"] = time.time() - 7200
+        with open(path, "w") as f:
+            json.dump(data, f)
+        assert SyncTokenStore(path, USER, HOMESERVER, max_age_seconds=3600).load() is None
+
+    def test_corrupt_file_is_ignored(self, tmp_path):
+        path = tmp_path / "token.json"
+        path.write_text("{not json")
+
+        assert SyncTokenStore(str(path), USER, HOMESERVER).load() is None
+
+
+class TestRunInitialSync:
+
+    @pytest.mark.asyncio
+    async def test_resumes_from_stored_token_without_long_poll(self, tmp_path):
+        store = SyncTokenStore(str(tmp_path / "token.json"), USER, HOMESERVER)
+        store.save("s1")
+        client = MagicMock()
+        client.sync = AsyncMock(return_value=_sync_response())
+
+        await run_initial_sync(client, SyncSettings(), store, MagicMock())
+
+        client.sync.assert_awaited_once()
+        kwargs = client.sync.await_args.kwargs
+        assert kwargs["since"] == "s1"
+        assert kwargs["timeout"] == 0
+        assert kwargs["full_state"] is True
+        assert kwargs["sync_filter"]["room"]["timeline"]["limit"] == 0
+        assert sync_tuning.snapshot()["sync_resumed"] is True
+
+    @pytest.mark.asyncio
+    async def test_catch_up_uses_live_timeline_limit(self, tmp_path):
+        store = SyncTokenStore(str(tmp_path / "token.json"), USER, HOMESERVER)
+        store.save("s1")
+        client = MagicMock()
+        client.sync = AsyncMock(return_value=_sync_response())
+
+        await run_initial_sync(client, SyncSettings(catch_up=True, timeline_limit=20), store, MagicMock())
+
+        assert client.sync.await_args.kwargs["sync_filter"]["room"]["timeline"]["limit"] == 20
+
+    @pytest.mark.asyncio
+    async def test_rejected_token_falls_back_to_fresh_sync(self, tmp_path):
+        store = SyncTokenStore(str(tmp_path / "token.json"), USER, HOMESERVER)
+        store.save("stale")
+        client = MagicMock()
+        client.sync = AsyncMock(side_effect=[SyncError("M_UNKNOWN_TOKEN"), _sync_response()])
+
+        await run_initial_sync(client, SyncSettings(), store, MagicMock())
+
+        assert client.sync.await_count == 2
+        fresh = client.sync.await_args.kwargs
+        assert "since" not in fresh
+        assert fresh["timeout"] == 30000
+        assert fresh["sync_filter"]["room"]["timeline"]["limit"] == 0
+        assert sync_tuning.snapshot()["sync_resumed"] is False
+
+
+class TestSyncMetrics:
+
+    @pytest.mark.asyncio
+    async def test_records_size_and_parse_time_of_sync_responses_only(self):
+        room = {"timeline": {"events": [
+            {"type": "m.room.message", "event_id": "$1", "sender": "@a:matrix.test",
+             "origin_server_ts": 1, "content": {"msgtype": "m.text", "body": "hi"}},
+        ]}}
+        sync = _sync_response(rooms={"!room:matrix.test": room})
+        other = MagicMock()
+        client = MagicMock()
+        client.create_matrix_response = AsyncMock(side_effect=[sync, other])
+        transport = MagicMock()
+        transport.read = AsyncMock(return_value=b"x" * 1234)
+
+        instrument_sync_metrics(client)
+        assert await client.create_matrix_response(SyncResponse, transport, data=None) is sync
+        assert await client.create_matrix_response(MagicMock, transport) is other
+
+        stats = sync_tuning.snapshot()
+        assert stats["sync_responses_total"] == 1
+        assert stats["sync_bytes_total"] == 1234
+        assert stats["sync_last_joined_rooms"] == 1
+        assert stats["sync_last_timeline_events"] == 1
+        assert stats["sync_parse_seconds_total"] > 0
+        transport.read.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_sync_errors_are_counted(self):
+        client = MagicMock()
+        client.create_matrix_response = AsyncMock(return_value=SyncError("boom"))
+        transport = MagicMock()
+        transport.read = AsyncMock(return_value=b"{}")
+
+        instrument_sync_metrics(client)
+        await client.create_matrix_response(SyncResponse, transport)
+
+        assert sync_tuning.snapshot()["sync_errors_total"] == 1
+        assert sync_tuning.snapshot()["sync_responses_total"] == 0
@@ -181,9 +181,9 @@ def test_persist_file_concurrency_safe(monkeypatch, tmp_path):
     assert out1[1] == out2[1]
     assert (out1[2], out2[2]).count(True) == 1
 
-    idx = tmp_path / ".hashes.json"
-    data = json.loads(idx.read_text(encoding="utf-8"))
+    data = activities._load_hash_index()
     assert len(data) == 1
+    assert not (tmp_path / ".hashes.json").exists()
 
 
 @pytest.mark.asyncio
@@ -223,7 +223,7 @@ async def test_cleanup_file_artifacts_removes_hash_and_files(monkeypatch, tmp_pa
     assert result.hash_entry_removed is True
     assert not temp_file.exists()
     assert not persistent.exists()
-    idx = json.loads((tmp_path / ".hashes.json").read_text(encoding="utf-8"))
+    idx = activities._load_hash_index()
     assert file_hash not in idx
 
 
@@ -269,10 +269,221 @@ async def test_cleanup_file_artifacts_keeps_hash_if_persistent_delete_fails(monk
             )
         )
 
-    idx = json.loads((tmp_path / ".hashes.json").read_text(encoding="utf-8"))
+    monkeypatch.setattr(os, "unlink", original_unlink)
+    idx = activities._load_hash_index()
     assert file_hash in idx
 
 
+def _media_client(handler):
+    import httpx
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_download_hashes_while_streaming(monkeypatch, tmp_path):
+    import hashlib
+
+    import httpx
+
+    from temporal_workflows.activities import download as download_activities
+
+    body = b"%PDF-1.4 " + os.urandom(600_000)
+    client = _media_client(lambda request: httpx.Response(200, content=body))
+    monkeypatch.setattr(activities, "PERSISTENT_DOCUMENTS_DIR", str(tmp_path / "docs"))
+    monkeypatch.setattr(download_activities, "_get_http_client", lambda: client)
+
+    def _no_rehash(path):
+        raise AssertionError("downloaded file should not be re-read for hashing")
+
+    monkeypatch.setattr(download_activities, "_sha256", _no_rehash)
+
+    result = await activities.download_file_from_matrix(
+        activities.DownloadInput(mxc_url="mxc://server/media1", file_type="application/pdf", file_name="a.pdf")
+    )
+    try:
+        assert result.file_size == len(body)
+        assert result.file_hash == hashlib.sha256(body).hexdigest()
+        with open(result.file_path, "rb") as f:
+            assert f.read() == body
+    finally:
+        os.unlink(result.file_path)
+
+
+@pytest.mark.asyncio
+async def test_download_rejects_oversized_content_length(monkeypatch, tmp_path):
+    import httpx
+
+    from temporal_workflows.activities import download as download_activities
+
+    client = _media_client(lambda request: httpx.Response(200, content=b"x" * 2048))
+    monkeypatch.setattr(activities, "PERSISTENT_DOCUMENTS_DIR", str(tmp_path / "docs"))
+    monkeypatch.setattr(download_activities, "_get_http_client", lambda: client)
+    monkeypatch.setattr(download_activities, "MAX_DOWNLOAD_BYTES", 1024)
+
+    with pytest.raises(activities.DownloadTooLargeError):
+        await activities.download_file_from_matrix(
+            activities.DownloadInput(mxc_url="mxc://server/big", file_type="application/pdf", file_name="big.pdf")
+        )
+    assert not os.path.exists(download_activities._partial_download_path("mxc://server/big", ".pdf"))
+
+
+@pytest.mark.asyncio
+async def test_download_resumes_partial_file_with_range(monkeypatch, tmp_path):
+    import hashlib
+
+    import httpx
+
+    from temporal_workflows.activities import download as download_activities
+
+    body = os.urandom(300_000)
+    seen_ranges = []
+
+    def _handler(request):
+        seen_ranges.append(request.headers.get("range"))
+        offset = int(request.headers["range"].split("=")[1].rstrip("-"))
+        return httpx.Response(
+            206,
+            content=body[offset:],
+            headers={"Content-Range": f"bytes {offset}-{len(body) - 1}/{len(body)}"},
+        )
+
+    client = _media_client(_handler)
+    monkeypatch.setattr(activities, "PERSISTENT_DOCUMENTS_DIR", str(tmp_path / "docs"))
+    monkeypatch.setattr(download_activities, "_get_http_client", lambda: client)
+
+    part_path = download_activities._partial_download_path("mxc://server/resume", ".pdf")
+    with open(part_path, "wb") as f:
+        f.write(body[:100_000])
+
+    result = await activities.download_file_from_matrix(
+        activities.DownloadInput(mxc_url="mxc://server/resume", file_type="application/pdf", file_name="r.pdf")
+    )
+    try:
+        assert seen_ranges == ["bytes=100000-"]
+        assert result.file_size == len(body)
+        assert result.file_hash == hashlib.sha256(body).hexdigest()
+        assert not os.path.exists(part_path)
+    finally:
+        os.unlink(result.file_path)
+
+
+@pytest.mark.asyncio
+async def test_download_restarts_when_range_ignored(monkeypatch, tmp_path):
+    import hashlib
+
+    import httpx
+
+    from temporal_workflows.activities import download as download_activities
+
+    body = b"complete document body"
+    client = _media_client(lambda request: httpx.Response(200, content=body))
+    monkeypatch.setattr(activities, "PERSISTENT_DOCUMENTS_DIR", str(tmp_path / "docs"))
+    monkeypatch.setattr(download_activities, "_get_http_client", lambda: client)
+
+    part_path = download_activities._partial_download_path("mxc://server/norange", ".txt")
+    with open(part_path, "wb") as f:
+        f.write(b"stale prefix")
+
+    result = await activities.download_file_from_matrix(
+        activities.DownloadInput(mxc_url="mxc://server/norange", file_type="text/plain", file_name="n.txt")
+    )
+    try:
+        with open(result.file_path, "rb") as f:
+            assert f.read() == body
+        assert result.file_hash == hashlib.sha256(body).hexdigest()
+    finally:
+        os.unlink(result.file_path)
+
+
+@pytest.mark.asyncio
+async def test_download_restarts_when_content_range_does_not_match(monkeypatch, tmp_path):
+    import hashlib
+
+    import httpx
+
+    from temporal_workflows.activities import download as download_activities
+
+    body = os.urandom(50_000)
+    seen_ranges = []
+
+    def _handler(request):
+        seen_ranges.append(request.headers.get("range"))
+        if "range" in request.headers:
+            # Server answers with a different window than the one requested
+            return httpx.Response(206, content=body, headers={"Content-Range": f"bytes 0-{len(body) - 1}/{len(body)}"})
+        return httpx.Response(200, content=body)
+
+    client = _media_client(_handler)
+    monkeypatch.setattr(activities, "PERSISTENT_DOCUMENTS_DIR", str(tmp_path / "docs"))
+    monkeypatch.setattr(download_activities, "_get_http_client", lambda: client)
+
+    part_path = download_activities._partial_download_path("mxc://server/badrange", ".pdf")
+    with open(part_path, "wb") as f:
+        f.write(body[:10_000])
+
+    result = await activities.download_file_from_matrix(
+        activities.DownloadInput(mxc_url="mxc://server/badrange", file_type="application/pdf", file_name="b.pdf")
+    )
+    try:
+        assert seen_ranges == ["bytes=10000-", None]
+        assert result.file_size == len(body)
+        assert result.file_hash == hashlib.sha256(body).hexdigest()
+    finally:
+        os.unlink(result.file_path)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("final_attempt", [False, True])
+async def test_download_transport_error_keeps_partial_until_final_attempt(monkeypatch, tmp_path, final_attempt):
+    import httpx
+
+    from temporal_workflows.activities import download as download_activities
+
+    def _handler(request):
+        raise httpx.ReadTimeout("stalled", request=request)
+
+    client = _media_client(_handler)
+    monkeypatch.setattr(activities, "PERSISTENT_DOCUMENTS_DIR", str(tmp_path / "docs"))
+    monkeypatch.setattr(download_activities, "_get_http_client", lambda: client)
+    monkeypatch.setattr(download_activities, "_is_final_attempt", lambda: final_attempt)
+
+    part_path = download_activities._partial_download_path("mxc://server/stall", ".pdf")
+    with open(part_path, "wb") as f:
+        f.write(b"partial")
+
+    try:
+        with pytest.raises(activities.DownloadError):
+            await activities.download_file_from_matrix(
+                activities.DownloadInput(mxc_url="mxc://server/stall", file_type="application/pdf", file_name="s.pdf")
+            )
+        assert os.path.exists(part_path) is not final_attempt
+    finally:
+        if os.path.exists(part_path):
+            os.unlink(part_path)
+
+
+@pytest.mark.asyncio
+async def test_download_client_replaced_for_new_loop_is_closed(monkeypatch):
+    import asyncio
+
+    from temporal_workflows.activities import download as download_activities
+
+    old_loop = asyncio.new_event_loop()
+    stale = download_activities.httpx.AsyncClient()
+    monkeypatch.setattr(download_activities, "_http_client", stale)
+    monkeypatch.setattr(download_activities, "_http_client_loop", old_loop)
+
+    fresh = download_activities._get_http_client()
+    try:
+        assert fresh is not stale
+        await asyncio.sleep(0)
+        assert stale.is_closed
+    finally:
+        await fresh.aclose()
+        old_loop.close()
+
+
 def test_should_remove_persistent_on_cancel():
     dr = DownloadResult(
         file_path="/tmp/file",
@@ -386,6 +597,7 @@ class _DeliverWS:
     def __init__(self, events):
         self._events = list(events)
         self.sent = []
+        self.closed = False
 
     async def send(self, payload):
         self.sent.append(payload)
@@ -395,9 +607,12 @@ class _DeliverWS:
             raise AssertionError("No queued websocket events")
         return self._events.pop(0)
 
-    async def close(self):
+    async def ping(self):
         return None
 
+    async def close(self):
+        self.closed = True
+
 
 class _HTTPResponse:
     def __init__(self, status_code=200, text="ok"):
@@ -467,6 +682,169 @@ async def test_deliver_to_letta_agent_not_found_is_non_retryable(monkeypatch):
         )
 
 
+@pytest.mark.asyncio
+async def test_deliver_to_letta_reuses_pooled_session(monkeypatch):
+    ws = _DeliverWS(
+        [
+            json.dumps({"type": "session_init", "session_id": "sess-1", "conversation_id": "conv-1"}),
+            json.dumps({"type": "stream", "event": "assistant", "content": "first"}),
+            json.dumps({"type": "result", "success": True}),
+            json.dumps({"type": "stream", "event": "assistant", "content": "second"}),
+            json.dumps({"type": "result", "success": True}),
+        ]
+    )
+    connects = []
+
+    async def _connect(*args, **kwargs):
+        connects.append(args)
+        return ws
+
+    monkeypatch.setattr(deliver_activities.websockets, "connect", _connect)
+
+    try:
+        first = await deliver_activities.deliver_to_letta(
+            DeliverToLettaInput(agent_id="agent-123", message_body="one", conversation_id="conv-1")
+        )
+        second = await deliver_activities.deliver_to_letta(
+            DeliverToLettaInput(agent_id="agent-123", message_body="two", conversation_id="conv-1")
+        )
+    finally:
+        await deliver_activities.close_gateway_pool()
+
+    assert (first.response_text, second.response_text) == ("first", "second")
+    assert len(connects) == 1
+    assert [json.loads(p)["type"] for p in ws.sent[:3]] == ["session_start", "message", "message"]
+
+
+@pytest.mark.asyncio
+async def test_deliver_to_letta_keeps_a_session_per_conversation(monkeypatch):
+    sockets = {
+        conversation_id: _DeliverWS(
+            [
+                json.dumps({"type": "session_init", "session_id": f"s-{conversation_id}",
+                            "conversation_id": conversation_id}),
+                json.dumps({"type": "stream", "event": "assistant", "content": f"{conversation_id} 1"}),
+                json.dumps({"type": "result", "success": True}),
+                json.dumps({"type": "stream", "event": "assistant", "content": f"{conversation_id} 2"}),
+                json.dumps({"type": "result", "success": True}),
+            ]
+        )
+        for conversation_id in ("conv-a", "conv-b")
+    }
+    unopened = list(sockets.values())
+
+    async def _connect(*args, **kwargs):
+        return unopened.pop(0)
+
+    monkeypatch.setattr(deliver_activities.websockets, "connect", _connect)
+
+    try:
+        responses = [
+            (
+                await deliver_activities.deliver_to_letta(
+                    DeliverToLettaInput(agent_id="agent-123", message_body="m", conversation_id=conversation_id)
+                )
+            ).response_text
+            for conversation_id in ("conv-a", "conv-b", "conv-a", "conv-b")
+        ]
+    finally:
+        await deliver_activities.close_gateway_pool()
+
+    # Alternating rooms reuses each conversation's session instead of reconnecting
+    assert responses == ["conv-a 1", "conv-b 1", "conv-a 2", "conv-b 2"]
+    assert unopened == []
+    for ws in sockets.values():
+        assert [json.loads(p)["type"] for p in ws.sent[:3]] == ["session_start", "message", "message"]
+
+
+@pytest.mark.asyncio
+async def test_deliver_to_letta_default_conversation_does_not_reuse_bound_session(monkeypatch):
+    sockets = [
+        _DeliverWS(
+            [
+                json.dumps({"type": "session_init", "session_id": "s1", "conversation_id": "conv-a"}),
+                json.dumps({"type": "result", "success": True}),
+            ]
+        ),
+        _DeliverWS(
+            [
+                json.dumps({"type": "session_init", "session_id": "s2", "conversation_id": "default-conv"}),
+                json.dumps({"type": "result", "success": True}),
+                json.dumps({"type": "result", "success": True}),
+            ]
+        ),
+    ]
+    opened = []
+
+    async def _connect(*args, **kwargs):
+        opened.append(sockets[0])
+        return sockets.pop(0)
+
+    monkeypatch.setattr(deliver_activities.websockets, "connect", _connect)
+
+    try:
+        for conversation_id in ("conv-a", "", ""):
+            await deliver_activities.deliver_to_letta(
+                DeliverToLettaInput(agent_id="agent-123", message_body="m", conversation_id=conversation_id)
+            )
+    finally:
+        await deliver_activities.close_gateway_pool()
+
+    # The default-conversation session is opened once and then reused
+    assert len(opened) == 2
+    assert "conversation_id" not in json.loads(opened[1].sent[0])
+
+
+def test_session_wait_budget_uses_remaining_start_to_close(monkeypatch):
+    from datetime import datetime, timedelta, timezone
+    from types import SimpleNamespace
+
+    info = SimpleNamespace(
+        start_to_close_timeout=timedelta(minutes=30),
+        started_time=datetime.now(timezone.utc) - timedelta(minutes=5),
+    )
+    monkeypatch.setattr(deliver_activities.activity, "in_activity", lambda: True)
+    monkeypatch.setattr(deliver_activities.activity, "info", lambda: info)
+    monkeypatch.setattr(deliver_activities, "_SESSION_WAIT_RESERVE", 300.0)
+
+    assert deliver_activities._session_wait_budget() == pytest.approx(25 * 60 - 300, abs=5)
+
+    info.started_time = datetime.now(timezone.utc) - timedelta(minutes=29)
+    assert deliver_activities._session_wait_budget() is None
+
+
+@pytest.mark.asyncio
+async def test_deliver_to_letta_heartbeats_while_streaming(monkeypatch):
+    from temporalio.testing import ActivityEnvironment
+
+    ws = _DeliverWS(
+        [
+            json.dumps({"type": "session_init", "session_id": "sess-1"}),
+            json.dumps({"type": "stream", "event": "assistant", "content": "Hello"}),
+            json.dumps({"type": "result", "success": True}),
+        ]
+    )
+
+    async def _connect(*args, **kwargs):
+        return ws
+
+    monkeypatch.setattr(deliver_activities.websockets, "connect", _connect)
+    heartbeats = []
+    env = ActivityEnvironment()
+    env.on_heartbeat = lambda *details: heartbeats.append(details[0])
+
+    try:
+        result = await env.run(
+            deliver_activities.deliver_to_letta,
+            DeliverToLettaInput(agent_id="agent-123", message_body="hi"),
+        )
+    finally:
+        await deliver_activities.close_gateway_pool()
+
+    assert result.success is True
+    assert heartbeats[-1] == {"events": 2, "response_chars": 5}
+
+
 @pytest.mark.asyncio
 async def test_send_delivery_ack_handles_5xx_gracefully(monkeypatch):
     client = _HTTPClient(_HTTPResponse(status_code=500, text="boom"))
@@ -488,10 +866,20 @@ async def test_send_delivery_ack_handles_5xx_gracefully(monkeypatch):
 async def test_dead_letter_message_writes_db_and_alerts(monkeypatch):
     execute_calls = []
 
+    class _Transaction:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
     class _Conn:
-        async def execute(self, query, *args):
+        async def executemany(self, query, args):
             execute_calls.append((query, args))
 
+        def transaction(self):
+            return _Transaction()
+
         async def close(self):
             return None
 
@@ -505,6 +893,8 @@ async def test_dead_letter_message_writes_db_and_alerts(monkeypatch):
     fake_asyncpg = types.SimpleNamespace(connect=_connect)
     import sys
     monkeypatch.setitem(sys.modules, "asyncpg", fake_asyncpg)
+    buffer = deliver_activities.DeadLetterBuffer("postgresql://test", "http://ntfy", "alerts", flush_interval=0)
+    monkeypatch.setattr(deliver_activities, "_get_dead_letter_buffer", lambda: buffer)
 
     result = await deliver_activities.dead_letter_message(
         deliver_activities.DeadLetterInput(
@@ -520,6 +910,7 @@ async def test_dead_letter_message_writes_db_and_alerts(monkeypatch):
 
     assert result.success is True
     assert len(execute_calls) == 1
+    assert execute_calls[0][1][0][0] == "$evt"
     assert len(client.post_calls) == 1
 
 
@@ -684,3 +1075,104 @@ async def test_ingest_to_haystack_delete_disabled_skips_delete(monkeypatch):
     # Only ingest call, no delete
     assert len(client.post_calls) == 1
     assert "ingest_document" in client.post_calls[0][0]
+
+
+@pytest.mark.asyncio
+async def test_stream_parse_and_ingest_flushes_sections_as_pages_arrive(monkeypatch, tmp_path):
+    from src.matrix import document_parser
+    from src.matrix.document_parser import DocumentSection
+
+    temp_file = tmp_path / "big.pdf"
+    temp_file.write_bytes(b"%PDF-1.4")
+
+    async def _fake_sections(file_path, filename="document", config=None):
+        for i in range(5):
+            yield DocumentSection(index=i, text=f"page {i} " + "x" * 20, page_number=i + 1, page_count=5, was_ocr=i == 4)
+
+    monkeypatch.setattr(document_parser, "iter_document_sections", _fake_sections)
+    monkeypatch.setenv("HAYHOOKS_INGEST_STREAM_SECTION_CHARS", "50")
+    monkeypatch.setenv("HAYHOOKS_DELETE_BEFORE_INGEST", "true")
+
+    client = _MultiResponseClient({
+        "delete_by_filename": _MockResponse(200, {}),
+        "ingest_document": _MockResponse(200, {"result": json.dumps({"status": "ok", "chunks_stored": 2})}),
+    })
+    monkeypatch.setattr(ingest_activities.httpx, "AsyncClient", lambda timeout=600.0: client)
+
+    result = await ingest_activities.stream_parse_and_ingest(
+        activities.StreamingIngestInput(
+            file_path=str(temp_file),
+            file_name="big.pdf",
+            room_id="!room:matrix.test",
+            sender="@user:matrix.test",
+        )
+    )
+
+    assert result.success is True
+    assert result.page_count == 5
+    assert result.was_ocr is True
+    assert result.sections_ingested == 3
+    assert result.chunks_stored == 6
+    assert "delete_by_filename" in client.post_calls[0][0]
+    ingest_filenames = [payload["filename"] for _, payload in client.post_calls[1:]]
+    assert ingest_filenames == ["big.pdf (part 1)", "big.pdf (part 2)", "big.pdf (part 3)"]
+    assert not temp_file.exists()
+
+
+@pytest.mark.asyncio
+async def test_stream_parse_and_ingest_parse_failure_skips_delete(monkeypatch, tmp_path):
+    from src.matrix import document_parser
+    from src.matrix.document_parser import DocumentParseError
+
+    temp_file = tmp_path / "broken.pdf"
+    temp_file.write_bytes(b"%PDF-1.4")
+
+    async def _failing_sections(file_path, filename="document", config=None):
+        raise DocumentParseError("No text could be extracted from the document")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(document_parser, "iter_document_sections", _failing_sections)
+    client = _MultiResponseClient({})
+    monkeypatch.setattr(ingest_activities.httpx, "AsyncClient", lambda timeout=600.0: client)
+
+    with pytest.raises(activities.ParseError):
+        await ingest_activities.stream_parse_and_ingest(
+            activities.StreamingIngestInput(
+                file_path=str(temp_file),
+                file_name="broken.pdf",
+                room_id="!room:matrix.test",
+                sender="@user:matrix.test",
+            )
+        )
+
+    assert client.post_calls == []
+    assert not temp_file.exists()
+
+
+@pytest.mark.asyncio
+async def test_stream_parse_and_ingest_keeps_file_for_retry_on_ingest_error(monkeypatch, tmp_path):
+    from src.matrix import document_parser
+    from src.matrix.document_parser import DocumentSection
+
+    temp_file = tmp_path / "big.pdf"
+    temp_file.write_bytes(b"%PDF-1.4")
+
+    async def _fake_sections(file_path, filename="document", config=None):
+        yield DocumentSection(index=0, text="page text " * 5, page_number=1, page_count=1)
+
+    monkeypatch.setattr(document_parser, "iter_document_sections", _fake_sections)
+    monkeypatch.setenv("HAYHOOKS_DELETE_BEFORE_INGEST", "false")
+    client = _MultiResponseClient({"ingest_document": _MockResponse(503, {"detail": "unavailable"})})
+    monkeypatch.setattr(ingest_activities.httpx, "AsyncClient", lambda timeout=600.0: client)
+
+    with pytest.raises(activities.IngestError):
+        await ingest_activities.stream_parse_and_ingest(
+            activities.StreamingIngestInput(
+                file_path=str(temp_file),
+                file_name="big.pdf",
+                room_id="!room:matrix.test",
+                sender="@user:matrix.test",
+            )
+        )
+
+    assert temp_file.exists()
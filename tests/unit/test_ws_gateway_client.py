@@ -496,7 +496,7 @@ async def test_get_or_create_returns_entry_with_in_use_set(gateway_client):
     )
     
     # Manually add to pool
-    gateway_client._pool[agent_id] = entry
+    gateway_client._pool[(agent_id, None)] = entry
     
     # Call _get_or_create
     result = await gateway_client._get_or_create(agent_id)
@@ -524,7 +524,7 @@ async def test_get_or_create_waits_for_busy_entry(gateway_client):
     )
     
     # Manually add to pool
-    gateway_client._pool[agent_id] = entry
+    gateway_client._pool[(agent_id, None)] = entry
     
     # Start _get_or_create as a task
     task = asyncio.create_task(gateway_client._get_or_create(agent_id))
@@ -559,7 +559,7 @@ async def test_get_or_create_timeout_on_permanently_busy_entry(gateway_client):
     )
     
     # Manually add to pool
-    gateway_client._pool[agent_id] = entry
+    gateway_client._pool[(agent_id, None)] = entry
     gateway_client._connect_timeout = 0.1
     
     # Call _get_or_create with short timeout
@@ -569,6 +569,95 @@ async def test_get_or_create_timeout_on_permanently_busy_entry(gateway_client):
     assert "Timed out" in str(exc_info.value)
 
 
+@pytest.mark.asyncio
+async def test_get_or_create_acquire_timeout_outlasts_connect_timeout(gateway_client):
+    """
+    Test that a caller-supplied acquire_timeout keeps waiting for a busy session past connect_timeout.
+    """
+    agent_id = "test-agent-long-turn"
+    mock_ws = AsyncMock()
+    mock_ws.ping = AsyncMock(return_value=None)
+    entry = _PoolEntry(ws=mock_ws, agent_id=agent_id, session_id="session-123", in_use=True)
+    gateway_client._pool[(agent_id, None)] = entry
+    gateway_client._connect_timeout = 0.05
+
+    task = asyncio.create_task(gateway_client._get_or_create(agent_id, acquire_timeout=5.0))
+    await asyncio.sleep(0.3)
+    assert not task.done()
+
+    async with gateway_client._pool_changed:
+        entry.in_use = False
+        gateway_client._pool_changed.notify_all()
+
+    assert await asyncio.wait_for(task, timeout=1.0) is entry
+
+
+def _strict_entry(conversation_id):
+    ws = AsyncMock()
+    ws.ping = AsyncMock(return_value=None)
+    return _PoolEntry(ws=ws, agent_id="agent", conversation_id=conversation_id or "default-conv")
+
+
+@pytest.mark.asyncio
+async def test_strict_conversation_reuses_session_when_alternating_conversations():
+    """
+    Test that strict mode keeps one session per conversation, so alternating rooms reuse warm sessions.
+    """
+    client = GatewayClient(gateway_url="ws://localhost:8000", strict_conversation=True)
+    sessions = {"conv-a": _strict_entry("conv-a"), "conv-b": _strict_entry("conv-b")}
+
+    async def connect(agent_id, conversation_id=None):
+        return sessions[conversation_id]
+
+    with patch.object(client, "_connect_and_init", side_effect=connect) as mock_connect:
+        for conversation_id in ("conv-a", "conv-b", "conv-a", "conv-b"):
+            entry = await client._get_or_create("agent", conversation_id)
+            assert entry is sessions[conversation_id]
+            entry.in_use = False
+
+    assert mock_connect.await_count == 2
+    assert set(client._pool) == {("agent", "conv-a"), ("agent", "conv-b")}
+    for entry in sessions.values():
+        entry.ws.close.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_strict_conversation_busy_session_does_not_block_other_conversation():
+    """
+    Test that a turn streaming in one conversation doesn't make another conversation of the same agent wait.
+    """
+    client = GatewayClient(gateway_url="ws://localhost:8000", strict_conversation=True, connect_timeout=0.1)
+    busy = _strict_entry("conv-a")
+    busy.in_use = True
+    client._pool[("agent", "conv-a")] = busy
+    fresh = _strict_entry("conv-b")
+
+    with patch.object(client, "_connect_and_init", AsyncMock(return_value=fresh)):
+        result = await client._get_or_create("agent", "conv-b")
+
+    assert result is fresh
+    assert client._pool[("agent", "conv-a")] is busy
+
+
+@pytest.mark.asyncio
+async def test_strict_conversation_default_conversation_gets_own_session():
+    """
+    Test that strict mode does not hand a session bound to a conversation to a default-conversation caller.
+    """
+    client = GatewayClient(gateway_url="ws://localhost:8000", strict_conversation=True)
+    bound = _strict_entry("conv-a")
+    client._pool[("agent", "conv-a")] = bound
+    fresh = _strict_entry(None)
+
+    with patch.object(client, "_connect_and_init", AsyncMock(return_value=fresh)) as connect:
+        result = await client._get_or_create("agent", None)
+
+    assert result is fresh
+    connect.assert_awaited_once_with("agent", None)
+    assert client._pool[("agent", None)] is fresh
+    bound.ws.close.assert_not_awaited()
+
+
 @pytest.mark.asyncio
 async def test_evict_oldest_unlocked_skips_in_use(gateway_client):
     """
@@ -598,8 +687,8 @@ async def test_evict_oldest_unlocked_skips_in_use(gateway_client):
     )
     
     # Add to pool
-    gateway_client._pool[agent_id_old] = entry_old
-    gateway_client._pool[agent_id_new] = entry_new
+    gateway_client._pool[(agent_id_old, None)] = entry_old
+    gateway_client._pool[(agent_id_new, None)] = entry_new
     
     # Call _evict_oldest_unlocked
     result = await gateway_client._evict_oldest_unlocked()
@@ -607,9 +696,9 @@ async def test_evict_oldest_unlocked_skips_in_use(gateway_client):
     # Verify it reported success
     assert result is True
     # Verify agent-old is still in pool (skipped because in_use)
-    assert agent_id_old in gateway_client._pool
+    assert (agent_id_old, None) in gateway_client._pool
     # Verify agent-new was evicted (oldest among non-in_use)
-    assert agent_id_new not in gateway_client._pool
+    assert (agent_id_new, None) not in gateway_client._pool
 
 
 @pytest.mark.asyncio
@@ -639,8 +728,8 @@ async def test_evict_oldest_unlocked_noop_when_all_in_use(gateway_client):
     )
     
     # Add to pool
-    gateway_client._pool[agent_id_1] = entry_1
-    gateway_client._pool[agent_id_2] = entry_2
+    gateway_client._pool[(agent_id_1, None)] = entry_1
+    gateway_client._pool[(agent_id_2, None)] = entry_2
     
     # Call _evict_oldest_unlocked
     result = await gateway_client._evict_oldest_unlocked()
@@ -674,7 +763,7 @@ async def test_get_or_create_waits_at_capacity_instead_of_exceeding():
             session_id=f"session-{i}",
             in_use=True,
         )
-        client._pool[f"other-agent-{i}"] = entry
+        client._pool[(f"other-agent-{i}", None)] = entry
     
     assert len(client._pool) == 2
     
@@ -685,7 +774,7 @@ async def test_get_or_create_waits_at_capacity_instead_of_exceeding():
     assert "Timed out" in str(exc_info.value)
     # Pool should NOT have grown beyond max_connections
     assert len(client._pool) <= 2
-    assert "new-agent" not in client._pool
+    assert ("new-agent", None) not in client._pool
 
 
 @pytest.mark.asyncio
@@ -709,7 +798,7 @@ async def test_get_or_create_creates_after_successful_eviction():
         session_id="session-old",
         in_use=False,
     )
-    client._pool["old-agent"] = entry_old
+    client._pool[("old-agent", None)] = entry_old
     
     assert len(client._pool) == 1
     
@@ -726,8 +815,63 @@ async def test_get_or_create_creates_after_successful_eviction():
         result = await client._get_or_create("new-agent")
     
     # Old entry should have been evicted
-    assert "old-agent" not in client._pool
+    assert ("old-agent", None) not in client._pool
     # New entry should be in pool and reserved
     assert result.agent_id == "new-agent"
     assert result.in_use is True
     assert len(client._pool) == 1
+
+
+def test_sniff_stream_event_only_trusts_unique_top_level_keys():
+    from src.letta.ws_gateway_client import sniff_stream_event
+
+    assert sniff_stream_event('{"type":"stream","event":"reasoning","content":"hm"}') == "reasoning"
+    assert sniff_stream_event(json.dumps({"type": "stream", "event": "assistant"})) == "assistant"
+    # Quoted keys inside string content are escaped and never match
+    assert sniff_stream_event(
+        json.dumps({"type": "stream", "event": "assistant", "content": '{"event": "reasoning"}'})
+    ) == "assistant"
+    # Nested keys in tool_input make the frame ambiguous → decode it
+    assert sniff_stream_event(
+        '{"type":"stream","event":"tool_call","tool_input":{"event":"reasoning"}}'
+    ) is None
+    assert sniff_stream_event('{"type":"result","events":[{"type":"stream"}]}') is None
+    assert sniff_stream_event(b'{"type":"stream","event":"reasoning"}') is None
+
+
+@pytest.mark.asyncio
+async def test_skipped_stream_events_are_not_decoded(gateway_client, mock_ws):
+    entry = _PoolEntry(ws=mock_ws, agent_id="test-agent-sniff", session_id="s", in_use=True)
+    mock_ws.recv.side_effect = [
+        json.dumps({"type": "stream", "event": "reasoning", "content": "thinking"}),
+        json.dumps({"type": "stream", "event": "assistant", "content": "hi"}),
+        json.dumps({"type": "result"}),
+    ]
+
+    with patch.object(gateway_client, "_get_or_create", return_value=entry), \
+         patch("src.letta.ws_gateway_client.decode_gateway_frame", wraps=json.loads) as decode:
+        collected = [
+            event
+            async for event in gateway_client.send_message_streaming(
+                agent_id="test-agent-sniff",
+                message="hi",
+                skip_stream_events=frozenset({"reasoning"}),
+            )
+        ]
+
+    assert [e.get("event") for e in collected] == ["assistant", None]
+    assert decode.call_count == 2
+
+
+def test_gateway_client_import_does_not_load_letta_sdk():
+    """
+    Test that the Temporal worker can import the gateway client without letta_client installed.
+    """
+    import subprocess
+    import sys
+
+    code = (
+        "import sys; import src.letta.ws_gateway_client; "
+        "assert 'letta_client' not in sys.modules and 'src.letta.client' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)